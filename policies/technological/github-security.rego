@@ -14,12 +14,32 @@ vulnerability_management_enabled {
     input.github.security_features.dependabot
 }
 
+# A.8.8 - Dépendances épinglées sans vulnérabilité connue (base OSV locale)
+default dependencies_free_of_known_vulnerabilities = false
+
+dependencies_free_of_known_vulnerabilities {
+    input.vulnerabilities.database.available
+    input.vulnerabilities.pinned > 0
+    input.vulnerabilities.findings_count == 0
+}
+
 # Score technologique - NOM IMPORTANT!
+# La troisième règle ne compte que si l'index OSV local existe: sans lui,
+# elle ne peut pas être satisfaite et ne mesurerait que son absence
 github_security_score = score {
+    input.vulnerabilities.database.available
+    controls := [
+        malware_protection_enabled,
+        vulnerability_management_enabled,
+        dependencies_free_of_known_vulnerabilities
+    ]
+    implemented := count([c | c := controls[_]; c == true])
+    score := (implemented / count(controls)) * 100
+} else = score {
     controls := [
         malware_protection_enabled,
         vulnerability_management_enabled
     ]
     implemented := count([c | c := controls[_]; c == true])
     score := (implemented / count(controls)) * 100
-}
\ No newline at end of file
+}
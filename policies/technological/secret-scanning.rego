@@ -0,0 +1,26 @@
+package technological.secrets
+
+# A.8.12 - Prévention de la fuite de données: le dépôt a été analysé
+default secrets_scan_performed = false
+
+secrets_scan_performed {
+    input.secrets.files_scanned > 0
+}
+
+# A.8.12 - Aucun secret (clé, jeton, clé privée) dans les fichiers du dépôt
+default no_exposed_secrets = false
+
+no_exposed_secrets {
+    secrets_scan_performed
+    input.secrets.findings_count == 0
+}
+
+# Score fuite de données - NOM IMPORTANT!
+secret_scanning_score = score {
+    controls := [
+        secrets_scan_performed,
+        no_exposed_secrets
+    ]
+    implemented := count([c | c := controls[_]; c == true])
+    score := (implemented / count(controls)) * 100
+}
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+import hashlib
+import json
+import mmap
+import os
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+from repo_snapshot import get_snapshot
+
+ASSET_CACHE_PATH = 'evidence/.asset_hashes.json'
+ASSET_MANIFEST_PATH = 'evidence/asset_manifest.tsv'
+CACHE_VERSION = 1
+HASH_WORKERS = int(os.getenv('ASSET_HASH_WORKERS', min(32, (os.cpu_count() or 1) * 4)))
+
+# Au-delà, le fichier est projeté en mémoire (mmap) au lieu d'être lu
+MMAP_THRESHOLD = 4 * 1024 * 1024
+# Octets examinés pour reconnaître un binaire (octet nul, comme git)
+SNIFF_BYTES = 8192
+
+# Arborescences de code tiers: inventoriées en bloc, jamais hachées fichier par fichier
+VENDORED_DIRS = {'node_modules', 'vendor', 'third_party', 'third-party', 'bower_components',
+                 '.venv', 'venv', 'site-packages', 'Pods', 'Carthage'}
+
+# Sorties des scripts de conformité (preuves, rapports, historique, caches):
+# non suivies, elles ne sont ni inventoriées ni analysées
+GENERATED_DIRS = ('evidence', 'reports', 'history')
+
+# Catégorie d'actif par extension; les extensions binaires ne sont pas lues
+ASSET_TYPES = {
+    "source": ('.py', '.js', '.ts', '.tsx', '.jsx', '.go', '.rs', '.java', '.kt', '.c', '.h', '.cc', '.cpp',
+               '.hpp', '.cs', '.rb', '.php', '.swift', '.scala', '.sh', '.bash', '.ps1', '.sql', '.rego'),
+    "config": ('.yml', '.yaml', '.json', '.toml', '.ini', '.cfg', '.conf', '.xml', '.env', '.properties',
+               '.tf', '.hcl', '.lock'),
+    "document": ('.md', '.markdown', '.rst', '.txt', '.adoc', '.html', '.htm', '.csv', '.j2'),
+    "image": ('.png', '.jpg', '.jpeg', '.gif', '.bmp', '.ico', '.webp', '.svg', '.tiff'),
+    "archive": ('.zip', '.tar', '.gz', '.tgz', '.bz2', '.xz', '.7z', '.rar', '.jar', '.war', '.whl'),
+    "binary": ('.exe', '.dll', '.so', '.dylib', '.a', '.o', '.obj', '.bin', '.class', '.pyc', '.wasm',
+               '.pdf', '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx', '.mp3', '.mp4', '.mov', '.avi',
+               '.woff', '.woff2', '.ttf', '.otf', '.eot', '.db', '.sqlite')
+}
+EXTENSION_TYPES = {extension: asset_type for asset_type, extensions in ASSET_TYPES.items()
+                   for extension in extensions}
+UNREAD_TYPES = {"image", "archive", "binary"}
+
+class AssetInventory:
+    """Inventaire des fichiers suivis du dépôt: taille, type et SHA-256
+
+    Les empreintes sont calculées en parallèle (le hachage libère le GIL)
+    et mémorisées par (inode, taille, mtime): un fichier inchangé n'est
+    jamais relu. Binaires (extension ou octet nul) et arborescences de code
+    tiers sont reconnus et comptés sans être hachés. Un instantané sans
+    répertoire sur disque (commit git) est inventorié sans empreintes.
+    Le manifeste est écrit dans `manifest_path` (si précisé) une fois par
+    état de l'instantané, avec ou sans cache d'empreintes.
+    """
+
+    def __init__(self, cache_path=None, workers=HASH_WORKERS, manifest_path=None):
+        self.cache_path = cache_path
+        self.workers = workers
+        self.manifest_path = manifest_path
+        # chemin -> [inode, taille, mtime_ns, type, sha256]
+        self.hashes = {}
+        self.snapshot = None
+        self.generation = None
+        self.assets = []
+        self.skipped = {}
+        # Fichiers illisibles lors du dernier inventaire (stats["errors"] cumule)
+        self.unreadable = []
+        # Génération de l'instantané dont le manifeste a été écrit
+        self.manifest_generation = None
+        self.stats = {"hashed": 0, "reused": 0, "bytes_hashed": 0, "errors": 0}
+        if cache_path is not None:
+            self.load()
+
+    def load(self):
+        try:
+            with open(self.cache_path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") == CACHE_VERSION:
+            self.hashes = data.get("files", {})
+
+    def save(self):
+        if self.cache_path is None:
+            return
+        os.makedirs(os.path.dirname(self.cache_path) or '.', exist_ok=True)
+        tmp_path = f"{self.cache_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(json.dumps({"version": CACHE_VERSION, "files": self.hashes}, separators=(',', ':')))
+        os.replace(tmp_path, self.cache_path)
+
+    # ---------- Inventaire ----------
+
+    def refresh(self, snapshot=None):
+        """Inventaire à jour pour un instantané (une seule fois par état de l'instantané)"""
+        snapshot = snapshot or get_snapshot()
+        if snapshot is self.snapshot and snapshot.generation == self.generation:
+            return self
+        assets = []
+        skipped = {}
+        pending = []
+        hashes = {}
+        unreadable = []
+        for path in tracked_files(snapshot):
+            entry = snapshot.stat(path)
+            if entry is None or entry.is_dir:
+                continue
+            if is_vendored(path):
+                skipped["vendored"] = skipped.get("vendored", 0) + 1
+                continue
+            asset_type = EXTENSION_TYPES.get(os.path.splitext(path)[1].lower(), "other")
+            asset = [path, entry.size, asset_type, None]
+            assets.append(asset)
+            if asset_type in UNREAD_TYPES or snapshot.root is None:
+                continue
+            cached = self.hashes.get(path)
+            if cached and cached[:3] == [entry.inode, entry.size, entry.mtime_ns]:
+                asset[2], asset[3] = cached[3], cached[4]
+                hashes[path] = cached
+                self.stats["reused"] += 1
+            else:
+                pending.append((asset, entry))
+        if pending:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                digests = pool.map(lambda item: hash_file(os.path.join(snapshot.root, item[0][0]), item[1].size),
+                                   pending)
+                for (asset, entry), (detected_type, digest) in zip(pending, digests):
+                    if detected_type is None:
+                        self.stats["errors"] += 1
+                        unreadable.append(asset[0])
+                        continue
+                    asset[2] = detected_type or asset[2]
+                    asset[3] = digest
+                    hashes[asset[0]] = [entry.inode, entry.size, entry.mtime_ns, asset[2], digest]
+                    if digest:
+                        self.stats["hashed"] += 1
+                        self.stats["bytes_hashed"] += entry.size
+        for asset in assets:
+            if asset[2] in UNREAD_TYPES:
+                skipped["binary"] = skipped.get("binary", 0) + 1
+        self.hashes = hashes
+        self.assets = assets
+        self.skipped = skipped
+        self.unreadable = unreadable
+        self.snapshot = snapshot
+        self.generation = snapshot.generation
+        return self
+
+    def manifest_lines(self):
+        """Manifeste compact, une ligne par actif: sha256, taille, type, chemin (séparés par des tabulations)"""
+        for path, size, asset_type, digest in self.assets:
+            yield f"{digest or '-'}\t{size}\t{asset_type}\t{path}\n"
+
+    def manifest_sha256(self):
+        digest = hashlib.sha256()
+        for line in self.manifest_lines():
+            digest.update(line.encode('utf-8', errors='surrogateescape'))
+        return digest.hexdigest()
+
+    def write_manifest(self):
+        """Écrit le manifeste de l'inventaire courant; retourne son chemin, None s'il n'a pas pu l'être"""
+        if self.manifest_path is None:
+            return None
+        if self.manifest_generation == (self.snapshot, self.generation):
+            return self.manifest_path
+        try:
+            os.makedirs(os.path.dirname(self.manifest_path) or '.', exist_ok=True)
+            tmp_path = f"{self.manifest_path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8', errors='surrogateescape') as f:
+                f.writelines(self.manifest_lines())
+            os.replace(tmp_path, self.manifest_path)
+        except OSError as e:
+            print(f"⚠️  Manifeste des actifs non écrit ({self.manifest_path}): {e}")
+            return None
+        self.manifest_generation = (self.snapshot, self.generation)
+        return self.manifest_path
+
+    def is_complete(self):
+        """Inventaire non vide dont chaque fichier a été lu (manifeste écrit s'il est demandé)"""
+        if not self.assets or self.unreadable:
+            return False
+        return self.manifest_path is None or self.write_manifest() is not None
+
+    def summary(self):
+        """Section `assets` des preuves: seulement ce que les politiques évaluent
+
+        Volumes, empreinte du manifeste et compteurs de hachage changent à
+        chaque commit ou exécution: ils vont dans les métriques (`statistics`).
+        """
+        return {
+            "complete": self.is_complete(),
+            "unreadable": len(self.unreadable)
+        }
+
+    def statistics(self):
+        """Volumes par type, empreinte du manifeste et compteurs de hachage de cette exécution"""
+        types = {}
+        total_bytes = 0
+        for _, size, asset_type, _ in self.assets:
+            types[asset_type] = types.get(asset_type, 0) + 1
+            total_bytes += size
+        return {
+            "files": len(self.assets),
+            "bytes": total_bytes,
+            "hashed": sum(1 for asset in self.assets if asset[3]),
+            "types": dict(sorted(types.items())),
+            "skipped": dict(sorted(self.skipped.items())),
+            "manifest_sha256": self.manifest_sha256(),
+            "hashing": dict(self.stats)
+        }
+
+def tracked_files(snapshot, untracked=False):
+    """Fichiers suivis par git (`git ls-files`), sinon tous les fichiers de l'instantané
+
+    `untracked`: ajoute les fichiers non suivis qui ne sont pas exclus par
+    .gitignore (ceux qu'un prochain commit pourrait inclure), hors sorties
+    non suivies des scripts (GENERATED_DIRS): un jeton repris d'une réponse
+    de l'API dans les preuves n'est pas une fuite du dépôt.
+    """
+    if snapshot.root is not None:
+        command = ['git', '-C', snapshot.root, 'ls-files', '-z']
+        if untracked:
+            command += ['--cached', '--others', '--exclude-standard']
+            command += [f'--exclude=/{directory}/' for directory in GENERATED_DIRS]
+        try:
+            output = subprocess.run(command, capture_output=True, check=True).stdout
+            return sorted(os.fsdecode(path) for path in output.split(b'\0') if path)
+        except (OSError, subprocess.CalledProcessError):
+            pass
+    # Répertoire hors git: pas de fichiers suivis, les sorties des scripts sont écartées;
+    # arbre d'un commit: tout y est suivi
+    generated = GENERATED_DIRS if snapshot.root is not None else ()
+    return sorted(path for path, entry in snapshot.entries.items()
+                  if path and not entry.is_dir and path.split('/', 1)[0] not in generated)
+
+def is_vendored(path):
+    return any(part in VENDORED_DIRS for part in path.split('/')[:-1])
+
+def hash_file(path, size):
+    """(type détecté, sha256): ("binary", None) pour un binaire, (None, None) si illisible"""
+    try:
+        with open(path, 'rb') as f:
+            head = f.read(SNIFF_BYTES)
+            if b'\0' in head:
+                return "binary", None
+            digest = hashlib.sha256(head)
+            if size > MMAP_THRESHOLD:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    with memoryview(mapped) as view, view[len(head):] as rest:
+                        digest.update(rest)
+            else:
+                digest.update(f.read())
+            return "", digest.hexdigest()
+    except (OSError, ValueError):
+        return None, None
+
+# Inventaire actif pour la collecte en cours (None = inventaire en mémoire, sans cache)
+_active_inventory = None
+
+def get_asset_inventory():
+    """Inventaire à jour pour l'instantané courant"""
+    global _active_inventory
+    if _active_inventory is None:
+        _active_inventory = AssetInventory()
+    return _active_inventory.refresh()
+
+def set_asset_inventory(inventory):
+    global _active_inventory
+    _active_inventory = inventory
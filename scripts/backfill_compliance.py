@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""Conformité rétroactive sur une plage de commits, lue directement dans les objets git
+
+Chaque commit est évalué à partir de son arbre (GitTreeSnapshot), sans
+checkout: la copie de travail n'est jamais modifiée. Les commits qui ne
+touchent aucun fichier lu par les vérifications ne recollectent que les
+sections qui portent sur tout le dépôt (secrets, inventaire); s'ils ne
+changent rien, ils reprennent le résultat du commit précédent. Les
+politiques .rego utilisées sont celles de la copie de travail: tous les
+commits sont mesurés avec le même référentiel.
+
+    python scripts/backfill_compliance.py --max-count 2000 --history
+"""
+import argparse
+import contextlib
+import io
+import os
+import re
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+from check_cache import affects, set_check_cache, set_dependency_recorder
+from asset_inventory import AssetInventory, set_asset_inventory
+from collect_real_evidence import CHECKS, WHOLE_TREE_SECTIONS, calculate_realistic_score, evidence_sections
+from control_registry import ControlRegistry, control_selection, set_control_registry
+from evaluate_with_opa import evaluate_evidence_documents, resolve_backend
+from git_objects import GitError, GitObjectReader, GitTreeSnapshot
+from history_store import HISTORY_PATH, HistoryStore
+from jsonl_io import JsonlWriter
+from pipeline_metrics import Metrics, get_metrics, set_metrics
+from policy_index import PolicyIndex, set_policy_index
+from repo_snapshot import set_snapshot
+from secret_scanner import SecretScanner, set_secret_scanner
+from workflow_analyzer import WorkflowAnalyzer, set_workflow_analyzer
+
+BACKFILL_PATH = 'reports/compliance_backfill.jsonl'
+# Commits évalués ensemble (un seul appel d'évaluation OPA par lot)
+EVALUATION_BATCH = 50
+
+def list_commits(repository='.', revision='HEAD', max_count=2000, first_parent=True):
+    """Identifiants des `max_count` derniers commits de `revision` (plage `a..b` acceptée), du plus ancien au plus récent"""
+    command = ['git', '-C', repository, 'rev-list', '--reverse', f'--max-count={max_count}']
+    if first_parent:
+        command.append('--first-parent')
+    command.append(revision)
+    process = subprocess.run(command, capture_output=True, text=True)
+    if process.returncode != 0:
+        raise GitError(process.stderr.strip() or f"git rev-list a échoué ({process.returncode})")
+    return process.stdout.split()
+
+def backfill(repository='.', revision='HEAD', max_count=2000, backend="python", policies_dir="policies",
+             controls=None, repository_name=None, first_parent=True):
+    """Points de la série temporelle, un par commit, dans l'ordre chronologique
+
+    Quand un commit ne modifie aucun chemin dont dépendent les vérifications
+    (chemins relevés par `depends_on` pendant les évaluations précédentes),
+    seules les sections et vérifications sans `depends_on` (WHOLE_TREE_SECTIONS,
+    ex: recherche de secrets) sont recollectées. Un point porte
+    `evaluated: False` quand elles ne changent pas non plus: ses scores sont
+    ceux du commit précédent.
+    """
+    metrics = get_metrics()
+    repository_name = repository_name or repository_label(repository)
+    with metrics.stage("list_commits"):
+        commit_ids = list_commits(repository, revision, max_count, first_parent)
+
+    set_check_cache(None)
+    # Index des politiques en mémoire: un document identique n'est indexé qu'une fois
+    set_policy_index(PolicyIndex())
+    # Idem pour les workflows: un fichier inchangé d'un commit à l'autre n'est analysé qu'une fois
+    set_workflow_analyzer(WorkflowAnalyzer())
+    # Secrets et inventaire: un blob déjà analysé n'est pas relu
+    set_secret_scanner(SecretScanner())
+    set_asset_inventory(AssetInventory())
+    dependencies = None
+    previous_tree = None
+    previous_evidence = None
+    pending = []
+    collected = 0
+    last = None
+    try:
+        with GitObjectReader(repository) as reader:
+            for commit_id in commit_ids:
+                with metrics.stage("read_tree"):
+                    commit = reader.commit(commit_id)
+                    changed = reader.diff(previous_tree, commit["tree"],
+                                          descend=lambda path: may_contain(path, dependencies)
+                                          ) if previous_tree and dependencies is not None else None
+                previous_tree = commit["tree"]
+                if changed is not None and not affects(changed, dependencies):
+                    evidence = None
+                    if changed:
+                        with metrics.stage("collect_whole_tree"):
+                            evidence = collect_whole_tree_evidence(reader, commit, previous_evidence, controls)
+                    pending.append((commit, evidence))
+                else:
+                    with metrics.stage("collect"):
+                        evidence, recorded = collect_commit_evidence(reader, commit, repository_name, controls)
+                    dependencies = (dependencies or set()) | recorded
+                    if previous_evidence is not None and unchanged(previous_evidence, evidence):
+                        # Fichiers lus modifiés, preuves identiques: pas de nouvelle évaluation
+                        evidence = None
+                    pending.append((commit, evidence))
+                if evidence is not None:
+                    previous_evidence = evidence
+                    collected += 1
+                if collected >= EVALUATION_BATCH:
+                    last = yield from evaluate_pending(pending, last, backend, policies_dir)
+                    pending = []
+                    collected = 0
+            yield from evaluate_pending(pending, last, backend, policies_dir)
+            metrics.record_cache("git_blobs", reader.stats["blob_hits"], len(reader.blobs))
+    finally:
+        set_snapshot(None)
+        set_policy_index(None)
+        set_workflow_analyzer(None)
+        set_secret_scanner(None)
+        set_asset_inventory(None)
+        set_control_registry(None)
+
+def collect_commit_evidence(reader, commit, repository_name, controls=None):
+    """(preuves du commit, chemins lus par les vérifications)"""
+    snapshot = GitTreeSnapshot.from_commit(reader, commit)
+    set_snapshot(snapshot)
+    evidence = {
+        "collection_time": commit_time(commit),
+        "repository": repository_name,
+        "iso27001_version": "2022",
+        "commit": commit["id"]
+    }
+    recorded = set()
+    set_dependency_recorder(recorded)
+    set_control_registry(ControlRegistry(CHECKS))
+    try:
+        # Sans paramètres GitHub: l'API ne décrit que l'état actuel du dépôt
+        for name, collect in evidence_sections(None, controls):
+            evidence[name] = collect()
+    finally:
+        set_dependency_recorder(None)
+    evidence["score_realiste"] = calculate_realistic_score(evidence["controles"])
+    return evidence, recorded
+
+def collect_whole_tree_evidence(reader, commit, previous, controls=None):
+    """Preuves d'un commit qui ne touche aucun chemin relevé par `depends_on`
+
+    Les sections et vérifications qui parcourent tout le dépôt sont
+    recollectées, le reste est repris du commit précédent. None si rien ne
+    change (le point reprend alors l'évaluation précédente).
+    """
+    set_snapshot(GitTreeSnapshot.from_commit(reader, commit))
+    registry = ControlRegistry(CHECKS)
+    set_control_registry(registry)
+    whole_tree = [control_id for control_id in registry.select(controls) if registry.reads_whole_tree(control_id)]
+    updated = {"controles": dict(previous["controles"], **registry.evaluate(whole_tree))}
+    for name, collect in evidence_sections(None, controls):
+        if name in WHOLE_TREE_SECTIONS:
+            updated[name] = collect()
+    if unchanged(previous, updated):
+        return None
+    evidence = dict(previous, collection_time=commit_time(commit), commit=commit["id"], **updated)
+    evidence["score_realiste"] = calculate_realistic_score(evidence["controles"])
+    return evidence
+
+def unchanged(previous, evidence):
+    """Les sections de `evidence` (hors date de collecte et commit) sont-elles celles du commit précédent?"""
+    return all(previous.get(name) == value
+               for name, value in evidence.items() if name not in ("collection_time", "commit"))
+
+def evaluate_pending(pending, last, backend, policies_dir):
+    """Évalue les preuves d'un lot et produit les points dans l'ordre des commits
+
+    `last`: (preuves, résultats) du dernier commit évalué, repris par les
+    commits sans changement pertinent; retourne celui de fin de lot.
+    """
+    documents = [evidence for _, evidence in pending if evidence is not None]
+    if not documents:
+        results = []
+    else:
+        # Les messages par package et par document noieraient la progression
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = evaluate_evidence_documents(documents, backend=backend, policies_dir=policies_dir)
+    results = iter(zip(documents, results))
+    for commit, evidence in pending:
+        if evidence is not None:
+            last = next(results)
+        evidence, opa_results = last
+        yield {
+            "commit": commit["id"],
+            "timestamp": commit_time(commit),
+            "subject": commit["subject"],
+            "evaluated": evidence["commit"] == commit["id"],
+            "score_realiste": evidence["score_realiste"],
+            "overall_score": opa_results["overall_score"],
+            "scores": opa_results["scores"],
+            "compliance_status": opa_results["compliance_status"],
+            "controles": evidence["controles"]
+        }
+    return last
+
+def may_contain(directory, dependencies):
+    """Une dépendance (chemin ou motif fnmatch) peut-elle désigner un chemin sous ce répertoire?"""
+    prefix = f"{directory}/"
+    for dependency in dependencies:
+        literal = re.split(r'[*?\[]', dependency, 1)[0]
+        if literal.startswith(prefix) or (literal != dependency and prefix.startswith(literal)):
+            return True
+    return False
+
+def repository_label(repository):
+    return os.getenv('GITHUB_REPOSITORY') or os.path.basename(os.path.abspath(repository))
+
+def commit_time(commit):
+    return datetime.fromtimestamp(commit["timestamp"], timezone.utc).replace(tzinfo=None).isoformat()
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Série temporelle de conformité sur l'historique git")
+    parser.add_argument('revision', nargs='?', default='HEAD', help="commit ou plage (v1.0..HEAD); défaut: HEAD")
+    parser.add_argument('--repo', default='.', help="dépôt git à analyser")
+    parser.add_argument('--max-count', type=int, default=2000, help="nombre de commits (défaut: 2000)")
+    parser.add_argument('--all-parents', action='store_true',
+                        help="suivre aussi les branches fusionnées (défaut: premier parent seulement)")
+    parser.add_argument('--backend', choices=['bundle', 'server', 'subprocess', 'python'],
+                        default=os.getenv('OPA_BACKEND', 'python'), help="moteur d'évaluation (défaut: python)")
+    parser.add_argument('--policies', default='policies', help="répertoire des politiques .rego")
+    parser.add_argument('--controls', nargs='+', metavar='ID', type=control_selection,
+                        help="n'évaluer que ces thèmes (A.8) ou contrôles (A.5.15)")
+    parser.add_argument('--output', default=BACKFILL_PATH, help=f"série JSON Lines (défaut: {BACKFILL_PATH})")
+    parser.add_argument('--history', action='store_true',
+                        help=f"enregistrer les commits évalués dans l'historique ({HISTORY_PATH})")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    metrics = Metrics("backfill_compliance")
+    set_metrics(metrics)
+    start = time.perf_counter()
+    print(f"⏪ Conformité rétroactive: {args.revision} ({args.max_count} commits au plus)...")
+
+    backend = resolve_backend(args.backend)
+    points = backfill(args.repo, args.revision, args.max_count, backend, args.policies, args.controls,
+                      first_parent=not args.all_parents)
+    first = last = None
+    total = evaluated = 0
+    try:
+        with contextlib.ExitStack() as stack:
+            writer = stack.enter_context(JsonlWriter(args.output))
+            store = stack.enter_context(HistoryStore(HISTORY_PATH)) if args.history else None
+            for point in points:
+                writer.write(dict(point, type="commit"))
+                first = first or point
+                last = point
+                total += 1
+                if not point["evaluated"]:
+                    continue
+                evaluated += 1
+                if store is not None:
+                    store.record_run(repository_label(args.repo), point["timestamp"], point["controles"],
+                                     point["scores"], point["compliance_status"], point["overall_score"],
+                                     point["score_realiste"])
+    except GitError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    metrics.add_bytes_written(writer.bytes_written)
+    metrics_path = metrics.write_prometheus()
+
+    print(f"✅ {total} commits: {evaluated} évalués, {total - evaluated} sans changement pertinent")
+    if first:
+        print(f"🎯 Score RÉALISTE: {first['score_realiste']}% ({first['commit'][:8]}) → "
+              f"{last['score_realiste']}% ({last['commit'][:8]})")
+        print(f"🎯 Score global: {first['overall_score']}% → {last['overall_score']}%")
+    print(f"📄 Série: {args.output}" + (f" | historique: {HISTORY_PATH}" if args.history else ""))
+    print(f"⏱️  Durée: {time.perf_counter() - start:.3f}s (métriques: {metrics_path})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+BENCHMARK_VERSION = 1
+
+# Échelles: nombre total de fichiers du dépôt synthétique
+SCALES = {"small": 10, "medium": 1000, "large": 50000}
+STAGES = ("collect", "evaluate", "report")
+
+CATEGORIES = ("organizational", "people", "technological")
+# Chemins d'input lus par les packages synthétiques (tous produits par collect_real_evidence)
+INPUT_PATHS = (
+    "input.policies.information_security_policy",
+    "input.policies.access_control_policy",
+    "input.policies.risk_management_policy",
+    "input.system.has_readme",
+    "input.system.has_github_actions",
+    "input.system.has_tests",
+    "input.github.security_features.code_scanning",
+    "input.github.security_features.dependabot",
+    "input.github.branch_protection.main",
+    "input.security.authentication.mfa_configured",
+)
+
+REGO_TEMPLATE = """package synthetic.pkg_{index:05d}
+
+# A.{theme}.{control} - Contrôle synthétique {index}
+default control_a = false
+
+control_a {{
+    {path_a}
+}}
+
+default control_b = false
+
+control_b {{
+    {path_b}
+}}
+
+# Score du package
+pkg_{index:05d}_score = score {{
+    controls := [
+        control_a,
+        control_b
+    ]
+    implemented := count([c | c := controls[_]; c == true])
+    score := (implemented / count(controls)) * 100
+}}
+"""
+
+WORKFLOW_TEMPLATE = """name: Synthetic {index}
+on: [push]
+jobs:
+  job:
+    runs-on: ubuntu-latest
+    steps:
+      - uses: actions/checkout@v4
+      - run: echo "step {index}"
+"""
+
+CODEQL_WORKFLOW_TEMPLATE = """name: CodeQL {index}
+on: [push, pull_request]
+permissions:
+  contents: read
+  security-events: write
+jobs:
+  analyze:
+    runs-on: ubuntu-latest
+    steps:
+      - uses: actions/checkout@v4
+      - uses: github/codeql-action/init@v3
+        with:
+          languages: python
+      - uses: github/codeql-action/analyze@v3
+"""
+
+POLICY_TEMPLATE = """# Politique synthétique {index}
+
+## Objectif
+Cette politique décrit les exigences de sécurité de l'information applicables
+au périmètre synthétique numéro {index}, utilisées pour mesurer les performances.
+"""
+
+def plan_repository(total_files):
+    """Répartition des fichiers du dépôt synthétique"""
+    fixed = 5  # README, 3 politiques de référence, dependabot
+    rego = max(1, min(400, total_files // 25))
+    workflows = max(1, min(500, total_files // 20))
+    policies = total_files // 10
+    filler = max(0, total_files - fixed - rego - workflows - policies)
+    return {"rego": rego, "workflows": workflows, "policies": policies, "filler": filler}
+
+def write_file(root, path, content):
+    full_path = os.path.join(root, path)
+    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+    with open(full_path, 'w', encoding='utf-8') as f:
+        f.write(content)
+
+def generate_synthetic_repo(root, total_files, seed=0):
+    """Crée un dépôt synthétique déterministe de `total_files` fichiers environ"""
+    rng = random.Random(seed)
+    plan = plan_repository(total_files)
+
+    write_file(root, 'README.md', "# Dépôt synthétique\n\n" + "Documentation du dépôt de benchmark. " * 10)
+    for name in ("information-security-policy.md", "access-control-policy.md", "risk-management-policy.md"):
+        write_file(root, f"policies/{name}", POLICY_TEMPLATE.format(index=name))
+    write_file(root, '.github/dependabot.yml', "version: 2\nupdates: []\n")
+
+    for index in range(plan["policies"]):
+        write_file(root, f"policies/policy-{index:05d}.md", POLICY_TEMPLATE.format(index=index))
+    for index in range(plan["rego"]):
+        path_a, path_b = rng.sample(INPUT_PATHS, 2)
+        write_file(root, f"policies/{CATEGORIES[index % len(CATEGORIES)]}/pkg-{index:05d}.rego",
+                   REGO_TEMPLATE.format(index=index, theme=5 + index % 4, control=1 + index % 34,
+                                        path_a=path_a, path_b=path_b))
+    for index in range(plan["workflows"]):
+        # Quelques workflows CodeQL pour check_has_code_scanning
+        if index % 50 == 0:
+            write_file(root, f".github/workflows/codeql-{index:05d}.yml", CODEQL_WORKFLOW_TEMPLATE.format(index=index))
+        else:
+            write_file(root, f".github/workflows/workflow-{index:05d}.yml", WORKFLOW_TEMPLATE.format(index=index))
+    for index in range(plan["filler"]):
+        size = rng.randint(64, 2048)
+        write_file(root, f"src/module_{index // 100:04d}/file_{index:06d}.py",
+                   f"# Fichier synthétique {index}\n" + "x = 1\n" * (size // 6))
+    return plan
+
+def install_opa_standin(bin_dir):
+    """Place un exécutable `opa` qui lance opa_standin.py"""
+    os.makedirs(bin_dir, exist_ok=True)
+    path = os.path.join(bin_dir, 'opa')
+    with open(path, 'w') as f:
+        f.write(f'#!/bin/sh\nexec "{sys.executable}" "{os.path.join(SCRIPTS_DIR, "opa_standin.py")}" "$@"\n')
+    os.chmod(path, 0o755)
+    return path
+
+# ========== MESURES ==========
+
+def run_collect():
+    from collect_real_evidence import calculate_realistic_score, collect_real_evidence
+    evidence = collect_real_evidence(use_cache=False)
+    evidence["score_realiste"] = calculate_realistic_score(evidence["controles"])
+    os.makedirs('evidence', exist_ok=True)
+    with open('evidence/real_evidence.json', 'w') as f:
+        json.dump(evidence, f, indent=2)
+
+def run_evaluate(backend):
+    from evaluate_with_opa import evaluate_with_opa
+    results = evaluate_with_opa(backend=backend, incremental=False)
+    os.makedirs('reports', exist_ok=True)
+    with open('reports/opa_evaluation_results.json', 'w') as f:
+        json.dump(results, f, indent=2)
+
+def run_report():
+    from generate_final_report import generate_final_report
+    generate_final_report()
+
+def measure(func, *args):
+    """Temps réel et temps CPU d'un appel (sortie console supprimée)"""
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        func(*args)
+        return time.perf_counter() - wall_start, time.process_time() - cpu_start
+
+def summarize(samples):
+    return {
+        "min": round(min(samples), 6),
+        "median": round(statistics.median(samples), 6),
+        "max": round(max(samples), 6)
+    }
+
+def benchmark_scale(repo_dir, repeat, backend):
+    """Mesure chaque étape séparément, `repeat` fois, dans le dépôt synthétique
+
+    Chaque exécution est à froid pour les caches persistants (pas de cache de
+    vérifications, évaluation complète); les caches en mémoire du processus
+    (politiques compilées) sont chauds après la première répétition.
+    """
+    stages = {stage: {"wall": [], "cpu": []} for stage in STAGES}
+    previous_dir = os.getcwd()
+    os.chdir(repo_dir)
+    try:
+        for _ in range(repeat):
+            for stage, func, args in (("collect", run_collect, ()),
+                                      ("evaluate", run_evaluate, (backend,)),
+                                      ("report", run_report, ())):
+                wall, cpu = measure(func, *args)
+                stages[stage]["wall"].append(wall)
+                stages[stage]["cpu"].append(cpu)
+    finally:
+        os.chdir(previous_dir)
+    return {
+        stage: {"wall_seconds": summarize(samples["wall"]), "cpu_seconds": summarize(samples["cpu"])}
+        for stage, samples in stages.items()
+    }
+
+def compare_results(current, baseline, threshold=0.2, min_delta=0.005):
+    """Régressions: médiane du temps réel > baseline × (1 + threshold) et écart > min_delta secondes"""
+    regressions = []
+    comparisons = []
+    for scale, result in current["results"].items():
+        baseline_scale = baseline.get("results", {}).get(scale)
+        if not baseline_scale:
+            continue
+        for stage, timings in result["stages"].items():
+            baseline_stage = baseline_scale["stages"].get(stage)
+            if not baseline_stage:
+                continue
+            now = timings["wall_seconds"]["median"]
+            before = baseline_stage["wall_seconds"]["median"]
+            ratio = now / before if before else float('inf')
+            comparison = {"scale": scale, "stage": stage, "baseline": before,
+                          "current": now, "ratio": round(ratio, 3)}
+            comparisons.append(comparison)
+            if now > before * (1 + threshold) and now - before > min_delta:
+                regressions.append(comparison)
+    return comparisons, regressions
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmarks de la chaîne collecte → évaluation → rapport")
+    parser.add_argument('--scales', nargs='+', default=list(SCALES),
+                        help=f"échelles ({', '.join(f'{k}={v}' for k, v in SCALES.items())}) "
+                             "ou nombres de fichiers")
+    parser.add_argument('--repeat', type=int, default=3, help="répétitions par échelle")
+    parser.add_argument('--backend', choices=['bundle', 'server', 'subprocess', 'python'], default='bundle')
+    parser.add_argument('--real-opa', action='store_true',
+                        help="utiliser le binaire opa du PATH au lieu de opa_standin.py")
+    parser.add_argument('--opa-startup-ms', type=float, default=0,
+                        help="(opa_standin) latence au lancement du processus")
+    parser.add_argument('--opa-eval-ms', type=float, default=0,
+                        help="(opa_standin) latence par évaluation")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workdir', help="répertoire des dépôts synthétiques (défaut: temporaire)")
+    parser.add_argument('--output', default='reports/benchmark_results.json')
+    parser.add_argument('--compare', metavar='BASELINE', help="résultats de référence à comparer")
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="ralentissement toléré par rapport à la référence (0.2 = +20%%)")
+    parser.add_argument('--min-delta-ms', type=float, default=5,
+                        help="écart absolu minimal pour signaler une régression")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    output = os.path.abspath(args.output)
+    workdir = args.workdir or tempfile.mkdtemp(prefix='iso27001-bench-')
+    os.makedirs(workdir, exist_ok=True)
+
+    if not args.real_opa:
+        opa_path = install_opa_standin(os.path.join(workdir, 'bin'))
+        os.environ['PATH'] = os.path.dirname(opa_path) + os.pathsep + os.environ.get('PATH', '')
+        os.environ['OPA_STANDIN_STARTUP_MS'] = str(args.opa_startup_ms)
+        os.environ['OPA_STANDIN_EVAL_MS'] = str(args.opa_eval_ms)
+
+    print(f"⏱️  Benchmarks ({args.backend}, {'opa du PATH' if args.real_opa else 'opa_standin'}, "
+          f"{args.repeat} répétitions)")
+    results = {}
+    try:
+        for scale in args.scales:
+            total_files = SCALES[scale] if scale in SCALES else int(scale)
+            repo_dir = os.path.join(workdir, f"repo-{total_files}")
+            if os.path.exists(repo_dir):
+                shutil.rmtree(repo_dir)
+            start = time.perf_counter()
+            plan = generate_synthetic_repo(repo_dir, total_files, seed=args.seed)
+            print(f"   🏗️  {scale}: {total_files} fichiers générés en {time.perf_counter() - start:.2f}s "
+                  f"({plan['rego']} packages .rego, {plan['workflows']} workflows)")
+            stages = benchmark_scale(repo_dir, args.repeat, args.backend)
+            results[scale] = {"files": total_files, "plan": plan, "stages": stages}
+            for stage, timings in stages.items():
+                print(f"      {stage:9s} médiane {timings['wall_seconds']['median'] * 1000:9.1f} ms "
+                      f"(CPU {timings['cpu_seconds']['median'] * 1000:.1f} ms)")
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    current = {
+        "benchmark_version": BENCHMARK_VERSION,
+        "created": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {"backend": args.backend, "repeat": args.repeat, "seed": args.seed,
+                   "opa": "real" if args.real_opa else "standin",
+                   "opa_startup_ms": args.opa_startup_ms, "opa_eval_ms": args.opa_eval_ms},
+        "results": results
+    }
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(current, f, indent=2)
+    print(f"📄 Résultats: {output}")
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+        if baseline.get("config") != current["config"]:
+            print("⚠️  Configuration différente de la référence: comparaison indicative")
+        comparisons, regressions = compare_results(current, baseline, args.threshold,
+                                                   args.min_delta_ms / 1000)
+        for comparison in comparisons:
+            flag = "❌" if comparison in regressions else "✅"
+            print(f"   {flag} {comparison['scale']}/{comparison['stage']}: "
+                  f"{comparison['baseline'] * 1000:.1f} → {comparison['current'] * 1000:.1f} ms "
+                  f"(x{comparison['ratio']})")
+        if regressions:
+            print(f"❌ {len(regressions)} régression(s) au-delà de +{args.threshold:.0%}")
+            sys.exit(1)
+        print("✅ Aucune régression")
+
+if __name__ == "__main__":
+    main()
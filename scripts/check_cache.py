@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+import fnmatch
+import functools
+import hashlib
+import importlib
+import inspect
+import json
+import os
+import time
+
+from pipeline_metrics import get_metrics
+from repo_snapshot import get_snapshot, normalize_path
+
+CACHE_PATH = 'evidence/.check_cache.json'
+CACHE_VERSION = 1
+
+class CheckCache:
+    """Cache persistant des résultats de vérifications
+
+    Chaque vérification déclare les chemins ou motifs dont elle dépend
+    (décorateur `depends_on`). Un résultat est réutilisé tant que les fichiers
+    correspondants sont les mêmes: taille et mtime identiques, ou à défaut
+    même empreinte SHA-256 du contenu. Les données lues hors du dépôt (index
+    OSV...) sont représentées par leur empreinte (`external`).
+    """
+
+    def __init__(self, path=CACHE_PATH):
+        self.path = path
+        self.entries = {}
+        self.session = {}
+        self.reused = []
+        self.recomputed = []
+        # Le dernier appel à run() a-t-il été servi sans exécuter la vérification?
+        self.last_hit = False
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") == CACHE_VERSION:
+            self.entries = data.get("entries", {})
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({"version": CACHE_VERSION, "entries": self.entries}, f)
+        os.replace(tmp_path, self.path)
+
+    def run(self, func, args, patterns, modules=(), external=None):
+        """Retourne le résultat en cache si ses dépendances (fichiers, code, données externes) n'ont pas changé"""
+        key = f"{func.__name__}({', '.join(json.dumps(arg) for arg in args)})"
+        if key in self.session:
+            self.last_hit = True
+            return self.session[key]
+
+        snapshot = get_snapshot()
+        dependencies = [normalize_path(pattern.format(*args)) for pattern in patterns]
+        code = code_fingerprint(func, tuple(modules))
+        inputs = external() if external is not None else None
+        entry = self.entries.get(key)
+
+        if (entry is not None and entry.get("code") == code and entry.get("external") == inputs
+                and self.is_fresh(entry, dependencies, snapshot)):
+            result = entry["result"]
+            self.reused.append(key)
+            self.last_hit = True
+        else:
+            result = func(*args)
+            self.entries[key] = {
+                "code": code,
+                "external": inputs,
+                "files": {path: fingerprint(snapshot, path) for path in match_all(snapshot, dependencies)},
+                "result": result
+            }
+            self.recomputed.append(key)
+            self.last_hit = False
+
+        self.session[key] = result
+        return result
+
+    def is_fresh(self, entry, dependencies, snapshot):
+        stored = entry.get("files", {})
+        current = match_all(snapshot, dependencies)
+        if set(current) != set(stored):
+            return False
+        for path in current:
+            size, mtime_ns, digest = stored[path]
+            stat = snapshot.stat(path)
+            if stat.is_dir:
+                continue
+            if stat.size == size and stat.mtime_ns == mtime_ns:
+                continue
+            # Fichier touché: comparer le contenu avant de recalculer
+            if stat.size != size or content_hash(snapshot, path) != digest:
+                return False
+            stored[path] = [stat.size, stat.mtime_ns, digest]
+        return True
+
+    def new_session(self):
+        """Oublie les résultats de la collecte précédente (mode veille: une collecte par changement)"""
+        self.session = {}
+        self.reused = []
+        self.recomputed = []
+
+    def summary(self):
+        return {
+            "reused": sorted(set(self.reused)),
+            "recomputed": sorted(set(self.recomputed))
+        }
+
+def match_all(snapshot, dependencies):
+    """Chemins existants correspondant aux dépendances déclarées"""
+    matched = set()
+    for dependency in dependencies:
+        if any(char in dependency for char in '*?['):
+            matched.update(path for path in snapshot.entries
+                           if path and fnmatch.fnmatchcase(path, dependency))
+        elif snapshot.exists(dependency):
+            matched.add(dependency)
+    return sorted(matched)
+
+def affects(paths, dependencies):
+    """Un des chemins modifiés correspond-il à une dépendance déclarée (fichier, motif ou répertoire)?"""
+    for path in paths:
+        for dependency in dependencies:
+            if (path == dependency or fnmatch.fnmatchcase(path, dependency)
+                    or dependency.startswith(f"{path}/") or path.startswith(f"{dependency}/")):
+                return True
+    return False
+
+def fingerprint(snapshot, path):
+    stat = snapshot.stat(path)
+    if stat.is_dir:
+        return [0, 0, "dir"]
+    return [stat.size, stat.mtime_ns, content_hash(snapshot, path)]
+
+def content_hash(snapshot, path):
+    return hashlib.sha256(snapshot.read_bytes(path) or b'').hexdigest()
+
+@functools.lru_cache(maxsize=None)
+def module_fingerprint(source_file):
+    with open(source_file, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()[:16]
+
+@functools.lru_cache(maxsize=None)
+def code_fingerprint(func, modules=()):
+    """Empreinte du module qui définit la vérification et des modules de règles qu'elle déclare
+    (`depends_on(..., modules=...)`): invalide le cache si ce code change"""
+    try:
+        fingerprints = [module_fingerprint(inspect.getsourcefile(func))]
+        fingerprints.extend(module_fingerprint(inspect.getsourcefile(importlib.import_module(name)))
+                            for name in modules)
+    except (OSError, TypeError, ImportError):
+        return None
+    return fingerprints[0] if not modules else hashlib.sha256(' '.join(fingerprints).encode()).hexdigest()[:16]
+
+# Cache actif pour la collecte en cours (None = pas de cache)
+_active_cache = None
+
+def get_check_cache():
+    return _active_cache
+
+def set_check_cache(cache):
+    global _active_cache
+    _active_cache = cache
+
+# Ensemble qui reçoit les chemins déclarés par les vérifications exécutées
+# (None = pas d'enregistrement); le mode veille s'en sert pour savoir de quels
+# fichiers dépend chaque section de preuves
+_dependency_recorder = None
+
+def get_dependency_recorder():
+    return _dependency_recorder
+
+def set_dependency_recorder(recorder):
+    global _dependency_recorder
+    _dependency_recorder = recorder
+
+def depends_on(*patterns, modules=(), external=None):
+    """Déclare les chemins (motifs fnmatch, arguments via {0}, {1}...) lus par une vérification
+
+    modules: modules dont les règles décident du résultat (ex: "policy_index"),
+    ajoutés à l'empreinte du code qui invalide le cache.
+    external: fonction sans argument qui retourne l'empreinte (JSON) des
+    données lues hors de l'instantané, comme l'index OSV de l'audit: les
+    motifs sont résolus dans le dépôt audité, pas dans le répertoire courant.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args):
+            start = time.perf_counter()
+            recorder = get_dependency_recorder()
+            if recorder is not None:
+                recorder.update(normalize_path(pattern.format(*args)) for pattern in patterns)
+            cache = get_check_cache()
+            if cache is None:
+                result = func(*args)
+            else:
+                result = cache.run(func, args, patterns, modules, external)
+            get_metrics().record_check(func.__name__, time.perf_counter() - start,
+                                       cached=cache is not None and cache.last_hit)
+            return result
+        wrapper.dependencies = patterns
+        wrapper.modules = modules
+        wrapper.external = external
+        return wrapper
+    return decorator
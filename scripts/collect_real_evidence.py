@@ -1,112 +1,271 @@
 #!/usr/bin/env python3
+import argparse
 import json
 import os
 import subprocess
 from datetime import datetime
 
-def collect_real_evidence():
-    """Collecte des preuves RÉELLES pour ISO 27001:2022"""
+from asset_inventory import ASSET_CACHE_PATH, ASSET_MANIFEST_PATH, AssetInventory, get_asset_inventory, set_asset_inventory
+from check_cache import CheckCache, depends_on, set_check_cache
+from control_registry import ControlRegistry, control_selection, get_control_registry, set_control_registry
+from github_api import MAX_REPOSITORY_ADMINS, GitHubApiError, fetch_repository_settings, get_github_client
+from jsonl_io import JsonlWriter, evidence_to_records
+from pipeline_metrics import Metrics, get_metrics, set_metrics
+from policy_index import POLICY_INDEX_PATH, POLICY_REQUIREMENTS, PolicyIndex, get_policy_index, set_policy_index
+from repo_snapshot import RepoSnapshot, get_snapshot, set_snapshot
+from secret_scanner import SECRET_CACHE_PATH, SecretScanner, get_secret_scanner, set_secret_scanner
+from vulnerability_index import (DEPENDENCY_FILES, INCLUDED_FILES, get_vulnerability_index, parse_dependency_file,
+                                 requirement_includes)
+from workflow_analyzer import (CODE_SCANNING_ACTIONS, CODE_SCANNING_COMMANDS, LICENSE_ACTIONS, LICENSE_COMMANDS,
+                               SECURITY_GATE_ACTIONS, SECURITY_GATE_COMMANDS, WORKFLOW_CACHE_PATH, WorkflowAnalyzer,
+                               get_workflow_analyzer, security_gate_fingerprint, set_workflow_analyzer)
+
+# Gravités GitHub Advisory (les autres avis n'ont qu'un vecteur CVSS)
+SEVERITY_LEVELS = ("LOW", "MODERATE", "HIGH", "CRITICAL")
+
+def collect_real_evidence(snapshot=None, use_cache=True, repository=None, controls=None, use_http_cache=None,
+                          manifest_path=ASSET_MANIFEST_PATH):
+    """Collecte des preuves RÉELLES pour ISO 27001:2022
+    
+    Le dépôt est parcouru une seule fois (RepoSnapshot); toutes les
+    vérifications répondent ensuite depuis cet instantané. Avec le cache,
+    seules les vérifications dont les fichiers ont changé sont recalculées,
+    seuls les documents de politique modifiés sont réindexés et seuls les
+    fichiers modifiés sont rehachés (inventaire des actifs) et réanalysés
+    (recherche de secrets); chaque workflow n'est analysé qu'une fois par contenu.
+    Le cache HTTP de l'API GitHub suit `use_cache` sauf si `use_http_cache`
+    est précisé (audit de flotte: pas de cache de vérifications, cache HTTP partagé).
+    Le manifeste des actifs est écrit dans `manifest_path`, cache ou non
+    (None: aucun fichier, seule son empreinte figure dans les preuves).
+    """
+    metrics = get_metrics()
+    with metrics.stage("snapshot"):
+        snapshot = snapshot or RepoSnapshot.from_directory('.')
+    set_snapshot(snapshot)
+    cache = CheckCache() if use_cache else None
+    set_check_cache(cache)
+    policy_index = PolicyIndex(POLICY_INDEX_PATH if use_cache else None)
+    set_policy_index(policy_index)
+    asset_inventory = AssetInventory(ASSET_CACHE_PATH if use_cache else None, manifest_path=manifest_path)
+    set_asset_inventory(asset_inventory)
+    secret_scanner = SecretScanner(SECRET_CACHE_PATH if use_cache else None)
+    set_secret_scanner(secret_scanner)
+    workflow_analyzer = WorkflowAnalyzer(WORKFLOW_CACHE_PATH if use_cache else None)
+    set_workflow_analyzer(workflow_analyzer)
+    set_control_registry(ControlRegistry(CHECKS))
+    
+    try:
+        evidence = collect_evidence_sections(repository, controls,
+                                             use_cache if use_http_cache is None else use_http_cache)
+    finally:
+        set_check_cache(None)
+        set_policy_index(None)
+        set_asset_inventory(None)
+        set_secret_scanner(None)
+        set_workflow_analyzer(None)
+        set_control_registry(None)
     
+    metrics.add_bytes_read(snapshot.bytes_read)
+    if policy_index.snapshot is not None:
+        indexed = policy_index.summary()
+        metrics.record_cache("policy_index", indexed["documents"] - len(indexed["reindexed"]),
+                             len(indexed["reindexed"]))
+    if asset_inventory.snapshot is not None:
+        metrics.record_cache("asset_hashes", asset_inventory.stats["reused"], asset_inventory.stats["hashed"])
+        metrics.record_statistics("assets", asset_inventory.statistics())
+    if secret_scanner.snapshot is not None:
+        metrics.record_cache("secret_scan", secret_scanner.stats["reused"], secret_scanner.stats["scanned"])
+        metrics.record_statistics("secrets", secret_scanner.statistics())
+    if workflow_analyzer.snapshot is not None:
+        metrics.record_cache("workflows", workflow_analyzer.stats["reused"], workflow_analyzer.stats["parsed"])
+    if cache is not None:
+        with metrics.stage("cache_save"):
+            cache.save()
+            if policy_index.snapshot is not None:
+                policy_index.save()
+            if asset_inventory.snapshot is not None:
+                asset_inventory.save()
+            secret_scanner.save()
+            if workflow_analyzer.snapshot is not None:
+                workflow_analyzer.save()
+        evidence["check_cache"] = cache.summary()
+        metrics.record_cache("checks", len(evidence["check_cache"]["reused"]),
+                             len(evidence["check_cache"]["recomputed"]))
+    
+    return evidence
+
+def collect_evidence_sections(repository=None, controls=None, use_http_cache=True):
+    """Sections de preuves (contrôles + structures attendues par OPA)"""
     evidence = {
         "collection_time": datetime.utcnow().isoformat(),
-        "repository": os.getenv('GITHUB_REPOSITORY', 'unknown'),
-        "iso27001_version": "2022",
-        "controles": check_real_controls(),
-        # AJOUTER CES SECTIONS POUR OPA:
-        "policies": collect_policy_evidence(),
-        "system": collect_system_evidence(), 
-        "github": collect_github_evidence(),
-        "security": collect_security_evidence()
+        "repository": repository or os.getenv('GITHUB_REPOSITORY', 'unknown'),
+        "iso27001_version": "2022"
     }
+    metrics = get_metrics()
+    with metrics.stage("github_api"):
+        settings = collect_github_settings(evidence["repository"], use_http_cache)
+    for name, collect in evidence_sections(settings, controls):
+        with metrics.stage(name):
+            evidence[name] = collect()
     
     return evidence
 
-def check_real_controls():
-    """Vérifie RÉELLEMENT chaque contrôle ISO 27001:2022"""
+# Sections qui portent sur tout le dépôt (pas de @depends_on), recollectées à
+# chaque changement (surveillance, rétroactif): leurs caches ne relisent que
+# les fichiers modifiés
+WHOLE_TREE_SECTIONS = {"assets", "secrets"}
+
+def evidence_sections(settings=None, controls=None):
+    """[(section, fonction de collecte)] dans l'ordre du document de preuves"""
+    return [
+        ("controles", lambda: check_real_controls(controls)),
+        # AJOUTER CES SECTIONS POUR OPA:
+        ("policies", collect_policy_evidence),
+        ("system", collect_system_evidence),
+        ("github", lambda: collect_github_evidence(settings)),
+        ("security", lambda: collect_security_evidence(settings)),
+        ("assets", collect_asset_evidence),
+        ("secrets", collect_secret_evidence),
+        ("workflows", collect_workflow_evidence),
+        ("vulnerabilities", scan_dependency_vulnerabilities)
+    ]
+
+def check_real_controls(selection=None):
+    """Vérifie RÉELLEMENT chaque contrôle ISO 27001:2022
     
-    return {
-        # A.5 - Contrôles organisationnels
-        "A.5.1": check_policy_exists("information-security-policy.md"),
-        "A.5.2": check_file_exists(".github/CODEOWNERS"),  # Équipes/rôles
-        "A.5.3": check_has_workflows(),  # Séparation des fonctions
-        "A.5.4": False,  # Responsabilité direction - besoin documentation
-        "A.5.5": False,  # Contact autorités
-        "A.5.7": check_file_exists("SECURITY.md"),  # Renseignement menaces
-        "A.5.8": False,  # Management projet sécurité
-        "A.5.9": check_readme_has_content(),  # Inventaire actifs
-        "A.5.10": False,  # Règles utilisation acceptable
-        "A.5.12": False,  # Classification information
-        "A.5.13": False,  # Étiquetage information
-        "A.5.15": check_policy_exists("access-control-policy.md"),  # Contrôle accès
-        "A.5.17": False,  # Authentification avancée
-        "A.5.19": False,  # Exigences cloud
-        "A.5.24": True,   # Cryptographie (HTTPS GitHub)
-        "A.5.25": False,  # Cycle de vie développement
-        "A.5.32": check_has_workflows(),  # Gestion changements
-        "A.5.35": False,  # Continuité TIC
-        
-        # A.6 - Contrôles personnes
-        "A.6.1": False,  # Vérification personnel
-        "A.6.2": False,  # Conditions emploi
-        "A.6.3": check_readme_has_content(),  # Sensibilisation
-        "A.6.7": True,   # Travail à distance (GitHub)
-        "A.6.8": True,   # Signalement événements (GitHub Issues)
-        
-        # A.7 - Contrôles physiques (gérés par GitHub)
-        "A.7.1": True,   # Périmètre sécurité physique
-        "A.7.2": True,   # Contrôles entrées physiques
-        "A.7.6": True,   # Bureau rangé/écran verrouillé
-        "A.7.13": False, # Élimination équipements
-        
-        # A.8 - Contrôles technologiques
-        "A.8.1": True,   # Dispositifs utilisateurs
-        "A.8.2": True,   # Accès privilégiés (GitHub admin)
-        "A.8.7": check_has_code_scanning(),  # Protection malware
-        "A.8.8": check_has_dependabot(),     # Gestion vulnérabilités
-        "A.8.11": True,  # Monitoring systèmes
-        "A.8.12": True,  # Synchronisation horloges
-        "A.8.18": True,  # Sécurité applications web
-        "A.8.26": check_has_workflows(),     # Gestion changements
-        "A.8.29": False  # Continuité TIC
-    }
+    Les contrôles sont déclarés dans control_registry.py. `selection` limite
+    l'évaluation à des thèmes ("A.8") ou identifiants ("A.5.15"); chaque
+    vérification partagée n'est exécutée qu'une fois par collecte.
+    """
+    return (get_control_registry() or ControlRegistry(CHECKS)).evaluate(selection)
 
+def memoized(check, *args):
+    """Résultat d'une vérification via le registre de la collecte (déjà calculé pour un contrôle?)"""
+    registry = get_control_registry()
+    if registry is None:
+        return check(*args)
+    return registry.run_check(check.__name__, args)
+
+@depends_on("policies/{0}", modules=("policy_index",))
 def check_policy_exists(filename):
-    """Vérifie si une politique existe et a du contenu"""
+    """Vérifie si une politique existe et couvre les clauses ISO qu'elle doit traiter"""
+    coverage = policy_coverage(filename)
+    return coverage is not None and bool(coverage["covered"]) and not coverage["missing"]
+
+@depends_on("policies/{0}", modules=("policy_index",))
+def policy_coverage(filename):
+    """Clauses requises couvertes (avec leurs sections) et manquantes; None si la politique n'existe pas
+    
+    Sans exigence déclarée (POLICY_REQUIREMENTS), toute clause reconnue compte.
+    """
     path = f"policies/{filename}"
-    if os.path.exists(path):
-        with open(path, 'r') as f:
-            content = f.read().strip()
-            return len(content) > 50
-    return False
+    index = get_policy_index()
+    if path not in index.files:
+        return None
+    required = POLICY_REQUIREMENTS.get(filename)
+    return index.coverage(path, required if required is not None else index.clauses_covered(path))
 
+@depends_on("{0}")
 def check_file_exists(filepath):
     """Vérifie si un fichier existe"""
-    return os.path.exists(filepath)
+    return get_snapshot().exists(filepath)
 
+@depends_on(".github/workflows", ".github/workflows/*", modules=("workflow_analyzer",))
 def check_has_workflows():
-    """Vérifie si des workflows GitHub existent"""
-    return os.path.exists('.github/workflows') and len(os.listdir('.github/workflows')) > 0
+    """Vérifie si des workflows GitHub (lisibles et avec au moins un job) existent"""
+    return len(get_workflow_analyzer().valid_workflows()) > 0
 
+@depends_on("README.md")
 def check_readme_has_content():
     """Vérifie si le README a du contenu"""
-    if os.path.exists('README.md'):
-        with open('README.md', 'r') as f:
-            content = f.read().strip()
-            return len(content) > 100
+    content = get_snapshot().read_text('README.md')
+    if content is not None:
+        return len(content.strip()) > 100
     return False
 
+@depends_on(".github/workflows", ".github/workflows/*", modules=("workflow_analyzer",))
 def check_has_code_scanning():
-    """Vérifie si le code scanning est configuré"""
-    workflows_dir = '.github/workflows'
-    if os.path.exists(workflows_dir):
-        for file in os.listdir(workflows_dir):
-            if 'codeql' in file.lower() or 'scan' in file.lower():
-                return True
-    return False
+    """Vérifie si un workflow lance une analyse de code (CodeQL, Semgrep, Trivy, Bandit...)"""
+    return get_workflow_analyzer().uses_any(CODE_SCANNING_ACTIONS, CODE_SCANNING_COMMANDS)
+
+@depends_on(".github/workflows", ".github/workflows/*", modules=("workflow_analyzer",))
+def check_workflow_segregation():
+    """Vérifie que les changements passent par une revue automatisée (workflow sur pull request)
+    sans jeton aux droits d'écriture complets (`permissions: write-all`)"""
+    analyzer = get_workflow_analyzer()
+    return len(analyzer.pull_request_workflows()) > 0 and not analyzer.grants_write_all()
+
+@depends_on(".github/workflows", ".github/workflows/*", modules=("workflow_analyzer",))
+def check_license_compliance():
+    """Vérifie qu'un workflow contrôle les licences des dépendances"""
+    analyzer = get_workflow_analyzer()
+    if analyzer.uses_any(LICENSE_ACTIONS, LICENSE_COMMANDS):
+        return True
+    # dependency-review-action ne filtre les licences qu'avec allow-licenses/deny-licenses
+    return any(action["action"].lower() == 'actions/dependency-review-action' and action.get("licenses")
+               for action in analyzer.actions())
 
+@depends_on(".github/workflows", ".github/workflows/*", modules=("workflow_analyzer",),
+            external=security_gate_fingerprint)
+def check_security_gates():
+    """Vérifie qu'un workflow déclenché par push ou pull request exécute un contrôle de sécurité
+    (analyse de code, revue des dépendances, secrets, évaluation de politiques OPA, dont le
+    pipeline de conformité de ce dépôt)"""
+    analyzer = get_workflow_analyzer()
+    gated = [workflow for workflow in analyzer.valid_workflows()
+             if {"push", "pull_request", "pull_request_target", "merge_group"} & set(workflow["triggers"])]
+    return analyzer.uses_any(SECURITY_GATE_ACTIONS, SECURITY_GATE_COMMANDS, gated)
+
+@depends_on(".github/dependabot.yml")
 def check_has_dependabot():
     """Vérifie si Dependabot est configuré"""
-    return os.path.exists('.github/dependabot.yml')
+    return get_snapshot().exists('.github/dependabot.yml')
+
+@depends_on("tests", "test")
+def check_has_tests():
+    """Vérifie si des tests automatisés existent"""
+    return any(get_snapshot().exists(f) for f in ['tests/', 'test/'])
+
+def check_asset_inventory():
+    """Vérifie que l'inventaire des fichiers suivis est complet: aucun fichier illisible, manifeste écrit
+    
+    Pas de @depends_on: l'inventaire dépend de tout le dépôt et tient son
+    propre cache d'empreintes par (inode, taille, mtime).
+    """
+    return get_asset_inventory().is_complete()
+
+def check_no_exposed_secrets():
+    """Vérifie qu'aucun secret (clé, jeton, clé privée) n'apparaît dans les fichiers du dépôt
+    
+    Pas de @depends_on, comme l'inventaire: l'analyse couvre tout le dépôt
+    et ne relit que les fichiers modifiés.
+    """
+    return get_secret_scanner().summary()["findings_count"] == 0
+
+def vulnerability_index_fingerprint():
+    """Index OSV de l'audit (répertoire courant), pas un fichier du dépôt audité"""
+    return get_vulnerability_index().fingerprint()
+
+@depends_on(".github/dependabot.yml", *DEPENDENCY_FILES, *INCLUDED_FILES, modules=("vulnerability_index",),
+            external=vulnerability_index_fingerprint)
+def check_vulnerability_management():
+    """Vérifie la gestion des vulnérabilités: Dependabot, ou dépendances épinglées sans avis connu
+    
+    La seconde voie exige l'index OSV local (scripts/vulnerability_index.py)
+    et au moins une dépendance épinglée.
+    """
+    if memoized(check_has_dependabot):
+        return True
+    scan = scan_dependency_vulnerabilities()
+    return scan["database"]["available"] and scan["pinned"] > 0 and scan["findings_count"] == 0
+
+# Vérifications référencées par nom dans control_registry.py
+CHECKS = {check.__name__: check for check in (
+    check_policy_exists, check_file_exists, check_has_workflows, check_readme_has_content,
+    check_has_code_scanning, check_has_dependabot, check_has_tests, check_asset_inventory,
+    check_no_exposed_secrets, check_vulnerability_management, check_workflow_segregation,
+    check_license_compliance, check_security_gates
+)}
 
 # ========== STRUCTURE POUR OPA ==========
 
@@ -117,87 +276,216 @@ def collect_policy_evidence():
         "access_control_policy": check_policy_exists("access-control-policy.md"), 
         "risk_management_policy": check_policy_exists("risk-management-policy.md"),
         "total_policies": count_policy_files("policies"),
-        "opa_policies": count_opa_policies("policies")
+        "opa_policies": count_opa_policies("policies"),
+        "coverage": {filename: coverage for filename, coverage in
+                     ((filename, policy_coverage(filename)) for filename in POLICY_REQUIREMENTS)
+                     if coverage is not None},
+        "clauses_covered": list_covered_clauses()
     }
 
 def collect_system_evidence():
     """Structure système pour OPA"""
     return {
-        "has_readme": check_readme_has_content(),
-        "has_github_actions": check_has_workflows(),
-        "has_tests": any(os.path.exists(f) for f in ['tests/', 'test/']),
+        "has_readme": memoized(check_readme_has_content),
+        "has_github_actions": memoized(check_has_workflows),
+        "has_tests": memoized(check_has_tests),
         "file_structure": {
-            "policies": os.path.exists('policies/'),
-            "scripts": os.path.exists('scripts/')
+            "policies": memoized(check_file_exists, 'policies/'),
+            "scripts": memoized(check_file_exists, 'scripts/')
         }
     }
 
-def collect_github_evidence():
-    """Structure GitHub pour OPA"""
-    return {
+def collect_github_settings(repository, use_cache=True):
+    """Paramètres du dépôt lus via l'API GitHub (None sans jeton ou sans `owner/nom`)
+    
+    Les compteurs de l'API (requêtes, quota, cache HTTP) changent à chaque
+    exécution: ils vont dans les métriques (`timings.statistics.github_api`),
+    pas dans les preuves. Ce sont ceux de ce dépôt: un même client sert tous
+    les dépôts d'un processus de l'audit de flotte.
+    """
+    client = get_github_client()
+    if client is None or '/' not in repository:
+        return None
+    if not use_cache:
+        client = client.without_cache()
+    before = client.summary()
+    try:
+        settings = fetch_repository_settings(client, repository)
+    except GitHubApiError as e:
+        print(f"⚠️  API GitHub indisponible pour {repository}: {e}")
+        settings = {"error": str(e)}
+    after = client.summary()
+    api = dict(after, requests=after["requests"] - before["requests"],
+               errors=after["errors"] - before["errors"],
+               errors_by_endpoint=settings.get("errors", {}), error=settings.get("error"))
+    metrics = get_metrics()
+    if "cache" in after:
+        cache = dict(after["cache"], **{name: after["cache"][name] - before["cache"][name]
+                                        for name in ("hits", "revalidated", "misses", "stored", "evicted")})
+        api["cache"] = cache
+        metrics.record_cache("github_http", cache["hits"] + cache["revalidated"], cache["misses"])
+    metrics.record_statistics("github_api", api)
+    return settings
+
+def collect_github_evidence(settings=None):
+    """Structure GitHub pour OPA
+    
+    Sans accès à l'API, seules les valeurs déduites du contenu du dépôt sont
+    renseignées; les autres valent None (inconnu), jamais True par défaut.
+    """
+    settings = settings or {}
+    protection = settings.get("branch_protection") or {}
+    security = settings.get("security_and_analysis") or {}
+    collaborators = settings.get("collaborators") or {}
+    evidence = {
         "branch_protection": {
-            "main": check_has_workflows(),
-            "require_reviews": True,
-            "require_checks": True
+            "main": protection.get("enabled"),
+            "require_reviews": protection.get("require_reviews"),
+            "require_checks": protection.get("require_checks")
         },
         "security_features": {
-            "code_scanning": check_has_code_scanning(),
-            "secret_scanning": True,
-            "dependabot": check_has_dependabot()
+            "code_scanning": memoized(check_has_code_scanning) or security.get("code_scanning_default_setup") is True,
+            "secret_scanning": security.get("secret_scanning"),
+            "dependabot": memoized(check_has_dependabot) or security.get("dependabot_alerts") is True
         },
         "access_control": {
-            "collaborators_limited": True,
-            "admin_access_restricted": True
-        }
+            "collaborators_limited": (None if collaborators.get("outside") is None
+                                      else collaborators["outside"] == 0),
+            "admin_access_restricted": (None if collaborators.get("admins") is None
+                                        else collaborators["admins"] <= MAX_REPOSITORY_ADMINS)
+        },
+        "source": "api" if settings and "error" not in settings else "repository"
     }
+    return evidence
 
-def collect_security_evidence():
-    """Structure sécurité pour OPA"""
+def collect_security_evidence(settings=None):
+    """Structure sécurité pour OPA (None: non vérifiable)"""
+    settings = settings or {}
+    organization = settings.get("organization") or {}
+    security = settings.get("security_and_analysis") or {}
+    mfa_required = organization.get("two_factor_requirement_enabled")
+    without_2fa = organization.get("members_without_2fa")
+    if mfa_required or without_2fa is None:
+        mfa_configured = mfa_required
+    else:
+        mfa_configured = without_2fa == 0
+    alerting = [security.get("secret_scanning"), security.get("code_scanning_default_setup")]
     return {
         "authentication": {
-            "mfa_configured": True,
-            "sso_configured": False
+            "mfa_configured": mfa_configured,
+            "sso_configured": None
         },
         "encryption": {
-            "https_enforced": True,
-            "secrets_encrypted": True
+            "https_enforced": None,
+            "secrets_encrypted": None
         },
         "monitoring": {
-            "audit_logs": True,
-            "security_events": True
+            "audit_logs": None,
+            "security_events": True if True in alerting else (None if None in alerting else False)
         }
     }
 
+def collect_asset_evidence():
+    """Inventaire des actifs (A.5.9): complétude et fichiers illisibles
+    
+    Le manifeste complet (sha256, taille, type, chemin) est écrit à part
+    (evidence/asset_manifest.tsv); son empreinte et les volumes figurent dans
+    les métriques de l'exécution (`timings.statistics.assets`).
+    """
+    inventory = get_asset_inventory()
+    assets = inventory.summary()
+    if inventory.manifest_path is not None:
+        assets["manifest"] = inventory.write_manifest()
+    return assets
+
+def collect_secret_evidence():
+    """Recherche locale de secrets: découvertes (aperçus masqués), décompte par règle
+    
+    Indépendante du secret scanning GitHub (`github.security_features`),
+    qui ne se lit que par l'API et ne couvre pas les fichiers non poussés.
+    """
+    return get_secret_scanner().summary()
+
+@depends_on(".github/workflows", ".github/workflows/*", modules=("workflow_analyzer",),
+            external=security_gate_fingerprint)
+def collect_workflow_evidence():
+    """Workflows GitHub Actions: déclencheurs, permissions, actions non épinglées par SHA,
+    outils installés dans les étapes `run` (ex: OPA téléchargé par curl) et contrôles exécutés"""
+    return get_workflow_analyzer().summary()
+
+@depends_on(*DEPENDENCY_FILES, *INCLUDED_FILES, modules=("vulnerability_index",),
+            external=vulnerability_index_fingerprint)
+def scan_dependency_vulnerabilities():
+    """Dépendances épinglées (requirements*.txt, Pipfile.lock, poetry.lock, uv.lock) et avis OSV qui les touchent
+    
+    Les fichiers inclus par un requirements.txt (`-r`, `-c`) sont lus aussi;
+    chaque dépendance est rattachée au fichier qui la déclare. Sans index
+    local, les dépendances sont listées mais `database.available` est faux:
+    l'absence de découverte ne prouve alors rien.
+    """
+    index = get_vulnerability_index()
+    snapshot = get_snapshot()
+    contents = {}
+    pending = sorted({path for pattern in DEPENDENCY_FILES for path in snapshot.glob(pattern)})
+    while pending:
+        path = pending.pop(0)
+        if path not in contents:
+            contents[path] = snapshot.read_text(path) or ''
+            pending.extend(included for included in requirement_includes(path, contents[path])
+                           if snapshot.is_file(included))
+    files = sorted(contents)
+    dependencies = {}
+    unpinned = []
+    for path in files:
+        for name, version, specifier in parse_dependency_file(path, contents[path]):
+            if version is None:
+                if f"{name}{specifier}" not in unpinned:
+                    unpinned.append(f"{name}{specifier}")
+            else:
+                dependencies.setdefault((name, version), path)
+    findings = [dict(finding, package=name, version=version, file=path)
+                for (name, version), path in sorted(dependencies.items())
+                for finding in index.lookup(name, version)]
+    by_severity = {}
+    for finding in findings:
+        severity = finding["severity"] if finding["severity"] in SEVERITY_LEVELS else "UNKNOWN"
+        by_severity[severity] = by_severity.get(severity, 0) + 1
+    return {
+        "database": index.summary(),
+        "files": files,
+        "pinned": len(dependencies),
+        "unpinned": unpinned,
+        "vulnerable_packages": len({finding["package"] for finding in findings}),
+        "findings_count": len(findings),
+        "by_severity": dict(sorted(by_severity.items())),
+        "findings": findings
+    }
+
 # ========== FONCTIONS MANQUANTES ==========
 
+@depends_on("{0}/*.md")
 def count_policy_files(directory):
     """Compte les fichiers de politique - FONCTION MANQUANTE"""
-    if not os.path.exists(directory):
-        return 0
-    policy_files = [f for f in os.listdir(directory) 
+    policy_files = [f for f in get_snapshot().listdir(directory)
                    if f.endswith('.md') and check_policy_file(directory, f)]
     return len(policy_files)
 
+@depends_on("{0}/{1}", modules=("policy_index",))
 def check_policy_file(directory, filename):
-    """Vérifie si un fichier de politique existe et a du contenu - FONCTION MANQUANTE"""
-    filepath = os.path.join(directory, filename)
-    if os.path.exists(filepath):
-        with open(filepath, 'r') as f:
-            content = f.read().strip()
-            return len(content) > 50
-    return False
+    """Vérifie si un fichier est une politique: document indexé qui couvre au moins une clause ISO"""
+    path = f"{directory}/{filename}"
+    index = get_policy_index()
+    return path in index.files and bool(index.clauses_covered(path))
 
+@depends_on("policies/*.md", "documents/*", modules=("policy_index",))
+def list_covered_clauses():
+    """Clauses ISO couvertes par l'ensemble des politiques et documents"""
+    return get_policy_index().covered_clauses()
+
+@depends_on("{0}/*.rego")
 def count_opa_policies(directory):
     """Compte les politiques OPA - FONCTION MANQUANTE"""
-    if not os.path.exists(directory):
-        return 0
-    
-    opa_count = 0
-    for root, dirs, files in os.walk(directory):
-        for file in files:
-            if file.endswith('.rego'):
-                opa_count += 1
-    return opa_count
+    return sum(1 for path in get_snapshot().files_under(directory) if path.endswith('.rego'))
 
 def calculate_realistic_score(controles):
     """Calcule un score RÉALISTE"""
@@ -205,22 +493,46 @@ def calculate_realistic_score(controles):
     total = len(controles)
     return round((implemented / total) * 100, 1) if total > 0 else 0
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Collecte des preuves ISO 27001:2022")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="recalculer toutes les vérifications sans utiliser evidence/.check_cache.json")
+    parser.add_argument('--format', choices=['json', 'jsonl'], default='json',
+                        help="json: evidence/real_evidence.json; "
+                             "jsonl: evidence/real_evidence.jsonl, un enregistrement par contrôle et par section")
+    parser.add_argument('--controls', nargs='+', metavar='ID', type=control_selection,
+                        help="n'évaluer que ces thèmes (A.8) ou contrôles (A.5.15); défaut: tous les contrôles évalués")
+    return parser.parse_args()
+
 def main():
+    args = parse_args()
+    metrics = Metrics("collect_real_evidence")
+    set_metrics(metrics)
     print("🔍 Collecte des preuves RÉELLES ISO 27001:2022...")
     
     # Créer le répertoire evidence
     os.makedirs('evidence', exist_ok=True)
     
     # Collecter les preuves
-    evidence = collect_real_evidence()
+    evidence = collect_real_evidence(use_cache=not args.no_cache, controls=args.controls)
     
     # Calculer le score réaliste
     realistic_score = calculate_realistic_score(evidence["controles"])
     evidence["score_realiste"] = realistic_score
+    evidence["timings"] = metrics.to_dict()
     
     # Sauvegarder les preuves
-    with open('evidence/real_evidence.json', 'w') as f:
-        json.dump(evidence, f, indent=2)
+    with metrics.stage("write"):
+        if args.format == 'jsonl':
+            with JsonlWriter('evidence/real_evidence.jsonl') as writer:
+                for record in evidence_to_records(evidence):
+                    writer.write(record)
+            metrics.add_bytes_written(writer.bytes_written)
+        else:
+            with open('evidence/real_evidence.json', 'w') as f:
+                json.dump(evidence, f, indent=2)
+            metrics.add_bytes_written(os.path.getsize('evidence/real_evidence.json'))
+    metrics_path = metrics.write_prometheus()
     
     # Afficher les résultats RÉELS
     controles = evidence["controles"]
@@ -230,13 +542,25 @@ def main():
     print("✅ Collecte des preuves RÉELLES terminée!")
     print(f"📊 Contrôles vérifiés: {implemented}/{total}")
     print(f"🎯 Score RÉALISTE: {realistic_score}%")
+    if "check_cache" in evidence:
+        reused = len(evidence["check_cache"]["reused"])
+        recomputed = len(evidence["check_cache"]["recomputed"])
+        print(f"♻️  Vérifications réutilisées: {reused}/{reused + recomputed}")
+    api = metrics.statistics.get("github_api")
+    if api:
+        cache = api.get("cache")
+        print(f"🐙 API GitHub: {api['requests']} requêtes"
+              + (f", cache HTTP {cache['hits']} frais / {cache['revalidated']} revalidés (304)"
+                 f" / {cache['misses']} manqués" if cache else ""))
+    print(f"⏱️  Durée: {evidence['timings']['wall_seconds']}s (métriques: {metrics_path})")
     
     # Afficher quelques contrôles clés
+    key_controls = [("A.5.1", "Politique sécurité"), ("A.5.15", "Contrôle accès"),
+                    ("A.8.7", "Protection malware"), ("A.8.8", "Gestion vulnérabilités")]
     print(f"🔑 Contrôles clés:")
-    print(f"   - A.5.1 Politique sécurité: {controles['A.5.1']}")
-    print(f"   - A.5.15 Contrôle accès: {controles['A.5.15']}")
-    print(f"   - A.8.7 Protection malware: {controles['A.8.7']}")
-    print(f"   - A.8.8 Gestion vulnérabilités: {controles['A.8.8']}")
+    for control_id, label in key_controls:
+        if control_id in controles:
+            print(f"   - {control_id} {label}: {controles[control_id]}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
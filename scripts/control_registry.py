@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+import argparse
+
+from check_cache import get_dependency_recorder
+from repo_snapshot import normalize_path
+
+# ========== CATALOGUE ISO 27001:2022 - ANNEXE A ==========
+
+ANNEX_A_CONTROLS = [
+    # A.5 - Contrôles organisationnels
+    ("A.5.1", "Politiques de sécurité de l'information"),
+    ("A.5.2", "Fonctions et responsabilités liées à la sécurité de l'information"),
+    ("A.5.3", "Séparation des tâches"),
+    ("A.5.4", "Responsabilités de la direction"),
+    ("A.5.5", "Contacts avec les autorités"),
+    ("A.5.6", "Contacts avec des groupes d'intérêt spécifiques"),
+    ("A.5.7", "Renseignements sur les menaces"),
+    ("A.5.8", "Sécurité de l'information dans la gestion de projet"),
+    ("A.5.9", "Inventaire des informations et autres actifs associés"),
+    ("A.5.10", "Utilisation correcte des informations et autres actifs associés"),
+    ("A.5.11", "Restitution des actifs"),
+    ("A.5.12", "Classification des informations"),
+    ("A.5.13", "Marquage des informations"),
+    ("A.5.14", "Transfert des informations"),
+    ("A.5.15", "Contrôle d'accès"),
+    ("A.5.16", "Gestion des identités"),
+    ("A.5.17", "Informations d'authentification"),
+    ("A.5.18", "Droits d'accès"),
+    ("A.5.19", "Sécurité de l'information dans les relations avec les fournisseurs"),
+    ("A.5.20", "La sécurité de l'information dans les accords conclus avec les fournisseurs"),
+    ("A.5.21", "Gestion de la sécurité de l'information dans la chaîne d'approvisionnement TIC"),
+    ("A.5.22", "Surveillance, révision et gestion des changements des services fournisseurs"),
+    ("A.5.23", "Sécurité de l'information dans l'utilisation de services en nuage"),
+    ("A.5.24", "Planification et préparation de la gestion des incidents"),
+    ("A.5.25", "Évaluation des événements liés à la sécurité de l'information"),
+    ("A.5.26", "Réponse aux incidents liés à la sécurité de l'information"),
+    ("A.5.27", "Tirer des enseignements des incidents"),
+    ("A.5.28", "Collecte des preuves"),
+    ("A.5.29", "Sécurité de l'information durant une perturbation"),
+    ("A.5.30", "Préparation des TIC pour la continuité d'activité"),
+    ("A.5.31", "Exigences légales, statutaires, réglementaires et contractuelles"),
+    ("A.5.32", "Droits de propriété intellectuelle"),
+    ("A.5.33", "Protection des enregistrements"),
+    ("A.5.34", "Protection de la vie privée et des DCP"),
+    ("A.5.35", "Révision indépendante de la sécurité de l'information"),
+    ("A.5.36", "Conformité aux politiques, règles et normes de sécurité"),
+    ("A.5.37", "Procédures d'exploitation documentées"),
+    # A.6 - Contrôles applicables aux personnes
+    ("A.6.1", "Sélection des candidats"),
+    ("A.6.2", "Termes et conditions du contrat de travail"),
+    ("A.6.3", "Sensibilisation, enseignement et formation"),
+    ("A.6.4", "Processus disciplinaire"),
+    ("A.6.5", "Responsabilités après la fin ou le changement d'un emploi"),
+    ("A.6.6", "Accords de confidentialité ou de non-divulgation"),
+    ("A.6.7", "Travail à distance"),
+    ("A.6.8", "Déclaration des événements liés à la sécurité de l'information"),
+    # A.7 - Contrôles physiques
+    ("A.7.1", "Périmètres de sécurité physique"),
+    ("A.7.2", "Les entrées physiques"),
+    ("A.7.3", "Sécurisation des bureaux, des salles et des installations"),
+    ("A.7.4", "Surveillance de la sécurité physique"),
+    ("A.7.5", "Protection contre les menaces physiques et environnementales"),
+    ("A.7.6", "Travail dans les zones sécurisées"),
+    ("A.7.7", "Bureau propre et écran vide"),
+    ("A.7.8", "Emplacement et protection du matériel"),
+    ("A.7.9", "Sécurité des actifs hors des locaux"),
+    ("A.7.10", "Supports de stockage"),
+    ("A.7.11", "Services support"),
+    ("A.7.12", "Sécurité du câblage"),
+    ("A.7.13", "Maintenance du matériel"),
+    ("A.7.14", "Élimination ou recyclage sécurisé du matériel"),
+    # A.8 - Contrôles technologiques
+    ("A.8.1", "Terminaux finaux des utilisateurs"),
+    ("A.8.2", "Droits d'accès privilégiés"),
+    ("A.8.3", "Restriction d'accès aux informations"),
+    ("A.8.4", "Accès aux codes source"),
+    ("A.8.5", "Authentification sécurisée"),
+    ("A.8.6", "Dimensionnement"),
+    ("A.8.7", "Protection contre les programmes malveillants"),
+    ("A.8.8", "Gestion des vulnérabilités techniques"),
+    ("A.8.9", "Gestion des configurations"),
+    ("A.8.10", "Suppression des informations"),
+    ("A.8.11", "Masquage des données"),
+    ("A.8.12", "Prévention de la fuite de données"),
+    ("A.8.13", "Sauvegarde des informations"),
+    ("A.8.14", "Redondance des moyens de traitement de l'information"),
+    ("A.8.15", "Journalisation"),
+    ("A.8.16", "Activités de surveillance"),
+    ("A.8.17", "Synchronisation des horloges"),
+    ("A.8.18", "Utilisation de programmes utilitaires à privilèges"),
+    ("A.8.19", "Installation de logiciels sur des systèmes en exploitation"),
+    ("A.8.20", "Sécurité des réseaux"),
+    ("A.8.21", "Sécurité des services réseau"),
+    ("A.8.22", "Cloisonnement des réseaux"),
+    ("A.8.23", "Filtrage web"),
+    ("A.8.24", "Utilisation de la cryptographie"),
+    ("A.8.25", "Cycle de vie de développement sécurisé"),
+    ("A.8.26", "Exigences de sécurité des applications"),
+    ("A.8.27", "Principes d'ingénierie et d'architecture des systèmes sécurisés"),
+    ("A.8.28", "Codage sécurisé"),
+    ("A.8.29", "Tests de sécurité dans le développement et l'acceptation"),
+    ("A.8.30", "Développement externalisé"),
+    ("A.8.31", "Séparation des environnements de développement, de test et de production"),
+    ("A.8.32", "Gestion des changements"),
+    ("A.8.33", "Informations relatives aux tests"),
+    ("A.8.34", "Protection des systèmes d'information pendant les tests d'audit"),
+]
+
+# ========== ÉVALUATION DES CONTRÔLES ==========
+#
+# check: nom d'une fonction check_* de collect_real_evidence.py (+ args)
+# static: valeur fixe quand aucune preuve n'est vérifiable dans le dépôt
+# note: preuve attendue
+# Les contrôles absents de ce tableau font partie du catalogue mais ne sont
+# pas évalués (valeur None s'ils sont demandés explicitement).
+
+CONTROL_ASSESSMENTS = {
+    # A.5 - Contrôles organisationnels
+    "A.5.1": {"check": "check_policy_exists", "args": ["information-security-policy.md"]},
+    "A.5.2": {"check": "check_file_exists", "args": [".github/CODEOWNERS"], "note": "Équipes/rôles"},
+    "A.5.3": {"check": "check_workflow_segregation", "note": "Séparation des fonctions (revue par pull request)"},
+    "A.5.4": {"static": False, "note": "Responsabilité direction - besoin documentation"},
+    "A.5.5": {"static": False, "note": "Contact autorités"},
+    "A.5.7": {"check": "check_file_exists", "args": ["SECURITY.md"], "note": "Renseignement menaces"},
+    "A.5.8": {"static": False, "note": "Management projet sécurité"},
+    "A.5.9": {"check": "check_asset_inventory", "note": "Inventaire actifs (manifeste SHA-256)"},
+    "A.5.10": {"static": False, "note": "Règles utilisation acceptable"},
+    "A.5.12": {"static": False, "note": "Classification information"},
+    "A.5.13": {"static": False, "note": "Étiquetage information"},
+    "A.5.15": {"check": "check_policy_exists", "args": ["access-control-policy.md"], "note": "Contrôle accès"},
+    "A.5.17": {"static": False, "note": "Authentification avancée"},
+    "A.5.19": {"static": False, "note": "Exigences cloud"},
+    "A.5.24": {"static": True, "note": "Cryptographie (HTTPS GitHub)"},
+    "A.5.25": {"static": False, "note": "Cycle de vie développement"},
+    "A.5.32": {"check": "check_license_compliance", "note": "Propriété intellectuelle (contrôle des licences)"},
+    "A.5.35": {"static": False, "note": "Continuité TIC"},
+
+    # A.6 - Contrôles personnes
+    "A.6.1": {"static": False, "note": "Vérification personnel"},
+    "A.6.2": {"static": False, "note": "Conditions emploi"},
+    "A.6.3": {"check": "check_readme_has_content", "note": "Sensibilisation"},
+    "A.6.7": {"static": True, "note": "Travail à distance (GitHub)"},
+    "A.6.8": {"static": True, "note": "Signalement événements (GitHub Issues)"},
+
+    # A.7 - Contrôles physiques (gérés par GitHub)
+    "A.7.1": {"static": True, "note": "Périmètre sécurité physique"},
+    "A.7.2": {"static": True, "note": "Contrôles entrées physiques"},
+    "A.7.6": {"static": True, "note": "Bureau rangé/écran verrouillé"},
+    "A.7.13": {"static": False, "note": "Élimination équipements"},
+
+    # A.8 - Contrôles technologiques
+    "A.8.1": {"static": True, "note": "Dispositifs utilisateurs"},
+    "A.8.2": {"static": True, "note": "Accès privilégiés (GitHub admin)"},
+    "A.8.7": {"check": "check_has_code_scanning", "note": "Protection malware (analyse de code en CI)"},
+    "A.8.8": {"check": "check_vulnerability_management", "note": "Gestion vulnérabilités (Dependabot ou base OSV)"},
+    "A.8.11": {"static": True, "note": "Monitoring systèmes"},
+    "A.8.12": {"check": "check_no_exposed_secrets", "note": "Fuite de données (recherche de secrets)"},
+    "A.8.18": {"static": True, "note": "Sécurité applications web"},
+    "A.8.26": {"check": "check_security_gates", "note": "Exigences sécurité applications (contrôles en CI)"},
+    "A.8.29": {"static": False, "note": "Continuité TIC"},
+}
+
+THEMES = {
+    "A.5": "Contrôles organisationnels",
+    "A.6": "Contrôles applicables aux personnes",
+    "A.7": "Contrôles physiques",
+    "A.8": "Contrôles technologiques",
+}
+
+CONTROL_TITLES = dict(ANNEX_A_CONTROLS)
+
+def control_theme(control_id):
+    """'A.8.26' -> 'A.8'"""
+    return control_id.rsplit('.', 1)[0]
+
+class ControlRegistry:
+    """Registre des contrôles: chaque contrôle déclare sa vérification ou sa valeur fixe
+
+    Les vérifications sont résolues par nom (`checks`: nom -> fonction) et
+    mémoïsées pour la durée de vie du registre: une vérification partagée par
+    plusieurs contrôles (même nom, mêmes arguments)
+    n'est exécutée qu'une fois. Les contrôles ne sont évalués qu'à la demande.
+    """
+
+    def __init__(self, checks, assessments=CONTROL_ASSESSMENTS):
+        self.checks = checks
+        self.assessments = assessments
+        self._results = {}
+        self.check_calls = 0
+        self._by_theme = {}
+        for control_id, _ in ANNEX_A_CONTROLS:
+            self._by_theme.setdefault(control_theme(control_id), []).append(control_id)
+
+    def select(self, selection=None):
+        """Identifiants correspondant à une sélection
+
+        selection: None (tous les contrôles évalués), ou une liste de thèmes
+        ("A.8") et/ou d'identifiants ("A.5.15"). Un thème ne retient que les
+        contrôles évalués; un identifiant explicite est toujours retenu.
+        """
+        if selection is None:
+            return [control_id for control_id, _ in ANNEX_A_CONTROLS if control_id in self.assessments]
+        if isinstance(selection, str):
+            selection = [selection]
+
+        selected = []
+        seen = set()
+        for item in selection:
+            if item in CONTROL_TITLES:
+                ids = [item]
+            elif item in self._by_theme:
+                ids = [control_id for control_id in self._by_theme[item] if control_id in self.assessments]
+            else:
+                raise ValueError(f"Contrôle ou thème inconnu: {item}")
+            for control_id in ids:
+                if control_id not in seen:
+                    seen.add(control_id)
+                    selected.append(control_id)
+        return selected
+
+    def iter_controls(self, selection=None):
+        """Évalue paresseusement les contrôles sélectionnés: (id, valeur)"""
+        for control_id in self.select(selection):
+            yield control_id, self.evaluate_control(control_id)
+
+    def evaluate(self, selection=None):
+        return dict(self.iter_controls(selection))
+
+    def evaluate_control(self, control_id):
+        assessment = self.assessments.get(control_id)
+        if assessment is None:
+            return None
+        if "check" not in assessment:
+            return assessment["static"]
+        return self.run_check(assessment["check"], tuple(assessment.get("args", ())))
+
+    def run_check(self, name, args):
+        key = (name, args)
+        if key not in self._results:
+            self.check_calls += 1
+            self._results[key] = self.checks[name](*args)
+        else:
+            # Résultat déjà calculé: la section qui le relit dépend des mêmes chemins (mode veille)
+            recorder = get_dependency_recorder()
+            if recorder is not None:
+                recorder.update(normalize_path(pattern.format(*args))
+                                for pattern in getattr(self.checks[name], "dependencies", ()))
+        return self._results[key]
+
+    def dependencies(self, control_id):
+        """Chemins dont dépend un contrôle (déclarés par @depends_on sur sa vérification)"""
+        assessment = self.assessments.get(control_id) or {}
+        if "check" not in assessment:
+            return []
+        check = self.checks[assessment["check"]]
+        args = assessment.get("args", ())
+        return [pattern.format(*args) for pattern in getattr(check, "dependencies", ())]
+
+    def reads_whole_tree(self, control_id):
+        """La vérification du contrôle parcourt-elle tout le dépôt (pas de @depends_on)?"""
+        assessment = self.assessments.get(control_id) or {}
+        return "check" in assessment and not hasattr(self.checks[assessment["check"]], "dependencies")
+
+    def describe(self, control_id):
+        assessment = self.assessments.get(control_id) or {}
+        return {
+            "id": control_id,
+            "title": CONTROL_TITLES.get(control_id),
+            "theme": control_theme(control_id),
+            "check": assessment.get("check"),
+            "args": list(assessment.get("args", ())),
+            "static": assessment.get("static"),
+            "note": assessment.get("note"),
+            "evidence": self.dependencies(control_id),
+        }
+
+def control_selection(item):
+    """Type argparse de `--controls`: thème ("A.8") ou identifiant ("A.5.15") connu"""
+    if item not in CONTROL_TITLES and item not in THEMES:
+        raise argparse.ArgumentTypeError(f"contrôle ou thème inconnu: {item}")
+    return item
+
+# Registre de la collecte en cours (None = hors collecte): les sections de
+# preuves y relisent les vérifications déjà exécutées pour les contrôles
+_active_registry = None
+
+def get_control_registry():
+    return _active_registry
+
+def set_control_registry(registry):
+    global _active_registry
+    _active_registry = registry
@@ -1,8 +1,9 @@
 #!/usr/bin/env python3
 import json
-import subprocess
 import os
 
+from opa_diagnostics import load_diagnostics
+
 def debug_opa():
     """Diagnostique le problème OPA"""
     
@@ -35,33 +36,86 @@ def debug_opa():
         print("   ❌ Aucun fichier .rego trouvé!")
         return
     
-    # 3. Tester chaque politique avec OPA
-    print("\n3. 🧪 Test manuel de chaque politique...")
+    # 3. Résultats et diagnostics de la dernière évaluation (sans réévaluer)
+    print("\n3. 🧪 Résultats de la dernière évaluation...")
+    try:
+        with open('reports/opa_evaluation_results.json', 'r') as f:
+            opa_results = json.load(f)
+    except Exception as e:
+        print(f"   ❌ Résultats OPA indisponibles: {e}")
+        print("   💡 Exécutez d'abord: python scripts/evaluate_with_opa.py")
+        return
+    results_by_package = {entry["package"]: entry["results"] for entry in opa_results.get("policies_evaluated", [])}
+    
+    try:
+        diagnostics = load_diagnostics()
+    except Exception:
+        diagnostics = None
+        print("   ⚠️  Pas de diagnostics OPA (reports/opa_diagnostics.json)")
+        print("   💡 Pour les capturer: python scripts/evaluate_with_opa.py --diagnostics")
+    
     for rego_file in rego_files:
-        print(f"\n   🔍 Test de {rego_file}:")
-        try:
-            result = subprocess.run([
-                'opa', 'eval',
-                '--data', rego_file,
-                '--input', 'evidence/real_evidence.json',
-                '--format', 'pretty',
-                'data'
-            ], capture_output=True, text=True, timeout=10)
-            
-            if result.returncode == 0:
-                print("   ✅ OPA a exécuté avec succès")
-                if result.stdout.strip():
-                    print("   📋 Résultat:")
-                    for line in result.stdout.split('\n'):
-                        if line.strip():
-                            print(f"      {line}")
-                else:
-                    print("   ⚠️  Aucun résultat retourné")
-            else:
-                print(f"   ❌ Erreur OPA: {result.stderr}")
-                
-        except Exception as e:
-            print(f"   ❌ Exception: {e}")
+        package = f"{os.path.basename(os.path.dirname(rego_file))}.{os.path.basename(rego_file)[:-len('.rego')]}"
+        print(f"\n   🔍 {rego_file} ({package}):")
+        if package not in results_by_package:
+            print("   ⚠️  Package absent des résultats")
+            continue
+        print("   📋 Résultat:")
+        for key, value in results_by_package[package].items():
+            print(f"      {key}: {json.dumps(value)}")
+        if diagnostics:
+            render_package_diagnostics(diagnostics, package, rego_file)
+    
+    if diagnostics:
+        render_evaluation_metrics(diagnostics)
+
+def render_package_diagnostics(diagnostics, package, rego_file, max_expressions=5, max_trace=20):
+    """Profil par règle, expressions les plus coûteuses et début de la trace"""
+    source = read_source_lines(rego_file)
+    rules = [rule for rule in diagnostics.get("rules", []) if rule["package"] == package]
+    if rules:
+        print("   ⏱️  Profil par règle:")
+        for rule in rules:
+            cached = f", {rule['num_cached']} mémoïsées" if rule.get("num_cached") else ""
+            print(f"      {rule['rule'] or '(package)':35s} {rule['time_ns'] / 1e6:9.3f} ms  "
+                  f"{rule['num_eval']} évaluations{cached}")
+    
+    expressions = [expr for expr in diagnostics.get("expressions", []) if expr["package"] == package]
+    if expressions:
+        print("   🐢 Expressions les plus coûteuses:")
+        for expr in expressions[:max_expressions]:
+            line = source[expr["row"] - 1].strip() if 0 < expr["row"] <= len(source) else ""
+            print(f"      L{expr['row']:<4} {expr['time_ns'] / 1e6:9.3f} ms  x{expr['num_eval']:<5} {line}")
+    
+    trace = diagnostics.get("traces", {}).get(package, [])
+    if trace:
+        print(f"   🧭 Trace ({len(trace)} événements{', tronquée' if package in diagnostics.get('truncated_traces', []) else ''}):")
+        depth = 0
+        for event in trace[:max_trace]:
+            if event["op"] == "exit" and depth:
+                depth -= 1
+            line = source[event["row"] - 1].strip() if event.get("row") and event["row"] <= len(source) else ""
+            print(f"      {'  ' * depth}{event['op']:<5} L{event.get('row')}: {line}")
+            if event["op"] == "enter":
+                depth += 1
+
+def render_evaluation_metrics(diagnostics):
+    print(f"\n4. 📈 Métriques OPA ({diagnostics.get('backend')}, {diagnostics.get('evaluation_time')})...")
+    for call in diagnostics.get("calls", []):
+        metrics = call.get("metrics", {})
+        eval_ns = metrics.get("timer_rego_query_eval_ns")
+        summary = f"{eval_ns / 1e6:.3f} ms d'évaluation" if eval_ns is not None else "pas de métriques"
+        print(f"   - {call['backend']} [{', '.join(call['packages'])}]: {summary}")
+        for name, value in sorted(metrics.items()):
+            if name != "timer_rego_query_eval_ns":
+                print(f"      {name}: {value}")
+
+def read_source_lines(path):
+    try:
+        with open(path, 'r') as f:
+            return f.read().splitlines()
+    except OSError:
+        return []
 
 if __name__ == "__main__":
-    debug_opa()
\ No newline at end of file
+    debug_opa()
@@ -2,76 +2,495 @@
 import json
 import subprocess
 import os
+import re
+import argparse
+import functools
+import hashlib
+import time
 from datetime import datetime
 
-def evaluate_with_opa():
-    """Évalue les preuves avec OPA"""
+from opa_diagnostics import (OPA_EVAL_FLAGS, OPA_SERVER_PARAMS, OpaDiagnostics, get_diagnostics,
+                             set_diagnostics)
+from opa_server import OpaServer, OpaServerError
+from jsonl_io import (JsonlWriter, package_record, read_jsonl, records_to_evidence,
+                      results_summary_record)
+from pipeline_metrics import Metrics, get_metrics, run_timed, set_metrics
+from rego_subset import RegoEvalError, RegoUnsupportedError, load_policy
+
+INCREMENTAL_STATE_PATH = 'reports/.opa_incremental_state.json'
+
+# Seuils de statut (score >= seuil), du plus exigeant au moins exigeant; en dessous: NON CONFORME
+COMPLIANCE_THRESHOLDS = ((80, "CONFORME"), (60, "PARTIELLEMENT CONFORME"))
+NON_COMPLIANT = "NON CONFORME"
+
+EVIDENCE_PATHS = {
+    "json": 'evidence/real_evidence.json',
+    "jsonl": 'evidence/real_evidence.jsonl'
+}
+
+def evaluate_with_opa(backend="bundle", incremental=True, evidence_format="json", on_package=None,
+                      evidence=None, diagnostics=None):
+    """Évalue les preuves avec OPA
+    
+    En mode incrémental, un package n'est réévalué que si son fichier .rego
+    ou les sous-arbres d'input qu'il lit ont changé depuis la dernière
+    exécution; sinon son résultat précédent (reports/) est réutilisé.
+    `on_package(entry, score)` est appelé pour chaque package dès qu'il est évalué.
+    `evidence`: preuves déjà en mémoire (sinon lues depuis evidence/).
+    `diagnostics` (OpaDiagnostics): capture métriques, profil et trace OPA
+    pendant l'évaluation; tous les packages sont alors réévalués.
+    """
     
     # Charger les preuves
-    try:
-        with open('evidence/real_evidence.json', 'r') as f:
-            evidence = json.load(f)
-    except FileNotFoundError:
-        print("❌ Fichier real_evidence.json non trouvé. Exécutez d'abord collect_real_evidence.py")
-        return create_fallback_results()
+    if evidence is None:
+        try:
+            with get_metrics().stage("load_evidence"):
+                evidence = load_evidence(evidence_format)
+        except FileNotFoundError:
+            print(f"❌ Fichier {os.path.basename(EVIDENCE_PATHS[evidence_format])} non trouvé. Exécutez d'abord collect_real_evidence.py")
+            return create_fallback_results()
     
-    results = {
-        "evaluation_time": datetime.utcnow().isoformat(),
-        "policies_evaluated": [],
-        "scores": {},
-        "compliance_status": {}
+    if diagnostics is not None:
+        set_diagnostics(diagnostics)
+        try:
+            return evaluate_evidence_documents([evidence], backend=backend, on_package=on_package)[0]
+        finally:
+            set_diagnostics(None)
+    if not incremental:
+        return evaluate_evidence_documents([evidence], backend=backend, on_package=on_package)[0]
+    return evaluate_incremental(evidence, backend=backend, on_package=on_package)
+
+def load_evidence(evidence_format="json", policies_dir="policies"):
+    """Charge les preuves; en JSON Lines, seules les sections lues par les politiques sont gardées"""
+    path = EVIDENCE_PATHS[evidence_format]
+    get_metrics().add_bytes_read(os.path.getsize(path))
+    if evidence_format == "jsonl":
+        return records_to_evidence(read_jsonl(path), sections=read_sections(discover_policies(policies_dir)))
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def read_sections(policies):
+    """Sections de premier niveau du document de preuves lues par les politiques (None = toutes)"""
+    sections = set()
+    for policy in policies:
+        for path in policy["input_paths"]:
+            if not path:
+                return None
+            sections.add(path[0])
+    return sections
+
+def evaluate_incremental(evidence, backend="bundle", policies_dir="policies",
+                         state_path=INCREMENTAL_STATE_PATH, on_package=None):
+    """Réévalue uniquement les packages dont la politique ou l'input a changé"""
+    policies = discover_policies(policies_dir)
+    state = load_incremental_state(state_path)
+    
+    fingerprints = {}
+    stale = []
+    outputs = {}
+    for policy in policies:
+        fingerprint = {
+            "policy_hash": policy["sha256"],
+            "input_hash": input_fingerprint(evidence, policy["input_paths"])
+        }
+        fingerprints[policy["package"]] = fingerprint
+        previous = state.get(policy["package"])
+        if (previous and not policy["reads_data"]
+                and all(previous.get(key) == value for key, value in fingerprint.items())):
+            outputs[policy["package"]] = previous["output"]
+        else:
+            stale.append(policy)
+    
+    if stale:
+        outputs.update(evaluate_policy_outputs(stale, [evidence], backend)[0])
+    get_metrics().record_cache("opa_packages", len(policies) - len(stale), len(stale))
+    
+    stale_packages = {policy["package"] for policy in stale}
+    
+    def annotate(entry, score):
+        entry["evaluation"] = "recomputed" if entry["package"] in stale_packages else "reused"
+        if on_package:
+            on_package(entry, score)
+    
+    with get_metrics().stage("build_results"):
+        results = build_results(policies, outputs, on_package=annotate)
+    results["incremental"] = {
+        "recomputed": [p["package"] for p in policies if p["package"] in stale_packages],
+        "reused": [p["package"] for p in policies if p["package"] not in stale_packages]
+    }
+    print(f"♻️  Packages réutilisés: {len(results['incremental']['reused'])}/{len(policies)}")
+    
+    # Mémoriser les sorties pour la prochaine exécution
+    new_state = {
+        package: dict(fingerprints[package], output=outputs[package])
+        for package in fingerprints if package in outputs
     }
+    save_incremental_state(state_path, new_state)
+    return results
+
+def input_fingerprint(evidence, input_paths):
+    """Empreinte des seuls sous-arbres d'input lus par un package"""
+    trimmed = json.dumps(trim_input(evidence, input_paths), sort_keys=True)
+    return hashlib.sha256(trimmed.encode()).hexdigest()
+
+def load_incremental_state(state_path):
+    try:
+        with open(state_path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_incremental_state(state_path, state):
+    os.makedirs(os.path.dirname(state_path) or '.', exist_ok=True)
+    tmp_path = f"{state_path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f)
+    os.replace(tmp_path, state_path)
+
+def evaluate_evidence_documents(documents, backend="bundle", policies_dir="policies", on_package=None):
+    """Évalue plusieurs documents de preuves avec le même jeu de politiques
     
-    # Évaluer chaque package OPA
-    policies_dir = "policies"
+    - "bundle": un seul `opa eval` pour tous les packages, qui n'interroge que
+      les règles déclarées et ne reçoit que les sous-arbres d'input lus.
+    - "server": la même requête ciblée envoyée à un `opa run --server` local;
+      chaque document coûte un aller-retour HTTP.
+    - "subprocess": un `opa eval` par fichier .rego sur tout l'arbre data.
+    - "python": évaluateur intégré (rego_subset), sans binaire opa.
+    En cas d'échec des autres modes, on retombe sur "subprocess".
+    """
+    policies = discover_policies(policies_dir)
+    outputs = evaluate_policy_outputs(policies, documents, backend)
+    with get_metrics().stage("build_results"):
+        return [build_results(policies, document_outputs, on_package) for document_outputs in outputs]
+
+def evaluate_policy_outputs(policies, documents, backend="bundle"):
+    """Sorties OPA brutes par document: [{package: sortie opa eval}]"""
+    outputs = None
+    
+    with get_metrics().stage("evaluate"):
+        if backend == "server":
+            outputs = evaluate_documents_server(policies, documents)
+        elif backend == "bundle":
+            outputs = evaluate_documents_bundle(policies, documents)
+        elif backend == "python":
+            outputs = evaluate_documents_python(policies, documents)
+        
+        if outputs is None:
+            if backend != "subprocess":
+                print("   ↩️  Retour au mode subprocess (opa eval par package)")
+            outputs = [evaluate_document_subprocess(policies, evidence) for evidence in documents]
     
+    return outputs
+
+def discover_policies(policies_dir="policies"):
+    """Liste les fichiers .rego, leur package OPA, leurs règles et les input.* lus"""
+    policies = []
     for root, dirs, files in os.walk(policies_dir):
         for file in files:
             if file.endswith('.rego'):
                 policy_path = os.path.join(root, file)
                 package_name = file.replace('.rego', '')
                 category = os.path.basename(root)
-                full_package_name = f"{category}.{package_name}"
-                
-                print(f"🔍 Évaluation de {full_package_name}...")
+                policy = {
+                    "path": policy_path,
+                    "name": package_name,
+                    "package": f"{category}.{package_name}"
+                }
+                policy.update(discover_rules(policy_path))
+                policies.append(policy)
+    return policies
+
+def discover_rules(policy_path):
+    """Analyse un fichier .rego (résultat mis en cache tant que le fichier ne change pas)"""
+    stat = os.stat(policy_path)
+    return _discover_rules_cached(policy_path, stat.st_mtime_ns, stat.st_size)
+
+@functools.lru_cache(maxsize=None)
+def _discover_rules_cached(policy_path, mtime_ns, size):
+    with open(policy_path, 'r') as f:
+        source = f.read()
+    analysis = analyze_rego_source(source)
+    analysis["sha256"] = hashlib.sha256(source.encode()).hexdigest()
+    return analysis
+
+REGO_PACKAGE_RE = re.compile(r'^package\s+([\w.]+)', re.MULTILINE)
+REGO_RULE_RE = re.compile(r'^(?:default\s+)?([A-Za-z_]\w*)\s*(?:=|:=|\{|if\b)', re.MULTILINE)
+REGO_INPUT_RE = re.compile(r'\binput((?:\.[A-Za-z_]\w*)+)')
+REGO_DYNAMIC_INPUT_RE = re.compile(r'\binput\b(?!\.[A-Za-z_])')
+REGO_DATA_RE = re.compile(r'\bdata\.')
+
+def analyze_rego_source(source):
+    """Extrait le package, les règles déclarées et les chemins input.* d'une source Rego"""
+    source = re.sub(r'#.*', '', source)
+    
+    package_match = REGO_PACKAGE_RE.search(source)
+    rules = []
+    for name in REGO_RULE_RE.findall(source):
+        if name not in rules and name not in ('package', 'import', 'else'):
+            rules.append(name)
+    
+    paths = sorted({tuple(match.strip('.').split('.')) for match in REGO_INPUT_RE.findall(source)})
+    if REGO_DYNAMIC_INPUT_RE.search(source):
+        # input[x] ou input entier: le package peut tout lire
+        paths = [()]
+    # Un chemin couvert par un préfixe plus court est inutile
+    input_paths = [path for path in paths
+                   if not any(path[:len(other)] == other and path != other for other in paths)]
+    
+    score_rules = [rule for rule in rules if rule.endswith('_score')]
+    return {
+        "rego_package": package_match.group(1) if package_match else None,
+        "rules": rules,
+        "score_rule": score_rules[0] if score_rules else None,
+        "input_paths": [list(path) for path in input_paths],
+        "reads_data": bool(REGO_DATA_RE.search(source))
+    }
+
+def trim_input(evidence, input_paths):
+    """Ne garde du document de preuves que les sous-arbres lus par un package"""
+    if [] in input_paths:
+        return evidence
+    trimmed = {}
+    for path in input_paths:
+        value = evidence
+        for part in path:
+            if not isinstance(value, dict) or part not in value:
+                break
+            value = value[part]
+        else:
+            target = trimmed
+            for part in path[:-1]:
+                target = target.setdefault(part, {})
+            target[path[-1]] = value
+    return trimmed
+
+def build_bundle_query(policies):
+    """Construit une requête qui n'interroge que les règles déclarées de chaque package
+    
+    Chaque règle est collectée dans un tableau (vide si la règle est indéfinie)
+    et évaluée avec l'input réduit de son package. Retourne la requête et la
+    correspondance variable -> (package, règle).
+    """
+    expressions = []
+    bindings = {}
+    for i, policy in enumerate(policies):
+        if not policy["rego_package"]:
+            continue
+        for j, rule in enumerate(policy["rules"]):
+            var = f"r{i}_{j}"
+            bindings[var] = (policy["package"], rule)
+            expressions.append(
+                f'{var} := [v | v := data.{policy["rego_package"]}.{rule} '
+                f'with input as input["{policy["package"]}"]]'
+            )
+    return "\n".join(expressions), bindings
+
+def build_bundle_input(policies, evidence):
+    """Input de la requête groupée: un sous-document réduit par package"""
+    return {policy["package"]: trim_input(evidence, policy["input_paths"]) for policy in policies}
+
+def split_bundle_bindings(values, bindings, policies):
+    """Redistribue les valeurs de la requête groupée par package"""
+    documents = {policy["package"]: {} for policy in policies}
+    for var, (package, rule) in bindings.items():
+        collected = values.get(var) or []
+        if collected:
+            documents[package][rule] = collected[0]
+    return {package: wrap_opa_value(document) for package, document in documents.items()}
+
+def evaluate_documents_bundle(policies, documents):
+    """Évalue tous les packages en un seul `opa eval` par document
+    
+    Retourne None si OPA refuse la requête groupée.
+    """
+    query, bindings = build_bundle_query(policies)
+    diagnostics = get_diagnostics()
+    command = ['opa', 'eval', '--format', 'json', '--stdin-input']
+    for policy in policies:
+        command += ['--data', policy["path"]]
+    if diagnostics is not None:
+        command += OPA_EVAL_FLAGS
+    command.append(query)
+    
+    outputs = []
+    for evidence in documents:
+        try:
+            result = run_timed(command, input=json.dumps(build_bundle_input(policies, evidence)),
+                               timeout=30, backend="bundle")
+        except subprocess.TimeoutExpired:
+            print("⏰ Timeout de l'évaluation groupée")
+            return None
+        except Exception as e:
+            print(f"❌ Exception pour l'évaluation groupée: {e}")
+            return None
+        
+        if result.returncode != 0:
+            print(f"❌ Erreur OPA (évaluation groupée): {result.stderr}")
+            return None
+        
+        opa_output = json.loads(result.stdout)
+        if diagnostics is not None:
+            diagnostics.add_opa_output(opa_output, "bundle", [policy["package"] for policy in policies])
+        values = (opa_output.get("result") or [{}])[0].get("bindings", {})
+        outputs.append(split_bundle_bindings(values, bindings, policies))
+    
+    return outputs
+
+def evaluate_documents_python(policies, documents):
+    """Évalue les packages en mémoire avec l'évaluateur Rego intégré
+    
+    Les politiques sont compilées une seule fois; retourne None si l'une
+    d'elles utilise une construction hors du sous-ensemble supporté.
+    """
+    compiled = []
+    for policy in policies:
+        try:
+            compiled.append((policy, load_policy(policy["path"])))
+        except RegoUnsupportedError as e:
+            print(f"⚠️  {policy['path']} hors du sous-ensemble supporté: {e}")
+            return None
+    
+    diagnostics = get_diagnostics()
+    outputs = []
+    for evidence in documents:
+        document_outputs = {}
+        for policy, compiled_policy in compiled:
+            profile = {} if diagnostics is not None else None
+            start = time.perf_counter()
+            try:
+                document_outputs[policy["package"]] = wrap_opa_value(compiled_policy.evaluate(evidence, profile))
+                failed = False
+            except RegoEvalError as e:
+                print(f"❌ Erreur d'évaluation pour {policy['name']}: {e}")
+                failed = True
+            elapsed = time.perf_counter() - start
+            get_metrics().record_opa_call("python", policy["package"], 0.0, elapsed, failed=failed)
+            if diagnostics is not None:
+                diagnostics.add_python_profile(policy, profile, int(elapsed * 1e9))
+        outputs.append(document_outputs)
+    
+    return outputs
+
+def evaluate_document_subprocess(policies, evidence):
+    """Évalue chaque package avec un processus `opa eval` dédié"""
+    evidence_json = json.dumps(evidence)
+    diagnostics = get_diagnostics()
+    outputs = {}
+    
+    for policy in policies:
+        package_name = policy["name"]
+        try:
+            # Exécuter OPA
+            result = run_timed([
+                'opa', 'eval',
+                '--data', policy["path"],
+                '--stdin-input',
+                '--format', 'json'
+            ] + (OPA_EVAL_FLAGS if diagnostics is not None else []) + [
+                'data'
+            ], input=evidence_json, timeout=30, backend="subprocess", package=policy["package"])
+            
+            if result.returncode == 0:
+                outputs[policy["package"]] = json.loads(result.stdout)
+                if diagnostics is not None:
+                    diagnostics.add_opa_output(outputs[policy["package"]], "subprocess", [policy["package"]])
+            else:
+                print(f"❌ Erreur OPA pour {package_name}: {result.stderr}")
                 
-                try:
-                    # Exécuter OPA
-                    result = subprocess.run([
-                        'opa', 'eval',
-                        '--data', policy_path,
-                        '--input', 'evidence/real_evidence.json',
-                        '--format', 'json',
-                        'data'
-                    ], capture_output=True, text=True, timeout=30)
-                    
-                    if result.returncode == 0:
-                        opa_output = json.loads(result.stdout)
-                        package_results = parse_opa_results(opa_output, package_name)
-                        results["policies_evaluated"].append({
-                            "package": full_package_name,
-                            "results": package_results
-                        })
-                        
-                        # Extraire le score - VERSION AMÉLIORÉE
-                        score_found = False
-                        for key, value in package_results.items():
-                            if "score" in key.lower() and isinstance(value, (int, float)):
-                                results["scores"][full_package_name] = value
-                                score_found = True
-                                print(f"   ✅ Score trouvé: {key} = {value}%")
-                                break
-                        
-                        if not score_found:
-                            print(f"   ⚠️  Aucun score trouvé dans les résultats")
-                            
-                    else:
-                        print(f"❌ Erreur OPA pour {package_name}: {result.stderr}")
-                        
-                except subprocess.TimeoutExpired:
-                    print(f"⏰ Timeout pour {package_name}")
-                except Exception as e:
-                    print(f"❌ Exception pour {package_name}: {e}")
+        except subprocess.TimeoutExpired:
+            print(f"⏰ Timeout pour {package_name}")
+        except Exception as e:
+            print(f"❌ Exception pour {package_name}: {e}")
+    
+    return outputs
+
+def evaluate_documents_server(policies, documents):
+    """Évalue les documents via un serveur OPA persistant
+    
+    Retourne None si le serveur n'a pas pu être utilisé.
+    """
+    server = OpaServer([policy["path"] for policy in policies],
+                       socket_path=os.getenv('OPA_SERVER_SOCKET'))
+    metrics = get_metrics()
+    start = time.perf_counter()
+    try:
+        server.start()
+        spawn_seconds = time.perf_counter() - start
+        print(f"🚀 Serveur OPA démarré sur {server.address()}")
+    except OpaServerError as e:
+        print(f"⚠️  Serveur OPA indisponible: {e}")
+        server.stop()
+        return None
+    
+    query, bindings = build_bundle_query(policies)
+    diagnostics = get_diagnostics()
+    outputs = []
+    try:
+        for evidence in documents:
+            # Un seul aller-retour: la requête ciblée sur tous les packages
+            start = time.perf_counter()
+            if diagnostics is not None:
+                payload = server.query_adhoc_payload(query, build_bundle_input(policies, evidence),
+                                                     params=OPA_SERVER_PARAMS)
+                diagnostics.add_opa_output(payload, "server", [policy["package"] for policy in policies])
+                result = payload.get("result", [])
+            else:
+                result = server.query_adhoc(query, build_bundle_input(policies, evidence))
+            # Le démarrage du serveur est compté sur la première requête
+            metrics.record_opa_call("server", "all", spawn_seconds, time.perf_counter() - start)
+            spawn_seconds = 0.0
+            values = result[0] if result else {}
+            outputs.append(split_bundle_bindings(values, bindings, policies))
+    except OpaServerError as e:
+        print(f"⚠️  Erreur du serveur OPA: {e}")
+        return None
+    finally:
+        server.stop()
+    
+    return outputs
+
+def wrap_opa_value(value):
+    """Met une valeur au format de sortie de `opa eval --format json`"""
+    return {"result": [{"expressions": [{"value": value}]}]}
+
+def build_results(policies, outputs, on_package=None):
+    """Construit les résultats d'évaluation à partir des sorties OPA par package"""
+    results = {
+        "evaluation_time": datetime.utcnow().isoformat(),
+        "policies_evaluated": [],
+        "scores": {},
+        "compliance_status": {}
+    }
+    
+    for policy in policies:
+        full_package_name = policy["package"]
+        if full_package_name not in outputs:
+            continue
+        
+        print(f"🔍 Évaluation de {full_package_name}...")
+        package_results = parse_opa_results(outputs[full_package_name], policy["name"])
+        entry = {
+            "package": full_package_name,
+            "results": package_results
+        }
+        results["policies_evaluated"].append(entry)
+        
+        # Extraire le score: la règle *_score déclarée en priorité
+        score_found = False
+        score_rule = policy.get("score_rule")
+        candidates = sorted(package_results.items(), key=lambda item: item[0] != score_rule)
+        for key, value in candidates:
+            if "score" in key.lower() and isinstance(value, (int, float)):
+                results["scores"][full_package_name] = value
+                score_found = True
+                print(f"   ✅ Score trouvé: {key} = {value}%")
+                break
+        
+        if not score_found:
+            print(f"   ⚠️  Aucun score trouvé dans les résultats")
+        
+        if on_package:
+            on_package(entry, results["scores"].get(full_package_name))
     
     # Calculer le score global
     results["overall_score"] = calculate_overall_score(results["scores"])
@@ -139,6 +558,7 @@ def set_fallback_scores(results, package_name):
         results["github_security_score"] = 0
         results["malware_protection_enabled"] = False
         results["vulnerability_management_enabled"] = False
+        results["dependencies_free_of_known_vulnerabilities"] = False
     elif "awareness-training" in package_name:
         results["awareness_score"] = 100
         results["security_awareness"] = True
@@ -156,12 +576,8 @@ def assess_compliance_status(scores):
     status = {}
     
     for category, score in scores.items():
-        if score >= 80:
-            status[category] = "CONFORME"
-        elif score >= 60:
-            status[category] = "PARTIELLEMENT CONFORME"
-        else:
-            status[category] = "NON CONFORME"
+        status[category] = next((label for threshold, label in COMPLIANCE_THRESHOLDS if score >= threshold),
+                                NON_COMPLIANT)
     
     return status
 
@@ -175,35 +591,91 @@ def create_fallback_results():
         "overall_score": 0
     }
 
-def main():
-    print("⚖️ Évaluation des politiques avec OPA...")
-    
-    # Vérifier qu'OPA est installé
+def resolve_backend(backend):
+    """Vérifie qu'OPA est installé, sinon utilise l'évaluateur intégré"""
+    if backend == "python":
+        return backend
     try:
         subprocess.run(['opa', 'version'], capture_output=True, check=True)
         print("✅ OPA est installé")
+        return backend
     except:
         print("❌ OPA n'est pas installé ou accessible")
-        return
+        print("🐍 Utilisation de l'évaluateur Rego intégré")
+        return "python"
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Évaluation des preuves avec OPA")
+    parser.add_argument('--backend', choices=['bundle', 'server', 'subprocess', 'python'],
+                        default=os.getenv('OPA_BACKEND', 'bundle'),
+                        help="bundle: un seul `opa eval` pour tous les packages; "
+                             "server: un `opa run --server` persistant; "
+                             "subprocess: un `opa eval` par package; "
+                             "python: évaluateur Rego intégré, sans binaire opa")
+    parser.add_argument('--full', action='store_true',
+                        help="réévaluer tous les packages sans réutiliser les résultats précédents")
+    parser.add_argument('--format', choices=['json', 'jsonl'], default='json',
+                        help="json: documents complets; jsonl: un enregistrement par ligne, "
+                             "écrit au fil de l'évaluation")
+    parser.add_argument('--diagnostics', action='store_true',
+                        default=os.getenv('OPA_DIAGNOSTICS', '') not in ('', '0', 'false'),
+                        help="capturer --metrics, --profile et --explain d'OPA pendant l'évaluation "
+                             "(reports/opa_diagnostics.json, lu par debug_opa.py); implique --full")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    metrics = Metrics("evaluate_with_opa")
+    set_metrics(metrics)
+    print("⚖️ Évaluation des politiques avec OPA...")
+    
+    # Vérifier qu'OPA est installé, sinon utiliser l'évaluateur intégré
+    args.backend = resolve_backend(args.backend)
     
     # Vérifier que le fichier evidence existe
-    if not os.path.exists('evidence/real_evidence.json'):
-        print("❌ Fichier evidence/real_evidence.json non trouvé")
+    evidence_path = EVIDENCE_PATHS[args.format]
+    if not os.path.exists(evidence_path):
+        print(f"❌ Fichier {evidence_path} non trouvé")
         print("💡 Exécutez d'abord: python scripts/collect_real_evidence.py")
         return
     
-    # Évaluer avec OPA
-    opa_results = evaluate_with_opa()
-    
     # Sauvegarder les résultats
     os.makedirs('reports', exist_ok=True)
+    diagnostics = OpaDiagnostics(discover_policies()) if args.diagnostics else None
     
-    with open('reports/opa_evaluation_results.json', 'w') as f:
-        json.dump(opa_results, f, indent=2)
+    if args.format == "jsonl":
+        # Chaque package est écrit dès qu'il est évalué: le rapport peut suivre le fichier
+        with JsonlWriter('reports/opa_evaluation_results.jsonl') as writer:
+            writer.write({"type": "evaluation", "evaluation_time": datetime.utcnow().isoformat()})
+            opa_results = evaluate_with_opa(
+                backend=args.backend, incremental=not args.full, evidence_format="jsonl",
+                diagnostics=diagnostics,
+                on_package=lambda entry, score: writer.write(package_record(
+                    entry, score, assess_compliance_status({entry["package"]: score}) if score is not None else {}
+                ))
+            )
+            writer.write(results_summary_record(opa_results))
+            opa_results["timings"] = metrics.to_dict()
+            writer.write({"type": "timings", "timings": opa_results["timings"]})
+        metrics.add_bytes_written(writer.bytes_written)
+    else:
+        # Évaluer avec OPA
+        opa_results = evaluate_with_opa(backend=args.backend, incremental=not args.full,
+                                        diagnostics=diagnostics)
+        opa_results["timings"] = metrics.to_dict()
+        
+        with metrics.stage("write"):
+            with open('reports/opa_evaluation_results.json', 'w') as f:
+                json.dump(opa_results, f, indent=2)
+        metrics.add_bytes_written(os.path.getsize('reports/opa_evaluation_results.json'))
+    metrics_path = metrics.write_prometheus()
+    if diagnostics is not None:
+        print(f"🩺 Diagnostics OPA: {diagnostics.save(args.backend, opa_results['evaluation_time'])}")
     
     print("✅ Évaluation OPA terminée!")
     print(f"🎯 Score global: {opa_results['overall_score']}%")
     print(f"📊 Politiques évaluées: {len(opa_results['policies_evaluated'])}")
+    print(f"⏱️  Durée: {opa_results['timings']['wall_seconds']}s (métriques: {metrics_path})")
     
     if opa_results['scores']:
         print(f"📈 Scores par catégorie: {opa_results['scores']}")
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import time
+
+from repo_snapshot import IGNORED_DIRS, RepoSnapshot
+
+# Masques inotify (linux/inotify.h)
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE
+              | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+EVENT_HEADER = struct.Struct('iIII')
+
+# Chemin signalé quand des événements ont été perdus: tout le dépôt est à relire
+RESCAN = ''
+
+class WatcherError(Exception):
+    """inotify indisponible (autre système, limite de surveillances atteinte...)"""
+
+
+class InotifyWatcher:
+    """Surveillance récursive d'un répertoire via inotify (ctypes, sans dépendance)
+
+    Une surveillance par répertoire; les répertoires créés pendant la
+    surveillance sont ajoutés à la volée. `read()` retourne les chemins
+    (relatifs à la racine) touchés depuis le dernier appel.
+    """
+
+    def __init__(self, root='.', ignored_dirs=IGNORED_DIRS):
+        self.root = os.path.abspath(root)
+        self.ignored_dirs = ignored_dirs
+        path = ctypes.util.find_library('c')
+        try:
+            self.libc = ctypes.CDLL(path or 'libc.so.6', use_errno=True)
+            self.libc.inotify_init1
+        except (OSError, AttributeError) as e:
+            raise WatcherError(f"inotify indisponible: {e}")
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise WatcherError(f"inotify_init1: {os.strerror(ctypes.get_errno())}")
+        self.directories = {}
+        self.add_tree('')
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+    def add_tree(self, relative_dir):
+        """Surveille un répertoire et ses sous-répertoires"""
+        stack = [relative_dir]
+        while stack:
+            current = stack.pop()
+            absolute = os.path.join(self.root, current) if current else self.root
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(absolute), WATCH_MASK)
+            if wd < 0:
+                error = ctypes.get_errno()
+                if error == errno.ENOSPC:
+                    raise WatcherError("limite fs.inotify.max_user_watches atteinte")
+                continue
+            self.directories[wd] = current
+            try:
+                with os.scandir(absolute) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False) and entry.name not in self.ignored_dirs:
+                            stack.append(f"{current}/{entry.name}" if current else entry.name)
+            except OSError:
+                continue
+
+    def read(self, timeout=None):
+        """Chemins modifiés (ensemble vide si rien n'arrive avant `timeout` secondes)"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        changed = set()
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            if not data:
+                break
+            changed.update(self.parse(data))
+        return changed
+
+    def parse(self, data):
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                yield RESCAN
+                continue
+            if mask & IN_IGNORED:
+                self.directories.pop(wd, None)
+                continue
+            directory = self.directories.get(wd)
+            if directory is None:
+                continue
+            if not name:
+                yield directory
+                continue
+            if name in self.ignored_dirs and mask & IN_ISDIR:
+                continue
+            path = f"{directory}/{name}" if directory else name
+            if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                self.add_tree(path)
+            yield path
+
+
+class PollingWatcher:
+    """Repli sans inotify: compare périodiquement tailles et dates de modification"""
+
+    def __init__(self, root='.', ignored_dirs=IGNORED_DIRS, interval=0.5):
+        self.root = root
+        self.ignored_dirs = ignored_dirs
+        self.interval = interval
+        self.state = self.scan()
+
+    def close(self):
+        pass
+
+    def scan(self):
+        snapshot = RepoSnapshot.from_directory(self.root, self.ignored_dirs)
+        return {path: (entry.is_dir, entry.size, entry.mtime_ns) for path, entry in snapshot.entries.items()}
+
+    def read(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self.interval if deadline is None else min(self.interval, deadline - time.monotonic())
+            if wait > 0:
+                time.sleep(wait)
+            state = self.scan()
+            changed = {path for path in state.keys() | self.state.keys()
+                       if state.get(path) != self.state.get(path)}
+            self.state = state
+            # Le répertoire parent change avec chaque création/suppression: seul le fichier compte
+            changed = {path for path in changed
+                       if not (state.get(path, (False,))[0] and any(other.startswith(f"{path}/") for other in changed))}
+            if changed or (deadline is not None and time.monotonic() >= deadline):
+                return changed
+
+
+def open_watcher(root='.', ignored_dirs=IGNORED_DIRS, polling=False, interval=0.5):
+    """inotify si disponible, sinon scrutation périodique"""
+    if not polling:
+        try:
+            return InotifyWatcher(root, ignored_dirs)
+        except WatcherError as e:
+            print(f"⚠️  {e}: surveillance par scrutation toutes les {interval}s")
+    return PollingWatcher(root, ignored_dirs, interval)
+
+def wait_for_changes(watcher, debounce=0.2, max_delay=2.0):
+    """Bloque jusqu'à un changement puis regroupe la rafale d'événements
+
+    Les événements sont accumulés tant qu'il en arrive à moins de `debounce`
+    secondes d'intervalle (une sauvegarde d'éditeur en produit plusieurs),
+    sans dépasser `max_delay` après le premier.
+    """
+    changed = set()
+    while not changed:
+        changed = watcher.read(None)
+    first = time.monotonic()
+    while True:
+        remaining = max_delay - (time.monotonic() - first)
+        if remaining <= 0:
+            break
+        more = watcher.read(min(debounce, remaining))
+        if not more:
+            break
+        changed |= more
+    return changed
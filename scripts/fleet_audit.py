@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+import argparse
+import contextlib
+import json
+import multiprocessing
+import multiprocessing.connection
+import os
+import time
+from datetime import datetime
+
+from collect_real_evidence import calculate_realistic_score, collect_real_evidence
+from evaluate_with_opa import evaluate_evidence_documents
+from jsonl_io import JsonlRecords
+from pipeline_metrics import get_metrics
+from report_templates import FLEET_OUTPUTS, render_outputs
+from repo_snapshot import RepoSnapshot
+from scoring_engine import ScoreMatrix, load_groups, load_weights
+
+def discover_repositories(checkouts_dir=None, manifest=None):
+    """Liste des dépôts à auditer: [{"name", "path"}]
+
+    - checkouts_dir: chaque sous-répertoire est un dépôt
+    - manifest: une ligne par dépôt, `chemin` ou `nom chemin` (# = commentaire),
+      chemins relatifs au répertoire du manifeste
+    """
+    repositories = []
+    if checkouts_dir:
+        for entry in sorted(os.scandir(checkouts_dir), key=lambda e: e.name):
+            if entry.is_dir() and not entry.name.startswith('.'):
+                repositories.append({"name": entry.name, "path": entry.path})
+    if manifest:
+        base_dir = os.path.dirname(os.path.abspath(manifest))
+        with open(manifest, 'r') as f:
+            for line in f:
+                line = line.split('#', 1)[0].strip()
+                if not line:
+                    continue
+                parts = line.split(None, 1)
+                name, path = (parts[0], parts[1]) if len(parts) == 2 else (None, parts[0])
+                path = os.path.join(base_dir, path)
+                repositories.append({"name": name or os.path.basename(os.path.normpath(path)),
+                                     "path": path})
+    return repositories
+
+def audit_repository(repository, backend="python", policies_dir="policies"):
+    """Collecte les preuves et évalue les politiques pour un dépôt"""
+    start = time.perf_counter()
+    if not os.path.isdir(repository["path"]):
+        raise FileNotFoundError(f"checkout introuvable: {repository['path']}")
+    snapshot = RepoSnapshot.from_directory(repository["path"])
+    # Pas de manifeste des actifs: les processus de travail écraseraient celui de l'audit
+    evidence = collect_real_evidence(snapshot=snapshot, use_cache=False, use_http_cache=True,
+                                     repository=repository["name"], manifest_path=None)
+    evidence["score_realiste"] = calculate_realistic_score(evidence["controles"])
+    opa_results = evaluate_evidence_documents([evidence], backend=backend,
+                                              policies_dir=policies_dir)[0]
+    return {
+        "repository": repository["name"],
+        "path": repository["path"],
+        "status": "ok",
+        "score_realiste": evidence["score_realiste"],
+        "overall_score": opa_results["overall_score"],
+        "scores": opa_results["scores"],
+        "compliance_status": opa_results["compliance_status"],
+        "controles": evidence["controles"],
+        # Compteurs de ce dépôt (absents sans accès à l'API)
+        "github_api": get_metrics().statistics.pop("github_api", None),
+        "duration_seconds": round(time.perf_counter() - start, 3)
+    }
+
+def worker_main(conn, backend, policies_dir):
+    """Processus de travail: reçoit un dépôt, renvoie son résultat"""
+    while True:
+        try:
+            repository = conn.recv()
+        except EOFError:
+            return
+        if repository is None:
+            return
+        try:
+            # Les scripts affichent leur progression: inutile dans un audit de flotte
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                result = audit_repository(repository, backend, policies_dir)
+        except Exception as e:
+            result = {"repository": repository["name"], "path": repository["path"],
+                      "status": "error", "error": f"{type(e).__name__}: {e}"}
+        conn.send(result)
+
+class Worker:
+    """Processus de travail et son canal dédié"""
+
+    def __init__(self, context, backend, policies_dir):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=worker_main,
+                                       args=(child_conn, backend, policies_dir), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.repository = None
+        self.started_at = None
+
+    def submit(self, repository):
+        self.repository = repository
+        self.started_at = time.monotonic()
+        self.conn.send(repository)
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.kill()
+        self.conn.close()
+
+def run_fleet(repositories, workers=None, timeout=120, backend="python", policies_dir="policies"):
+    """Audite les dépôts en parallèle et produit chaque résultat dès qu'il est prêt
+
+    Chaque processus de travail a son propre canal: un dépôt qui dépasse le
+    délai est abandonné en tuant son processus, qui est aussitôt remplacé,
+    sans bloquer les autres.
+    """
+    context = multiprocessing.get_context()
+    workers = max(1, min(workers or os.cpu_count() or 1, len(repositories) or 1))
+    pending = list(reversed(repositories))
+    pool = [Worker(context, backend, policies_dir) for _ in range(workers)]
+
+    try:
+        for worker in pool:
+            if pending:
+                worker.submit(pending.pop())
+
+        while any(worker.repository for worker in pool):
+            busy = [worker for worker in pool if worker.repository]
+            now = time.monotonic()
+            wait_for = max(0.0, min(worker.started_at + timeout - now for worker in busy))
+            ready = multiprocessing.connection.wait([worker.conn for worker in busy], timeout=wait_for)
+
+            for index, worker in enumerate(pool):
+                if not worker.repository:
+                    continue
+                result = None
+                if worker.conn in ready:
+                    try:
+                        result = worker.conn.recv()
+                    except EOFError:
+                        result = {"repository": worker.repository["name"],
+                                  "path": worker.repository["path"],
+                                  "status": "error", "error": "processus de travail arrêté"}
+                        worker.kill()
+                        pool[index] = worker = Worker(context, backend, policies_dir)
+                elif time.monotonic() - worker.started_at >= timeout:
+                    result = {"repository": worker.repository["name"],
+                              "path": worker.repository["path"],
+                              "status": "timeout", "error": f"délai de {timeout}s dépassé"}
+                    worker.kill()
+                    pool[index] = worker = Worker(context, backend, policies_dir)
+                if result is None:
+                    continue
+
+                worker.repository = None
+                if pending:
+                    worker.submit(pending.pop())
+                yield result
+    finally:
+        for worker in pool:
+            if worker.repository:
+                worker.kill()
+            else:
+                worker.stop()
+
+def summarize_fleet(results, weights=None, groups=None):
+    """Résumé de flotte: matrice dépôts x contrôles notée par scoring_engine.py
+
+    `results` est parcouru une seule fois (ex: JsonlRecords sur le fichier de
+    résultats): seuls les scores et les contrôles sont gardés. Avec des poids
+    égaux, le score réaliste de la flotte est celui de calculate_realistic_score()
+    sur tous les contrôles de tous les dépôts; les statuts gardent les seuils
+    de assess_compliance_status(). `groups` (dépôt -> équipe, organisation)
+    ajoute les agrégats par équipe et par organisation.
+    """
+    repositories_failed = []
+    matrix = ScoreMatrix.from_results(successful_results(results, repositories_failed))
+    return dict({
+        "generation_time": datetime.utcnow().isoformat(),
+        "repositories_total": len(matrix.repositories) + len(repositories_failed),
+        "repositories_audited": len(matrix.repositories),
+        "repositories_failed": repositories_failed
+    }, **matrix.summary(weights, groups))
+
+def successful_results(results, failed):
+    """Résultats `ok`; les échecs (erreur, délai dépassé) sont ajoutés à `failed`"""
+    for result in results:
+        if result["status"] == "ok":
+            yield result
+        else:
+            failed.append({"repository": result["repository"], "status": result["status"],
+                           "error": result.get("error")})
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Audit ISO 27001 d'une flotte de dépôts locaux")
+    parser.add_argument('--checkouts', help="répertoire contenant un checkout par sous-répertoire")
+    parser.add_argument('--manifest', help="fichier listant les dépôts (une ligne: `chemin` ou `nom chemin`)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                        help="nombre de processus (défaut: nombre de coeurs)")
+    parser.add_argument('--timeout', type=float, default=120, help="délai maximal par dépôt, en secondes")
+    parser.add_argument('--backend', choices=['python', 'bundle', 'server', 'subprocess'],
+                        default='python', help="moteur d'évaluation des politiques (voir evaluate_with_opa.py)")
+    parser.add_argument('--policies', default='policies', help="répertoire des politiques .rego")
+    parser.add_argument('--output', default='reports/fleet_results.jsonl',
+                        help="résultats par dépôt, une ligne JSON par dépôt")
+    parser.add_argument('--weights', help="poids par contrôle pour les scores de flotte (JSON {contrôle: poids})")
+    parser.add_argument('--groups', help="équipe et organisation par dépôt (JSON {dépôt: {team, org}})")
+    args = parser.parse_args()
+    if not args.checkouts and not args.manifest:
+        parser.error("--checkouts ou --manifest est requis")
+    return args
+
+def main():
+    args = parse_args()
+    repositories = discover_repositories(args.checkouts, args.manifest)
+    print(f"🚢 Audit de flotte: {len(repositories)} dépôts, {args.workers} processus")
+
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    policies_dir = os.path.abspath(args.policies)
+    with open(args.output, 'w') as output:
+        for result in run_fleet(repositories, args.workers, args.timeout, args.backend, policies_dir):
+            output.write(json.dumps(result) + "\n")
+            output.flush()
+            if result["status"] == "ok":
+                print(f"   ✅ {result['repository']}: {result['overall_score']}% "
+                      f"(réaliste {result['score_realiste']}%, {result['duration_seconds']}s)")
+            else:
+                print(f"   ❌ {result['repository']}: {result['status']} - {result.get('error')}")
+
+    # Résumé et rapports relisent les résultats depuis le fichier, dépôt par dépôt
+    results = JsonlRecords(args.output)
+    summary = summarize_fleet(results, load_weights(args.weights) if args.weights else None,
+                              load_groups(args.groups) if args.groups else None)
+    output_dir = os.path.dirname(args.output) or '.'
+    summary_path = os.path.join(output_dir, 'fleet_summary.json')
+    with open(summary_path, 'w') as f:
+        json.dump(summary, f, indent=2)
+    report_paths = render_outputs(FLEET_OUTPUTS, base_dir=output_dir, summary=summary, repositories=results)
+
+    print("✅ Audit de flotte terminé!")
+    print(f"📊 Dépôts audités: {summary['repositories_audited']}/{summary['repositories_total']}")
+    print(f"🎯 Score global de la flotte: {summary['fleet_overall_score']}%")
+    print(f"🎯 Score RÉALISTE de la flotte: {summary['fleet_score_realiste']}%")
+    print(f"📈 Centiles du score réaliste: {summary['percentiles']['score_realiste']}")
+    print(f"📄 Résultats: {args.output}, {summary_path}")
+    print(f"📄 Rapports: {', '.join(report_paths.values())}")
+
+if __name__ == "__main__":
+    main()
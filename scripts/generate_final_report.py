@@ -1,15 +1,36 @@
 #!/usr/bin/env python3
+import argparse
+import itertools
 import json
 import os
 from datetime import datetime
 
-def generate_final_report():
-    """Génère le rapport final de conformité"""
+from history_store import HISTORY_PATH, HistoryStore
+from jsonl_io import JsonlRecords, JsonlWriter, read_jsonl, records_to_evidence
+from pipeline_metrics import Metrics, get_metrics, set_metrics
+from report_templates import REPORT_OUTPUTS, render_outputs
+
+EVALUATION_JSONL_PATH = 'reports/opa_evaluation_results.jsonl'
+REPORT_JSONL_PATH = 'reports/final_compliance_report.jsonl'
+# Sections des preuves utilisées par le rapport
+REPORT_EVIDENCE_SECTIONS = {"policies", "system", "github", "controles"}
+
+def generate_final_report(history_path=HISTORY_PATH, since=None, formats=None):
+    """Génère le rapport final de conformité
+    
+    Avec `history_path`, l'exécution est ajoutée à l'historique et le rapport
+    reçoit tendances et régressions (depuis la dernière exécution, ou depuis
+    `since`). None désactive l'historique. `formats` limite les sorties
+    rendues (voir REPORT_OUTPUTS).
+    """
+    metrics = get_metrics()
     
     # Charger les résultats OPA
     try:
-        with open('reports/opa_evaluation_results.json', 'r') as f:
-            opa_results = json.load(f)
+        with metrics.stage("load_results"):
+            with open('reports/opa_evaluation_results.json', 'r') as f:
+                opa_results = json.load(f)
+        metrics.add_bytes_read(os.path.getsize('reports/opa_evaluation_results.json'))
     except FileNotFoundError:
         print("❌ Fichier OPA results non trouvé. Exécutez d'abord evaluate_with_opa.py")
         return create_fallback_report()
@@ -18,29 +39,151 @@ def generate_final_report():
     evidence = {}
     if os.path.exists('evidence/real_evidence.json'):
         try:
-            with open('evidence/real_evidence.json', 'r') as f:
-                evidence = json.load(f)
+            with metrics.stage("load_evidence"):
+                with open('evidence/real_evidence.json', 'r') as f:
+                    evidence = json.load(f)
+            metrics.add_bytes_read(os.path.getsize('evidence/real_evidence.json'))
         except:
             evidence = {"error": "Erreur lecture evidence"}
     
-    report = {
-        "generation_time": datetime.utcnow().isoformat(),
-        "summary": generate_summary(opa_results, evidence),
-        "detailed_results": opa_results.get("policies_evaluated", []),
-        "recommendations": generate_recommendations(opa_results, evidence),
-        "next_steps": generate_next_steps(opa_results)
-    }
+    report = build_final_report(opa_results, evidence)
+    if history_path:
+        record_history(report, opa_results, evidence, history_path, since)
+    write_final_report(report, evidence, formats)
+    return report
+
+def build_final_report(opa_results, evidence):
+    """Construit le rapport à partir des résultats OPA et des preuves en mémoire"""
+    with get_metrics().stage("build"):
+        return {
+            "generation_time": datetime.utcnow().isoformat(),
+            "summary": generate_summary(opa_results, evidence),
+            "detailed_results": opa_results.get("policies_evaluated", []),
+            "recommendations": generate_recommendations(opa_results, evidence),
+            "next_steps": generate_next_steps(opa_results)
+        }
+
+def record_history(report, opa_results, evidence, path=HISTORY_PATH, since=None):
+    """Ajoute l'exécution à l'historique et joint le bloc `history` au rapport"""
+    metrics = get_metrics()
+    repository = evidence.get("repository") or "unknown"
+    with metrics.stage("history"), HistoryStore(path) as store:
+        store.record_run(repository, report["generation_time"], evidence.get("controles", {}),
+                         opa_results.get("scores", {}), opa_results.get("compliance_status", {}),
+                         overall_score=opa_results.get("overall_score"),
+                         score_realiste=evidence.get("score_realiste"),
+                         timings=metrics.to_dict())
+        report["history"] = store.summary(repository, since)
+    return report["history"]
+
+def write_final_report(report, evidence, formats=None):
+    """Écrit le rapport JSON (avec les mesures d'exécution) et ses rendus (Markdown, HTML, résumé)"""
+    metrics = get_metrics()
+    report["timings"] = metrics.to_dict()
     
     # Sauvegarder le rapport JSON
     os.makedirs('reports', exist_ok=True)
-    with open('reports/final_compliance_report.json', 'w') as f:
-        json.dump(report, f, indent=2)
+    with metrics.stage("write"):
+        with open('reports/final_compliance_report.json', 'w') as f:
+            json.dump(report, f, indent=2)
+    metrics.add_bytes_written(os.path.getsize('reports/final_compliance_report.json'))
+    
+    render_report(report, evidence, formats)
+
+def generate_final_report_streaming(follow=False, timeout=None, history_path=HISTORY_PATH, since=None,
+                                    formats=None):
+    """Génère le rapport à partir des fichiers JSON Lines, enregistrement par enregistrement
     
-    # Générer le rapport Markdown
-    generate_markdown_report(report, evidence)
+    Chaque package évalué est traité dès sa lecture et le rapport est écrit
+    au fil de l'eau: la mémoire ne dépend pas du nombre de packages. En mode
+    suivi, la génération démarre avant la fin de l'évaluation et attend les
+    packages au fur et à mesure qu'ils sont écrits. Les résultats d'une
+    évaluation antérieure à la collecte des preuves sont ignorés: le suivi
+    attend alors le flux de l'évaluation en cours.
+    """
+    metrics = get_metrics()
+    with metrics.stage("load_evidence"):
+        evidence = load_report_evidence()
+    records = read_jsonl(EVALUATION_JSONL_PATH, follow=follow, timeout=timeout,
+                         accept=lambda header: evaluation_is_current(header, evidence))
+    
+    generation_time = datetime.utcnow().isoformat()
+    evaluation_summary = {}
+    policies_evaluated_count = 0
+    
+    try:
+        with metrics.stage("stream"), JsonlWriter(REPORT_JSONL_PATH) as writer:
+            writer.write({"type": "report", "generation_time": generation_time})
+            
+            for record in records:
+                if record["type"] == "package":
+                    policies_evaluated_count += 1
+                    writer.write({"type": "detailed_result", "package": record["package"],
+                                  "results": record["results"]})
+                    if record.get("score") is not None:
+                        for recommendation in score_recommendations(record["package"], record["score"]):
+                            writer.write({"type": "recommendation", "text": recommendation})
+                elif record["type"] == "summary":
+                    evaluation_summary = record
+                elif record["type"] == "error":
+                    print(f"❌ Évaluation interrompue: {record.get('message')}")
+            
+            for recommendation in evidence_recommendations(evidence):
+                writer.write({"type": "recommendation", "text": recommendation})
+            for step in generate_next_steps(evaluation_summary):
+                writer.write({"type": "next_step", "text": step})
+            
+            summary = generate_summary(evaluation_summary, evidence)
+            summary["policies_evaluated_count"] = policies_evaluated_count
+            writer.write({"type": "summary", **summary})
+            timings = metrics.to_dict()
+            writer.write({"type": "timings", "timings": timings})
+        metrics.add_bytes_read(os.path.getsize(EVALUATION_JSONL_PATH))
+        metrics.add_bytes_written(writer.bytes_written)
+    except FileNotFoundError:
+        print("❌ Fichier OPA results non trouvé. Exécutez d'abord evaluate_with_opa.py --format jsonl")
+        return create_fallback_report()
     
+    report = {
+        "generation_time": generation_time,
+        "summary": summary,
+        "detailed_results": JsonlRecords(REPORT_JSONL_PATH, "detailed_result"),
+        "recommendations": JsonlRecords(REPORT_JSONL_PATH, "recommendation", "text"),
+        "next_steps": JsonlRecords(REPORT_JSONL_PATH, "next_step", "text"),
+        "timings": timings
+    }
+    if history_path:
+        record_history(report, evaluation_summary, evidence, history_path, since)
+    render_report(report, evidence, formats)
     return report
 
+def evaluation_is_current(header, evidence):
+    """Le flux d'évaluation (premier enregistrement) a-t-il commencé après la collecte des preuves?"""
+    evaluated = header.get("evaluation_time") if header.get("type") == "evaluation" else None
+    collected = evidence.get("collection_time")
+    if not evaluated or not collected:
+        return True
+    try:
+        return datetime.fromisoformat(evaluated) >= datetime.fromisoformat(collected)
+    except (TypeError, ValueError):
+        return True
+
+def load_report_evidence():
+    """Preuves utiles au rapport (JSON Lines si disponible, sinon JSON)"""
+    if os.path.exists('evidence/real_evidence.jsonl'):
+        try:
+            return records_to_evidence(read_jsonl('evidence/real_evidence.jsonl'),
+                                       sections=REPORT_EVIDENCE_SECTIONS)
+        except ValueError:
+            return {"error": "Erreur lecture evidence"}
+    if os.path.exists('evidence/real_evidence.json'):
+        try:
+            with open('evidence/real_evidence.json', 'r') as f:
+                return json.load(f)
+        except:
+            return {"error": "Erreur lecture evidence"}
+    return {}
+
 def create_fallback_report():
     """Crée un rapport de secours si les données sont manquantes"""
     report = {
@@ -68,7 +211,7 @@ def create_fallback_report():
     with open('reports/final_compliance_report.json', 'w') as f:
         json.dump(report, f, indent=2)
     
-    generate_markdown_report(report, {})
+    render_report(report, {})
     return report
 
 def generate_summary(opa_results, evidence):
@@ -91,13 +234,27 @@ def generate_recommendations(opa_results, evidence):
     # Recommandations basées sur les scores OPA
     scores = opa_results.get("scores", {})
     for category, score in scores.items():
-        if score < 60:
-            recommendations.append(f"Améliorer la conformité dans {category} (score: {score}%)")
+        recommendations.extend(score_recommendations(category, score))
     
     # Recommandations basées sur les preuves manquantes
+    recommendations.extend(evidence_recommendations(evidence))
+    return recommendations
+
+def score_recommendations(category, score):
+    """Recommandations pour le score d'un package"""
+    if score < 60:
+        return [f"Améliorer la conformité dans {category} (score: {score}%)"]
+    return []
+
+def evidence_recommendations(evidence):
+    """Recommandations basées sur les preuves manquantes"""
+    recommendations = []
     policies = evidence.get("policies", {})
     if policies.get("total_policies", 0) < 2:
         recommendations.append("Créer les politiques de sécurité manquantes (au moins 2)")
+    for filename, coverage in policies.get("coverage", {}).items():
+        if coverage["missing"]:
+            recommendations.append(f"Compléter {filename}: clauses non couvertes {', '.join(coverage['missing'])}")
     
     system = evidence.get("system", {})
     if not system.get("has_tests", False):
@@ -110,6 +267,30 @@ def generate_recommendations(opa_results, evidence):
     if not security_features.get("dependabot", False):
         recommendations.append("Configurer Dependabot pour la gestion des vulnérabilités")
     
+    vulnerabilities = evidence.get("vulnerabilities", {})
+    if vulnerabilities.get("findings_count"):
+        upgrades = sorted({f"{finding['package']} {finding['version']} → {finding['fixed'] or '?'}"
+                           for finding in vulnerabilities["findings"]})
+        recommendations.append(f"Mettre à jour les dépendances vulnérables "
+                               f"({vulnerabilities['findings_count']} avis): {', '.join(upgrades)}")
+    elif vulnerabilities and not vulnerabilities.get("database", {}).get("available"):
+        recommendations.append("Construire l'index OSV local (scripts/vulnerability_index.py) "
+                               "pour vérifier les dépendances")
+
+    workflows = evidence.get("workflows", {})
+    unverified = sorted({install["tool"] for install in workflows.get("tool_installs", [])
+                         if install["url"] and not install["verified"]})
+    if unverified:
+        recommendations.append(f"Vérifier l'empreinte des outils téléchargés en CI: {', '.join(unverified)}")
+    if workflows.get("unpinned_actions"):
+        recommendations.append(f"Épingler les actions GitHub par SHA de commit "
+                               f"({len(workflows['unpinned_actions'])} non épinglées)")
+    
+    secrets = evidence.get("secrets", {})
+    if secrets.get("findings_count"):
+        locations = ', '.join(f"{finding['path']}:{finding['line']}" for finding in secrets["findings"][:5])
+        recommendations.append(f"Révoquer et retirer les {secrets['findings_count']} secret(s) détecté(s) ({locations})")
+    
     return recommendations
 
 def generate_next_steps(opa_results):
@@ -122,79 +303,90 @@ def generate_next_steps(opa_results):
         "Documenter les améliorations apportées"
     ]
 
-def generate_markdown_report(report, evidence):
-    """Génère un rapport Markdown lisible"""
-    
-    with open('reports/final_compliance_report.md', 'w') as f:
-        f.write("# 📋 Rapport de Conformité ISO 27001:2022\n\n")
-        f.write(f"**Date de génération**: {report['generation_time']}\n\n")
-        
-        score = report['summary']['overall_compliance_score']
-        f.write(f"## 🎯 Score Global de Conformité: {score}%\n\n")
-        
-        # Barre de progression visuelle - CORRIGÉE
-        filled_bars = int(score // 20)
-        empty_bars = 5 - filled_bars
-        progress_bar = "🟩" * filled_bars + "⬜" * empty_bars
-        f.write(f"{progress_bar}\n\n")
-        
-        f.write("## 📊 Statut de Conformité par Catégorie\n\n")
-        status_dict = report['summary']['compliance_status']
-        if status_dict and "error" not in str(status_dict):
-            for category, status in status_dict.items():
-                emoji = "✅" if status == "CONFORME" else "⚠️" if status == "PARTIELLEMENT CONFORME" else "❌"
-                # Trouver le score pour cette catégorie
-                category_score = report['summary'].get('scores', {}).get(category, "N/A")
-                f.write(f"{emoji} **{category}**: {status} ({category_score}%)\n")
-        else:
-            f.write("❌ *Données de conformité non disponibles*\n")
-        
-        f.write(f"\n## 📈 Métriques Collectées\n\n")
-        evidence_data = report['summary']['evidence_collected']
-        if "error" not in str(evidence_data):
-            f.write(f"- 🔍 Politiques évaluées: {report['summary']['policies_evaluated_count']}\n")
-            f.write(f"- 📋 Politiques documentées: {evidence_data.get('policy_files', 0)}\n")
-            f.write(f"- ⚖️ Politiques OPA: {evidence_data.get('opa_policies', 0)}\n")
-        else:
-            f.write("❌ *Métriques non disponibles - exécutez collect_real_evidence.py*\n")
-        
-        f.write(f"\n## 💡 Recommandations d'Amélioration\n\n")
-        recommendations = report['recommendations']
-        if recommendations:
-            for i, rec in enumerate(recommendations, 1):
-                f.write(f"{i}. {rec}\n")
-        else:
-            f.write("✅ Aucune recommandation critique - bon travail!\n")
-        
-        f.write(f"\n## 🚀 Prochaines Étapes Recommandées\n\n")
-        for step in report['next_steps']:
-            f.write(f"- {step}\n")
-        
-        f.write(f"\n## 🔄 Workflow d'Audit\n\n")
-        f.write("1. `scripts/collect_real_evidence.py` - Collecte des preuves\n")
-        f.write("2. `scripts/evaluate_with_opa.py` - Évaluation avec OPA\n") 
-        f.write("3. `scripts/generate_final_report.py` - Génération du rapport\n")
-        
-        f.write(f"\n---\n")
-        f.write(f"*Rapport généré automatiquement par le système de conformité ISO 27001* | ")
-        f.write(f"[Voir les artefacts](#) | ")
-        f.write(f"[Journal d'exécution](#)\n")
+def render_report(report, evidence, formats=None):
+    """Rend le rapport avec les templates Jinja2 (REPORT_OUTPUTS), en flux"""
+    metrics = get_metrics()
+    with metrics.stage("render"):
+        paths = render_outputs(REPORT_OUTPUTS, formats, report=report, evidence=evidence)
+    metrics.add_bytes_written(sum(os.path.getsize(path) for path in paths.values()))
+    return paths
+
+def print_history(history):
+    """Résumé console du bloc `history`"""
+    trend = history['score_trend']
+    print(f"📉 Historique: {history['runs']} exécutions"
+          + (f", score {' → '.join(str(run['overall_score']) for run in trend[-5:])}" if trend else ""))
+    regressions = history['regressions']
+    if regressions:
+        regressed = regressions['regressed_controls'] + [p['package'] for p in regressions['regressed_packages']]
+        print(f"   Régressions depuis {regressions['baseline']['timestamp']}: "
+              + (", ".join(regressed) if regressed else "aucune"))
+    if history['flapping_controls']:
+        print("   Contrôles instables: " + ", ".join(
+            f"{control['control_id']} ({control['flips']})" for control in history['flapping_controls']))
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Génération du rapport final de conformité")
+    parser.add_argument('--format', choices=['json', 'jsonl'], default='json',
+                        help="jsonl: lit opa_evaluation_results.jsonl et écrit "
+                             "final_compliance_report.jsonl enregistrement par enregistrement")
+    parser.add_argument('--follow', action='store_true',
+                        help="(jsonl) démarrer sans attendre la fin de l'évaluation")
+    parser.add_argument('--timeout', type=float, default=None,
+                        help="(jsonl --follow) délai maximal d'attente, en secondes")
+    parser.add_argument('--outputs', nargs='+', choices=list(REPORT_OUTPUTS), default=None,
+                        help="rendus à produire (défaut: tous)")
+    parser.add_argument('--history-db', default=HISTORY_PATH,
+                        help=f"historique SQLite des exécutions (défaut: {HISTORY_PATH})")
+    parser.add_argument('--no-history', action='store_true',
+                        help="ne pas enregistrer l'exécution dans l'historique")
+    parser.add_argument('--since', metavar='DATE',
+                        help="régressions et bascules depuis cette date (ISO 8601, ex: 2026-01-01)")
+    parser.add_argument('--history-only', metavar='REPOSITORY', nargs='?', const='',
+                        help="interroger l'historique sans générer de rapport "
+                             "(dépôt par défaut: GITHUB_REPOSITORY)")
+    args = parser.parse_args()
+    if args.since:
+        try:
+            datetime.fromisoformat(args.since)
+        except ValueError:
+            parser.error(f"--since: date invalide: {args.since}")
+    return args
 
 def main():
+    args = parse_args()
+    metrics = Metrics("generate_final_report")
+    set_metrics(metrics)
+    if args.history_only is not None:
+        repository = args.history_only or os.getenv('GITHUB_REPOSITORY', 'unknown')
+        with HistoryStore(args.history_db) as store:
+            print_history(store.summary(repository, args.since))
+        return
+    
     print("📊 Génération du rapport final de conformité...")
     
-    report = generate_final_report()
+    history_path = None if args.no_history else args.history_db
+    if args.format == 'jsonl':
+        report = generate_final_report_streaming(follow=args.follow, timeout=args.timeout,
+                                                 history_path=history_path, since=args.since,
+                                                 formats=args.outputs)
+    else:
+        report = generate_final_report(history_path=history_path, since=args.since, formats=args.outputs)
     
     print("✅ Rapport final généré!")
     print(f"🎯 Score global: {report['summary']['overall_compliance_score']}%")
     print(f"📋 Politiques évaluées: {report['summary']['policies_evaluated_count']}")
     print(f"💡 Recommandations: {len(report['recommendations'])}")
-    print(f"📄 Rapport disponible: reports/final_compliance_report.md")
+    print("📄 Rapport disponible: " + ", ".join(REPORT_OUTPUTS[output_format][1]
+                                              for output_format in args.outputs or REPORT_OUTPUTS))
+    print(f"⏱️  Métriques: {metrics.write_prometheus()}")
+    if report.get('history'):
+        print_history(report['history'])
     
     # Afficher un résumé dans la console
     if report['recommendations']:
         print(f"\n🔔 Recommandations importantes:")
-        for rec in report['recommendations'][:3]:  # Afficher les 3 premières
+        for rec in itertools.islice(report['recommendations'], 3):  # Afficher les 3 premières
             print(f"   - {rec}")
 
 if __name__ == "__main__":
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+import functools
+import re
+import subprocess
+
+from repo_snapshot import FileEntry, RepoSnapshot
+
+# Mode git d'un sous-arbre (les sous-modules, 160000, sont ignorés)
+TREE_MODE = b'40000'
+SUBMODULE_MODE = b'160000'
+# Requêtes envoyées d'un bloc à `cat-file --batch-check` avant d'en lire les réponses
+# (au-delà, les tubes pleins bloqueraient git et ce processus)
+CHECK_BATCH = 512
+
+@functools.lru_cache(maxsize=None)
+def tree_entry_pattern(oid_bytes):
+    """Entrée d'un objet tree: `mode nom\\0oid` (oid binaire de 20 ou 32 octets)"""
+    return re.compile(rb'(\d+) ([^\0]+)\0(.{%d})' % oid_bytes, re.DOTALL)
+
+class GitError(Exception):
+    """Objet introuvable ou processus git arrêté"""
+
+
+class GitObjectReader:
+    """Lecture des objets git par deux processus `git cat-file` persistants
+
+    `--batch` sert le contenu (commits, arbres, blobs), `--batch-check` les
+    seules tailles. Chaque objet n'est lu qu'une fois par identifiant: un
+    fichier identique dans mille commits est un seul blob, et un sous-arbre
+    inchangé n'est pas réanalysé.
+    """
+
+    def __init__(self, repository='.', max_blob_bytes=256 * 1024 * 1024):
+        self.repository = repository
+        self.max_blob_bytes = max_blob_bytes
+        self.batch = self.spawn('--batch')
+        self.check = self.spawn('--batch-check')
+        self.blobs = {}
+        self.blob_bytes = 0
+        self.sizes = {}
+        self.trees = {}
+        # 20 octets (SHA-1) ou 32 (dépôt SHA-256), d'après le premier commit lu
+        self.oid_bytes = 20
+        self.stats = {"objects_read": 0, "bytes_read": 0, "blob_hits": 0, "size_lookups": 0}
+
+    def spawn(self, mode):
+        return subprocess.Popen(['git', '-C', self.repository, 'cat-file', mode],
+                                stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+
+    def close(self):
+        for process in (self.batch, self.check):
+            if process.poll() is None:
+                process.stdin.close()
+                process.wait()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ---------- Objets ----------
+
+    def read(self, oid):
+        """(type, contenu) d'un objet"""
+        self.batch.stdin.write(oid.encode() + b'\n')
+        self.batch.stdin.flush()
+        header = self.batch.stdout.readline()
+        if not header:
+            raise GitError("git cat-file --batch s'est arrêté")
+        parts = header.split()
+        if len(parts) < 3 or parts[1] == b'missing':
+            raise GitError(f"objet introuvable: {oid}")
+        size = int(parts[2])
+        content = self.batch.stdout.read(size)
+        self.batch.stdout.read(1)
+        self.stats["objects_read"] += 1
+        self.stats["bytes_read"] += size
+        return parts[1].decode(), content
+
+    def blob(self, oid):
+        """Contenu d'un blob, lu au plus une fois tant qu'il reste de la place en mémoire"""
+        content = self.blobs.get(oid)
+        if content is not None:
+            self.stats["blob_hits"] += 1
+            return content
+        _, content = self.read(oid)
+        if self.blob_bytes + len(content) <= self.max_blob_bytes:
+            self.blobs[oid] = content
+            self.blob_bytes += len(content)
+        return content
+
+    def blob_sizes(self, oids):
+        """Tailles des blobs sans lire leur contenu ({oid: taille})"""
+        missing = [oid for oid in dict.fromkeys(oids) if oid not in self.sizes]
+        for start in range(0, len(missing), CHECK_BATCH):
+            chunk = missing[start:start + CHECK_BATCH]
+            self.check.stdin.write(b''.join(oid.encode() + b'\n' for oid in chunk))
+            self.check.stdin.flush()
+            for oid in chunk:
+                parts = self.check.stdout.readline().split()
+                self.sizes[oid] = int(parts[2]) if len(parts) == 3 else 0
+            self.stats["size_lookups"] += len(chunk)
+        return {oid: self.sizes[oid] for oid in oids}
+
+    def commit(self, oid):
+        """En-têtes d'un commit: tree, parents, date (epoch), sujet"""
+        _, content = self.read(oid)
+        self.oid_bytes = len(oid) // 2
+        headers, _, message = content.partition(b'\n\n')
+        commit = {"id": oid, "tree": None, "parents": [], "timestamp": 0,
+                  "subject": message.decode('utf-8', errors='replace').split('\n', 1)[0]}
+        for line in headers.split(b'\n'):
+            key, _, value = line.partition(b' ')
+            if key == b'tree':
+                commit["tree"] = value.decode()
+            elif key == b'parent':
+                commit["parents"].append(value.decode())
+            elif key == b'committer':
+                commit["timestamp"] = int(value.rsplit(b' ', 2)[1])
+        return commit
+
+    def tree(self, oid):
+        """Entrées d'un arbre: [(nom, est_un_arbre, oid)]"""
+        entries = self.trees.get(oid)
+        if entries is not None:
+            return entries
+        _, content = self.read(oid)
+        entries = [(name.decode('utf-8', errors='surrogateescape'), mode == TREE_MODE, entry_oid.hex())
+                   for mode, name, entry_oid in tree_entry_pattern(self.oid_bytes).findall(content)
+                   if mode != SUBMODULE_MODE]
+        self.trees[oid] = entries
+        return entries
+
+    def flatten(self, oid, prefix=''):
+        """Chemins d'un arbre, récursivement, parents d'abord: [(chemin, est_un_arbre, oid)]"""
+        paths = []
+        for name, is_tree, entry_oid in self.tree(oid):
+            path = f"{prefix}{name}"
+            paths.append((path, is_tree, entry_oid))
+            if is_tree:
+                paths.extend(self.flatten(entry_oid, f"{path}/"))
+        return paths
+
+    def diff(self, old_oid, new_oid, prefix='', descend=None):
+        """Chemins ajoutés, supprimés ou modifiés entre deux arbres
+
+        Les sous-arbres identiques sont sautés; `descend(chemin)` peut aussi
+        écarter les répertoires dont le détail n'intéresse pas l'appelant
+        (seul le répertoire est alors signalé).
+        """
+        if old_oid == new_oid:
+            return []
+        old = {name: (is_tree, oid) for name, is_tree, oid in self.tree(old_oid)} if old_oid else {}
+        new = {name: (is_tree, oid) for name, is_tree, oid in self.tree(new_oid)} if new_oid else {}
+        changed = []
+        for name in old.keys() | new.keys():
+            before, after = old.get(name), new.get(name)
+            if before == after:
+                continue
+            path = f"{prefix}{name}"
+            changed.append(path)
+            old_tree = before[1] if before and before[0] else None
+            new_tree = after[1] if after and after[0] else None
+            if (old_tree or new_tree) and (descend is None or descend(path)):
+                changed.extend(self.diff(old_tree, new_tree, f"{path}/", descend))
+        return changed
+
+    def summary(self):
+        return dict(self.stats, blobs_cached=len(self.blobs), trees_cached=len(self.trees))
+
+
+class GitTreeSnapshot(RepoSnapshot):
+    """Instantané d'un commit lu depuis les objets git, sans toucher à la copie de travail
+
+    Même interface que RepoSnapshot: les vérifications de preuves s'exécutent
+    telles quelles. La date de modification de chaque fichier est celle du
+    commit; le contenu est lu à la demande, par identifiant de blob.
+    """
+
+    def __init__(self, reader, commit):
+        super().__init__(root=None)
+        self.reader = reader
+        self.commit = commit
+        self.oids = {}
+
+    @classmethod
+    def from_commit(cls, reader, commit):
+        snapshot = cls(reader, commit)
+        paths = reader.flatten(commit["tree"])
+        sizes = reader.blob_sizes([oid for _, is_tree, oid in paths if not is_tree])
+        mtime_ns = commit["timestamp"] * 1_000_000_000
+        for path, is_tree, oid in paths:
+            snapshot.oids[path] = oid
+            parent, _, name = path.rpartition('/')
+            snapshot.entries[path] = FileEntry(is_tree, 0 if is_tree else sizes[oid], mtime_ns)
+            snapshot.children.setdefault(parent, []).append(name)
+            if is_tree:
+                snapshot.children.setdefault(path, [])
+        return snapshot
+
+    def _load(self, path):
+        return self.reader.blob(self.oids[path])
@@ -0,0 +1,441 @@
+#!/usr/bin/env python3
+import concurrent.futures
+import copy
+import hashlib
+import os
+import threading
+import time
+import urllib.parse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from http_cache import HttpCache, cache_key
+
+API_URL = os.getenv('GITHUB_API_URL', 'https://api.github.com')
+API_VERSION = '2022-11-28'
+PER_PAGE = 100
+# Un administrateur de plus et l'accès n'est plus considéré comme restreint
+MAX_REPOSITORY_ADMINS = 3
+# Réponses « limite atteinte » successives tolérées pour une même requête
+MAX_RATE_LIMITED_RETRIES = 10
+
+
+class GitHubApiError(Exception):
+    """Erreur d'accès à l'API GitHub (réseau, limite de débit, réponse inattendue)"""
+
+
+class RateLimiter:
+    """Limites de débit GitHub partagées par tous les threads d'un client
+
+    - limite primaire: suit X-RateLimit-Remaining/Reset; sous `low_watermark`
+      requêtes restantes, les appels sont étalés jusqu'à la réinitialisation,
+      et à zéro ils attendent la réinitialisation.
+    - limite secondaire (403/429 avec Retry-After ou message dédié): tous les
+      threads s'arrêtent, avec un délai qui double à chaque récidive et
+      revient à la base après une réponse normale. Le nombre de requêtes
+      simultanées est aussi divisé par deux, puis remonte d'une unité toutes
+      les `max_concurrency` réponses normales.
+    """
+
+    def __init__(self, max_concurrency=8, backoff_base=60.0, max_wait=900.0, low_watermark=0.05):
+        self.max_concurrency = max_concurrency
+        self.concurrency = max_concurrency
+        self.in_flight = 0
+        self.successes = 0
+        self.backoff_base = backoff_base
+        self.max_wait = max_wait
+        self.low_watermark = low_watermark
+        self.lock = threading.Condition()
+        self.limit = None
+        self.remaining = None
+        self.reset_at = None
+        self.blocked_until = 0.0
+        self.next_slot = 0.0
+        self.backoff = backoff_base
+        self.waits = 0
+        self.waited_seconds = 0.0
+
+    def acquire(self):
+        """Attend, si nécessaire, avant d'envoyer une requête (à suivre de release())"""
+        with self.lock:
+            self.lock.wait_for(lambda: self.in_flight < self.concurrency)
+            self.in_flight += 1
+            now = time.time()
+            start = max(now, self.blocked_until, self.next_slot)
+            if self.remaining is not None and self.reset_at is not None and self.reset_at > now:
+                if self.remaining <= 0:
+                    start = max(start, self.reset_at)
+                elif self.limit and self.remaining < self.limit * self.low_watermark:
+                    # Étaler le reste du quota jusqu'à la réinitialisation
+                    self.next_slot = start + (self.reset_at - now) / self.remaining
+                if self.remaining > 0:
+                    self.remaining -= 1
+            delay = start - now
+            if delay > self.max_wait:
+                self.in_flight -= 1
+                self.lock.notify()
+                raise GitHubApiError(f"limite de débit: attente de {delay:.0f}s au-delà de {self.max_wait:.0f}s")
+            if delay > 0:
+                self.waits += 1
+                self.waited_seconds += delay
+        if delay > 0:
+            time.sleep(delay)
+
+    def update(self, headers):
+        with self.lock:
+            if 'X-RateLimit-Remaining' in headers:
+                self.remaining = int(headers['X-RateLimit-Remaining'])
+            if 'X-RateLimit-Limit' in headers:
+                self.limit = int(headers['X-RateLimit-Limit'])
+            if 'X-RateLimit-Reset' in headers:
+                self.reset_at = float(headers['X-RateLimit-Reset'])
+
+    def release(self):
+        with self.lock:
+            self.in_flight -= 1
+            self.lock.notify()
+
+    def succeeded(self):
+        with self.lock:
+            self.backoff = self.backoff_base
+            self.successes += 1
+            if self.concurrency < self.max_concurrency and self.successes >= self.max_concurrency:
+                self.concurrency += 1
+                self.successes = 0
+                self.lock.notify()
+
+    def block(self, retry_after=None):
+        """Limite secondaire: suspend toutes les requêtes"""
+        with self.lock:
+            delay = float(retry_after) if retry_after is not None else self.backoff
+            self.backoff = min(self.backoff * 2, self.max_wait)
+            self.concurrency = max(1, self.concurrency // 2)
+            self.successes = 0
+            self.blocked_until = max(self.blocked_until, time.time() + delay)
+
+    def summary(self):
+        return {"limit": self.limit, "remaining": self.remaining, "reset_at": self.reset_at,
+                "concurrency": self.concurrency, "waits": self.waits, "waited_seconds": round(self.waited_seconds, 3)}
+
+
+class GitHubClient:
+    """Client REST GitHub: session HTTP partagée, requêtes concurrentes
+
+    Les connexions keep-alive sont réparties dans un pool de la taille du
+    nombre de threads; `base_url` (GITHUB_API_URL) permet de viser GitHub
+    Enterprise ou un serveur local de substitution (github_standin.py).
+    Avec `cache` (HttpCache), les GET sont servis ou revalidés depuis le disque.
+    """
+
+    def __init__(self, token=None, base_url=API_URL, max_workers=8, timeout=30, max_retries=3,
+                 retry_delay=1.0, backoff_base=60.0, max_wait=900.0, cache=None):
+        self.base_url = base_url.rstrip('/')
+        self.cache = cache
+        # Les réponses (et leurs ETag) dépendent de l'identité: le jeton fait partie de la clé de cache
+        self.identity = hashlib.sha256(token.encode()).hexdigest()[:16] if token else 'anonymous'
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.max_workers = max_workers
+        self.rate_limiter = RateLimiter(max_workers, backoff_base=backoff_base, max_wait=max_wait)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            "Accept": "application/vnd.github+json",
+            "X-GitHub-Api-Version": API_VERSION,
+            "User-Agent": "iso27001-compliance-collector"
+        })
+        if token:
+            self.session.headers["Authorization"] = f"Bearer {token}"
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers,
+                                                              thread_name_prefix='github-api')
+        self.stats_lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        self.session.close()
+        if self.cache is not None:
+            self.cache.close()
+
+    def without_cache(self):
+        """Même client (session, pool, limites de débit), sans cache HTTP"""
+        client = copy.copy(self)
+        client.cache = None
+        return client
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ---------- Requêtes ----------
+
+    def url(self, path):
+        return path if path.startswith(('http://', 'https://')) else f"{self.base_url}/{path.lstrip('/')}"
+
+    def request(self, method, path, params=None):
+        """Requête, servie par le cache HTTP si possible (GET)"""
+        if self.cache is None or method != 'GET':
+            return self.send(method, path, params)
+        key = cache_key(self.url(path), params, self.identity)
+        cached, fresh = self.cache.lookup(key)
+        if cached is not None and fresh:
+            self.cache.count("hits")
+            self.cache.touch(key)
+            return cached
+        response = self.send(method, path, params, self.cache.validators(cached) if cached is not None else None)
+        if response.status_code == 304 and cached is not None:
+            self.cache.count("revalidated")
+            self.cache.touch(key, revalidated=True)
+            return cached
+        self.cache.count("misses")
+        self.cache.store(key, response)
+        return response
+
+    def send(self, method, path, params=None, headers=None):
+        """Envoi avec limites de débit et nouvelles tentatives (erreurs réseau et 5xx)"""
+        attempt = 0
+        limited = 0
+        while True:
+            self.rate_limiter.acquire()
+            with self.stats_lock:
+                self.requests += 1
+            try:
+                response = self.session.request(method, self.url(path), params=params, headers=headers,
+                                                timeout=self.timeout)
+            except requests.RequestException as e:
+                response = None
+                error = e
+            finally:
+                self.rate_limiter.release()
+            if response is not None:
+                self.rate_limiter.update(response.headers)
+                if is_rate_limited(response):
+                    limited += 1
+                    if limited > MAX_RATE_LIMITED_RETRIES:
+                        raise GitHubApiError(f"{method} {path}: limite de débit toujours atteinte")
+                    if response.headers.get('X-RateLimit-Remaining') != '0':
+                        self.rate_limiter.block(response.headers.get('Retry-After'))
+                    continue
+                if response.status_code < 500:
+                    self.rate_limiter.succeeded()
+                    return response
+                error = GitHubApiError(f"{method} {path}: HTTP {response.status_code}")
+            attempt += 1
+            with self.stats_lock:
+                self.errors += 1
+            if attempt > self.max_retries:
+                raise GitHubApiError(str(error))
+            time.sleep(self.retry_delay * 2 ** (attempt - 1))
+
+    def get_json(self, path, params=None):
+        """Document JSON, ou None si la ressource est absente ou non autorisée (404, 403)"""
+        response = self.request('GET', path, params)
+        if response.status_code in (403, 404):
+            return None
+        if response.status_code >= 400:
+            raise GitHubApiError(f"GET {path}: HTTP {response.status_code}")
+        return response.json() if response.content else {}
+
+    def status(self, path):
+        return self.request('GET', path).status_code
+
+    def map(self, func, items):
+        """Applique `func` en parallèle; le résultat (ou l'exception) de chaque élément"""
+        futures = [self.executor.submit(func, item) for item in items]
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def paginate_many(self, paths, params=None):
+        """Tous les éléments de plusieurs listes paginées: {chemin: liste ou None}
+
+        Les premières pages sont demandées ensemble; le lien rel="last"
+        donne alors le nombre de pages, et les suivantes partent toutes en
+        parallèle au lieu d'être enchaînées lien par lien.
+        """
+        params = dict(params or {}, per_page=PER_PAGE)
+        first_pages = dict(zip(paths, self.map(lambda path: self.request('GET', path, params), paths)))
+        items = {}
+        remaining = []
+        for path, response in first_pages.items():
+            if isinstance(response, Exception) or response.status_code >= 400:
+                items[path] = None
+                continue
+            items[path] = list(response.json())
+            last_page = page_number(response.links.get('last', {}).get('url'))
+            remaining.extend((path, page) for page in range(2, (last_page or 1) + 1))
+            if last_page is None and 'next' in response.links:
+                # Pagination sans dernière page connue: suivre les liens
+                items[path].extend(self.follow_links(response.links['next']['url']))
+
+        pages = self.map(lambda entry: self.request('GET', entry[0], dict(params, page=entry[1])), remaining)
+        for (path, _), response in zip(remaining, pages):
+            if items[path] is None:
+                continue
+            if isinstance(response, Exception) or response.status_code >= 400:
+                items[path] = None
+            else:
+                items[path].extend(response.json())
+        return items
+
+    def follow_links(self, url):
+        items = []
+        while url:
+            response = self.request('GET', url)
+            if response.status_code >= 400:
+                raise GitHubApiError(f"GET {url}: HTTP {response.status_code}")
+            items.extend(response.json())
+            url = response.links.get('next', {}).get('url')
+        return items
+
+    def summary(self):
+        summary = {"base_url": self.base_url, "requests": self.requests, "errors": self.errors,
+                   "rate_limit": self.rate_limiter.summary()}
+        if self.cache is not None:
+            summary["cache"] = self.cache.summary()
+        return summary
+
+def is_rate_limited(response):
+    if response.status_code not in (403, 429):
+        return False
+    if response.headers.get('X-RateLimit-Remaining') == '0' or 'Retry-After' in response.headers:
+        return True
+    return 'rate limit' in response.text.lower()
+
+def page_number(url):
+    if not url:
+        return None
+    values = urllib.parse.parse_qs(urllib.parse.urlparse(url).query).get('page')
+    return int(values[0]) if values else None
+
+# ========== PARAMÈTRES DU DÉPÔT ==========
+
+def fetch_repository_settings(client, repository):
+    """Paramètres de sécurité d'un dépôt `owner/nom`
+
+    Une valeur inconnue (droits insuffisants, fonction indisponible) vaut
+    None: elle n'est jamais supposée vraie.
+    """
+    start = time.perf_counter()
+    repo = client.get_json(f"repos/{repository}")
+    if repo is None:
+        raise GitHubApiError(f"dépôt {repository} introuvable ou inaccessible")
+    owner = repo.get("owner", {})
+    branch = repo.get("default_branch", "main")
+    is_organization = owner.get("type") == "Organization"
+
+    calls = {
+        "protection": lambda: client.request(
+            'GET', f"repos/{repository}/branches/{urllib.parse.quote(branch, safe='')}/protection"),
+        "vulnerability_alerts": lambda: client.status(f"repos/{repository}/vulnerability-alerts"),
+        "code_scanning": lambda: client.get_json(f"repos/{repository}/code-scanning/default-setup"),
+        "organization": lambda: client.get_json(f"orgs/{owner.get('login')}") if is_organization else None
+    }
+    futures = {name: client.executor.submit(call) for name, call in calls.items()}
+    # Listes paginées depuis ce thread: leurs pages partent dans le même pool
+    list_paths = {
+        "direct": f"repos/{repository}/collaborators?affiliation=direct",
+        "outside": f"repos/{repository}/collaborators?affiliation=outside"
+    }
+    if is_organization:
+        list_paths["without_2fa"] = f"orgs/{owner.get('login')}/members?filter=2fa_disabled"
+    lists = client.paginate_many(list(list_paths.values()))
+    direct, outside, without_2fa = (lists.get(list_paths.get(name)) for name in ("direct", "outside", "without_2fa"))
+
+    results = {}
+    errors = {}
+    for name, future in futures.items():
+        try:
+            results[name] = future.result()
+        except Exception as e:
+            results[name] = None
+            errors[name] = str(e)
+
+    return {
+        "repository": repository,
+        "default_branch": branch,
+        "owner_type": owner.get("type"),
+        "branch_protection": protection_settings(results["protection"]),
+        "security_and_analysis": security_settings(repo, results["vulnerability_alerts"], results["code_scanning"]),
+        "collaborators": None if direct is None else {
+            "direct": len(direct),
+            "outside": None if outside is None else len(outside),
+            "admins": sum(1 for user in direct if user.get("permissions", {}).get("admin"))
+        },
+        "organization": None if results["organization"] is None else {
+            "two_factor_requirement_enabled": results["organization"].get("two_factor_requirement_enabled"),
+            "members_without_2fa": None if without_2fa is None else len(without_2fa)
+        },
+        "errors": errors,
+        "seconds": round(time.perf_counter() - start, 3)
+    }
+
+def protection_settings(response):
+    """404: branche non protégée; autre erreur (403 sans droits d'administration...): inconnu"""
+    if response is not None and response.status_code == 404:
+        return {"enabled": False, "require_reviews": False, "required_approving_review_count": 0,
+                "require_checks": False, "enforce_admins": False}
+    if response is None or response.status_code != 200:
+        return {"enabled": None, "require_reviews": None, "required_approving_review_count": None,
+                "require_checks": None, "enforce_admins": None}
+    protection = response.json()
+    reviews = protection.get("required_pull_request_reviews")
+    return {
+        "enabled": True,
+        "require_reviews": reviews is not None,
+        "required_approving_review_count": (reviews or {}).get("required_approving_review_count", 0),
+        "require_checks": protection.get("required_status_checks") is not None,
+        "enforce_admins": (protection.get("enforce_admins") or {}).get("enabled")
+    }
+
+def security_settings(repo, vulnerability_alerts, code_scanning):
+    analysis = repo.get("security_and_analysis")
+
+    def enabled(feature):
+        if analysis is None or feature not in analysis:
+            return None
+        return analysis[feature].get("status") == "enabled"
+
+    return {
+        "secret_scanning": enabled("secret_scanning"),
+        "secret_scanning_push_protection": enabled("secret_scanning_push_protection"),
+        "dependabot_security_updates": enabled("dependabot_security_updates"),
+        # 204: alertes activées, 404: désactivées, autre (403...): inconnu
+        "dependabot_alerts": {204: True, 404: False}.get(vulnerability_alerts),
+        "code_scanning_default_setup": None if code_scanning is None else code_scanning.get("state") == "configured"
+    }
+
+# Client actif (None: pas de jeton, collecte limitée au contenu du dépôt)
+_client = None
+_client_loaded = False
+
+def get_github_client():
+    """Client créé à la demande depuis GITHUB_TOKEN (ou GH_TOKEN) et GITHUB_API_URL
+
+    Cache HTTP: GITHUB_HTTP_CACHE (chemin, `off` pour le désactiver) et
+    GITHUB_HTTP_CACHE_MAX_MB.
+    """
+    global _client, _client_loaded
+    if not _client_loaded:
+        token = os.getenv('GITHUB_TOKEN') or os.getenv('GH_TOKEN')
+        cache = HttpCache() if token and os.getenv('GITHUB_HTTP_CACHE') != 'off' else None
+        _client = GitHubClient(token, max_workers=int(os.getenv('GITHUB_API_WORKERS', '8')),
+                               cache=cache) if token else None
+        _client_loaded = True
+    return _client
+
+def set_github_client(client):
+    global _client, _client_loaded
+    _client = client
+    _client_loaded = True
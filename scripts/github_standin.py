@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""API GitHub de substitution pour les essais et benchmarks de collecte
+
+Sert les points d'accès lus par github_api.fetch_repository_settings avec
+des paramètres déterministes (dérivés du nom du dépôt), la pagination
+(en-têtes Link) et les deux limites de débit de GitHub:
+
+- primaire: `--rate-limit` requêtes par fenêtre de `--rate-window` secondes
+  (en-têtes X-RateLimit-*, 403 une fois le quota épuisé)
+- secondaire: au-delà de `--max-concurrent` requêtes simultanées, 403 avec
+  Retry-After
+
+Les réponses 200 portent un ETag; une requête conditionnelle qui
+correspond reçoit un 304, non décompté du quota.
+
+    python scripts/github_standin.py --port 8089 &
+    GITHUB_API_URL=http://127.0.0.1:8089 GITHUB_TOKEN=x GITHUB_REPOSITORY=acme/app \\
+        python scripts/collect_real_evidence.py
+"""
+import argparse
+import email.utils
+import hashlib
+import json
+import re
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROUTES = [
+    (re.compile(r'^/repos/([^/]+)/([^/]+)$'), 'repository'),
+    (re.compile(r'^/repos/([^/]+)/([^/]+)/branches/([^/]+)/protection$'), 'protection'),
+    (re.compile(r'^/repos/([^/]+)/([^/]+)/vulnerability-alerts$'), 'vulnerability_alerts'),
+    (re.compile(r'^/repos/([^/]+)/([^/]+)/code-scanning/default-setup$'), 'code_scanning'),
+    (re.compile(r'^/repos/([^/]+)/([^/]+)/collaborators$'), 'collaborators'),
+    (re.compile(r'^/orgs/([^/]+)$'), 'organization'),
+    (re.compile(r'^/orgs/([^/]+)/members$'), 'members')
+]
+
+# Les paramètres servis ne changent pas pendant la vie du serveur
+LAST_MODIFIED = email.utils.formatdate(usegmt=True)
+
+def flag(*parts):
+    """Booléen déterministe pour un dépôt et une fonctionnalité"""
+    return hashlib.sha256(':'.join(parts).encode()).digest()[0] % 2 == 0
+
+def users(prefix, count, admins=0):
+    return [{"login": f"{prefix}-{index}", "id": index,
+             "permissions": {"admin": index < admins, "push": True, "pull": True}}
+            for index in range(count)]
+
+class StandinState:
+    """Compteurs partagés: quota primaire et requêtes en cours"""
+
+    def __init__(self, rate_limit=5000, rate_window=3600, max_concurrent=100, latency_ms=0,
+                 collaborators=12):
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self.max_concurrent = max_concurrent
+        self.latency = latency_ms / 1000
+        self.collaborator_count = collaborators
+        self.lock = threading.Lock()
+        self.window_start = time.time()
+        self.used = 0
+        self.in_flight = 0
+        self.requests = 0
+        self.rejected = 0
+
+    def admit(self):
+        """(statut de limite, en-têtes de quota): None si la requête est acceptée"""
+        with self.lock:
+            now = time.time()
+            if now - self.window_start >= self.rate_window:
+                self.window_start = now
+                self.used = 0
+            self.requests += 1
+            reset = int(self.window_start + self.rate_window) + 1
+            limited = None
+            if self.used >= self.rate_limit:
+                limited = 'primary'
+            elif self.in_flight >= self.max_concurrent:
+                limited = 'secondary'
+            else:
+                self.used += 1
+                self.in_flight += 1
+            if limited:
+                self.rejected += 1
+            headers = {"X-RateLimit-Limit": str(self.rate_limit),
+                       "X-RateLimit-Remaining": str(self.rate_limit - self.used),
+                       "X-RateLimit-Reset": str(reset),
+                       "X-RateLimit-Used": str(self.used)}
+            return limited, headers
+
+    def release(self):
+        with self.lock:
+            self.in_flight -= 1
+
+    def refund(self):
+        """Un 304 ne compte pas dans le quota"""
+        with self.lock:
+            self.used -= 1
+
+    # ---------- Documents ----------
+
+    def repository(self, owner, name):
+        full_name = f"{owner}/{name}"
+        return {
+            "full_name": full_name, "name": name, "default_branch": "main", "private": True,
+            "owner": {"login": owner, "type": "User" if owner.startswith('user') else "Organization"},
+            "security_and_analysis": {
+                feature: {"status": "enabled" if flag(full_name, feature) else "disabled"}
+                for feature in ("secret_scanning", "secret_scanning_push_protection",
+                                "dependabot_security_updates")
+            }
+        }
+
+    def protection(self, owner, name, branch):
+        full_name = f"{owner}/{name}"
+        if not flag(full_name, "protection"):
+            return 404, {"message": "Branch not protected"}
+        document = {"enforce_admins": {"enabled": flag(full_name, "enforce_admins")}}
+        if flag(full_name, "reviews"):
+            document["required_pull_request_reviews"] = {"required_approving_review_count": 1}
+        if flag(full_name, "checks"):
+            document["required_status_checks"] = {"strict": True, "contexts": ["ci"]}
+        return 200, document
+
+    def vulnerability_alerts(self, owner, name):
+        return (204, None) if flag(f"{owner}/{name}", "dependabot_alerts") else (404, {"message": "Not Found"})
+
+    def code_scanning(self, owner, name):
+        configured = flag(f"{owner}/{name}", "code_scanning")
+        return 200, {"state": "configured" if configured else "not-configured"}
+
+    def collaborators(self, owner, name, query):
+        if query.get("affiliation") == "outside":
+            return users(f"{name}-outside", 0 if flag(f"{owner}/{name}", "outside") else 2)
+        return users(f"{name}-member", self.collaborator_count, admins=2)
+
+    def organization(self, owner):
+        return 200, {"login": owner, "two_factor_requirement_enabled": flag(owner, "2fa")}
+
+    def members(self, owner, query):
+        return users(f"{owner}-no2fa", 0 if flag(owner, "2fa") else 3)
+
+def make_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, *args):
+            pass
+
+        def send_json(self, status, document, headers=None):
+            body = b'' if document is None else json.dumps(document).encode()
+            if status == 200:
+                etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+                headers = dict(headers or {}, ETag=etag, **{"Last-Modified": LAST_MODIFIED})
+                if self.headers.get('If-None-Match') == etag:
+                    state.refund()
+                    status, body, document = 304, b'', None
+            self.send_response(status)
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            if document is not None:
+                self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            limited, headers = state.admit()
+            if limited == 'primary':
+                return self.send_json(403, {"message": "API rate limit exceeded"}, headers)
+            if limited == 'secondary':
+                return self.send_json(403, {"message": "You have exceeded a secondary rate limit."},
+                                      dict(headers, **{"Retry-After": "1"}))
+            try:
+                if state.latency:
+                    time.sleep(state.latency)
+                self.route(headers)
+            finally:
+                state.release()
+
+        def route(self, headers):
+            url = urllib.parse.urlsplit(self.path)
+            query = {key: values[-1] for key, values in urllib.parse.parse_qs(url.query).items()}
+            for pattern, name in ROUTES:
+                match = pattern.match(url.path)
+                if not match:
+                    continue
+                args = [urllib.parse.unquote(part) for part in match.groups()]
+                if name in ('collaborators', 'members'):
+                    return self.send_page(getattr(state, name)(*args, query), url, query, headers)
+                if name == 'repository':
+                    return self.send_json(200, state.repository(*args), headers)
+                status, document = getattr(state, name)(*args)
+                return self.send_json(status, document, headers)
+            self.send_json(404, {"message": "Not Found"}, headers)
+
+        def send_page(self, items, url, query, headers):
+            per_page = int(query.get("per_page", 30))
+            page = int(query.get("page", 1))
+            last_page = max(1, -(-len(items) // per_page))
+            links = []
+            for rel, number in (("next", page + 1), ("last", last_page)):
+                if page < last_page:
+                    link_query = urllib.parse.urlencode(dict(query, page=number))
+                    links.append(f'<http://{self.headers["Host"]}{url.path}?{link_query}>; rel="{rel}"')
+            if links:
+                headers = dict(headers, Link=', '.join(links))
+            self.send_json(200, items[(page - 1) * per_page:page * per_page], headers)
+
+    return Handler
+
+def start_standin(host='127.0.0.1', port=0, **options):
+    """Démarre le serveur dans un thread; retourne (serveur, URL de base)"""
+    server = ThreadingHTTPServer((host, port), make_handler(StandinState(**options)))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="API GitHub de substitution (collecte des paramètres de dépôt)")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--rate-limit', type=int, default=5000, help="requêtes par fenêtre (limite primaire)")
+    parser.add_argument('--rate-window', type=float, default=3600, help="durée de la fenêtre, en secondes")
+    parser.add_argument('--max-concurrent', type=int, default=100,
+                        help="requêtes simultanées avant la limite secondaire")
+    parser.add_argument('--latency-ms', type=float, default=0, help="délai par requête")
+    parser.add_argument('--collaborators', type=int, default=12, help="collaborateurs directs par dépôt")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    state = StandinState(rate_limit=args.rate_limit, rate_window=args.rate_window,
+                         max_concurrent=args.max_concurrent, latency_ms=args.latency_ms,
+                         collaborators=args.collaborators)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(state))
+    server.daemon_threads = True
+    print(f"🐙 API GitHub de substitution: http://{args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+import os
+import sqlite3
+
+HISTORY_PATH = os.getenv('COMPLIANCE_HISTORY_DB', 'history/compliance_history.db')
+SCHEMA_VERSION = 1
+
+# Les horodatages sont des chaînes ISO 8601 (UTC): l'ordre lexicographique
+# est l'ordre chronologique, et une date seule ("2026-01-01") est une borne valide.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    repository TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    overall_score REAL,
+    score_realiste REAL,
+    wall_seconds REAL,
+    cpu_seconds REAL
+);
+CREATE INDEX IF NOT EXISTS runs_repository_timestamp ON runs (repository, timestamp);
+
+CREATE TABLE IF NOT EXISTS control_results (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    repository TEXT NOT NULL,
+    control_id TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    compliant INTEGER NOT NULL,
+    changed INTEGER NOT NULL,
+    PRIMARY KEY (run_id, control_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS control_results_trend ON control_results (repository, control_id, timestamp);
+CREATE INDEX IF NOT EXISTS control_results_flips ON control_results (repository, timestamp, control_id) WHERE changed = 1;
+
+CREATE TABLE IF NOT EXISTS package_scores (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    repository TEXT NOT NULL,
+    package TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    score REAL,
+    status TEXT,
+    PRIMARY KEY (run_id, package)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS package_scores_trend ON package_scores (repository, package, timestamp);
+
+CREATE TABLE IF NOT EXISTS stage_timings (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    stage TEXT NOT NULL,
+    wall_seconds REAL,
+    cpu_seconds REAL,
+    PRIMARY KEY (run_id, stage)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS control_state (
+    repository TEXT NOT NULL,
+    control_id TEXT NOT NULL,
+    compliant INTEGER NOT NULL,
+    flips INTEGER NOT NULL,
+    runs INTEGER NOT NULL,
+    last_timestamp TEXT NOT NULL,
+    PRIMARY KEY (repository, control_id)
+) WITHOUT ROWID;
+"""
+
+class HistoryStore:
+    """Historique des exécutions (SQLite), interrogé par index
+
+    Chaque exécution ajoute une ligne par contrôle, par package et par étape.
+    Les bascules d'un contrôle (conforme <-> non conforme) sont repérées à
+    l'insertion (`changed`) et cumulées dans `control_state`: tendances,
+    régressions et contrôles instables se lisent sans parcourir l'historique
+    ni relire d'anciens rapports JSON.
+    """
+
+    def __init__(self, path=HISTORY_PATH):
+        self.path = path
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.connection = sqlite3.connect(path, timeout=30)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.execute("PRAGMA synchronous = NORMAL")
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+        if version not in (0, SCHEMA_VERSION):
+            raise ValueError(f"Historique {path}: version de schéma {version} non supportée")
+        with self.connection:
+            self.connection.executescript(SCHEMA)
+            self.connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ---------- Écriture ----------
+
+    def record_run(self, repository, timestamp, controls, scores, statuses=None,
+                   overall_score=None, score_realiste=None, timings=None):
+        """Ajoute une exécution; retourne son identifiant"""
+        statuses = statuses or {}
+        timings = timings or {}
+        with self.connection:
+            run_id = self.connection.execute(
+                "INSERT INTO runs (repository, timestamp, overall_score, score_realiste, wall_seconds, cpu_seconds)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (repository, timestamp, overall_score, score_realiste,
+                 timings.get("wall_seconds"), timings.get("cpu_seconds"))
+            ).lastrowid
+
+            previous = {row["control_id"]: row for row in self.connection.execute(
+                "SELECT control_id, compliant, last_timestamp FROM control_state WHERE repository = ?",
+                (repository,))}
+            control_rows = []
+            for control_id, compliant in controls.items():
+                if compliant is None:
+                    continue
+                compliant = int(bool(compliant))
+                state = previous.get(control_id)
+                # Une exécution antérieure (backfill) ne remplace pas l'état courant
+                changed = int(state is not None and state["compliant"] != compliant
+                              and timestamp >= state["last_timestamp"])
+                control_rows.append((run_id, repository, control_id, timestamp, compliant, changed))
+            self.connection.executemany(
+                "INSERT INTO control_results VALUES (?, ?, ?, ?, ?, ?)", control_rows)
+            self.connection.executemany(
+                "INSERT INTO control_state VALUES (?, ?, ?, ?, 1, ?)"
+                " ON CONFLICT (repository, control_id) DO UPDATE SET"
+                "   flips = flips + ?,"
+                "   runs = runs + 1,"
+                "   compliant = CASE WHEN excluded.last_timestamp >= last_timestamp"
+                "                    THEN excluded.compliant ELSE compliant END,"
+                "   last_timestamp = MAX(last_timestamp, excluded.last_timestamp)",
+                [(repository, control_id, compliant, changed, ts, changed)
+                 for _, _, control_id, ts, compliant, changed in control_rows])
+
+            self.connection.executemany(
+                "INSERT INTO package_scores VALUES (?, ?, ?, ?, ?, ?)",
+                [(run_id, repository, package, timestamp, score, statuses.get(package))
+                 for package, score in scores.items()])
+            self.connection.executemany(
+                "INSERT INTO stage_timings VALUES (?, ?, ?, ?)",
+                [(run_id, stage, values.get("wall_seconds"), values.get("cpu_seconds"))
+                 for stage, values in timings.get("stages", {}).items()])
+        return run_id
+
+    # ---------- Lecture ----------
+
+    def runs(self, repository, since=None, limit=None):
+        """Exécutions d'un dépôt, de la plus récente à la plus ancienne"""
+        return [dict(row) for row in self.connection.execute(
+            "SELECT id, timestamp, overall_score, score_realiste, wall_seconds FROM runs"
+            " WHERE repository = ? AND timestamp >= ? ORDER BY timestamp DESC, id DESC LIMIT ?",
+            (repository, since or '', -1 if limit is None else limit))]
+
+    def latest_run(self, repository, before=None):
+        """Dernière exécution (strictement avant `before` si fourni)"""
+        query = "SELECT id, timestamp, overall_score FROM runs WHERE repository = ?"
+        params = [repository]
+        if before is not None:
+            query += " AND timestamp < ?"
+            params.append(before)
+        row = self.connection.execute(query + " ORDER BY timestamp DESC, id DESC LIMIT 1", params).fetchone()
+        return dict(row) if row else None
+
+    def score_trend(self, repository, since=None, limit=30):
+        """Score global par exécution, dans l'ordre chronologique"""
+        return list(reversed(self.runs(repository, since, limit)))
+
+    def control_trend(self, repository, control_id, since=None, limit=30):
+        rows = self.connection.execute(
+            "SELECT timestamp, compliant FROM control_results"
+            " WHERE repository = ? AND control_id = ? AND timestamp >= ?"
+            " ORDER BY timestamp DESC, run_id DESC LIMIT ?",
+            (repository, control_id, since or '', limit))
+        return [{"timestamp": row["timestamp"], "compliant": bool(row["compliant"])}
+                for row in reversed(rows.fetchall())]
+
+    def package_trend(self, repository, package, since=None, limit=30):
+        rows = self.connection.execute(
+            "SELECT timestamp, score, status FROM package_scores"
+            " WHERE repository = ? AND package = ? AND timestamp >= ?"
+            " ORDER BY timestamp DESC, run_id DESC LIMIT ?",
+            (repository, package, since or '', limit))
+        return [dict(row) for row in reversed(rows.fetchall())]
+
+    def compare_runs(self, baseline_id, current_id):
+        """Contrôles et packages qui ont changé entre deux exécutions"""
+        controls = self.connection.execute(
+            "SELECT c.control_id, b.compliant AS before, c.compliant AS after"
+            " FROM control_results c JOIN control_results b"
+            "   ON b.run_id = ? AND b.control_id = c.control_id"
+            " WHERE c.run_id = ? AND b.compliant != c.compliant ORDER BY c.control_id",
+            (baseline_id, current_id)).fetchall()
+        packages = self.connection.execute(
+            "SELECT c.package, b.score AS before, c.score AS after, b.status AS status_before,"
+            "       c.status AS status_after"
+            " FROM package_scores c JOIN package_scores b"
+            "   ON b.run_id = ? AND b.package = c.package"
+            " WHERE c.run_id = ? AND b.score IS NOT c.score ORDER BY c.package",
+            (baseline_id, current_id)).fetchall()
+        return {
+            "regressed_controls": [row["control_id"] for row in controls if row["before"] > row["after"]],
+            "fixed_controls": [row["control_id"] for row in controls if row["before"] < row["after"]],
+            "regressed_packages": [dict(row) for row in packages
+                                   if row["before"] is not None and row["after"] is not None
+                                   and row["after"] < row["before"]],
+            "improved_packages": [dict(row) for row in packages
+                                  if row["before"] is not None and row["after"] is not None
+                                  and row["after"] > row["before"]]
+        }
+
+    def regressions(self, repository, since=None):
+        """Écarts entre la dernière exécution et la précédente (ou la dernière avant `since`)
+
+        Retourne None s'il n'y a pas d'exécution de référence.
+        """
+        current = self.latest_run(repository)
+        if current is None:
+            return None
+        baseline = self.latest_run(repository, before=since or current["timestamp"])
+        if baseline is None or baseline["id"] == current["id"]:
+            return None
+        return {"baseline": baseline, "current": current, **self.compare_runs(baseline["id"], current["id"])}
+
+    def flapping_controls(self, repository, since=None, limit=10):
+        """Contrôles qui basculent le plus souvent (depuis `since` si fourni)"""
+        if since is None:
+            rows = self.connection.execute(
+                "SELECT control_id, flips, runs FROM control_state"
+                " WHERE repository = ? AND flips > 0 ORDER BY flips DESC, control_id LIMIT ?",
+                (repository, limit))
+        else:
+            rows = self.connection.execute(
+                "SELECT control_id, COUNT(*) AS flips FROM control_results"
+                " WHERE repository = ? AND timestamp >= ? AND changed = 1"
+                " GROUP BY control_id ORDER BY flips DESC, control_id LIMIT ?",
+                (repository, since, limit))
+        return [dict(row) for row in rows]
+
+    def summary(self, repository, since=None, trend_limit=10, flapping_limit=5):
+        """Bloc `history` du rapport"""
+        return {
+            "runs": self.connection.execute(
+                "SELECT COUNT(*) FROM runs WHERE repository = ?", (repository,)).fetchone()[0],
+            "since": since,
+            "score_trend": self.score_trend(repository, limit=trend_limit),
+            "regressions": self.regressions(repository, since),
+            "flapping_controls": self.flapping_controls(repository, since, flapping_limit)
+        }
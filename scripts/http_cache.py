@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+HTTP_CACHE_PATH = os.getenv('GITHUB_HTTP_CACHE', 'evidence/.github_http_cache.db')
+HTTP_CACHE_MAX_BYTES = int(float(os.getenv('GITHUB_HTTP_CACHE_MAX_MB', '64')) * 1024 * 1024)
+
+# Durée pendant laquelle une réponse est servie sans requête (par point d'accès);
+# ensuite elle est revalidée par une requête conditionnelle
+DEFAULT_TTLS = [
+    (re.compile(r'/protection(\?|$)'), 600),
+    (re.compile(r'/(vulnerability-alerts|code-scanning/default-setup)(\?|$)'), 1800),
+    (re.compile(r'/(collaborators|members)(\?|$)'), 3600),
+    (re.compile(r'/orgs/[^/?]+(\?|$)'), 3600),
+    (re.compile(r'/repos/[^/]+/[^/?]+(\?|$)'), 300)
+]
+DEFAULT_TTL = 300
+# 204/404 signalent une fonction activée/désactivée (alertes Dependabot, protection
+# de branche): sans validateur, ils ne sont servis que pendant leur TTL
+CACHEABLE_STATUSES = (200, 204, 404)
+# En-têtes conservés avec le corps (pagination, revalidation)
+STORED_HEADERS = ('Content-Type', 'ETag', 'Last-Modified', 'Link')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    status INTEGER NOT NULL,
+    headers TEXT NOT NULL,
+    body BLOB NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    fetched_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at);
+
+-- Taille totale tenue à jour par déclencheurs (partagée entre processus): le
+-- plafond est vérifié à chaque écriture sans additionner toute la table
+CREATE TABLE IF NOT EXISTS cache_size (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    bytes INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO cache_size SELECT 0, COALESCE(SUM(size), 0) FROM responses;
+CREATE TRIGGER IF NOT EXISTS responses_size_insert AFTER INSERT ON responses
+BEGIN UPDATE cache_size SET bytes = bytes + NEW.size; END;
+CREATE TRIGGER IF NOT EXISTS responses_size_update AFTER UPDATE OF size ON responses
+BEGIN UPDATE cache_size SET bytes = bytes - OLD.size + NEW.size; END;
+CREATE TRIGGER IF NOT EXISTS responses_size_delete AFTER DELETE ON responses
+BEGIN UPDATE cache_size SET bytes = bytes - OLD.size; END;
+"""
+
+class HttpCache:
+    """Cache HTTP persistant (SQLite) pour les requêtes GET de l'API GitHub
+
+    Une réponse encore fraîche (TTL du point d'accès) est servie sans
+    requête. Au-delà, elle est revalidée avec If-None-Match /
+    If-Modified-Since: un 304 ne compte pas dans le quota GitHub. La taille
+    totale est plafonnée, les entrées les moins récemment lues étant
+    évincées. Le mode WAL et des transactions courtes permettent à plusieurs
+    processus (audit de flotte) d'écrire dans le même fichier.
+    """
+
+    def __init__(self, path=HTTP_CACHE_PATH, max_bytes=HTTP_CACHE_MAX_BYTES, ttls=DEFAULT_TTLS,
+                 default_ttl=DEFAULT_TTL):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttls = ttls
+        self.default_ttl = default_ttl
+        self.lock = threading.Lock()
+        self.connect_lock = threading.Lock()
+        self._connection = None
+        self.stats = {"hits": 0, "revalidated": 0, "misses": 0, "stored": 0, "evicted": 0}
+
+    @property
+    def connection(self):
+        """Base SQLite ouverte (et créée) à la première requête servie par le cache:
+        un client qui n'utilise pas le cache (--no-cache) n'écrit aucun fichier"""
+        with self.connect_lock:
+            if self._connection is None:
+                os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+                connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False,
+                                             isolation_level=None)
+                connection.execute("PRAGMA journal_mode = WAL")
+                connection.execute("PRAGMA synchronous = NORMAL")
+                connection.executescript(f"BEGIN IMMEDIATE;{SCHEMA}COMMIT;")
+                self._connection = connection
+            return self._connection
+
+    def close(self):
+        """Ferme la base; la prochaine requête la rouvre"""
+        with self.connect_lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def ttl(self, url):
+        for pattern, seconds in self.ttls:
+            if pattern.search(url):
+                return seconds
+        return self.default_ttl
+
+    def count(self, name):
+        with self.lock:
+            self.stats[name] += 1
+
+    # ---------- Lecture / écriture ----------
+
+    def lookup(self, key):
+        """(réponse, fraîche?) ou (None, False)"""
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT url, status, headers, body, fetched_at FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None, False
+        url, status, headers, body, fetched_at = row
+        fresh = time.time() - fetched_at < self.ttl(url)
+        return build_response(url, status, json.loads(headers), body), fresh
+
+    def validators(self, response):
+        """En-têtes de requête conditionnelle pour une réponse en cache"""
+        headers = {}
+        if response.headers.get('ETag'):
+            headers['If-None-Match'] = response.headers['ETag']
+        if response.headers.get('Last-Modified'):
+            headers['If-Modified-Since'] = response.headers['Last-Modified']
+        return headers
+
+    def store(self, key, response):
+        """Enregistre une réponse (200 revalidable, ou 204/404 servis pendant leur TTL)"""
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if response.status_code not in CACHEABLE_STATUSES:
+            return
+        headers = {name: response.headers[name] for name in STORED_HEADERS if name in response.headers}
+        body = response.content
+        now = time.time()
+        with self.lock:
+            # Mise à jour plutôt que REPLACE: la suppression implicite de REPLACE
+            # ne déclencherait pas responses_size_delete
+            self.connection.execute(
+                "INSERT INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT (key) DO UPDATE SET url = excluded.url, status = excluded.status,"
+                " headers = excluded.headers, body = excluded.body, etag = excluded.etag,"
+                " last_modified = excluded.last_modified, fetched_at = excluded.fetched_at,"
+                " accessed_at = excluded.accessed_at, size = excluded.size",
+                (key, response.url, response.status_code, json.dumps(headers), body, etag, last_modified,
+                 now, now, len(body)))
+            self.stats["stored"] += 1
+            self.evict()
+
+    def touch(self, key, revalidated=False):
+        """Marque une entrée comme lue (LRU); une revalidation repart pour un TTL"""
+        now = time.time()
+        with self.lock:
+            if revalidated:
+                self.connection.execute("UPDATE responses SET accessed_at = ?, fetched_at = ? WHERE key = ?",
+                                        (now, now, key))
+            else:
+                self.connection.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+
+    def evict(self):
+        """Supprime les entrées les moins récemment lues au-delà de max_bytes (verrou tenu)"""
+        total = self.connection.execute("SELECT bytes FROM cache_size").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            # Relue dans la transaction: un autre processus a pu évincer entre-temps
+            total = self.connection.execute("SELECT bytes FROM cache_size").fetchone()[0]
+            # Descendre sous 90% du plafond: pas d'éviction à chaque écriture suivante
+            excess = total - int(self.max_bytes * 0.9)
+            evicted = 0
+            for key, size in self.connection.execute(
+                    "SELECT key, size FROM responses ORDER BY accessed_at").fetchall():
+                if excess <= 0:
+                    break
+                self.connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                excess -= size
+                evicted += 1
+            self.connection.execute("COMMIT")
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+        self.stats["evicted"] += evicted
+
+    def summary(self):
+        with self.lock:
+            entries, size = self.connection.execute(
+                "SELECT (SELECT COUNT(*) FROM responses), bytes FROM cache_size").fetchone()
+            return dict(self.stats, entries=entries, bytes=size, max_bytes=self.max_bytes)
+
+def cache_key(url, params, identity):
+    """Clé d'une requête: URL, paramètres triés et identité (empreinte du jeton)"""
+    query = json.dumps(sorted((params or {}).items()), default=str)
+    return hashlib.sha256(f"{identity}\n{url}\n{query}".encode()).hexdigest()
+
+def build_response(url, status, headers, body):
+    response = requests.Response()
+    response.status_code = status
+    response.headers = CaseInsensitiveDict(headers)
+    response._content = body
+    response.url = url
+    response.encoding = 'utf-8'
+    return response
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+import json
+import os
+import time
+
+# Enregistrement qui termine un flux: un lecteur en mode suivi s'arrête dessus
+END_RECORD = {"type": "end"}
+
+class JsonlWriter:
+    """Écrit un enregistrement JSON par ligne, vidé au fil de l'eau
+
+    Le fichier précédent est remplacé dès l'ouverture (nom temporaire
+    renommé, nouvel inode): un lecteur en mode suivi voit les lignes arriver
+    au fur et à mesure. L'écriture n'est donc pas atomique: le flux n'est
+    complet qu'à l'enregistrement de fin (`error` s'il a été interrompu).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self.bytes_written = 0
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        self.file = open(tmp_path, 'w', encoding='utf-8')
+        os.replace(tmp_path, path)
+
+    def write(self, record):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        self.file.write(line)
+        self.file.flush()
+        self.count += 1
+        self.bytes_written += len(line.encode())
+
+    def close(self):
+        if self.file.closed:
+            return
+        self.write(END_RECORD)
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            # Le lecteur en mode suivi ne doit pas attendre indéfiniment
+            self.write({"type": "error", "message": f"{exc_type.__name__}: {exc}"})
+        self.close()
+
+def read_jsonl(path, follow=False, poll_interval=0.1, timeout=None, accept=None):
+    """Lit les enregistrements un par un
+
+    En mode suivi, attend que le fichier apparaisse puis que de nouvelles
+    lignes soient écrites, jusqu'à l'enregistrement de fin (ou `timeout`).
+    `accept(premier enregistrement)`: en mode suivi, un flux refusé (celui
+    d'une exécution précédente) est ignoré jusqu'à ce que le fichier soit
+    remplacé par le suivant.
+    """
+    deadline = time.monotonic() + timeout if timeout else None
+
+    def expired():
+        return deadline is not None and time.monotonic() > deadline
+
+    while True:
+        while not os.path.exists(path):
+            if not follow or expired():
+                raise FileNotFoundError(path)
+            time.sleep(poll_interval)
+
+        with open(path, 'r', encoding='utf-8') as f:
+            inode = os.fstat(f.fileno()).st_ino
+            pending = ''
+            first = True
+            while True:
+                line = f.readline()
+                if not line:
+                    if not follow or expired():
+                        return
+                    time.sleep(poll_interval)
+                    continue
+                pending += line
+                if not pending.endswith("\n"):
+                    # Ligne en cours d'écriture
+                    continue
+                record = json.loads(pending)
+                pending = ''
+                if first and follow and accept is not None and not accept(record):
+                    break
+                first = False
+                if record.get("type") == END_RECORD["type"]:
+                    return
+                yield record
+
+        # Flux périmé: attendre que l'écrivain le remplace
+        while not os.path.exists(path) or os.stat(path).st_ino == inode:
+            if expired():
+                return
+            time.sleep(poll_interval)
+
+class JsonlRecords:
+    """Vue relisible sur les enregistrements d'un type donné
+
+    Permet de parcourir (plusieurs fois) les recommandations d'un rapport
+    JSON Lines sans les garder en mémoire. Sans `field`, chaque
+    enregistrement est rendu entier (sans son type); sans `record_type`,
+    tous les enregistrements sont rendus.
+    """
+
+    def __init__(self, path, record_type=None, field=None):
+        self.path = path
+        self.record_type = record_type
+        self.field = field
+
+    def __iter__(self):
+        for record in read_jsonl(self.path):
+            if self.record_type is not None and record.get("type") != self.record_type:
+                continue
+            if self.field is not None:
+                yield record[self.field]
+            else:
+                yield {key: value for key, value in record.items() if key != "type"}
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __bool__(self):
+        for _ in self:
+            return True
+        return False
+
+# ========== PREUVES ==========
+
+EVIDENCE_HEADER_FIELDS = ("collection_time", "repository", "iso27001_version")
+
+def evidence_to_records(evidence):
+    """Un enregistrement d'en-tête, un par contrôle, un par section, puis le résumé"""
+    yield {"type": "evidence", **{key: evidence.get(key) for key in EVIDENCE_HEADER_FIELDS}}
+    for control_id, value in evidence.get("controles", {}).items():
+        yield {"type": "control", "id": control_id, "value": value}
+    for name, value in evidence.items():
+        if name in EVIDENCE_HEADER_FIELDS or name in ("controles", "score_realiste"):
+            continue
+        yield {"type": "section", "name": name, "value": value}
+    if "score_realiste" in evidence:
+        yield {"type": "summary", "score_realiste": evidence["score_realiste"]}
+
+def records_to_evidence(records, sections=None):
+    """Reconstruit le document de preuves
+
+    `sections` limite les sections conservées (ex: celles lues par les
+    politiques); les contrôles ne sont gardés que si "controles" en fait partie.
+    """
+    evidence = {}
+    for record in records:
+        record_type = record.get("type")
+        if record_type == "evidence":
+            evidence.update({key: record.get(key) for key in EVIDENCE_HEADER_FIELDS})
+        elif record_type == "control":
+            if sections is None or "controles" in sections:
+                evidence.setdefault("controles", {})[record["id"]] = record["value"]
+        elif record_type == "section":
+            if sections is None or record["name"] in sections:
+                evidence[record["name"]] = record["value"]
+        elif record_type == "summary":
+            evidence["score_realiste"] = record.get("score_realiste")
+    return evidence
+
+# ========== RÉSULTATS D'ÉVALUATION ==========
+
+def package_record(entry, score, status):
+    """Enregistrement JSON Lines d'un package évalué"""
+    package = entry["package"]
+    record = {"type": "package", "package": package, "results": entry["results"],
+              "score": score, "compliance_status": status.get(package)}
+    if "evaluation" in entry:
+        record["evaluation"] = entry["evaluation"]
+    return record
+
+def results_summary_record(results):
+    record = {"type": "summary", "overall_score": results.get("overall_score", 0),
+              "compliance_status": results.get("compliance_status", {}),
+              "scores": results.get("scores", {})}
+    if "incremental" in results:
+        record["incremental"] = results["incremental"]
+    return record
+
+def records_to_results(records):
+    """Reconstruit le document opa_evaluation_results.json"""
+    results = {"evaluation_time": None, "policies_evaluated": [], "scores": {},
+               "compliance_status": {}, "overall_score": 0}
+    for record in records:
+        record_type = record.get("type")
+        if record_type == "evaluation":
+            results["evaluation_time"] = record.get("evaluation_time")
+        elif record_type == "package":
+            entry = {"package": record["package"], "results": record["results"]}
+            if "evaluation" in record:
+                entry["evaluation"] = record["evaluation"]
+            results["policies_evaluated"].append(entry)
+        elif record_type == "summary":
+            results.update({key: value for key, value in record.items() if key != "type"})
+        elif record_type == "timings":
+            results["timings"] = record["timings"]
+    return results
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+import bisect
+import functools
+import json
+import os
+import re
+
+DIAGNOSTICS_PATH = 'reports/opa_diagnostics.json'
+# Options ajoutées à `opa eval` en mode diagnostic
+OPA_EVAL_FLAGS = ['--metrics', '--profile', '--explain', 'full']
+# Paramètres de /v1/query (le serveur ne fournit pas de profil par expression)
+OPA_SERVER_PARAMS = {"metrics": "true", "instrument": "true", "explain": "full"}
+# Au-delà, la trace d'un package est tronquée
+MAX_TRACE_EVENTS = 2000
+
+RULE_HEAD_RE = re.compile(r'^(?:default\s+)?([A-Za-z_]\w*)\s*(?:=|:=|\{|if\b)')
+
+class OpaDiagnostics:
+    """Métriques, profil et trace (explain) capturés pendant l'évaluation réelle
+
+    Les emplacements (fichier, ligne) du profil OPA sont rattachés à la règle
+    qui les contient: on obtient le temps et le nombre d'évaluations par
+    règle et par expression, sans réévaluer les politiques.
+    """
+
+    def __init__(self, policies=()):
+        self.files = {}
+        self.calls = []
+        self.expressions = {}
+        self.rules = {}
+        self.traces = {}
+        self.truncated = set()
+        for policy in policies:
+            self.register_policy(policy)
+
+    def register_policy(self, policy):
+        self.files[os.path.normpath(policy["path"])] = policy["package"]
+
+    def package_of(self, path):
+        return self.files.get(os.path.normpath(path)) if path else None
+
+    # ---------- Sorties OPA ----------
+
+    def add_opa_output(self, output, backend, packages):
+        """Sortie JSON de `opa eval` lancée avec OPA_EVAL_FLAGS (ou réponse de /v1/query)"""
+        self.calls.append({"backend": backend, "packages": list(packages),
+                           "metrics": output.get("metrics", {})})
+        for entry in output.get("profile") or []:
+            location = entry.get("location") or {}
+            self.add_expression(location.get("file"), location.get("row"), location.get("col"),
+                                entry.get("total_time_ns", 0), entry.get("num_eval", 0),
+                                entry.get("num_redo", 0), entry.get("num_gen_expr", 0))
+        for event in output.get("explanation") or []:
+            self.add_trace_event(event)
+
+    def add_expression(self, path, row, col, time_ns, num_eval, num_redo=0, num_gen_expr=0):
+        package = self.package_of(path)
+        if package is None or row is None:
+            return
+        path = os.path.normpath(path)
+        key = (path, row, col or 0)
+        expression = self.expressions.setdefault(key, {
+            "package": package, "rule": rule_at(path, row), "file": path, "row": row, "col": col or 0,
+            "time_ns": 0, "num_eval": 0, "num_redo": 0, "num_gen_expr": 0
+        })
+        expression["time_ns"] += time_ns
+        expression["num_eval"] += num_eval
+        expression["num_redo"] += num_redo
+        expression["num_gen_expr"] += num_gen_expr
+        self.add_rule(package, expression["rule"], path, time_ns, num_eval)
+
+    def add_rule(self, package, rule, path, time_ns, num_eval, num_cached=0):
+        entry = self.rules.setdefault((package, rule), {
+            "package": package, "rule": rule, "file": path, "row": rule_row(path, rule),
+            "time_ns": 0, "num_eval": 0, "num_cached": 0
+        })
+        entry["time_ns"] += time_ns
+        entry["num_eval"] += num_eval
+        entry["num_cached"] += num_cached
+
+    def add_trace_event(self, event):
+        location = event.get("location") or {}
+        package = self.package_of(location.get("file"))
+        if package is None:
+            return
+        trace = self.traces.setdefault(package, [])
+        if len(trace) >= MAX_TRACE_EVENTS:
+            self.truncated.add(package)
+            return
+        trace.append({
+            "op": event.get("op"), "query_id": event.get("query_id"),
+            "parent_id": event.get("parent_id"), "type": event.get("type"),
+            "file": os.path.normpath(location["file"]), "row": location.get("row"),
+            "col": location.get("col")
+        })
+
+    # ---------- Évaluateur intégré ----------
+
+    def add_python_profile(self, policy, profile, time_ns):
+        """Profil par règle de rego_subset (temps inclusif, évaluations, lectures mémoïsées)"""
+        self.calls.append({"backend": "python", "packages": [policy["package"]],
+                           "metrics": {"timer_rego_query_eval_ns": time_ns}})
+        for rule, entry in profile.items():
+            self.add_rule(policy["package"], rule, os.path.normpath(policy["path"]),
+                          entry["time_ns"], entry["num_eval"], entry["num_cached"])
+
+    # ---------- Sauvegarde ----------
+
+    def to_dict(self, backend, evaluation_time):
+        by_time = lambda entry: -entry["time_ns"]
+        return {
+            "evaluation_time": evaluation_time,
+            "backend": backend,
+            "calls": self.calls,
+            "rules": sorted(self.rules.values(), key=by_time),
+            "expressions": sorted(self.expressions.values(), key=by_time),
+            "traces": self.traces,
+            "truncated_traces": sorted(self.truncated)
+        }
+
+    def save(self, backend, evaluation_time, path=DIAGNOSTICS_PATH):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(backend, evaluation_time), f, indent=2)
+        return path
+
+def load_diagnostics(path=DIAGNOSTICS_PATH):
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def rule_heads(path):
+    """[(ligne, règle)] des têtes de règles d'un fichier .rego"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return []
+    return _rule_heads_cached(path, stat.st_mtime_ns, stat.st_size)
+
+@functools.lru_cache(maxsize=None)
+def _rule_heads_cached(path, mtime_ns, size):
+    heads = []
+    with open(path, 'r') as f:
+        for row, line in enumerate(f, 1):
+            match = RULE_HEAD_RE.match(line)
+            if match and match.group(1) not in ('package', 'import', 'else'):
+                heads.append((row, match.group(1)))
+    return heads
+
+def rule_at(path, row):
+    """Règle contenant la ligne `row` (None avant la première règle)"""
+    heads = rule_heads(path)
+    index = bisect.bisect_right([head_row for head_row, _ in heads], row) - 1
+    return heads[index][1] if index >= 0 else None
+
+def rule_row(path, rule):
+    for row, name in rule_heads(path):
+        if name == rule:
+            return row
+    return None
+
+# Collecteur actif pendant l'évaluation (None = mode diagnostic désactivé)
+_active_diagnostics = None
+
+def get_diagnostics():
+    return _active_diagnostics
+
+def set_diagnostics(diagnostics):
+    global _active_diagnostics
+    _active_diagnostics = diagnostics
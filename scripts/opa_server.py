@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+import http.client
+import json
+import os
+import queue
+import shutil
+import socket
+import subprocess
+import tempfile
+import time
+import urllib.parse
+
+
+class OpaServerError(Exception):
+    """Erreur de démarrage ou de communication avec le serveur OPA"""
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """Connexion HTTP keep-alive sur une socket Unix"""
+
+    def __init__(self, socket_path, timeout=30):
+        super().__init__('localhost', timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        self.sock = sock
+
+
+class OpaServer:
+    """Serveur OPA local persistant (`opa run --server`)
+
+    Les politiques sont chargées une seule fois au démarrage; chaque document
+    de preuves coûte ensuite un seul aller-retour HTTP sur une connexion
+    keep-alive du pool. Le serveur est relancé s'il s'arrête en cours de route.
+    """
+
+    def __init__(self, policy_paths, socket_path=None, host='127.0.0.1', port=None,
+                 pool_size=4, startup_timeout=10, request_timeout=30, max_restarts=3):
+        self.policy_paths = list(policy_paths)
+        self.socket_path = socket_path
+        self.host = host
+        self.port = port
+        self.pool_size = pool_size
+        self.startup_timeout = startup_timeout
+        self.request_timeout = request_timeout
+        self.max_restarts = max_restarts
+        self.restarts = 0
+        self.process = None
+        # Journal d'erreurs d'opa: fichier temporaire, pas un tube que personne
+        # ne viderait (un serveur bavard s'y bloquerait une fois le tube plein)
+        self.stderr = None
+        self._pool = queue.LifoQueue()
+
+    # ---------- Cycle de vie ----------
+
+    def start(self):
+        """Démarre le serveur et attend qu'il réponde au health check"""
+        if shutil.which('opa') is None:
+            raise OpaServerError("binaire opa introuvable")
+
+        if self.socket_path is None and self.port is None:
+            self.port = find_free_port(self.host)
+        if self.socket_path and os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+        command = ['opa', 'run', '--server', '--addr', self.address(),
+                   '--log-level', 'error'] + self.policy_paths
+        self.stderr = tempfile.TemporaryFile()
+        try:
+            self.process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=self.stderr)
+        except OSError as e:
+            self.stderr.close()
+            self.stderr = None
+            raise OpaServerError(f"impossible de lancer opa: {e}")
+
+        try:
+            self.wait_until_healthy()
+        except OpaServerError:
+            # Processus et journal d'erreurs libérés même si opa s'arrête au démarrage
+            self.stop()
+            raise
+        return self
+
+    def stop(self):
+        """Arrête le serveur et ferme les connexions du pool"""
+        self._close_pool()
+        if self.process is not None:
+            if self.process.poll() is None:
+                self.process.terminate()
+                try:
+                    self.process.wait(timeout=5)
+                except subprocess.TimeoutExpired:
+                    self.process.kill()
+                    self.process.wait()
+            self.process = None
+        if self.stderr is not None:
+            self.stderr.close()
+            self.stderr = None
+        if self.socket_path and os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+    def restart(self):
+        """Relance le serveur après un arrêt inattendu"""
+        if self.restarts >= self.max_restarts:
+            raise OpaServerError(f"serveur OPA arrêté {self.restarts} fois, abandon")
+        self.restarts += 1
+        print(f"   🔄 Redémarrage du serveur OPA ({self.restarts}/{self.max_restarts})")
+        self.stop()
+        self.start()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def address(self):
+        """Adresse passée à `opa run --addr`"""
+        if self.socket_path:
+            return f"unix://{self.socket_path}"
+        return f"{self.host}:{self.port}"
+
+    def is_alive(self):
+        return self.process is not None and self.process.poll() is None
+
+    def wait_until_healthy(self):
+        """Interroge /health jusqu'à ce que le serveur soit prêt"""
+        deadline = time.monotonic() + self.startup_timeout
+        while time.monotonic() < deadline:
+            if not self.is_alive():
+                raise OpaServerError(f"opa s'est arrêté au démarrage: {self.error_log()}")
+            if self.is_healthy():
+                return
+            time.sleep(0.05)
+        raise OpaServerError(f"serveur OPA non prêt après {self.startup_timeout}s")
+
+    def error_log(self, limit=4096):
+        """Fin du journal d'erreurs d'opa"""
+        if self.stderr is None:
+            return ''
+        self.stderr.seek(0, os.SEEK_END)
+        self.stderr.seek(max(0, self.stderr.tell() - limit))
+        return self.stderr.read().decode(errors='replace').strip()
+
+    def is_healthy(self):
+        try:
+            status, _ = self._request('GET', '/health')
+            return status == 200
+        except (OSError, http.client.HTTPException):
+            return False
+
+    # ---------- Requêtes ----------
+
+    def query(self, package_path="", input_doc=None):
+        """Évalue `data.<package_path>` avec le document d'entrée donné
+
+        Retourne la valeur du document (None si indéfini).
+        """
+        path = '/v1/data'
+        if package_path:
+            path += '/' + package_path.replace('.', '/')
+        payload = self._post(path, {"input": input_doc if input_doc is not None else {}})
+        return payload.get("result")
+
+    def query_adhoc(self, query, input_doc=None):
+        """Exécute une requête Rego ad hoc (POST /v1/query)
+
+        Retourne la liste des jeux de bindings (vide si la requête est indéfinie).
+        """
+        return self.query_adhoc_payload(query, input_doc).get("result", [])
+
+    def query_adhoc_payload(self, query, input_doc=None, params=None):
+        """Réponse complète de /v1/query (`params`: ex. metrics, explain)"""
+        path = '/v1/query'
+        if params:
+            path += '?' + urllib.parse.urlencode(params)
+        return self._post(path, {"query": query,
+                                 "input": input_doc if input_doc is not None else {}})
+
+    def _post(self, path, document):
+        """POST JSON; une erreur de connexion provoque un redémarrage puis un nouvel essai"""
+        body = json.dumps(document)
+        for attempt in range(self.max_restarts + 1):
+            try:
+                status, payload = self._request('POST', path, body)
+            except (OSError, http.client.HTTPException):
+                if self.is_alive() and attempt == 0:
+                    # Connexion keep-alive fermée côté serveur: on réessaie
+                    continue
+                self.restart()
+                continue
+            if status != 200:
+                raise OpaServerError(f"OPA a répondu {status}: {payload}")
+            return payload
+        raise OpaServerError("serveur OPA injoignable")
+
+    def _request(self, method, path, body=None):
+        conn = self._acquire()
+        try:
+            headers = {"Content-Type": "application/json"} if body is not None else {}
+            conn.request(method, path, body=body, headers=headers)
+            response = conn.getresponse()
+            raw = response.read()
+        except Exception:
+            conn.close()
+            raise
+        if response.will_close:
+            conn.close()
+        else:
+            self._release(conn)
+        payload = json.loads(raw) if raw else {}
+        return response.status, payload
+
+    # ---------- Pool de connexions ----------
+
+    def _new_connection(self):
+        if self.socket_path:
+            return UnixHTTPConnection(self.socket_path, timeout=self.request_timeout)
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.request_timeout)
+
+    def _acquire(self):
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            return self._new_connection()
+
+    def _release(self, conn):
+        if self._pool.qsize() < self.pool_size:
+            self._pool.put(conn)
+        else:
+            conn.close()
+
+    def _close_pool(self):
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+def find_free_port(host='127.0.0.1'):
+    """Réserve un port TCP libre sur l'interface loopback"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""Binaire `opa` de substitution pour les benchmarks
+
+Répond aux appels faits par evaluate_with_opa.py et opa_server.py
+(`opa version`, `opa eval`, `opa run --server`) en évaluant les politiques
+avec l'évaluateur intégré (rego_subset). Résultats déterministes, sans
+réseau; la latence est réglable:
+
+- OPA_STANDIN_STARTUP_MS: délai au lancement du processus
+- OPA_STANDIN_EVAL_MS: délai par évaluation (par requête en mode serveur)
+"""
+import json
+import os
+import re
+import socketserver
+import sys
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from rego_subset import RegoEvalError, load_policy
+
+VERSION = "0.60.0-standin"
+
+# Requête groupée construite par evaluate_with_opa.build_bundle_query
+BUNDLE_LINE_RE = re.compile(
+    r'^(\w+) := \[v \| v := data\.([\w.]+)\.(\w+) with input as input\["([^"]+)"\]\]$'
+)
+RULE_HEAD_RE = re.compile(r'^(?:default\s+)?([A-Za-z_]\w*)\s*(?:=|:=|\{|if\b)')
+
+def sleep_ms(variable):
+    delay = float(os.getenv(variable, '0') or 0)
+    if delay > 0:
+        time.sleep(delay / 1000)
+
+class PolicySet:
+    """Politiques chargées (par package Rego), évaluées à la demande
+
+    Avec `diagnostics`, chaque évaluation alimente un profil par règle
+    (emplacement = tête de la règle) et une trace enter/exit, au format des
+    sorties `--profile` et `--explain` d'opa.
+    """
+
+    def __init__(self, policy_paths, diagnostics=False):
+        self.policies = {}
+        self.paths = {}
+        for path in policy_paths:
+            policy = load_policy(path)
+            self.policies[policy.package] = policy
+            self.paths[policy.package] = path
+        self.diagnostics = diagnostics
+        self.profile = {}
+        self.explanation = []
+
+    def evaluate(self, package, input_doc):
+        policy = self.policies[package]
+        if not self.diagnostics:
+            return policy.evaluate(input_doc)
+        profile = {}
+        document = policy.evaluate(input_doc, profile)
+        path = self.paths[package]
+        heads = rule_rows(path)
+        for rule, entry in profile.items():
+            location = {"file": path, "row": heads.get(rule, 1), "col": 1}
+            total = self.profile.setdefault((path, location["row"]), {
+                "total_time_ns": 0, "num_eval": 0, "num_redo": 0, "num_gen_expr": 1, "location": location
+            })
+            total["total_time_ns"] += entry["time_ns"]
+            total["num_eval"] += entry["num_eval"] + entry["num_cached"]
+            query_id = len(self.explanation)
+            for op in ("enter", "exit"):
+                self.explanation.append({"op": op, "query_id": query_id, "parent_id": 0,
+                                         "type": "rule", "location": location})
+        return document
+
+    def diagnostics_output(self):
+        return {"profile": sorted(self.profile.values(), key=lambda entry: -entry["total_time_ns"]),
+                "explanation": self.explanation}
+
+    def data_tree(self, input_doc, prefix=()):
+        """Document `data` (ou l'un de ses sous-arbres) pour un input"""
+        tree = {}
+        for package, policy in self.policies.items():
+            parts = package.split('.')
+            if tuple(parts[:len(prefix)]) != tuple(prefix) and tuple(prefix[:len(parts)]) != tuple(parts):
+                continue
+            target = tree
+            for part in parts[:-1]:
+                target = target.setdefault(part, {})
+            target[parts[-1]] = self.evaluate(package, input_doc)
+        for part in prefix:
+            if not isinstance(tree, dict) or part not in tree:
+                return None
+            tree = tree[part]
+        return tree
+
+    def bundle_bindings(self, query, input_doc):
+        """Bindings de la requête groupée: un tableau (vide si indéfini) par règle"""
+        documents = {}
+        bindings = {}
+        for line in query.splitlines():
+            match = BUNDLE_LINE_RE.match(line.strip())
+            if not match:
+                raise ValueError(f"requête non supportée: {line.strip()}")
+            var, package, rule, key = match.groups()
+            if (package, key) not in documents:
+                documents[(package, key)] = (self.evaluate(package, input_doc.get(key, {}))
+                                             if package in self.policies else {})
+            document = documents[(package, key)]
+            bindings[var] = [document[rule]] if rule in document else []
+        return bindings
+
+    def eval_query(self, query, input_doc):
+        """Sortie de `opa eval --format json`"""
+        sleep_ms('OPA_STANDIN_EVAL_MS')
+        start = time.perf_counter_ns()
+        if query == 'data' or query.startswith('data.'):
+            value = self.data_tree(input_doc, tuple(query.split('.')[1:]))
+            output = {} if value is None else {
+                "result": [{"expressions": [{"value": value, "text": query,
+                                             "location": {"row": 1, "col": 1}}]}]
+            }
+        else:
+            output = {"result": [{"expressions": [], "bindings": self.bundle_bindings(query, input_doc)}]}
+        if self.diagnostics:
+            output["metrics"] = {"timer_rego_query_eval_ns": time.perf_counter_ns() - start}
+            output.update(self.diagnostics_output())
+        return output
+
+def rule_rows(path):
+    """Ligne de la première tête de chaque règle"""
+    rows = {}
+    with open(path, 'r') as f:
+        for row, line in enumerate(f, 1):
+            match = RULE_HEAD_RE.match(line)
+            if match:
+                rows.setdefault(match.group(1), row)
+    return rows
+
+def command_eval(args):
+    policy_paths = []
+    input_path = None
+    stdin_input = False
+    diagnostics = False
+    query = None
+    index = 0
+    while index < len(args):
+        arg = args[index]
+        if arg in ('--data', '-d'):
+            policy_paths.append(args[index + 1])
+            index += 2
+        elif arg in ('--input', '-i'):
+            input_path = args[index + 1]
+            index += 2
+        elif arg in ('--format', '-f', '--explain', '--profile-sort', '--profile-limit'):
+            diagnostics = diagnostics or arg == '--explain'
+            index += 2
+        elif arg in ('--stdin-input', '-I'):
+            stdin_input = True
+            index += 1
+        elif arg in ('--metrics', '--profile') or arg.startswith('--explain='):
+            diagnostics = True
+            index += 1
+        else:
+            query = arg
+            index += 1
+
+    if stdin_input:
+        input_doc = json.load(sys.stdin)
+    elif input_path:
+        with open(input_path, 'r') as f:
+            input_doc = json.load(f)
+    else:
+        input_doc = {}
+
+    try:
+        output = PolicySet(policy_paths, diagnostics).eval_query(query or 'data', input_doc)
+    except (RegoEvalError, ValueError) as e:
+        print(f"1 error occurred: {e}", file=sys.stderr)
+        return 1
+    print(json.dumps(output))
+    return 0
+
+def make_handler(policy_set):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, *args):
+            pass
+
+        def send_json(self, status, document):
+            body = json.dumps(document).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path.startswith('/health'):
+                return self.send_json(200, {})
+            self.send_json(404, {"code": "resource_not_found"})
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length', 0))
+            body = json.loads(self.rfile.read(length) or b'{}')
+            input_doc = body.get('input', {})
+            path, _, query_string = self.path.partition('?')
+            params = urllib.parse.parse_qs(query_string)
+            sleep_ms('OPA_STANDIN_EVAL_MS')
+            try:
+                if path == '/v1/query':
+                    start = time.perf_counter_ns()
+                    bindings = policy_set.bundle_bindings(body.get('query', ''), input_doc)
+                    response = {"result": [bindings]}
+                    if 'metrics' in params:
+                        response["metrics"] = {"timer_rego_query_eval_ns": time.perf_counter_ns() - start}
+                    return self.send_json(200, response)
+                if path.startswith('/v1/data'):
+                    prefix = tuple(part for part in path[len('/v1/data'):].split('/') if part)
+                    value = policy_set.data_tree(input_doc, prefix)
+                    return self.send_json(200, {} if value is None else {"result": value})
+            except (RegoEvalError, ValueError) as e:
+                return self.send_json(400, {"code": "invalid_parameter", "message": str(e)})
+            self.send_json(404, {"code": "resource_not_found"})
+
+    return Handler
+
+class UnixHTTPServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def get_request(self):
+        request, _ = super().get_request()
+        # BaseHTTPRequestHandler attend une adresse (hôte, port)
+        return request, ('local', 0)
+
+def command_run(args):
+    address = '127.0.0.1:8181'
+    policy_paths = []
+    index = 0
+    while index < len(args):
+        arg = args[index]
+        if arg in ('--addr', '-a'):
+            address = args[index + 1]
+            index += 2
+        elif arg in ('--log-level', '-l'):
+            index += 2
+        elif arg.startswith('-'):
+            index += 1
+        else:
+            policy_paths.append(arg)
+            index += 1
+
+    handler = make_handler(PolicySet(policy_paths))
+    if address.startswith('unix://'):
+        server = UnixHTTPServer(address[len('unix://'):], handler)
+    else:
+        host, port = address.rsplit(':', 1)
+        server = ThreadingHTTPServer((host or '127.0.0.1', int(port)), handler)
+        server.daemon_threads = True
+    server.serve_forever()
+    return 0
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    sleep_ms('OPA_STANDIN_STARTUP_MS')
+    if not argv or argv[0] == 'version':
+        print(f"Version: {VERSION}")
+        return 0
+    if argv[0] == 'eval':
+        return command_eval(argv[1:])
+    if argv[0] == 'run' and ('--server' in argv or '-s' in argv):
+        return command_run(argv[1:])
+    print(f"opa-standin: commande non supportée: {' '.join(argv)}", file=sys.stderr)
+    return 2
+
+if __name__ == "__main__":
+    sys.exit(main())
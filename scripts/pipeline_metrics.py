@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+import contextlib
+import os
+import subprocess
+import time
+
+# Répertoire lu par le collecteur textfile de node_exporter
+METRICS_DIR = os.getenv('METRICS_TEXTFILE_DIR', 'reports/metrics')
+METRIC_PREFIX = 'iso27001'
+
+class Metrics:
+    """Mesures d'exécution d'un script: étapes, vérifications, appels OPA, E/S, caches
+
+    Les mesures sont agrégées (par étape, par vérification, par package OPA):
+    leur taille ne dépend pas du nombre d'exécutions dans un même processus.
+    """
+
+    def __init__(self, script):
+        self.script = script
+        self.stages = {}
+        self.checks = {}
+        self.opa_calls = {}
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.caches = {}
+        # Statistiques d'exécution des collecteurs (inventaire, recherche de secrets, API
+        # GitHub): variables d'une exécution à l'autre, elles restent hors des preuves
+        self.statistics = {}
+        self.started_at = time.perf_counter()
+        self.cpu_started_at = time.process_time()
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """Mesure le temps réel et le temps CPU d'une étape"""
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield
+        finally:
+            stage = self.stages.setdefault(name, {"wall_seconds": 0.0, "cpu_seconds": 0.0, "calls": 0})
+            stage["wall_seconds"] += time.perf_counter() - wall_start
+            stage["cpu_seconds"] += time.process_time() - cpu_start
+            stage["calls"] += 1
+
+    def record_check(self, name, seconds, cached=False):
+        check = self.checks.setdefault(name, {"seconds": 0.0, "calls": 0, "cache_hits": 0})
+        check["seconds"] += seconds
+        check["calls"] += 1
+        check["cache_hits"] += int(cached)
+
+    def record_opa_call(self, backend, package, spawn_seconds, eval_seconds, failed=False):
+        """Appel OPA: lancement du processus (ou du serveur) puis évaluation"""
+        call = self.opa_calls.setdefault((backend, package), {
+            "spawn_seconds": 0.0, "eval_seconds": 0.0, "calls": 0, "failures": 0
+        })
+        call["spawn_seconds"] += spawn_seconds
+        call["eval_seconds"] += eval_seconds
+        call["calls"] += 1
+        call["failures"] += int(failed)
+
+    def add_bytes_read(self, count):
+        self.bytes_read += count
+
+    def add_bytes_written(self, count):
+        self.bytes_written += count
+
+    def record_cache(self, name, hits, misses):
+        cache = self.caches.setdefault(name, {"hits": 0, "misses": 0})
+        cache["hits"] += hits
+        cache["misses"] += misses
+
+    def record_statistics(self, collector, values):
+        """Statistiques d'un collecteur pour cette exécution (remplacent les précédentes)"""
+        self.statistics[collector] = values
+
+    def to_dict(self):
+        """Bloc `timings` des rapports"""
+        return {
+            "script": self.script,
+            "wall_seconds": round(time.perf_counter() - self.started_at, 6),
+            "cpu_seconds": round(time.process_time() - self.cpu_started_at, 6),
+            "stages": {name: rounded(stage) for name, stage in self.stages.items()},
+            "checks": {name: rounded(check) for name, check in self.checks.items()},
+            "opa_calls": [
+                dict(backend=backend, package=package, **rounded(call))
+                for (backend, package), call in self.opa_calls.items()
+            ],
+            "bytes_read": self.bytes_read,
+            "bytes_written": self.bytes_written,
+            "caches": dict(self.caches),
+            "statistics": dict(self.statistics)
+        }
+
+    def to_prometheus(self):
+        """Exposition au format texte Prometheus (0.0.4), lu par le collecteur textfile de node_exporter
+
+        Les compteurs sont nommés `*_total` dès leurs lignes TYPE et HELP:
+        ce format, contrairement à OpenMetrics, n'ajoute pas le suffixe.
+        """
+        script = {"script": self.script}
+        families = [
+            ("run_wall_seconds", "gauge", "Durée totale du script",
+             [(script, time.perf_counter() - self.started_at)]),
+            ("run_cpu_seconds", "gauge", "Temps CPU total du script",
+             [(script, time.process_time() - self.cpu_started_at)]),
+            ("stage_wall_seconds", "gauge", "Durée réelle par étape",
+             [(dict(script, stage=name), stage["wall_seconds"]) for name, stage in self.stages.items()]),
+            ("stage_cpu_seconds", "gauge", "Temps CPU par étape",
+             [(dict(script, stage=name), stage["cpu_seconds"]) for name, stage in self.stages.items()]),
+            ("check_seconds", "gauge", "Latence cumulée par vérification",
+             [(dict(script, check=name), check["seconds"]) for name, check in self.checks.items()]),
+            ("check_calls", "counter", "Appels par vérification",
+             [(dict(script, check=name), check["calls"]) for name, check in self.checks.items()]),
+            ("opa_spawn_seconds", "gauge", "Lancement du processus ou du serveur OPA",
+             [(dict(script, backend=backend, package=package), call["spawn_seconds"])
+              for (backend, package), call in self.opa_calls.items()]),
+            ("opa_eval_seconds", "gauge", "Évaluation OPA (après lancement)",
+             [(dict(script, backend=backend, package=package), call["eval_seconds"])
+              for (backend, package), call in self.opa_calls.items()]),
+            ("opa_calls", "counter", "Appels OPA",
+             [(dict(script, backend=backend, package=package), call["calls"])
+              for (backend, package), call in self.opa_calls.items()]),
+            ("opa_failures", "counter", "Appels OPA en échec",
+             [(dict(script, backend=backend, package=package), call["failures"])
+              for (backend, package), call in self.opa_calls.items()]),
+            ("bytes_read", "counter", "Octets lus", [(script, self.bytes_read)]),
+            ("bytes_written", "counter", "Octets écrits", [(script, self.bytes_written)]),
+            ("cache_hits", "counter", "Résultats réutilisés depuis un cache",
+             [(dict(script, cache=name), cache["hits"]) for name, cache in self.caches.items()]),
+            ("cache_misses", "counter", "Résultats recalculés",
+             [(dict(script, cache=name), cache["misses"]) for name, cache in self.caches.items()]),
+            ("collector_statistic", "gauge", "Statistique d'exécution d'un collecteur",
+             [(dict(script, collector=collector, statistic=name), value)
+              for collector, values in self.statistics.items()
+              for name, value in numeric_items(values)]),
+        ]
+
+        lines = []
+        for name, metric_type, help_text, samples in families:
+            if not samples:
+                continue
+            family = f"{METRIC_PREFIX}_{name}" + ("_total" if metric_type == "counter" else "")
+            lines.append(f"# HELP {family} {escape_help(help_text)}")
+            lines.append(f"# TYPE {family} {metric_type}")
+            for labels, value in samples:
+                lines.append(f"{family}{{{format_labels(labels)}}} {format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, directory=METRICS_DIR):
+        """Écrit <directory>/<script>.prom (renommage atomique pour le collecteur)"""
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{self.script}.prom")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp_path, path)
+        return path
+
+def numeric_items(values, prefix=''):
+    """(nom, valeur) des valeurs numériques, dictionnaires imbriqués aplatis (a_b)"""
+    for name, value in values.items():
+        if isinstance(value, dict):
+            yield from numeric_items(value, f"{prefix}{name}_")
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield f"{prefix}{name}", value
+
+def rounded(values):
+    return {key: round(value, 6) if isinstance(value, float) else value for key, value in values.items()}
+
+def escape_help(text):
+    return text.replace('\\', '\\\\').replace('\n', '\\n')
+
+def format_labels(labels):
+    escaped = (
+        (key, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for key, value in labels.items()
+    )
+    return ",".join(f'{key}="{value}"' for key, value in escaped)
+
+def format_value(value):
+    if isinstance(value, float):
+        return repr(round(value, 6))
+    return str(value)
+
+def run_timed(command, input=None, timeout=None, backend="subprocess", package="all"):
+    """Équivalent de subprocess.run(capture_output=True, text=True) qui mesure l'appel
+
+    Le temps de lancement couvre fork/exec (retour de Popen); le temps
+    d'évaluation couvre le reste, de l'envoi de l'input à la fin du processus.
+    """
+    start = time.perf_counter()
+    process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                               stderr=subprocess.PIPE, text=True)
+    spawned = time.perf_counter()
+    try:
+        stdout, stderr = process.communicate(input, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.communicate()
+        get_metrics().record_opa_call(backend, package, spawned - start,
+                                      time.perf_counter() - spawned, failed=True)
+        raise
+    get_metrics().record_opa_call(backend, package, spawned - start, time.perf_counter() - spawned,
+                                  failed=process.returncode != 0)
+    get_metrics().add_bytes_read(len(stdout.encode()))
+    return subprocess.CompletedProcess(command, process.returncode, stdout, stderr)
+
+# Mesures du script en cours
+_current_metrics = None
+
+def get_metrics():
+    """Mesures courantes (créées à la demande)"""
+    global _current_metrics
+    if _current_metrics is None:
+        _current_metrics = Metrics("pipeline")
+    return _current_metrics
+
+def set_metrics(metrics):
+    global _current_metrics
+    _current_metrics = metrics
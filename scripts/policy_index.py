@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+import functools
+import hashlib
+import json
+import os
+import re
+import unicodedata
+
+from repo_snapshot import get_snapshot
+
+POLICY_INDEX_PATH = 'evidence/.policy_index.json'
+INDEX_VERSION = 1
+
+# Documents indexés: politiques (racine de policies/) et documentation ISMS
+POLICY_SOURCES = [('policies', False), ('documents', True)]
+DOCUMENT_EXTENSIONS = ('.md', '.markdown', '.txt')
+# Index de répertoire, jamais une politique
+IGNORED_DOCUMENTS = {'readme.md'}
+
+# Mots vides FR/EN (après suppression des accents)
+STOPWORDS = set("""
+a an and are as at be been by for from has have in is it its of on or shall should that the their this
+to was were will with within all any each per not no
+au aux avec ce ces cette dans de des du en est et il ils la le les leur leurs ou par pas pour qui que
+sa se ses son sont sur un une doit doivent tout tous toute toutes
+""".split())
+
+# Références explicites: contrôle de l'annexe A ("A.5.15", "A 8.2") ou clause
+# du système de management ("clause 9.3", "§ 6.1", "6.1.2"), en une seule passe
+REFERENCE = re.compile(r'\bA ?\.? ?([5-8])\.(\d{1,2})\b'
+                       r'|(?:\b[Cc]lause\s+|§ ?)((?:[4-9]|10)\.\d(?:\.\d)?)(?![\w.])'
+                       r'|(?<![\w.])((?:[4-9]|10)\.\d\.\d)(?![\w.])')
+TOKEN = re.compile(r"[a-z0-9]+")
+HEADING = re.compile(r'^(#{1,6})\s+(.*?)\s*#*\s*$')
+
+# Formulations (FR/EN) qui valent couverture d'une clause, en plus de sa référence
+CLAUSE_KEYWORDS = {
+    "A.5.1": ["information security policy", "politique de sécurité de l'information",
+              "politique de sécurité"],
+    "A.5.2": ["roles and responsibilities", "rôles et responsabilités"],
+    "A.5.3": ["segregation of duties", "séparation des tâches", "séparation des fonctions"],
+    "A.5.12": ["classification of information", "information shall be classified",
+               "classification de l'information", "classification des informations"],
+    "A.5.15": ["access control", "contrôle d'accès", "contrôle des accès"],
+    "A.5.16": ["identity management", "user registration", "unique user id",
+               "gestion des identités", "identifiant unique"],
+    "A.5.17": ["authentication information", "password", "mot de passe",
+               "informations d'authentification"],
+    "A.5.18": ["access rights", "access review", "revocation", "droits d'accès", "revue des accès"],
+    "A.5.24": ["incident management", "security incident", "gestion des incidents",
+               "incident de sécurité"],
+    "A.5.30": ["business continuity", "continuité d'activité"],
+    "A.5.35": ["independent review", "policy shall be reviewed", "revue indépendante"],
+    "A.8.2": ["privileged access", "least privilege", "accès privilégiés", "moindre privilège"],
+    "A.8.5": ["secure authentication", "multi-factor authentication", "authentification forte",
+              "authentification multifacteur"],
+    "A.8.15": ["logging", "journalisation"],
+    "A.8.16": ["monitoring", "surveillance"],
+    "6.1.2": ["risk assessment", "risk identification", "appréciation des risques",
+              "évaluation des risques", "identification des risques"],
+    "6.1.3": ["risk treatment", "traitement des risques"],
+    "9.3": ["management review", "revue de direction"]
+}
+
+# Clauses qu'une politique doit couvrir (fichier de policies/ -> clauses)
+POLICY_REQUIREMENTS = {
+    "information-security-policy.md": ["A.5.1", "A.5.2"],
+    "access-control-policy.md": ["A.5.15", "A.5.17", "A.5.18"],
+    "risk-management-policy.md": ["6.1.2", "6.1.3"],
+    "risk-assessment-policy.md": ["6.1.2", "6.1.3"]
+}
+
+def normalize(text):
+    """Minuscules sans accents ni ponctuation typographique ("Contrôle d’accès" -> "controle d'acces")"""
+    text = unicodedata.normalize('NFKD', text.replace('’', "'"))
+    return text.encode('ascii', 'ignore').decode('ascii').lower()
+
+@functools.lru_cache(maxsize=65536)
+def stem(token):
+    """Racine grossière FR/EN: pluriels réguliers"""
+    if len(token) > 4 and token.endswith('ies'):
+        return token[:-3] + 'y'
+    if len(token) > 3 and token.endswith(('s', 'x')) and not token.endswith(('ss', 'us', 'is')):
+        return token[:-1]
+    return token
+
+def tokenize(text):
+    """Termes significatifs, dans l'ordre (élisions "d'", "l'" et mots vides retirés)"""
+    return [stem(token) for token in TOKEN.findall(normalize(text))
+            if len(token) > 1 and token not in STOPWORDS]
+
+def terms_of(tokens):
+    """Termes indexés: mots et paires de mots consécutifs (recherche d'expressions)"""
+    return tokens + [f"{first} {second}" for first, second in zip(tokens, tokens[1:])]
+
+def phrase_terms(phrase):
+    """Termes à trouver dans une même section pour une expression"""
+    tokens = tokenize(phrase)
+    if len(tokens) < 2:
+        return tokens
+    return [f"{first} {second}" for first, second in zip(tokens, tokens[1:])]
+
+def clause_references(text):
+    """Clauses citées explicitement dans un texte"""
+    return {f"A.{theme}.{number}" if theme else clause or subclause
+            for theme, number, clause, subclause in REFERENCE.findall(text)}
+
+def split_sections(text):
+    """[(titre, texte)] selon les titres Markdown; le préambule a pour titre celui du document"""
+    sections = []
+    title, lines = '', []
+    for line in text.splitlines():
+        match = HEADING.match(line)
+        if match:
+            if title or lines:
+                sections.append((title, '\n'.join(lines)))
+            title, lines = match.group(2), []
+        else:
+            lines.append(line)
+    sections.append((title, '\n'.join(lines)))
+    return [(heading, body) for heading, body in sections if heading or body.strip()]
+
+def index_document(text):
+    """Index direct d'un document: sections, termes et clauses -> numéros de section"""
+    sections = split_sections(text)
+    terms = {}
+    clauses = {}
+    for number, (heading, body) in enumerate(sections):
+        section_text = f"{heading}\n{body}"
+        for term in set(terms_of(tokenize(section_text))):
+            terms.setdefault(term, []).append(number)
+        for clause in clause_references(section_text):
+            clauses.setdefault(clause, []).append(number)
+    return {
+        "title": next((heading for heading, _ in sections if heading), ''),
+        "sections": [heading for heading, _ in sections],
+        "terms": terms,
+        "clauses": clauses
+    }
+
+class PolicyIndex:
+    """Index plein texte des politiques et documents ISMS
+
+    Chaque document est découpé en sections (titres Markdown) puis indexé:
+    termes normalisés (accents, pluriels et mots vides FR/EN retirés, paires
+    de mots pour les expressions) et références de clauses ISO. L'index
+    direct de chaque document est conservé sur disque par empreinte SHA-256
+    du contenu: seuls les documents nouveaux ou modifiés sont relus et
+    réindexés. L'index inversé (terme -> document -> sections) est assemblé
+    en mémoire; une recherche est une intersection de listes de postings.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        # chemin -> [taille, mtime_ns, empreinte]
+        self.files = {}
+        # empreinte -> index direct du document
+        self.documents = {}
+        self.snapshot = None
+        self.generation = None
+        self.postings = {}
+        self.clause_postings = {}
+        self.reindexed = []
+        if path is not None:
+            self.load()
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") == INDEX_VERSION:
+            self.files = data.get("files", {})
+            self.documents = data.get("documents", {})
+
+    def save(self):
+        if self.path is None:
+            return
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({"version": INDEX_VERSION, "files": self.files, "documents": self.documents},
+                               ensure_ascii=False, separators=(',', ':')))
+        os.replace(tmp_path, self.path)
+
+    # ---------- Indexation ----------
+
+    def refresh(self, snapshot=None):
+        """Met l'index à jour pour un instantané (une seule fois par état de l'instantané)"""
+        snapshot = snapshot or get_snapshot()
+        if snapshot is self.snapshot and snapshot.generation == self.generation:
+            return self
+        files = {}
+        for path in document_paths(snapshot):
+            stat = snapshot.stat(path)
+            stored = self.files.get(path)
+            if stored and stored[0] == stat.size and stored[1] == stat.mtime_ns and stored[2] in self.documents:
+                files[path] = stored
+                continue
+            content = snapshot.read_bytes(path) or b''
+            digest = hashlib.sha256(content).hexdigest()
+            if digest not in self.documents:
+                self.documents[digest] = index_document(content.decode('utf-8', errors='replace'))
+                self.reindexed.append(path)
+            files[path] = [stat.size, stat.mtime_ns, digest]
+        self.files = files
+        # Documents supprimés: leur index direct n'est plus référencé
+        used = {digest for _, _, digest in files.values()}
+        self.documents = {digest: document for digest, document in self.documents.items() if digest in used}
+        self.build_postings()
+        self.snapshot = snapshot
+        self.generation = snapshot.generation
+        return self
+
+    def build_postings(self):
+        self.postings = {}
+        self.clause_postings = {}
+        for path, (_, _, digest) in self.files.items():
+            document = self.documents[digest]
+            for term, sections in document["terms"].items():
+                self.postings.setdefault(term, {})[path] = sections
+            for clause, sections in document["clauses"].items():
+                self.clause_postings.setdefault(clause, {})[path] = sections
+
+    # ---------- Recherche ----------
+
+    def search(self, phrase, paths=None):
+        """{chemin: [sections]} des sections contenant tous les termes de l'expression"""
+        postings = [self.postings.get(term) for term in phrase_terms(phrase)]
+        if not postings or not all(postings):
+            return {}
+        # Intersection à partir de la liste la plus courte (terme le plus rare)
+        postings.sort(key=len)
+        candidates = postings[0] if paths is None else {path: postings[0][path] for path in paths
+                                                         if path in postings[0]}
+        matches = {}
+        for path, sections in candidates.items():
+            sections = set(sections)
+            for other in postings[1:]:
+                sections.intersection_update(other.get(path, ()))
+                if not sections:
+                    break
+            if sections:
+                matches[path] = sorted(sections)
+        return matches
+
+    def clause_matches(self, clause, paths=None):
+        """{chemin: [sections]} qui couvrent une clause (référence ou formulation)"""
+        references = self.clause_postings.get(clause, {})
+        matches = {path: set(sections) for path, sections in references.items()
+                   if paths is None or path in paths}
+        for phrase in CLAUSE_KEYWORDS.get(clause, []):
+            for path, sections in self.search(phrase, paths).items():
+                matches.setdefault(path, set()).update(sections)
+        return {path: sorted(sections) for path, sections in matches.items()}
+
+    def covered_clauses(self):
+        """Clauses couvertes par au moins un document de l'index"""
+        clauses = set(self.clause_postings)
+        clauses.update(clause for clause in CLAUSE_KEYWORDS if self.clause_matches(clause))
+        return sorted(clauses, key=clause_sort_key)
+
+    def clauses_covered(self, path):
+        """Clauses connues couvertes par un document"""
+        clauses = set(self.documents[self.files[path][2]]["clauses"]) if path in self.files else set()
+        clauses.update(clause for clause in CLAUSE_KEYWORDS if self.clause_matches(clause, {path}))
+        return sorted(clauses, key=clause_sort_key)
+
+    def coverage(self, path, required=None):
+        """Clauses requises couvertes / manquantes pour un document, avec les sections qui les couvrent"""
+        required = POLICY_REQUIREMENTS.get(os.path.basename(path), []) if required is None else required
+        sections = self.sections(path)
+        covered = {}
+        for clause in required:
+            numbers = self.clause_matches(clause, {path}).get(path)
+            if numbers:
+                covered[clause] = [sections[number] for number in numbers]
+        return {
+            "covered": covered,
+            "missing": [clause for clause in required if clause not in covered]
+        }
+
+    def sections(self, path):
+        if path not in self.files:
+            return []
+        return self.documents[self.files[path][2]]["sections"]
+
+    def summary(self):
+        return {
+            "documents": len(self.files),
+            "terms": len(self.postings),
+            "reindexed": sorted(self.reindexed)
+        }
+
+def document_paths(snapshot):
+    """Documents indexés de l'instantané"""
+    paths = []
+    for directory, recursive in POLICY_SOURCES:
+        if recursive:
+            candidates = snapshot.files_under(directory)
+        else:
+            candidates = [f"{directory}/{name}" for name in snapshot.listdir(directory)]
+        paths.extend(path for path in candidates
+                     if snapshot.is_file(path) and path.lower().endswith(DOCUMENT_EXTENSIONS)
+                     and os.path.basename(path).lower() not in IGNORED_DOCUMENTS)
+    return sorted(paths)
+
+def clause_sort_key(clause):
+    """Clauses du système de management (4-10) puis de l'annexe A, dans l'ordre numérique"""
+    parts = clause[2:].split('.') if clause.startswith('A.') else clause.split('.')
+    return (clause.startswith('A.'), [int(part) for part in parts])
+
+# Index actif pour la collecte en cours (None = index en mémoire, non persisté)
+_active_index = None
+
+def get_policy_index():
+    """Index à jour pour l'instantané courant"""
+    global _active_index
+    if _active_index is None:
+        _active_index = PolicyIndex()
+    return _active_index.refresh()
+
+def set_policy_index(index):
+    global _active_index
+    _active_index = index
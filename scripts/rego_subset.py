@@ -0,0 +1,872 @@
+#!/usr/bin/env python3
+"""Évaluateur Rego intégré, limité au sous-ensemble utilisé par nos politiques
+
+Constructions supportées:
+- `package`, `default <règle> = <terme>`
+- règles `nom { corps }`, `nom = valeur { corps }`, `nom := terme`, chaînes `else`
+- corps: expressions booléennes, `not`, comparaisons, `x := expr`
+- termes: littéraux, références `input.*`, variables locales, autres règles du
+  package, tableaux, compréhensions de tableau `[x | corps]`, itération `[_]`
+- fonctions: count, sum, max, min
+- arithmétique: + - * / %
+
+Tout le reste (imports, `data.*`, règles partielles, fonctions, ensembles,
+objets, `some`, `with`, unification `=` dans un corps...) est refusé à la
+compilation avec RegoUnsupportedError: la politique doit alors être évaluée
+par le binaire opa.
+"""
+import argparse
+import functools
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+
+
+class RegoUnsupportedError(Exception):
+    """Construction Rego hors du sous-ensemble supporté"""
+
+
+class RegoEvalError(Exception):
+    """Erreur d'évaluation (conflit de règle, division par zéro, type invalide...)"""
+
+
+UNDEFINED = object()
+
+BUILTINS = {'count', 'sum', 'max', 'min'}
+KEYWORDS = {'package', 'import', 'default', 'else', 'not', 'true', 'false', 'null',
+            'some', 'every', 'with', 'as', 'in', 'if', 'contains'}
+
+
+# ========== ANALYSE LEXICALE ==========
+
+TOKEN_RE = re.compile(r'''
+    (?P<ws>[ \t\r]+)
+  | (?P<comment>\#[^\n]*)
+  | (?P<newline>\n)
+  | (?P<number>\d+(?:\.\d+)?(?:[eE][+-]?\d+)?)
+  | (?P<string>"(?:[^"\\\n]|\\.)*")
+  | (?P<raw>`[^`]*`)
+  | (?P<ident>[A-Za-z_][A-Za-z0-9_]*)
+  | (?P<op>:=|==|!=|<=|>=|[<>=+\-*/%|;,.()\[\]{}])
+''', re.VERBOSE)
+
+
+def tokenize(source):
+    """Découpe la source en jetons (kind, valeur, ligne)
+
+    Les retours à la ligne à l'intérieur de () et [] ne séparent pas les
+    instructions et sont ignorés.
+    """
+    tokens = []
+    depth = 0
+    line = 1
+    pos = 0
+    while pos < len(source):
+        match = TOKEN_RE.match(source, pos)
+        if not match:
+            raise RegoUnsupportedError(f"ligne {line}: caractère inattendu {source[pos]!r}")
+        kind = match.lastgroup
+        value = match.group()
+        pos = match.end()
+        if kind in ('ws', 'comment'):
+            continue
+        if kind == 'newline':
+            if depth == 0:
+                tokens.append(('newline', value, line))
+            line += 1
+            continue
+        if kind == 'op' and value in '([':
+            depth += 1
+        elif kind == 'op' and value in ')]':
+            depth = max(depth - 1, 0)
+        tokens.append((kind, value, line))
+    tokens.append(('eof', '', line))
+    return tokens
+
+
+# ========== ANALYSE SYNTAXIQUE ==========
+#
+# Noeuds de l'arbre: tuples dont le premier élément est le type.
+#   ('const', valeur)           ('ref', racine, [segments])
+#   ('array', [exprs])          ('compr', tête, corps)
+#   ('call', nom, [exprs])      ('binop', op, gauche, droite)
+#   ('neg', expr)
+# Segments de référence: ('key', nom) | ('index', expr) | ('wildcard',)
+# Instructions: ('expr', expr) | ('not', expr) | ('assign', var, expr)
+
+
+class Parser:
+    def __init__(self, source):
+        self.tokens = tokenize(source)
+        self.pos = 0
+
+    # ---------- Outils ----------
+
+    def peek(self, offset=0):
+        return self.tokens[min(self.pos + offset, len(self.tokens) - 1)]
+
+    def next(self):
+        token = self.tokens[self.pos]
+        self.pos += 1
+        return token
+
+    def at(self, value, kind=None):
+        token = self.peek()
+        return token[1] == value and (kind is None or token[0] == kind)
+
+    def expect(self, value):
+        token = self.next()
+        if token[1] != value:
+            raise RegoUnsupportedError(f"ligne {token[2]}: attendu {value!r}, trouvé {token[1]!r}")
+        return token
+
+    def skip_newlines(self):
+        while self.peek()[0] == 'newline':
+            self.pos += 1
+
+    def error(self, message):
+        raise RegoUnsupportedError(f"ligne {self.peek()[2]}: {message}")
+
+    # ---------- Module ----------
+
+    def parse_module(self):
+        self.skip_newlines()
+        if not self.at('package', 'ident'):
+            self.error("déclaration `package` attendue")
+        self.next()
+        package = [self.expect_ident()]
+        while self.at('.', 'op'):
+            self.next()
+            package.append(self.expect_ident())
+
+        defaults = {}
+        rules = {}
+        while True:
+            self.skip_newlines()
+            token = self.peek()
+            if token[0] == 'eof':
+                break
+            if token[0] != 'ident':
+                self.error(f"début de règle attendu, trouvé {token[1]!r}")
+            if token[1] == 'import':
+                self.error("`import` non supporté")
+            if token[1] == 'default':
+                self.next()
+                name = self.expect_ident()
+                if not (self.at('=', 'op') or self.at(':=', 'op')):
+                    self.error("`=` attendu après `default`")
+                self.next()
+                if name in defaults:
+                    self.error(f"default multiple pour {name}")
+                defaults[name] = self.parse_expr()
+                continue
+            name = self.expect_ident()
+            rules.setdefault(name, []).append(self.parse_rule_chain(name))
+
+        return {"package": '.'.join(package), "defaults": defaults, "rules": rules}
+
+    def expect_ident(self):
+        token = self.next()
+        if token[0] != 'ident' or token[1] in KEYWORDS:
+            raise RegoUnsupportedError(f"ligne {token[2]}: identifiant attendu, trouvé {token[1]!r}")
+        return token[1]
+
+    def parse_rule_chain(self, name):
+        """Une définition de règle et ses branches `else`"""
+        if self.at('[', 'op') or self.at('(', 'op') or self.at('contains', 'ident'):
+            self.error(f"règle partielle ou fonction non supportée: {name}")
+        chain = [self.parse_rule_branch(name)]
+        while True:
+            save = self.pos
+            self.skip_newlines()
+            if self.at('else', 'ident'):
+                self.next()
+                chain.append(self.parse_rule_branch(name))
+            else:
+                self.pos = save
+                break
+        return chain
+
+    def parse_rule_branch(self, name):
+        value = None
+        if self.at('=', 'op') or self.at(':=', 'op'):
+            self.next()
+            value = self.parse_expr()
+        if self.at('if', 'ident'):
+            self.next()
+        body = None
+        if self.at('{', 'op'):
+            self.next()
+            body = self.parse_body('}')
+            self.expect('}')
+        if value is None and body is None:
+            self.error(f"règle {name} sans valeur ni corps")
+        if value is None:
+            value = ('const', True)
+        return (value, body or [])
+
+    def parse_body(self, closing):
+        """Instructions séparées par des retours à la ligne ou des `;`"""
+        statements = []
+        while True:
+            while self.peek()[0] == 'newline' or self.at(';', 'op'):
+                self.next()
+            if self.at(closing, 'op'):
+                return statements
+            statements.append(self.parse_statement())
+            if not (self.peek()[0] == 'newline' or self.at(';', 'op') or self.at(closing, 'op')):
+                self.error(f"fin d'instruction attendue, trouvé {self.peek()[1]!r}")
+
+    def parse_statement(self):
+        token = self.peek()
+        if token[0] == 'ident' and token[1] in ('some', 'every', 'with'):
+            self.error(f"`{token[1]}` non supporté")
+        if token[0] == 'ident' and token[1] == 'not':
+            self.next()
+            return ('not', self.parse_expr())
+        if token[0] == 'ident' and self.peek(1)[1] == ':=':
+            name = self.expect_ident()
+            self.next()
+            return ('assign', name, self.parse_expr())
+        expr = self.parse_expr()
+        if self.at('=', 'op'):
+            self.error("unification `=` non supportée dans un corps (utiliser `:=` ou `==`)")
+        if self.at('with', 'ident'):
+            self.error("`with` non supporté")
+        return ('expr', expr)
+
+    # ---------- Expressions ----------
+
+    def parse_expr(self):
+        left = self.parse_additive()
+        while self.peek()[0] == 'op' and self.peek()[1] in ('==', '!=', '<', '<=', '>', '>='):
+            op = self.next()[1]
+            left = ('binop', op, left, self.parse_additive())
+        return left
+
+    def parse_additive(self):
+        left = self.parse_multiplicative()
+        while self.peek()[0] == 'op' and self.peek()[1] in ('+', '-'):
+            op = self.next()[1]
+            left = ('binop', op, left, self.parse_multiplicative())
+        return left
+
+    def parse_multiplicative(self):
+        left = self.parse_unary()
+        while self.peek()[0] == 'op' and self.peek()[1] in ('*', '/', '%'):
+            op = self.next()[1]
+            left = ('binop', op, left, self.parse_unary())
+        return left
+
+    def parse_unary(self):
+        if self.at('-', 'op'):
+            self.next()
+            return ('neg', self.parse_unary())
+        return self.parse_term()
+
+    def parse_term(self):
+        kind, value, line = self.next()
+        if kind == 'number':
+            return ('const', int(value) if value.isdigit() else float(value))
+        if kind == 'string':
+            return ('const', json.loads(value))
+        if kind == 'raw':
+            return ('const', value[1:-1])
+        if kind == 'op' and value == '(':
+            expr = self.parse_expr()
+            self.expect(')')
+            return expr
+        if kind == 'op' and value == '[':
+            return self.parse_array()
+        if kind == 'op' and value == '{':
+            raise RegoUnsupportedError(f"ligne {line}: objets et ensembles non supportés")
+        if kind == 'ident':
+            if value == 'true':
+                return ('const', True)
+            if value == 'false':
+                return ('const', False)
+            if value == 'null':
+                return ('const', None)
+            if value in KEYWORDS:
+                raise RegoUnsupportedError(f"ligne {line}: `{value}` non supporté ici")
+            if self.at('(', 'op'):
+                return self.parse_call(value, line)
+            return self.parse_ref(value)
+        raise RegoUnsupportedError(f"ligne {line}: terme inattendu {value!r}")
+
+    def parse_call(self, name, line):
+        if name not in BUILTINS:
+            raise RegoUnsupportedError(f"ligne {line}: fonction {name}() non supportée")
+        self.expect('(')
+        args = []
+        while not self.at(')', 'op'):
+            args.append(self.parse_expr())
+            if not self.at(')', 'op'):
+                self.expect(',')
+        self.expect(')')
+        if len(args) != 1:
+            raise RegoUnsupportedError(f"ligne {line}: {name}() attend un argument")
+        return ('call', name, args)
+
+    def parse_ref(self, root):
+        segments = []
+        while True:
+            if self.at('.', 'op'):
+                self.next()
+                if self.peek()[0] == 'ident' and self.peek(1)[1] == '(':
+                    self.error(f"fonction {root}.{self.peek()[1]}() non supportée")
+                segments.append(('key', self.expect_ident()))
+            elif self.at('[', 'op'):
+                self.next()
+                if self.at('_', 'ident'):
+                    self.next()
+                    segments.append(('wildcard',))
+                else:
+                    segments.append(('index', self.parse_expr()))
+                self.expect(']')
+            else:
+                return ('ref', root, segments)
+
+    def parse_array(self):
+        if self.at(']', 'op'):
+            self.next()
+            return ('array', [])
+        first = self.parse_expr()
+        if self.at('|', 'op'):
+            self.next()
+            body = self.parse_body(']')
+            self.expect(']')
+            return ('compr', first, body)
+        items = [first]
+        while self.at(',', 'op'):
+            self.next()
+            if self.at(']', 'op'):
+                break
+            items.append(self.parse_expr())
+        self.expect(']')
+        return ('array', items)
+
+
+# ========== SÉMANTIQUE ==========
+
+TYPE_RANK = {type(None): 0, bool: 1, int: 2, float: 2, str: 3, list: 4, dict: 5}
+
+
+def type_rank(value):
+    rank = TYPE_RANK.get(type(value))
+    if rank is None:
+        raise RegoEvalError(f"type non supporté: {type(value).__name__}")
+    return rank
+
+
+def rego_equal(left, right):
+    """Égalité Rego: pas de conversion entre booléens et nombres"""
+    if type_rank(left) != type_rank(right):
+        return False
+    if isinstance(left, list):
+        return len(left) == len(right) and all(rego_equal(a, b) for a, b in zip(left, right))
+    if isinstance(left, dict):
+        return left.keys() == right.keys() and all(rego_equal(left[k], right[k]) for k in left)
+    return left == right
+
+
+def rego_compare(left, right):
+    """Ordre total de Rego: null < booléen < nombre < chaîne < tableau < objet"""
+    left_rank, right_rank = type_rank(left), type_rank(right)
+    if left_rank != right_rank:
+        return -1 if left_rank < right_rank else 1
+    if isinstance(left, list):
+        for a, b in zip(left, right):
+            result = rego_compare(a, b)
+            if result:
+                return result
+        return (len(left) > len(right)) - (len(left) < len(right))
+    if isinstance(left, dict):
+        return rego_compare(sorted(left.items()), sorted(right.items()))
+    return (left > right) - (left < right)
+
+
+def is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def normalize_number(value):
+    """50.0 -> 50, comme la sortie JSON d'OPA"""
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def arithmetic(op, left, right):
+    if not (is_number(left) and is_number(right)):
+        raise RegoEvalError(f"opérande non numérique pour {op}")
+    if op == '+':
+        return normalize_number(left + right)
+    if op == '-':
+        return normalize_number(left - right)
+    if op == '*':
+        return normalize_number(left * right)
+    if right == 0:
+        raise RegoEvalError("division par zéro")
+    if op == '/':
+        return normalize_number(left / right)
+    if not (isinstance(left, int) and isinstance(right, int)):
+        raise RegoEvalError("modulo sur des nombres non entiers")
+    return left % right
+
+
+def call_builtin(name, value):
+    if name == 'count':
+        if not isinstance(value, (list, dict, str)):
+            raise RegoEvalError("count() attend une collection ou une chaîne")
+        return len(value)
+    if not isinstance(value, list):
+        raise RegoEvalError(f"{name}() attend un tableau")
+    if name == 'sum':
+        if not all(is_number(item) for item in value):
+            raise RegoEvalError("sum() attend des nombres")
+        return normalize_number(sum(value))
+    if not value:
+        return UNDEFINED
+    best = value[0]
+    for item in value[1:]:
+        order = rego_compare(item, best)
+        if (name == 'max' and order > 0) or (name == 'min' and order < 0):
+            best = item
+    return best
+
+
+# ========== COMPILATION EN FERMETURES ==========
+#
+# Une expression compilée est une fonction (ctx, env) -> itérateur de valeurs:
+# aucune valeur = indéfini, plusieurs valeurs = itération via `[_]`.
+# Une instruction compilée est une fonction (ctx, env) -> itérateur d'env.
+
+
+class Compiler:
+    def __init__(self, rule_names):
+        self.rule_names = rule_names
+        self.input_paths = set()
+
+    def compile_body(self, statements, scope):
+        scope = set(scope)
+        compiled = []
+        for statement in statements:
+            compiled.append(self.compile_statement(statement, scope))
+
+        def run(ctx, env, index=0):
+            if index == len(compiled):
+                yield env
+                return
+            for next_env in compiled[index](ctx, env):
+                yield from run(ctx, next_env, index + 1)
+        return run
+
+    def compile_statement(self, statement, scope):
+        kind = statement[0]
+        if kind == 'assign':
+            name, expr = statement[1], statement[2]
+            if name in scope or name in self.rule_names or name == 'input':
+                raise RegoUnsupportedError(f"variable déjà définie: {name}")
+            value_fn = self.compile_expr(expr, scope)
+            scope.add(name)
+
+            def assign(ctx, env):
+                for value in value_fn(ctx, env):
+                    new_env = dict(env)
+                    new_env[name] = value
+                    yield new_env
+            return assign
+
+        value_fn = self.compile_expr(statement[1], scope)
+        if kind == 'not':
+            def negate(ctx, env):
+                for value in value_fn(ctx, env):
+                    if value is not False:
+                        return
+                yield env
+            return negate
+
+        def test(ctx, env):
+            for value in value_fn(ctx, env):
+                if value is not False:
+                    yield env
+        return test
+
+    def compile_expr(self, node, scope):
+        kind = node[0]
+
+        if kind == 'const':
+            value = node[1]
+            return lambda ctx, env: iter((value,))
+
+        if kind == 'array':
+            item_fns = [self.compile_expr(item, scope) for item in node[1]]
+
+            def array(ctx, env):
+                values = []
+                for fn in item_fns:
+                    value = first(fn(ctx, env))
+                    if value is UNDEFINED:
+                        return
+                    values.append(value)
+                yield values
+            return array
+
+        if kind == 'compr':
+            body_fn = self.compile_body(node[2], scope)
+            inner_scope = set(scope) | assigned_vars(node[2])
+            head_fn = self.compile_expr(node[1], inner_scope)
+
+            def comprehension(ctx, env):
+                values = []
+                for body_env in body_fn(ctx, env):
+                    values.extend(head_fn(ctx, body_env))
+                yield values
+            return comprehension
+
+        if kind == 'call':
+            name = node[1]
+            arg_fn = self.compile_expr(node[2][0], scope)
+
+            def call(ctx, env):
+                for value in arg_fn(ctx, env):
+                    result = call_builtin(name, value)
+                    if result is not UNDEFINED:
+                        yield result
+            return call
+
+        if kind == 'neg':
+            operand_fn = self.compile_expr(node[1], scope)
+
+            def negative(ctx, env):
+                for value in operand_fn(ctx, env):
+                    yield arithmetic('-', 0, value)
+            return negative
+
+        if kind == 'binop':
+            op = node[1]
+            left_fn = self.compile_expr(node[2], scope)
+            right_fn = self.compile_expr(node[3], scope)
+            if op in ('==', '!='):
+                expected = op == '=='
+                apply = lambda a, b: rego_equal(a, b) == expected
+            elif op in ('<', '<=', '>', '>='):
+                checks = {'<': lambda c: c < 0, '<=': lambda c: c <= 0,
+                          '>': lambda c: c > 0, '>=': lambda c: c >= 0}[op]
+                apply = lambda a, b: checks(rego_compare(a, b))
+            else:
+                apply = functools.partial(arithmetic, op)
+
+            def binop(ctx, env):
+                for left in left_fn(ctx, env):
+                    for right in right_fn(ctx, env):
+                        yield apply(left, right)
+            return binop
+
+        if kind == 'ref':
+            return self.compile_ref(node[1], node[2], scope)
+
+        raise RegoUnsupportedError(f"expression non supportée: {kind}")
+
+    def compile_ref(self, root, segments, scope):
+        if root == 'input':
+            static = []
+            for segment in segments:
+                if segment[0] != 'key':
+                    break
+                static.append(segment[1])
+            if static:
+                self.input_paths.add(tuple(static))
+            root_fn = lambda ctx, env: ctx.input
+        elif root in scope:
+            root_fn = lambda ctx, env: env[root]
+        elif root in self.rule_names:
+            root_fn = lambda ctx, env: ctx.rule_value(root)
+        elif root == 'data':
+            raise RegoUnsupportedError("références `data.*` non supportées")
+        else:
+            raise RegoUnsupportedError(f"variable non liée: {root}")
+
+        steps = []
+        for segment in segments:
+            if segment[0] == 'key':
+                steps.append(('key', segment[1]))
+            elif segment[0] == 'wildcard':
+                steps.append(('wildcard', None))
+            else:
+                steps.append(('index', self.compile_expr(segment[1], scope)))
+
+        def walk(ctx, env, value, index):
+            if value is UNDEFINED:
+                return
+            if index == len(steps):
+                yield value
+                return
+            kind, arg = steps[index]
+            if kind == 'key':
+                yield from walk(ctx, env, lookup(value, arg), index + 1)
+            elif kind == 'wildcard':
+                if isinstance(value, list):
+                    items = value
+                elif isinstance(value, dict):
+                    items = value.values()
+                else:
+                    return
+                for item in items:
+                    yield from walk(ctx, env, item, index + 1)
+            else:
+                for key in arg(ctx, env):
+                    yield from walk(ctx, env, lookup(value, key), index + 1)
+
+        def ref(ctx, env):
+            return walk(ctx, env, root_fn(ctx, env), 0)
+        return ref
+
+
+def lookup(value, key):
+    if isinstance(value, dict):
+        return value.get(key, UNDEFINED) if isinstance(key, str) else UNDEFINED
+    if isinstance(value, list) and is_number(key) and float(key).is_integer():
+        index = int(key)
+        return value[index] if 0 <= index < len(value) else UNDEFINED
+    return UNDEFINED
+
+
+def assigned_vars(statements):
+    return {statement[1] for statement in statements if statement[0] == 'assign'}
+
+
+def first(values):
+    for value in values:
+        return value
+    return UNDEFINED
+
+
+# ========== POLITIQUE COMPILÉE ==========
+
+
+class EvaluationContext:
+    """État d'une évaluation: input et valeurs de règles mémoïsées
+
+    `profile` (optionnel) reçoit par règle le temps d'évaluation (ns, règles
+    dépendantes incluses), le nombre d'évaluations et de lectures mémoïsées.
+    """
+
+    def __init__(self, policy, input_doc, profile=None):
+        self.policy = policy
+        self.input = input_doc
+        self.values = {}
+        self.in_progress = set()
+        self.profile = profile
+
+    def rule_value(self, name):
+        if name in self.values:
+            if self.profile is not None:
+                self.profile_entry(name)["num_cached"] += 1
+            return self.values[name]
+        if name in self.in_progress:
+            raise RegoEvalError(f"récursion sur la règle {name}")
+        self.in_progress.add(name)
+        start = time.perf_counter_ns() if self.profile is not None else 0
+        try:
+            value = self.policy.evaluate_rule(self, name)
+        finally:
+            self.in_progress.discard(name)
+            if self.profile is not None:
+                entry = self.profile_entry(name)
+                entry["time_ns"] += time.perf_counter_ns() - start
+                entry["num_eval"] += 1
+        self.values[name] = value
+        return value
+
+    def profile_entry(self, name):
+        return self.profile.setdefault(name, {"time_ns": 0, "num_eval": 0, "num_cached": 0})
+
+
+class CompiledPolicy:
+    """Package Rego compilé en fermetures Python"""
+
+    def __init__(self, source):
+        module = Parser(source).parse_module()
+        self.package = module["package"]
+        rule_names = set(module["rules"]) | set(module["defaults"])
+        compiler = Compiler(rule_names)
+
+        self.defaults = {}
+        for name, expr in module["defaults"].items():
+            if expr[0] not in ('const', 'array'):
+                raise RegoUnsupportedError(f"default {name}: valeur constante attendue")
+            self.defaults[name] = first(compiler.compile_expr(expr, set())(None, {}))
+
+        self.rules = {}
+        for name, definitions in module["rules"].items():
+            compiled_definitions = []
+            for chain in definitions:
+                compiled_chain = []
+                for value_expr, body in chain:
+                    body_fn = compiler.compile_body(body, set())
+                    value_fn = compiler.compile_expr(value_expr, assigned_vars(body))
+                    compiled_chain.append((value_fn, body_fn))
+                compiled_definitions.append(compiled_chain)
+            self.rules[name] = compiled_definitions
+
+        self.rule_names = list(dict.fromkeys(list(module["defaults"]) + list(module["rules"])))
+        self.input_paths = sorted(compiler.input_paths)
+
+    def evaluate_rule(self, ctx, name):
+        values = []
+        for chain in self.rules.get(name, []):
+            for value_fn, body_fn in chain:
+                branch_values = [value for env in body_fn(ctx, {}) for value in value_fn(ctx, env)]
+                if branch_values:
+                    values.extend(branch_values)
+                    break
+        if values:
+            result = values[0]
+            if any(not rego_equal(result, other) for other in values[1:]):
+                raise RegoEvalError(f"conflit de valeurs pour la règle {name}")
+            return result
+        return self.defaults.get(name, UNDEFINED)
+
+    def evaluate(self, input_doc, profile=None):
+        """Équivalent de `data.<package>`: valeur de chaque règle définie"""
+        ctx = EvaluationContext(self, input_doc, profile)
+        document = {}
+        for name in self.rule_names:
+            value = ctx.rule_value(name)
+            if value is not UNDEFINED:
+                document[name] = value
+        return document
+
+
+def compile_policy(source):
+    """Compile une source Rego; lève RegoUnsupportedError hors du sous-ensemble"""
+    return CompiledPolicy(source)
+
+
+def load_policy(policy_path):
+    """Compile un fichier .rego (mis en cache tant que le fichier ne change pas)"""
+    stat = os.stat(policy_path)
+    return _load_policy_cached(policy_path, stat.st_mtime_ns, stat.st_size)
+
+
+@functools.lru_cache(maxsize=None)
+def _load_policy_cached(policy_path, mtime_ns, size):
+    with open(policy_path, 'r') as f:
+        return compile_policy(f.read())
+
+
+# ========== TEST DIFFÉRENTIEL CONTRE OPA ==========
+
+
+def input_variants(evidence, input_paths):
+    """Documents dérivés de `evidence` en faisant varier chaque chemin lu"""
+    candidates = [True, False, None, 0, 1, 2, 3, 100, "", "x", [], {}]
+    yield evidence
+    yield {}
+    for path in input_paths:
+        for candidate in candidates + [UNDEFINED]:
+            variant = json.loads(json.dumps(evidence))
+            target = variant
+            for part in path[:-1]:
+                if not isinstance(target.get(part), dict):
+                    target[part] = {}
+                target = target[part]
+            if candidate is UNDEFINED:
+                target.pop(path[-1], None)
+            else:
+                target[path[-1]] = candidate
+            yield variant
+
+
+def read_path(document, path):
+    for part in path:
+        if not isinstance(document, dict) or part not in document:
+            return "<indéfini>"
+        document = document[part]
+    return document
+
+
+def opa_eval_package(policy_path, package, input_doc):
+    result = subprocess.run(['opa', 'eval', '--data', policy_path, '--stdin-input',
+                             '--format', 'json', f'data.{package}'],
+                            input=json.dumps(input_doc), capture_output=True, text=True, timeout=30)
+    if result.returncode != 0:
+        return {"error": result.stderr.strip()}
+    output = json.loads(result.stdout)
+    if not output.get("result"):
+        return {}
+    return output["result"][0]["expressions"][0]["value"]
+
+
+def differential_check(policy_paths, evidence_docs):
+    """Compare l'évaluateur intégré à `opa eval` sur des variantes d'input
+
+    Retourne la liste des écarts (vide si les deux moteurs concordent).
+    """
+    mismatches = []
+    for policy_path in policy_paths:
+        policy = load_policy(policy_path)
+        checked = 0
+        for evidence in evidence_docs:
+            for variant in input_variants(evidence, policy.input_paths):
+                try:
+                    ours = policy.evaluate(variant)
+                except RegoEvalError as e:
+                    ours = {"error": str(e)}
+                theirs = opa_eval_package(policy_path, policy.package, variant)
+                checked += 1
+                if "error" in ours and "error" in theirs:
+                    continue
+                if not rego_equal(ours, theirs):
+                    read_values = {'.'.join(path): read_path(variant, path) for path in policy.input_paths}
+                    mismatches.append({"policy": policy_path, "input": read_values,
+                                       "python": ours, "opa": theirs})
+        print(f"   🔍 {policy_path}: {checked} documents comparés")
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Évaluateur Rego intégré")
+    parser.add_argument('--differential', action='store_true',
+                        help="comparer l'évaluateur intégré à `opa eval`")
+    parser.add_argument('--evidence', nargs='*', default=['evidence/real_evidence.json'])
+    parser.add_argument('--policies', default='policies')
+    args = parser.parse_args()
+
+    policy_paths = sorted(os.path.join(root, f) for root, _, files in os.walk(args.policies)
+                          for f in files if f.endswith('.rego'))
+    evidence_docs = []
+    for path in args.evidence:
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                evidence_docs.append(json.load(f))
+
+    if not args.differential:
+        for policy_path in policy_paths:
+            try:
+                policy = load_policy(policy_path)
+            except RegoUnsupportedError as e:
+                print(f"❌ {policy_path}: {e}")
+                continue
+            for evidence in evidence_docs:
+                print(f"✅ {policy.package}: {json.dumps(policy.evaluate(evidence))}")
+        return 0
+
+    print("⚖️ Test différentiel: évaluateur intégré vs opa eval...")
+    mismatches = differential_check(policy_paths, evidence_docs or [{}])
+    if mismatches:
+        print(f"❌ {len(mismatches)} écarts détectés")
+        for mismatch in mismatches[:10]:
+            print(f"   - {json.dumps(mismatch, ensure_ascii=False)}")
+        return 1
+    print("✅ Résultats identiques à opa eval")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+import fnmatch
+import os
+from stat import S_ISDIR
+
+# Répertoires jamais parcourus
+IGNORED_DIRS = {'.git'}
+
+class FileEntry:
+    """Métadonnées d'un fichier ou répertoire du dépôt"""
+    __slots__ = ('is_dir', 'size', 'mtime_ns', 'inode')
+
+    def __init__(self, is_dir, size, mtime_ns, inode=0):
+        self.is_dir = is_dir
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.inode = inode
+
+class RepoSnapshot:
+    """Instantané du dépôt construit en un seul parcours os.scandir
+
+    Chemins, tailles et dates de modification sont relevés une fois; le
+    contenu d'un fichier n'est lu qu'à la première demande puis gardé en
+    mémoire. Toutes les vérifications de preuves répondent depuis cet index.
+    """
+
+    def __init__(self, root='.'):
+        self.root = root
+        self.entries = {'': FileEntry(True, 0, 0)}
+        self.children = {'': []}
+        self._contents = {}
+        self.bytes_read = 0
+        self.files_read = 0
+        # Incrémenté à chaque mise à jour (mode veille): invalide les index dérivés
+        self.generation = 0
+
+    @classmethod
+    def from_directory(cls, root='.', ignored_dirs=IGNORED_DIRS):
+        snapshot = cls(root)
+        stack = ['']
+        while stack:
+            relative_dir = stack.pop()
+            absolute_dir = os.path.join(root, relative_dir) if relative_dir else root
+            try:
+                iterator = os.scandir(absolute_dir)
+            except OSError:
+                continue
+            with iterator:
+                for entry in iterator:
+                    relative_path = f"{relative_dir}/{entry.name}" if relative_dir else entry.name
+                    try:
+                        is_dir = entry.is_dir(follow_symlinks=False)
+                        stat = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    if is_dir and entry.name in ignored_dirs:
+                        continue
+                    snapshot.add(relative_path, is_dir, 0 if is_dir else stat.st_size, stat.st_mtime_ns,
+                                 entry.inode())
+                    if is_dir:
+                        stack.append(relative_path)
+        return snapshot
+
+    def add(self, path, is_dir, size, mtime_ns, inode=0):
+        """Enregistre une entrée (utilisé par le parcours et les instantanés synthétiques)"""
+        path = normalize_path(path)
+        parent, _, name = path.rpartition('/')
+        if parent not in self.entries:
+            self.add(parent, True, 0, 0)
+        self.entries[path] = FileEntry(is_dir, size, mtime_ns, inode)
+        self.children[parent].append(name)
+        if is_dir:
+            self.children.setdefault(path, [])
+
+    def refresh(self, path, ignored_dirs=IGNORED_DIRS):
+        """Relit un chemin modifié sur disque (créé, modifié ou supprimé) et son contenu"""
+        path = normalize_path(path)
+        if not path:
+            return
+        self.generation += 1
+        self._contents.pop(path, None)
+        if any(part in ignored_dirs for part in path.split('/')):
+            return
+        try:
+            stat = os.lstat(os.path.join(self.root, path))
+        except OSError:
+            self.remove(path)
+            return
+        is_dir = S_ISDIR(stat.st_mode)
+        entry = self.entries.get(path)
+        if entry is None or entry.is_dir != is_dir:
+            self.remove(path)
+            self.add(path, is_dir, 0 if is_dir else stat.st_size, stat.st_mtime_ns, stat.st_ino)
+            if is_dir:
+                # Nouveau répertoire: son contenu n'a peut-être pas produit d'événement
+                subtree = RepoSnapshot.from_directory(os.path.join(self.root, path), ignored_dirs)
+                for relative_path, sub_entry in subtree.entries.items():
+                    if relative_path:
+                        self.add(f"{path}/{relative_path}", sub_entry.is_dir, sub_entry.size, sub_entry.mtime_ns,
+                                 sub_entry.inode)
+        else:
+            self.entries[path] = FileEntry(is_dir, 0 if is_dir else stat.st_size, stat.st_mtime_ns, stat.st_ino)
+
+    def remove(self, path):
+        """Retire un chemin (et tout ce qu'il contient) de l'instantané"""
+        path = normalize_path(path)
+        if path not in self.entries or not path:
+            return
+        prefix = f"{path}/"
+        for removed in [p for p in self.entries if p == path or p.startswith(prefix)]:
+            del self.entries[removed]
+            self.children.pop(removed, None)
+            self._contents.pop(removed, None)
+        parent, _, name = path.rpartition('/')
+        siblings = self.children.get(parent)
+        if siblings is not None and name in siblings:
+            siblings.remove(name)
+        self.generation += 1
+
+    # ---------- Requêtes ----------
+
+    def exists(self, path):
+        return normalize_path(path) in self.entries
+
+    def is_file(self, path):
+        entry = self.entries.get(normalize_path(path))
+        return entry is not None and not entry.is_dir
+
+    def is_dir(self, path):
+        entry = self.entries.get(normalize_path(path))
+        return entry is not None and entry.is_dir
+
+    def stat(self, path):
+        return self.entries.get(normalize_path(path))
+
+    def listdir(self, path):
+        """Équivalent de os.listdir (liste vide si le répertoire n'existe pas)"""
+        return list(self.children.get(normalize_path(path), []))
+
+    def files_under(self, directory):
+        """Chemins de tous les fichiers sous un répertoire, récursivement"""
+        directory = normalize_path(directory)
+        if not self.is_dir(directory):
+            return []
+        prefix = f"{directory}/" if directory else ''
+        return [path for path, entry in self.entries.items()
+                if not entry.is_dir and path.startswith(prefix)]
+
+    def glob(self, pattern):
+        """Fichiers dont le chemin correspond au motif fnmatch"""
+        pattern = normalize_path(pattern)
+        return sorted(path for path, entry in self.entries.items()
+                      if not entry.is_dir and fnmatch.fnmatchcase(path, pattern))
+
+    # ---------- Contenu ----------
+
+    def read_bytes(self, path):
+        """Contenu brut d'un fichier, lu au plus une fois (None s'il n'existe pas)"""
+        path = normalize_path(path)
+        if path in self._contents:
+            return self._contents[path]
+        if not self.is_file(path):
+            return None
+        content = self._load(path)
+        if content is not None:
+            self.files_read += 1
+            self.bytes_read += len(content)
+        self._contents[path] = content
+        return content
+
+    def read_text(self, path):
+        content = self.read_bytes(path)
+        if content is None:
+            return None
+        return content.decode('utf-8', errors='replace')
+
+    def _load(self, path):
+        try:
+            with open(os.path.join(self.root, path), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+def normalize_path(path):
+    """'./policies/' -> 'policies'"""
+    path = path.replace(os.sep, '/').strip('/')
+    while path.startswith('./'):
+        path = path[2:]
+    return '' if path == '.' else path
+
+# Instantané courant partagé par les vérifications
+_current_snapshot = None
+
+def get_snapshot():
+    """Instantané courant (construit à la demande depuis le répertoire courant)"""
+    global _current_snapshot
+    if _current_snapshot is None:
+        _current_snapshot = RepoSnapshot.from_directory('.')
+    return _current_snapshot
+
+def set_snapshot(snapshot):
+    """Remplace l'instantané courant (None = reconstruire au prochain accès)"""
+    global _current_snapshot
+    _current_snapshot = snapshot
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+import functools
+import json
+import os
+
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, StrictUndefined, select_autoescape
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates')
+# Templates compilés (bytecode), réutilisés d'une exécution à l'autre
+TEMPLATE_CACHE_DIR = os.getenv('REPORT_TEMPLATE_CACHE', 'reports/.template_cache')
+
+# Sorties du rapport d'un dépôt: format -> (template, fichier)
+REPORT_OUTPUTS = {
+    "markdown": ("report.md.j2", 'reports/final_compliance_report.md'),
+    "html": ("report.html.j2", 'reports/final_compliance_report.html'),
+    "summary": ("summary.json.j2", 'reports/final_compliance_summary.json')
+}
+# Sorties du rapport de flotte (chemins relatifs au répertoire des résultats)
+FLEET_OUTPUTS = {
+    "markdown": ("fleet_report.md.j2", 'fleet_report.md'),
+    "html": ("fleet_report.html.j2", 'fleet_report.html')
+}
+
+STATUS_EMOJIS = {"CONFORME": "✅", "PARTIELLEMENT CONFORME": "⚠️"}
+
+def progress_bar(score):
+    filled_bars = int(score // 20)
+    return "🟩" * filled_bars + "⬜" * (5 - filled_bars)
+
+def status_emoji(status):
+    return STATUS_EMOJIS.get(status, "❌")
+
+def to_json(value):
+    return json.dumps(value, ensure_ascii=False)
+
+@functools.lru_cache(maxsize=None)
+def get_environment(cache_dir=TEMPLATE_CACHE_DIR):
+    """Environnement Jinja2 partagé
+
+    Les templates compilés sont gardés en mémoire (un seul chargement par
+    processus) et sur disque: au démarrage suivant, seul le bytecode est relu.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    environment = Environment(
+        loader=FileSystemLoader(TEMPLATES_DIR),
+        bytecode_cache=FileSystemBytecodeCache(cache_dir),
+        autoescape=select_autoescape(enabled_extensions=('html.j2',), default_for_string=False),
+        undefined=StrictUndefined,
+        trim_blocks=True,
+        lstrip_blocks=True,
+        keep_trailing_newline=True,
+        auto_reload=True
+    )
+    environment.filters.update(progress_bar=progress_bar, status_emoji=status_emoji, to_json=to_json)
+    return environment
+
+def render_to_file(template_name, path, **context):
+    """Écrit le rendu morceau par morceau (`generate()`); retourne le nombre d'octets écrits
+
+    Le document n'est jamais construit en entier: les itérables du contexte
+    (résultats JSON Lines, dépôts d'une flotte) sont consommés pendant l'écriture.
+    """
+    template = get_environment().get_template(template_name)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        for chunk in template.generate(**context):
+            f.write(chunk)
+    os.replace(tmp_path, path)
+    return os.path.getsize(path)
+
+def render_outputs(outputs, formats=None, base_dir='', **context):
+    """Rend chaque format demandé; retourne {format: chemin}"""
+    paths = {}
+    for output_format, (template_name, path) in outputs.items():
+        if formats is not None and output_format not in formats:
+            continue
+        paths[output_format] = os.path.join(base_dir, path)
+        render_to_file(template_name, paths[output_format], **context)
+    return paths
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import os
+import time
+
+from control_registry import control_selection
+from history_store import HISTORY_PATH
+from pipeline_metrics import Metrics, set_metrics
+
+STAGES = ("collect", "evaluate", "report")
+EVIDENCE_PATH = 'evidence/real_evidence.json'
+RESULTS_PATH = 'reports/opa_evaluation_results.json'
+
+# Chaque étape importe son module au moment où elle s'exécute: `--until collect`
+# ne charge ni l'évaluation ni le rapport.
+
+def run_collect(context):
+    from collect_real_evidence import calculate_realistic_score, collect_real_evidence
+    evidence = collect_real_evidence(use_cache=context["use_cache"], controls=context["controls"])
+    evidence["score_realiste"] = calculate_realistic_score(evidence["controles"])
+    context["evidence"] = evidence
+
+def run_evaluate(context):
+    from evaluate_with_opa import discover_policies, evaluate_with_opa, resolve_backend
+    context["backend"] = resolve_backend(context["backend"])
+    if context["diagnostics"]:
+        from opa_diagnostics import OpaDiagnostics
+        context["diagnostics"] = OpaDiagnostics(discover_policies())
+    context["opa_results"] = evaluate_with_opa(backend=context["backend"],
+                                               incremental=context["incremental"],
+                                               evidence=context["evidence"],
+                                               diagnostics=context["diagnostics"] or None)
+
+def run_report(context):
+    from generate_final_report import build_final_report
+    context["report"] = build_final_report(context["opa_results"], context["evidence"])
+
+STAGE_FUNCTIONS = {"collect": run_collect, "evaluate": run_evaluate, "report": run_report}
+
+def run_pipeline(until="report", backend="bundle", use_cache=True, incremental=True,
+                 controls=None, artifacts=True, diagnostics=False, metrics=None,
+                 history_path=HISTORY_PATH, since=None):
+    """Collecte, évaluation et rapport dans un seul processus
+
+    Les étapes se passent les preuves et les résultats en mémoire; rien n'est
+    relu depuis le disque. Les fichiers (mêmes chemins que les scripts
+    séparés) sont écrits une fois, à la fin. Sans artefacts, rien n'est écrit:
+    ni fichiers de sortie, ni caches (vérifications, évaluation incrémentale),
+    ni historique.
+    """
+    metrics = metrics or Metrics("run_pipeline")
+    set_metrics(metrics)
+    context = {
+        "backend": backend,
+        "use_cache": use_cache and artifacts,
+        "incremental": incremental and artifacts,
+        "controls": controls,
+        "diagnostics": diagnostics,
+        "history_path": history_path,
+        "since": since
+    }
+
+    for stage in STAGES[:STAGES.index(until) + 1]:
+        with metrics.stage(stage):
+            STAGE_FUNCTIONS[stage](context)
+
+    if artifacts:
+        with metrics.stage("write_artifacts"):
+            write_artifacts(context, metrics)
+    return context
+
+def write_artifacts(context, metrics):
+    """Écrit les sorties des étapes exécutées, avec les mesures du pipeline"""
+    context["evidence"]["timings"] = metrics.to_dict()
+    write_json(EVIDENCE_PATH, context["evidence"], metrics)
+    if "opa_results" in context:
+        context["opa_results"]["timings"] = metrics.to_dict()
+        write_json(RESULTS_PATH, context["opa_results"], metrics)
+        if context["diagnostics"]:
+            context["diagnostics"].save(context["backend"], context["opa_results"]["evaluation_time"])
+    if "report" in context:
+        from generate_final_report import record_history, write_final_report
+        if context["history_path"]:
+            record_history(context["report"], context["opa_results"], context["evidence"],
+                           context["history_path"], context["since"])
+        write_final_report(context["report"], context["evidence"])
+    context["metrics_path"] = metrics.write_prometheus()
+
+def write_json(path, document, metrics):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(document, f, indent=2)
+    metrics.add_bytes_written(os.path.getsize(path))
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Chaîne complète de conformité ISO 27001 en un seul processus")
+    parser.add_argument('--until', choices=STAGES, default='report',
+                        help="dernière étape exécutée (défaut: report)")
+    parser.add_argument('--backend', choices=['bundle', 'server', 'subprocess', 'python'],
+                        default=os.getenv('OPA_BACKEND', 'bundle'),
+                        help="moteur d'évaluation des politiques (voir evaluate_with_opa.py)")
+    parser.add_argument('--no-cache', action='store_true', help="recalculer toutes les vérifications")
+    parser.add_argument('--full', action='store_true', help="réévaluer tous les packages")
+    parser.add_argument('--controls', nargs='+', metavar='ID', type=control_selection,
+                        help="n'évaluer que ces thèmes (A.8) ou contrôles (A.5.15)")
+    parser.add_argument('--diagnostics', action='store_true',
+                        help="capturer métriques, profil et trace OPA (reports/opa_diagnostics.json)")
+    parser.add_argument('--no-history', action='store_true',
+                        help="ne pas enregistrer l'exécution dans l'historique")
+    parser.add_argument('--since', metavar='DATE',
+                        help="régressions et bascules depuis cette date (ISO 8601)")
+    parser.add_argument('--no-artifacts', action='store_true',
+                        help="n'écrire aucun fichier (ni sorties, ni caches)")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    start = time.perf_counter()
+    print("🚀 Pipeline de conformité ISO 27001:2022...")
+
+    context = run_pipeline(until=args.until, backend=args.backend, use_cache=not args.no_cache,
+                           incremental=not args.full, controls=args.controls,
+                           artifacts=not args.no_artifacts, diagnostics=args.diagnostics,
+                           history_path=None if args.no_history else HISTORY_PATH, since=args.since)
+
+    evidence = context["evidence"]
+    print("✅ Pipeline terminé!")
+    print(f"🎯 Score RÉALISTE: {evidence['score_realiste']}%")
+    if "opa_results" in context:
+        print(f"🎯 Score global: {context['opa_results']['overall_score']}%")
+    if "report" in context:
+        report = context["report"]
+        print(f"💡 Recommandations: {len(report['recommendations'])}")
+        for rec in report['recommendations'][:3]:
+            print(f"   - {rec}")
+        if report.get('history'):
+            from generate_final_report import print_history
+            print_history(report['history'])
+    if args.no_artifacts:
+        print("📭 Aucun fichier écrit (--no-artifacts)")
+    else:
+        print(f"📄 Fichiers: {EVIDENCE_PATH}"
+              + (f", {RESULTS_PATH}" if "opa_results" in context else "")
+              + (", reports/final_compliance_report.{json,md,html}" if "report" in context else ""))
+        print(f"📈 Métriques: {context['metrics_path']}")
+    print(f"⏱️  Durée: {time.perf_counter() - start:.3f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import time
+
+import numpy as np
+
+from control_registry import ANNEX_A_CONTROLS, THEMES, control_theme
+from evaluate_with_opa import COMPLIANCE_THRESHOLDS, NON_COMPLIANT
+from jsonl_io import JsonlRecords
+
+PERCENTILES = (10, 25, 50, 75, 90)
+ROLLUP_LEVELS = ("team", "org")
+UNASSIGNED = "(non affecté)"
+
+class ScoreMatrix:
+    """Résultats d'une flotte: une ligne par dépôt, une colonne par contrôle
+
+    `values` (float32) vaut 1 pour un contrôle satisfait, 0 sinon (ou un score
+    partiel entre 0 et 1); `evaluated` (booléen) distingue un contrôle non
+    satisfait d'un contrôle absent des résultats du dépôt. Tous les scores
+    (pondérés, par thème, par équipe ou organisation, centiles) sont des
+    opérations vectorielles sur ces deux matrices; avec des poids égaux, le
+    score d'un dépôt est exactement calculate_realistic_score().
+    """
+
+    def __init__(self, repositories, controls, values, evaluated, overall_scores=None):
+        self.repositories = list(repositories)
+        self.controls = list(controls)
+        self.values = values
+        self.evaluated = evaluated
+        # Produits matriciels (BLAS) en float32: poids satisfaits et poids évalués
+        self.satisfied = values * evaluated
+        self.evaluated_weights = evaluated.astype(np.float32)
+        self.overall_scores = (np.zeros(len(self.repositories)) if overall_scores is None
+                               else np.asarray(overall_scores, dtype=np.float64))
+        themes = [control_theme(control) for control in self.controls]
+        self.themes = sorted(set(themes), key=theme_sort_key)
+        # Matrice d'appartenance contrôle -> thème (colonnes x thèmes)
+        self.theme_members = np.zeros((len(self.controls), len(self.themes)), dtype=np.float64)
+        self.theme_members[np.arange(len(self.controls)), [self.themes.index(theme) for theme in themes]] = 1
+
+    @classmethod
+    def from_results(cls, results, controls=None):
+        """Matrice construite en un seul passage sur les résultats `status == "ok"` (fleet_audit.py)
+
+        Les colonnes suivent le catalogue de l'Annexe A; un contrôle inconnu
+        du catalogue est ajouté en fin de matrice.
+        """
+        controls = list(controls or (control_id for control_id, _ in ANNEX_A_CONTROLS))
+        columns = {control: index for index, control in enumerate(controls)}
+        repositories, overall_scores = [], []
+        rows, cols, values = [], [], []
+        for result in results:
+            if result.get("status", "ok") != "ok":
+                continue
+            row = len(repositories)
+            repositories.append(result["repository"])
+            overall_scores.append(result.get("overall_score") or 0)
+            for control, value in result["controles"].items():
+                if control not in columns:
+                    columns[control] = len(controls)
+                    controls.append(control)
+                rows.append(row)
+                cols.append(columns[control])
+                values.append(control_value(value))
+        shape = (len(repositories), len(controls))
+        matrix_values = np.zeros(shape, dtype=np.float32)
+        evaluated = np.zeros(shape, dtype=bool)
+        matrix_values[rows, cols] = values
+        evaluated[rows, cols] = True
+        return cls(repositories, controls, matrix_values, evaluated, overall_scores)
+
+    def weight_vector(self, weights=None):
+        """Poids par colonne: `weights` (contrôle -> poids), 1 pour les contrôles absents"""
+        weights = weights or {}
+        return np.array([weights.get(control, 1.0) for control in self.controls], dtype=np.float64)
+
+    def theme_sums(self, weights=None):
+        """(poids satisfaits, poids évalués) par dépôt et par thème: deux matrices dépôts x thèmes"""
+        weighted_members = (self.theme_members * self.weight_vector(weights)[:, None]).astype(np.float32)
+        return ((self.satisfied @ weighted_members).astype(np.float64),
+                (self.evaluated_weights @ weighted_members).astype(np.float64))
+
+    # ---------- Scores par dépôt ----------
+
+    def realistic_scores(self, weights=None, sums=None):
+        """Score réaliste pondéré de chaque dépôt (%)"""
+        satisfied, evaluated = sums or self.theme_sums(weights)
+        return percent(satisfied.sum(axis=1), evaluated.sum(axis=1))
+
+    def theme_scores(self, weights=None, sums=None):
+        """Sous-totaux par thème (A.5, A.6, A.7, A.8) de chaque dépôt: dépôts x thèmes (%)"""
+        satisfied, evaluated = sums or self.theme_sums(weights)
+        return percent(satisfied, evaluated)
+
+    def statuses(self, scores=None):
+        """Statut de conformité de chaque dépôt (score global OPA par défaut)"""
+        return compliance_labels(self.overall_scores if scores is None else scores)
+
+    # ---------- Agrégats ----------
+
+    def fleet_score(self, weights=None, sums=None):
+        """Score réaliste de toute la flotte (contrôles de tous les dépôts mis en commun)"""
+        satisfied, evaluated = sums or self.theme_sums(weights)
+        return float(percent(satisfied.sum(), evaluated.sum()))
+
+    def fleet_theme_scores(self, weights=None, sums=None):
+        satisfied, evaluated = sums or self.theme_sums(weights)
+        return dict(zip(self.themes, percent(satisfied.sum(axis=0), evaluated.sum(axis=0)).tolist()))
+
+    def percentiles(self, scores, q=PERCENTILES):
+        """Distribution d'un score par dépôt: {"p10": ..., "p50": ...}"""
+        if len(scores) == 0:
+            return {}
+        return {f"p{p}": value for p, value in zip(q, np.round(np.percentile(scores, q), 1).tolist())}
+
+    def rollup(self, groups, weights=None, sums=None):
+        """Agrégats par groupe (équipe, organisation): `groups` donne le groupe de chaque dépôt
+
+        Score réaliste et thèmes: contrôles du groupe mis en commun (comme
+        pour la flotte); score global: moyenne des scores globaux des dépôts.
+        """
+        names, inverse = np.unique(np.array(groups, dtype=str), return_inverse=True)
+        satisfied, evaluated = sums or self.theme_sums(weights)
+        group_satisfied = np.stack([np.bincount(inverse, weights=column, minlength=len(names))
+                                    for column in satisfied.T], axis=1)
+        group_evaluated = np.stack([np.bincount(inverse, weights=column, minlength=len(names))
+                                    for column in evaluated.T], axis=1)
+        repositories = np.bincount(inverse, minlength=len(names))
+        overall = np.round(np.bincount(inverse, weights=self.overall_scores, minlength=len(names))
+                           / np.maximum(repositories, 1), 1)
+        realistic = percent(group_satisfied.sum(axis=1), group_evaluated.sum(axis=1))
+        themes = percent(group_satisfied, group_evaluated)
+        statuses = compliance_labels(overall)
+        return {
+            name: {
+                "repositories": int(repositories[index]),
+                "score_realiste": float(realistic[index]),
+                "overall_score": float(overall[index]),
+                "status": str(statuses[index]),
+                "themes": dict(zip(self.themes, themes[index].tolist()))
+            }
+            for index, name in enumerate(names.tolist())
+        }
+
+    def summary(self, weights=None, groups=None):
+        """Scores de flotte: thèmes, centiles, statuts et agrégats par équipe et organisation
+
+        groups: dépôt -> {"team": ..., "org": ...} (voir load_groups)
+        """
+        weights = weights or {}
+        sums = self.theme_sums(weights)
+        labels = compliance_label_names()
+        codes = compliance_codes(self.overall_scores)
+        return {
+            "fleet_overall_score": round(float(self.overall_scores.mean()), 1) if len(self.repositories) else 0,
+            "fleet_score_realiste": self.fleet_score(sums=sums),
+            "weights": {control: weight for control, weight in weights.items()
+                        if weight != 1 and control in self.controls},
+            "themes": self.fleet_theme_scores(sums=sums),
+            "percentiles": {
+                "score_realiste": self.percentiles(self.realistic_scores(sums=sums)),
+                "overall_score": self.percentiles(self.overall_scores)
+            },
+            "compliance_status_counts": dict(zip(labels, np.bincount(codes, minlength=len(labels)).tolist())),
+            "compliance_status": dict(zip(self.repositories, (labels[code] for code in codes.tolist()))),
+            "rollups": {
+                level: self.rollup([groups.get(repository, {}).get(level) or UNASSIGNED
+                                    for repository in self.repositories], sums=sums)
+                for level in ROLLUP_LEVELS
+            } if groups else {}
+        }
+
+def control_value(value):
+    """True/False/None d'un contrôle -> 1/0; un nombre (score partiel en %) -> 0..1"""
+    if isinstance(value, bool) or value is None:
+        return 1.0 if value else 0.0
+    return min(max(float(value) / 100, 0.0), 1.0)
+
+def percent(satisfied, evaluated):
+    """100 × satisfied / evaluated arrondi au dixième (0 si rien n'est évalué), élément par élément"""
+    satisfied = np.asarray(satisfied, dtype=np.float64)
+    evaluated = np.asarray(evaluated, dtype=np.float64)
+    ratio = np.divide(satisfied, evaluated, out=np.zeros_like(satisfied), where=evaluated > 0)
+    return np.round(ratio * 100, 1)
+
+def compliance_codes(scores):
+    """Indice dans compliance_label_names() du statut de chaque score (seuils de assess_compliance_status())"""
+    scores = np.asarray(scores, dtype=np.float64)
+    return np.select([scores >= threshold for threshold, _ in COMPLIANCE_THRESHOLDS],
+                     np.arange(len(COMPLIANCE_THRESHOLDS)), default=len(COMPLIANCE_THRESHOLDS))
+
+def compliance_labels(scores):
+    """Statut de chaque score, avec les seuils de assess_compliance_status()"""
+    return np.array(compliance_label_names(), dtype=object)[compliance_codes(scores)]
+
+def compliance_label_names():
+    return [label for _, label in COMPLIANCE_THRESHOLDS] + [NON_COMPLIANT]
+
+def load_weights(path):
+    """Fichier JSON {contrôle: poids} (poids 1 pour les contrôles absents)"""
+    with open(path, 'r') as f:
+        return {control_id: float(weight) for control_id, weight in json.load(f).items()}
+
+def load_groups(path):
+    """Fichier JSON {dépôt: {"team": ..., "org": ...}}"""
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def theme_sort_key(theme):
+    """'A.10' après 'A.9'; les thèmes hors catalogue en dernier"""
+    if theme in THEMES:
+        return 0, int(theme.rsplit('.', 1)[1]), theme
+    return 1, 0, theme
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Scores de flotte pondérés, par thème, équipe et organisation")
+    parser.add_argument('results', nargs='?', default='reports/fleet_results.jsonl',
+                        help="résultats par dépôt de fleet_audit.py (JSONL)")
+    parser.add_argument('--weights', help="poids par contrôle (JSON {contrôle: poids})")
+    parser.add_argument('--groups', help="équipe et organisation par dépôt (JSON {dépôt: {team, org}})")
+    parser.add_argument('--output', help="écrire les scores dans ce fichier JSON")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    matrix = ScoreMatrix.from_results(JsonlRecords(args.results))
+    weights = load_weights(args.weights) if args.weights else None
+    groups = load_groups(args.groups) if args.groups else None
+    start = time.perf_counter()
+    scores = matrix.summary(weights, groups)
+    elapsed = time.perf_counter() - start
+    print(f"📊 {len(matrix.repositories)} dépôts x {len(matrix.controls)} contrôles "
+          f"notés en {elapsed * 1000:.1f} ms")
+    print(f"🎯 Score RÉALISTE de la flotte: {scores['fleet_score_realiste']}%")
+    for theme, score in scores["themes"].items():
+        print(f"   {theme} {THEMES.get(theme, '')}: {score}%")
+    print(f"📈 Centiles du score réaliste: {scores['percentiles']['score_realiste']}")
+    for level, rollup in scores["rollups"].items():
+        for name, group in rollup.items():
+            print(f"   {level} {name}: {group['score_realiste']}% ({group['repositories']} dépôts, {group['status']})")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(scores, f, indent=2, ensure_ascii=False)
+        print(f"📄 Scores: {args.output}")
+
+if __name__ == "__main__":
+    main()
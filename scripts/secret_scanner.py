@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""Recherche locale de secrets (clés, jetons, clés privées) dans le dépôt
+
+Les ancres de toutes les règles sont cherchées ensemble: le coût d'une
+analyse dépend du volume lu, pas du nombre de règles. Les fichiers sont
+répartis entre processus (un par cœur) et les résultats mémorisés par
+(inode, taille, mtime): une nouvelle analyse ne relit que les fichiers
+modifiés. Les secrets trouvés ne sont jamais recopiés, seul un aperçu
+masqué est conservé.
+
+    python scripts/secret_scanner.py          # code de sortie 1 si un secret est trouvé
+"""
+import argparse
+import hashlib
+import json
+import math
+import multiprocessing
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from asset_inventory import SNIFF_BYTES, is_vendored, tracked_files
+from repo_snapshot import RepoSnapshot, get_snapshot
+
+SECRET_CACHE_PATH = 'evidence/.secret_scan.json'
+CACHE_VERSION = 1
+SCAN_WORKERS = int(os.getenv('SECRET_SCAN_WORKERS', os.cpu_count() or 1))
+
+# En dessous, le coût de démarrage des processus dépasse le gain
+PARALLEL_MIN_BYTES = 8 * 1024 * 1024
+# Fichiers plus gros non analysés (jeux de données, exports)
+MAX_SCAN_BYTES = 20 * 1024 * 1024
+# Détail des découvertes recopié dans les preuves (le décompte reste complet)
+MAX_REPORTED_FINDINGS = 100
+# Marqueur de ligne pour un faux positif assumé (`# nosecret`)
+ALLOW_MARKER = b'nosecret'
+
+# (règle, ancres, motif). Les ancres sont les débuts possibles d'une
+# découverte, en minuscules; les motifs précis passent avant les génériques,
+# dont le groupe nommé `v_<règle>` capture la valeur à mesurer (entropie)
+SECRET_RULES = [
+    ("private_key", [rb'-----begin'],
+     rb'-----BEGIN (?:RSA |EC |DSA |OPENSSH |PGP |ENCRYPTED )?PRIVATE KEY(?: BLOCK)?-----'),
+    ("aws_access_key_id", [rb'akia', rb'asia', rb'abia', rb'acca'], rb'\b(?:AKIA|ASIA|ABIA|ACCA)[0-9A-Z]{16}\b'),
+    ("aws_secret_access_key", [rb'aws_?secret'],
+     rb'(?i:aws_?secret_?access_?key)["\']?\s*[:=]\s*["\']?[A-Za-z0-9/+]{40}(?![A-Za-z0-9/+])'),
+    ("github_token", [rb'gh[pousr]_'], rb'\bgh[pousr]_[A-Za-z0-9]{36,255}\b'),
+    ("github_fine_grained_token", [rb'github_pat_'], rb'\bgithub_pat_[A-Za-z0-9_]{82}\b'),
+    ("gitlab_token", [rb'glpat-'], rb'\bglpat-[A-Za-z0-9_\-]{20}\b'),
+    ("slack_token", [rb'xox[abprs]-'], rb'\bxox[abprs]-[0-9A-Za-z\-]{10,}\b'),
+    ("google_api_key", [rb'aiza'], rb'\bAIza[0-9A-Za-z_\-]{35}\b'),
+    ("stripe_live_key", [rb'rk_live_', rb'sk_live_'], rb'\b[rs]k_live_[0-9A-Za-z]{24,}\b'),
+    ("generic_secret", [rb'secret', rb'token', rb'passw', rb'api_?key', rb'access_?key', rb'auth_?key', rb'credential'],
+     rb'(?i:secret|token|passw(?:or)?d|api_?key|access_?key|auth_?key|credential)[\w.\-]*["\']?'
+     rb'\s*[:=]\s*["\'](?P<v_generic_secret>[^"\'\s/]{12,})["\']'),
+    ("high_entropy_string", [rb'["\'][a-z0-9+/_\-]{40}'],
+     rb'["\'](?P<v_high_entropy_string>[A-Za-z0-9+/_\-]{40,}={0,2})["\']')
+]
+# Entropie de Shannon minimale (bits par caractère) de la valeur capturée
+ENTROPY_THRESHOLDS = {"generic_secret": 3.5, "high_entropy_string": 4.5}
+# Valeurs d'exemple ou de gabarit, jamais des secrets
+PLACEHOLDER = re.compile(rb'example|sample|dummy|changeme|placeholder|your[_\-]|xxxx|\*\*\*|\$\{|\{\{|<[a-z_]+>',
+                         re.IGNORECASE)
+
+# Détection en deux temps. Une passe par expression d'ancres, sans groupe:
+# tant qu'elles commencent toutes par un littéral, sre saute directement
+# d'un candidat au suivant. L'ancre de `high_entropy_string` (guillemet puis
+# classe) ferait perdre cet avantage aux autres: elle a sa propre passe.
+# Puis, à chaque position candidate seulement, toutes les règles réunies en
+# une expression (`lastgroup` désigne la règle reconnue).
+ANCHOR_PATTERNS = [
+    re.compile(b'|'.join(anchor for rule, anchors, _ in SECRET_RULES if rule != "high_entropy_string"
+                         for anchor in anchors)),
+    re.compile(b'|'.join(anchor for rule, anchors, _ in SECRET_RULES if rule == "high_entropy_string"
+                         for anchor in anchors))
+]
+SECRET_PATTERN = re.compile(b'|'.join(b'(?P<%s>%s)' % (rule.encode(), pattern) for rule, _, pattern in SECRET_RULES))
+SPECIFIC_PATTERN = re.compile(b'|'.join(b'(?P<%s>%s)' % (rule.encode(), pattern) for rule, _, pattern in SECRET_RULES
+                                        if rule not in ENTROPY_THRESHOLDS))
+# Les résultats en cache ne valent que pour ce jeu de règles
+RULES_FINGERPRINT = hashlib.sha256(repr((SECRET_RULES, ENTROPY_THRESHOLDS, PLACEHOLDER.pattern,
+                                         ALLOW_MARKER)).encode()).hexdigest()[:16]
+
+class SecretScanner:
+    """Analyse des fichiers du dépôt (suivis ou non ignorés par .gitignore)
+
+    Les binaires (octet nul) et le code tiers sont écartés. Un instantané sans
+    répertoire sur disque (commit git) est analysé dans ce processus, sans
+    cache: ses dates de modification sont celles du commit.
+    """
+
+    def __init__(self, cache_path=None, workers=SCAN_WORKERS):
+        self.cache_path = cache_path
+        self.workers = workers
+        # chemin -> [inode, taille, mtime_ns, découvertes ou None (binaire)]
+        self.results = {}
+        self.snapshot = None
+        self.generation = None
+        self.skipped = {}
+        self.stats = {"scanned": 0, "reused": 0, "bytes_scanned": 0, "workers": 0}
+        if cache_path is not None:
+            self.load()
+
+    def load(self):
+        try:
+            with open(self.cache_path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") == CACHE_VERSION and data.get("rules") == RULES_FINGERPRINT:
+            self.results = data.get("files", {})
+
+    def save(self):
+        if self.cache_path is None or self.snapshot is None or self.snapshot.root is None:
+            return
+        os.makedirs(os.path.dirname(self.cache_path) or '.', exist_ok=True)
+        tmp_path = f"{self.cache_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(json.dumps({"version": CACHE_VERSION, "rules": RULES_FINGERPRINT, "files": self.results},
+                               separators=(',', ':')))
+        os.replace(tmp_path, self.cache_path)
+
+    # ---------- Analyse ----------
+
+    def refresh(self, snapshot=None):
+        """Analyse à jour pour un instantané (une seule fois par état de l'instantané)"""
+        snapshot = snapshot or get_snapshot()
+        if snapshot is self.snapshot and snapshot.generation == self.generation:
+            return self
+        on_disk = snapshot.root is not None
+        # Arbre d'un commit (GitTreeSnapshot): un blob déjà analysé n'est pas relu
+        blob_ids = getattr(snapshot, 'oids', None) if not on_disk else None
+        results = {}
+        skipped = {}
+        pending = []
+        for path in tracked_files(snapshot, untracked=True):
+            entry = snapshot.stat(path)
+            if entry is None or entry.is_dir:
+                continue
+            if is_vendored(path):
+                skipped["vendored"] = skipped.get("vendored", 0) + 1
+                continue
+            if entry.size > MAX_SCAN_BYTES:
+                skipped["large"] = skipped.get("large", 0) + 1
+                continue
+            key = [blob_ids[path], entry.size, 0] if blob_ids else [entry.inode, entry.size, entry.mtime_ns]
+            cached = self.results.get(path) if on_disk or blob_ids else None
+            if cached and cached[:3] == key:
+                results[path] = cached
+                self.stats["reused"] += 1
+            else:
+                pending.append((path, key))
+
+        if on_disk:
+            scanned = self.scan_parallel(snapshot.root, pending)
+        else:
+            scanned = ((path, scan_content(snapshot.read_bytes(path))) for path, _ in pending)
+        for (path, key), (_, findings) in zip(pending, scanned):
+            results[path] = key + [findings]
+            self.stats["scanned"] += 1
+            self.stats["bytes_scanned"] += key[1] if findings is not None else 0
+        for _, _, _, findings in results.values():
+            if findings is None:
+                skipped["binary"] = skipped.get("binary", 0) + 1
+
+        self.results = results
+        self.skipped = skipped
+        self.snapshot = snapshot
+        self.generation = snapshot.generation
+        return self
+
+    def scan_parallel(self, root, pending):
+        """[(chemin, découvertes)] dans l'ordre de `pending`, réparti entre processus si le volume le justifie
+
+        Dans un processus démon (travailleur de fleet_audit.py, déjà un
+        processus par dépôt), l'analyse reste séquentielle: un démon ne peut
+        pas créer de processus enfants.
+        """
+        paths = [path for path, _ in pending]
+        total = sum(key[1] for _, key in pending)
+        if (self.workers <= 1 or total < PARALLEL_MIN_BYTES or len(paths) < 2
+                or multiprocessing.current_process().daemon):
+            return scan_files(root, paths)
+        # Lots de tailles comparables, plusieurs par processus pour équilibrer la charge
+        batches = []
+        target = max(total // (self.workers * 4), 1)
+        batch, size = [], 0
+        for path, key in pending:
+            batch.append(path)
+            size += key[1]
+            if size >= target:
+                batches.append(batch)
+                batch, size = [], 0
+        if batch:
+            batches.append(batch)
+        self.stats["workers"] = min(self.workers, len(batches))
+        with ProcessPoolExecutor(max_workers=self.stats["workers"]) as pool:
+            return [result for results in pool.map(scan_files, [root] * len(batches), batches)
+                    for result in results]
+
+    def findings(self):
+        """Découvertes triées par chemin puis ligne"""
+        return [{"path": path, "line": line, "rule": rule, "preview": preview}
+                for path, (_, _, _, findings) in sorted(self.results.items()) if findings
+                for rule, line, preview in findings]
+
+    def summary(self):
+        """Section `secrets` des preuves"""
+        findings = self.findings()
+        by_rule = {}
+        for finding in findings:
+            by_rule[finding["rule"]] = by_rule.get(finding["rule"], 0) + 1
+        return {
+            "files_scanned": sum(1 for result in self.results.values() if result[3] is not None),
+            "rules": len(SECRET_RULES),
+            "findings_count": len(findings),
+            "files_with_findings": len({finding["path"] for finding in findings}),
+            "by_rule": dict(sorted(by_rule.items())),
+            "findings": findings[:MAX_REPORTED_FINDINGS],
+            "skipped": dict(sorted(self.skipped.items()))
+        }
+
+    def statistics(self):
+        """Compteurs de cette exécution (métriques, pas preuves: ils varient d'une exécution à l'autre)"""
+        return dict(self.stats)
+
+def scan_files(root, paths):
+    """Analyse une liste de fichiers sur disque (exécuté dans les processus de travail)"""
+    results = []
+    for path in paths:
+        try:
+            with open(os.path.join(root, path), 'rb') as f:
+                content = f.read()
+        except OSError:
+            content = None
+        results.append((path, scan_content(content)))
+    return results
+
+def scan_content(content):
+    """Découvertes [(règle, ligne, aperçu masqué)] d'un contenu; None pour un binaire ou un fichier illisible"""
+    if content is None or b'\0' in content[:SNIFF_BYTES]:
+        return None
+    lowered = content.lower()
+    candidates = sorted({match.start() for pattern in ANCHOR_PATTERNS for match in pattern.finditer(lowered)})
+    findings = []
+    covered = 0
+    for position in candidates:
+        if position < covered:
+            continue
+        match = SECRET_PATTERN.match(content, position)
+        if match is None:
+            continue
+        rule = match.lastgroup
+        value = match.group(f"v_{rule}") if rule in ENTROPY_THRESHOLDS else match.group()
+        if rule in ENTROPY_THRESHOLDS:
+            if PLACEHOLDER.search(value) or shannon_entropy(value) < ENTROPY_THRESHOLDS[rule]:
+                continue
+            # Jeton reconnaissable derrière une affectation générique: règle précise
+            specific = SPECIFIC_PATTERN.search(value)
+            if specific:
+                rule = specific.lastgroup
+        # Seule une découverte retenue masque les candidats qu'elle contient: une
+        # affectation générique écartée (entropie) laisse chercher un jeton imbriqué
+        covered = match.end()
+        start = content.rfind(b'\n', 0, match.start()) + 1
+        end = content.find(b'\n', match.end())
+        if ALLOW_MARKER in content[start:end if end >= 0 else len(content)]:
+            continue
+        findings.append((rule, content.count(b'\n', 0, match.start()) + 1, redact(value)))
+    return findings
+
+def shannon_entropy(value):
+    """Entropie de Shannon, en bits par caractère"""
+    counts = {}
+    for byte in value:
+        counts[byte] = counts.get(byte, 0) + 1
+    length = len(value)
+    return -sum(count / length * math.log2(count / length) for count in counts.values())
+
+def redact(value):
+    """Aperçu d'un secret: ses 4 premiers caractères et sa longueur"""
+    text = value.decode('utf-8', errors='replace')
+    return f"{text[:4]}…({len(text)})"
+
+# Analyse active pour la collecte en cours (None = analyse en mémoire, sans cache)
+_active_scanner = None
+
+def get_secret_scanner():
+    """Analyse à jour pour l'instantané courant"""
+    global _active_scanner
+    if _active_scanner is None:
+        _active_scanner = SecretScanner()
+    return _active_scanner.refresh()
+
+def set_secret_scanner(scanner):
+    global _active_scanner
+    _active_scanner = scanner
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Recherche de secrets dans le dépôt")
+    parser.add_argument('root', nargs='?', default='.', help="racine du dépôt (défaut: répertoire courant)")
+    parser.add_argument('--full', action='store_true', help="ignorer le cache et tout réanalyser")
+    parser.add_argument('--workers', type=int, default=SCAN_WORKERS, help="processus d'analyse (défaut: un par cœur)")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    start = time.perf_counter()
+    cache_path = None if args.full else os.path.join(args.root, SECRET_CACHE_PATH)
+    scanner = SecretScanner(cache_path, args.workers)
+    scanner.refresh(RepoSnapshot.from_directory(args.root))
+    scanner.save()
+    summary = scanner.summary()
+    for finding in scanner.findings():
+        print(f"🔑 {finding['path']}:{finding['line']}: {finding['rule']} ({finding['preview']})")
+    scan = scanner.statistics()
+    print(f"{'❌' if summary['findings_count'] else '✅'} {summary['findings_count']} secret(s) dans "
+          f"{summary['files_with_findings']} fichier(s) | {summary['files_scanned']} fichiers, "
+          f"{scan['scanned']} analysés, {scan['reused']} en cache ({time.perf_counter() - start:.3f}s)")
+    sys.exit(1 if summary["findings_count"] else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,408 @@
+#!/usr/bin/env python3
+"""Index local des avis de sécurité OSV et correspondance avec les dépendances épinglées
+
+L'export OSV (répertoire de fichiers JSON ou archive `all.zip` d'osv.dev)
+est analysé une seule fois: l'index regroupe les avis par paquet, avec les
+versions explicitement touchées et les intervalles de versions. Vérifier
+les dépendances d'un dépôt ne demande ensuite que quelques recherches en
+mémoire, sans accès réseau.
+
+    curl -sSfLo /tmp/osv-pypi.zip https://osv-vulnerabilities.storage.googleapis.com/PyPI/all.zip
+    python scripts/vulnerability_index.py /tmp/osv-pypi.zip
+"""
+import argparse
+import functools
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+import zipfile
+from datetime import datetime
+
+try:
+    import tomllib
+except ImportError:
+    # Python < 3.11: poetry.lock et uv.lock ne sont pas lus
+    tomllib = None
+
+VULNERABILITY_INDEX_PATH = os.getenv('OSV_INDEX', 'evidence/.osv_index.json')
+INDEX_VERSION = 1
+# Écosystèmes OSV retenus dans l'index (ceux des fichiers de dépendances lus)
+ECOSYSTEMS = {"PyPI"}
+
+# Fichiers de dépendances à la racine du dépôt (motifs fnmatch, aussi déclarés
+# comme dépendances des vérifications)
+DEPENDENCY_FILES = ("requirements*.txt", "requirements/*.txt", "Pipfile.lock", "poetry.lock", "uv.lock")
+# Fichiers qu'un requirements.txt inclut le plus souvent (-r/-c), en plus des
+# précédents: déclarés comme dépendances des vérifications. Toute inclusion
+# présente dans le dépôt est lue, mais une autre ne rafraîchit pas le cache.
+INCLUDED_FILES = ("constraints*.txt", "*requirements*.in", "requirements/*")
+
+# PEP 440: époque, version, pré-version, post-version, développement, local
+VERSION_PATTERN = re.compile(r'''
+    v?(?:(?P<epoch>\d+)!)?(?P<release>\d+(?:\.\d+)*)
+    (?:[-_.]?(?P<pre_label>a|alpha|b|beta|c|rc|pre|preview)[-_.]?(?P<pre>\d*))?
+    (?:-(?P<post_implicit>\d+)|[-_.]?(?P<post_label>post|rev|r)[-_.]?(?P<post>\d*))?
+    (?:[-_.]?(?P<dev_label>dev)[-_.]?(?P<dev>\d*))?
+    (?:\+[a-z0-9]+(?:[-_.][a-z0-9]+)*)?
+''', re.VERBOSE)
+PRE_RELEASE_ORDER = {"a": 0, "alpha": 0, "b": 1, "beta": 1, "c": 2, "rc": 2, "pre": 2, "preview": 2}
+REQUIREMENT_PATTERN = re.compile(r'^([A-Za-z0-9][A-Za-z0-9._-]*)\s*(?:\[[^\]]*\])?\s*(.*)$')
+# Inclusion d'un autre fichier: exigences (-r) ou contraintes (-c)
+INCLUDE_PATTERN = re.compile(r'^(?:-r|-c|--requirement|--constraint)(?:\s*=\s*|\s+)?(\S+)$')
+
+class VulnerabilityIndex:
+    """Avis OSV indexés par paquet (nom normalisé PEP 503)
+
+    Pour chaque paquet: versions touchées explicitement (recherche directe)
+    et intervalles [introduite, corrigée) ou [introduite, dernière touchée].
+    """
+
+    def __init__(self, path=VULNERABILITY_INDEX_PATH):
+        self.path = path
+        self.advisories = []
+        self.packages = {}
+        self.positions = {}
+        self.source = None
+        self.available = False
+        if path is not None:
+            self.load()
+
+    def load(self):
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") != INDEX_VERSION:
+            return
+        self.advisories = data["advisories"]
+        self.packages = data["packages"]
+        self.positions = {advisory[0]: index for index, advisory in enumerate(self.advisories)}
+        self.source = data["source"]
+        self.available = True
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(json.dumps({"version": INDEX_VERSION, "source": self.source, "advisories": self.advisories,
+                                "packages": self.packages}, separators=(',', ':')))
+        os.replace(tmp_path, self.path)
+
+    # ---------- Construction ----------
+
+    def build(self, source):
+        """Indexe un export OSV; retourne False si l'index correspond déjà à cet export"""
+        fingerprint = source_fingerprint(source)
+        if self.available and self.source and self.source.get("fingerprint") == fingerprint:
+            return False
+        self.advisories = []
+        self.packages = {}
+        self.positions = {}
+        for document in read_osv_documents(source):
+            self.add(document)
+        self.source = {"path": os.path.abspath(source), "fingerprint": fingerprint,
+                       "built": datetime.utcnow().isoformat(), "advisories": len(self.advisories)}
+        self.available = True
+        return True
+
+    def add(self, advisory):
+        """Ajoute un avis OSV (les avis retirés et les autres écosystèmes sont ignorés)
+
+        Un identifiant déjà indexé (même avis dans deux fichiers de l'export)
+        garde sa première description; ses versions et intervalles s'ajoutent
+        sans doublon.
+        """
+        if advisory.get("withdrawn"):
+            return
+        index = self.positions.get(advisory["id"])
+        for affected in advisory.get("affected", []):
+            package = affected.get("package", {})
+            if package.get("ecosystem") not in ECOSYSTEMS or not package.get("name"):
+                continue
+            intervals = [interval for affected_range in affected.get("ranges", [])
+                         if affected_range.get("type") in ("ECOSYSTEM", "SEMVER")
+                         for interval in range_intervals(affected_range.get("events", []))]
+            versions = affected.get("versions", [])
+            if not intervals and not versions:
+                continue
+            if index is None:
+                index = len(self.advisories)
+                self.positions[advisory["id"]] = index
+                self.advisories.append([advisory["id"], advisory.get("aliases", []),
+                                        (advisory.get("summary") or advisory.get("details") or "")[:200],
+                                        advisory_severity(advisory)])
+            entry = self.packages.setdefault(normalize_name(package["name"]), {"versions": {}, "ranges": []})
+            for version in versions:
+                matches = entry["versions"].setdefault(version, [])
+                if index not in matches:
+                    matches.append(index)
+            for introduced, fixed, last_affected in intervals:
+                if [index, introduced, fixed, last_affected] not in entry["ranges"]:
+                    entry["ranges"].append([index, introduced, fixed, last_affected])
+
+    # ---------- Recherche ----------
+
+    def lookup(self, name, version):
+        """Avis qui touchent une version d'un paquet: [{advisory, aliases, summary, severity, fixed}]"""
+        entry = self.packages.get(normalize_name(name))
+        if entry is None:
+            return []
+        matches = {index: None for index in entry["versions"].get(version, [])}
+        key = version_key(version)
+        fixes = {}
+        for index, introduced, fixed, last_affected in entry["ranges"]:
+            if fixed:
+                fixes.setdefault(index, []).append(fixed)
+            if key is not None and index not in matches and in_interval(key, introduced, fixed, last_affected):
+                matches[index] = None
+        findings = []
+        for index in sorted(matches):
+            advisory_id, aliases, summary, severity = self.advisories[index]
+            # Première version corrigée au-delà de la version installée
+            fixed = sorted((fix for fix in fixes.get(index, []) if key is None or
+                            (version_key(fix) is not None and version_key(fix) > key)), key=sort_key)
+            findings.append({"advisory": advisory_id, "aliases": aliases, "summary": summary,
+                             "severity": severity, "fixed": fixed[0] if fixed else None})
+        return findings
+
+    def fingerprint(self):
+        """Identité de l'index (format et export OSV source); None sans index"""
+        if not self.available:
+            return None
+        return f"{INDEX_VERSION}:{self.source.get('fingerprint') if self.source else None}"
+
+    def summary(self):
+        return {
+            "available": self.available,
+            "advisories": len(self.advisories),
+            "packages": len(self.packages),
+            "built": self.source.get("built") if self.source else None
+        }
+
+def read_osv_documents(source):
+    """Avis d'un export OSV: répertoire (récursif) ou archive zip de fichiers JSON"""
+    if zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as archive:
+            for name in archive.namelist():
+                if name.endswith('.json'):
+                    yield json.loads(archive.read(name))
+        return
+    for root, _, files in os.walk(source):
+        for file in sorted(files):
+            if file.endswith('.json'):
+                with open(os.path.join(root, file), 'rb') as f:
+                    yield json.load(f)
+
+def source_fingerprint(source):
+    """Empreinte d'un export: l'index n'est reconstruit que s'il change
+
+    Archive: contenu (un téléchargement identique garde la même empreinte);
+    répertoire: chemins, tailles et dates des fichiers.
+    """
+    digest = hashlib.sha256()
+    if os.path.isdir(source):
+        for root, _, files in sorted(os.walk(source)):
+            for file in sorted(files):
+                stat = os.stat(os.path.join(root, file))
+                digest.update(f"{os.path.relpath(os.path.join(root, file), source)}:{stat.st_size}:"
+                              f"{stat.st_mtime_ns}\n".encode())
+    else:
+        with open(source, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+    return digest.hexdigest()[:16]
+
+def range_intervals(events):
+    """Intervalles [introduite, corrigée, dernière touchée] d'une plage OSV (événements triés par version)"""
+    intervals = []
+    introduced = None
+    opened = False
+    for event in sorted(events, key=lambda event: sort_key(next(iter(event.values()), ''))):
+        if "introduced" in event:
+            if not opened:
+                introduced = None if event["introduced"] == "0" else event["introduced"]
+                opened = True
+        elif opened and ("fixed" in event or "last_affected" in event):
+            intervals.append([introduced, event.get("fixed"), event.get("last_affected")])
+            opened = False
+    if opened:
+        intervals.append([introduced, None, None])
+    return intervals
+
+def in_interval(key, introduced, fixed, last_affected):
+    if introduced is not None:
+        lower = version_key(introduced)
+        if lower is None or key < lower:
+            return False
+    if fixed is not None:
+        upper = version_key(fixed)
+        if upper is None or key >= upper:
+            return False
+    if last_affected is not None:
+        upper = version_key(last_affected)
+        if upper is None or key > upper:
+            return False
+    return True
+
+def advisory_severity(advisory):
+    """Gravité déclarée par la base d'origine (GHSA: LOW...CRITICAL), sinon vecteur CVSS"""
+    severity = (advisory.get("database_specific") or {}).get("severity")
+    if severity:
+        return severity.upper()
+    for score in advisory.get("severity", []):
+        if score.get("type", "").startswith("CVSS"):
+            return score.get("score")
+    return None
+
+@functools.lru_cache(maxsize=65536)
+def version_key(version):
+    """Clé de comparaison PEP 440 (None si la version n'est pas reconnue)"""
+    match = VERSION_PATTERN.fullmatch(version.strip().lower())
+    if match is None:
+        return None
+    release = tuple(int(part) for part in match["release"].split('.'))
+    while len(release) > 1 and release[-1] == 0:
+        release = release[:-1]
+    has_post = match["post_implicit"] is not None or match["post_label"] is not None
+    has_dev = match["dev_label"] is not None
+    if match["pre_label"]:
+        pre = (PRE_RELEASE_ORDER[match["pre_label"]], int(match["pre"] or 0))
+    elif has_dev and not has_post:
+        # 1.0.dev1 précède 1.0a1
+        pre = (-1, 0)
+    else:
+        pre = (3, 0)
+    if match["post_implicit"] is not None:
+        post = int(match["post_implicit"])
+    else:
+        post = int(match["post"] or 0) if has_post else -1
+    dev = int(match["dev"] or 0) if has_dev else float('inf')
+    return (int(match["epoch"] or 0), release, pre, post, dev)
+
+def sort_key(version):
+    """Tri tolérant: versions reconnues d'abord (ordre PEP 440), les autres ensuite"""
+    key = version_key(version)
+    return (0, key, '') if key is not None else (1, (), version)
+
+def normalize_name(name):
+    """Nom de paquet normalisé (PEP 503)"""
+    return re.sub(r'[-_.]+', '-', name).lower()
+
+# ========== FICHIERS DE DÉPENDANCES ==========
+
+def parse_dependency_file(path, content):
+    """[(paquet, version épinglée ou None, spécification)] d'un fichier de dépendances"""
+    name = os.path.basename(path)
+    if name == "Pipfile.lock":
+        return parse_pipfile_lock(content)
+    if name in ("poetry.lock", "uv.lock"):
+        return parse_toml_lock(content)
+    return parse_requirements(content)
+
+def requirement_lines(content):
+    """Lignes utiles d'un requirements.txt (sans commentaires, lignes prolongées par `\\` jointes)"""
+    for line in content.replace('\\\n', ' ').splitlines():
+        line = re.sub(r'(^|\s)#.*', '', line).strip()
+        if line:
+            yield line
+
+def requirement_includes(path, content):
+    """Fichiers inclus par `-r`/`-c` (chemins relatifs au fichier, ramenés à la racine du dépôt)
+
+    Les inclusions d'URL ou hors du dépôt sont ignorées.
+    """
+    if not os.path.basename(path).endswith(('.txt', '.in')):
+        return []
+    includes = []
+    for line in requirement_lines(content):
+        match = INCLUDE_PATTERN.match(line)
+        if not match or '://' in match[1] or os.path.isabs(match[1]):
+            continue
+        included = os.path.normpath(os.path.join(os.path.dirname(path), match[1])).replace(os.sep, '/')
+        if included != '..' and not included.startswith('../'):
+            includes.append(included)
+    return includes
+
+def parse_requirements(content):
+    dependencies = []
+    for line in requirement_lines(content):
+        # Options (-r/-c: fichiers inclus, lus à part par requirement_includes)
+        if line.startswith('-'):
+            continue
+        line = line.split(';', 1)[0].split(' --', 1)[0].strip()
+        match = REQUIREMENT_PATTERN.match(line)
+        if not match:
+            continue
+        specifier = match[2].replace(' ', '')
+        pinned = re.fullmatch(r'===?([^,*]+)', specifier)
+        dependencies.append((match[1], pinned[1] if pinned else None, specifier))
+    return dependencies
+
+def parse_pipfile_lock(content):
+    try:
+        data = json.loads(content)
+    except ValueError:
+        return []
+    dependencies = []
+    for section in ("default", "develop"):
+        for name, details in sorted((data.get(section) or {}).items()):
+            specifier = details.get("version", "") if isinstance(details, dict) else ""
+            pinned = specifier[2:] if specifier.startswith("==") else None
+            dependencies.append((name, pinned, specifier))
+    return dependencies
+
+def parse_toml_lock(content):
+    if tomllib is None:
+        return []
+    try:
+        data = tomllib.loads(content)
+    except ValueError:
+        return []
+    return [(package["name"], package.get("version"), f"=={package['version']}" if package.get("version") else "")
+            for package in data.get("package", []) if package.get("name")]
+
+# Index actif (chargé une fois par processus, partagé par les dépôts d'un audit de flotte)
+_active_index = None
+
+def get_vulnerability_index():
+    global _active_index
+    if _active_index is None:
+        _active_index = VulnerabilityIndex()
+    return _active_index
+
+def set_vulnerability_index(index):
+    global _active_index
+    _active_index = index
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Index local des avis de sécurité OSV")
+    parser.add_argument('source', help="export OSV: répertoire de fichiers JSON ou archive all.zip")
+    parser.add_argument('--output', default=VULNERABILITY_INDEX_PATH,
+                        help=f"fichier d'index (défaut: {VULNERABILITY_INDEX_PATH})")
+    parser.add_argument('--force', action='store_true', help="reconstruire même si l'export n'a pas changé")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    start = time.perf_counter()
+    index = VulnerabilityIndex(None if args.force else args.output)
+    index.path = args.output
+    try:
+        built = index.build(args.source)
+    except (OSError, ValueError, zipfile.BadZipFile) as e:
+        print(f"❌ Export OSV illisible: {e}")
+        sys.exit(1)
+    if not built:
+        print(f"♻️  Index à jour ({index.source['advisories']} avis): {args.output}")
+        return
+    index.save()
+    summary = index.summary()
+    print(f"✅ {summary['advisories']} avis indexés pour {summary['packages']} paquets "
+          f"({time.perf_counter() - start:.3f}s): {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""Mode veille: retour de conformité immédiat pendant l'édition du dépôt
+
+Preuves, résultats OPA et caches restent en mémoire. À chaque rafale de
+modifications (inotify, sinon scrutation), seuls les contrôles, sections de
+preuves et packages qui dépendent des fichiers touchés sont recalculés, puis
+l'écart de score est affiché.
+
+    python scripts/watch_compliance.py
+"""
+import argparse
+import contextlib
+import io
+import os
+import time
+
+from check_cache import CheckCache, affects, set_check_cache, set_dependency_recorder
+from collect_real_evidence import (CHECKS, WHOLE_TREE_SECTIONS, calculate_realistic_score,
+                                   collect_github_settings, evidence_sections)
+from control_registry import ControlRegistry, control_selection, set_control_registry
+from evaluate_with_opa import build_results, discover_policies, evaluate_policy_outputs, resolve_backend
+from file_watcher import RESCAN, open_watcher, wait_for_changes
+from pipeline_metrics import Metrics, set_metrics
+from policy_index import POLICY_INDEX_PATH, PolicyIndex, set_policy_index
+from repo_snapshot import IGNORED_DIRS, RepoSnapshot, set_snapshot
+from workflow_analyzer import WORKFLOW_CACHE_PATH, WorkflowAnalyzer, set_workflow_analyzer
+
+# Sorties des scripts: les écrire ne doit pas relancer une évaluation
+WATCH_IGNORED_DIRS = IGNORED_DIRS | {'evidence', 'reports', 'history', '__pycache__', 'node_modules'}
+
+class ComplianceWatch:
+    """État de conformité d'un dépôt, mis à jour fichier par fichier"""
+
+    def __init__(self, backend="python", policies_dir="policies", controls=None, repository=None):
+        self.backend = backend
+        self.policies_dir = policies_dir
+        self.controls = controls
+        self.repository = repository or os.getenv('GITHUB_REPOSITORY', 'unknown')
+        self.registry = ControlRegistry(CHECKS)
+        self.snapshot = None
+        self.check_cache = None
+        self.policy_index = None
+        self.workflow_analyzer = None
+        self.settings = None
+        self.evidence = {}
+        # section -> chemins (motifs) lus pendant sa dernière collecte
+        self.section_dependencies = {}
+        self.policies = []
+        self.outputs = {}
+        self.results = None
+
+    def start(self):
+        """Collecte et évaluation complètes; les paramètres GitHub ne sont lus qu'ici"""
+        self.snapshot = RepoSnapshot.from_directory('.', WATCH_IGNORED_DIRS)
+        set_snapshot(self.snapshot)
+        self.check_cache = CheckCache()
+        set_check_cache(self.check_cache)
+        self.policy_index = PolicyIndex(POLICY_INDEX_PATH)
+        set_policy_index(self.policy_index)
+        self.workflow_analyzer = WorkflowAnalyzer(WORKFLOW_CACHE_PATH)
+        set_workflow_analyzer(self.workflow_analyzer)
+        self.settings = collect_github_settings(self.repository)
+        set_control_registry(self.registry)
+        self.evidence = {"repository": self.repository, "iso27001_version": "2022"}
+        self.collect_sections([name for name, _ in evidence_sections()])
+        self.policies = discover_policies(self.policies_dir)
+        self.evaluate(self.policies)
+
+    def stop(self):
+        """Conserve les caches pour la prochaine collecte"""
+        self.check_cache.save()
+        if self.policy_index.snapshot is not None:
+            self.policy_index.save()
+        if self.workflow_analyzer.snapshot is not None:
+            self.workflow_analyzer.save()
+        set_check_cache(None)
+        set_policy_index(None)
+        set_workflow_analyzer(None)
+        set_control_registry(None)
+
+    # ---------- Mise à jour ----------
+
+    def apply(self, paths):
+        """Recalcule ce qui dépend des chemins modifiés; retourne l'écart (voir `delta`)"""
+        start = time.perf_counter()
+        before = self.state()
+        if RESCAN in paths:
+            self.snapshot = RepoSnapshot.from_directory('.', WATCH_IGNORED_DIRS)
+            set_snapshot(self.snapshot)
+        else:
+            for path in paths:
+                self.snapshot.refresh(path, WATCH_IGNORED_DIRS)
+        self.check_cache.new_session()
+        # Registre neuf: ses résultats mémorisés datent de la collecte précédente
+        self.registry = ControlRegistry(CHECKS)
+        set_control_registry(self.registry)
+
+        controls = [control_id for control_id in self.registry.select(self.controls)
+                    if RESCAN in paths or self.registry.reads_whole_tree(control_id)
+                    or affects(paths, self.registry.dependencies(control_id))]
+        sections = [name for name, dependencies in self.section_dependencies.items()
+                    if name != "controles" and (RESCAN in paths or name in WHOLE_TREE_SECTIONS
+                                                or affects(paths, dependencies))]
+        changed_sections = set()
+        if controls:
+            updated = dict(self.evidence["controles"], **self.registry.evaluate(controls))
+            if updated != self.evidence["controles"]:
+                self.evidence["controles"] = updated
+                self.evidence["score_realiste"] = calculate_realistic_score(updated)
+                changed_sections.add("controles")
+        changed_sections.update(self.collect_sections(sections))
+
+        # Fichier .rego ou répertoire de politiques ajouté, modifié ou supprimé
+        rego_changed = RESCAN in paths or any(
+            path.endswith('.rego') or not self.snapshot.is_file(path) for path in paths
+            if path == self.policies_dir or path.startswith(f"{self.policies_dir}/"))
+        policies = discover_policies(self.policies_dir) if rego_changed else self.policies
+        previous = {policy["package"]: policy["sha256"] for policy in self.policies}
+        stale = [policy for policy in policies
+                 if previous.get(policy["package"]) != policy["sha256"]
+                 or any(not path or path[0] in changed_sections for path in policy["input_paths"])]
+        self.policies = policies
+        if stale or rego_changed:
+            self.evaluate(stale)
+
+        return self.delta(before, paths, controls, sections, stale, time.perf_counter() - start)
+
+    def collect_sections(self, names):
+        """Recollecte des sections en notant leurs dépendances; retourne celles qui ont changé"""
+        changed = set()
+        for name, collect in evidence_sections(self.settings, self.controls):
+            if name not in names:
+                continue
+            recorder = set()
+            set_dependency_recorder(recorder)
+            try:
+                value = collect()
+            finally:
+                set_dependency_recorder(None)
+            self.section_dependencies[name] = recorder
+            if self.evidence.get(name) != value:
+                self.evidence[name] = value
+                changed.add(name)
+        if "controles" in changed:
+            self.evidence["score_realiste"] = calculate_realistic_score(self.evidence["controles"])
+        return changed
+
+    def evaluate(self, stale):
+        """Réévalue les packages périmés et recalcule les scores à partir de toutes les sorties"""
+        packages = {policy["package"] for policy in self.policies}
+        self.outputs = {package: output for package, output in self.outputs.items() if package in packages}
+        # Les messages par package noieraient l'écart affiché
+        with contextlib.redirect_stdout(io.StringIO()):
+            if stale:
+                self.outputs.update(evaluate_policy_outputs(stale, [self.evidence], self.backend)[0])
+            self.results = build_results(self.policies, self.outputs)
+
+    # ---------- Affichage ----------
+
+    def state(self):
+        return {
+            "overall_score": self.results["overall_score"] if self.results else None,
+            "score_realiste": self.evidence.get("score_realiste"),
+            "scores": dict(self.results["scores"]) if self.results else {},
+            "controles": dict(self.evidence.get("controles", {}))
+        }
+
+    def delta(self, before, paths, controls, sections, packages, elapsed):
+        after = self.state()
+        return {
+            "paths": sorted(path or '.' for path in paths),
+            "recomputed": {"controls": controls, "sections": sections,
+                           "packages": [policy["package"] for policy in packages]},
+            "overall_score": (before["overall_score"], after["overall_score"]),
+            "score_realiste": (before["score_realiste"], after["score_realiste"]),
+            "packages": {package: (before["scores"].get(package), score)
+                         for package, score in after["scores"].items()
+                         if before["scores"].get(package) != score},
+            "controls": {control_id: (before["controles"].get(control_id), value)
+                         for control_id, value in after["controles"].items()
+                         if before["controles"].get(control_id) != value},
+            "seconds": elapsed
+        }
+
+def format_change(before, after, unit="%"):
+    if before == after:
+        return f"{after}{unit}"
+    if before is None or after is None:
+        return f"{before}{unit} → {after}{unit}"
+    return f"{before}{unit} → {after}{unit} ({after - before:+.1f})"
+
+def print_delta(delta):
+    print(f"📝 {', '.join(delta['paths'][:5])}" + (f" (+{len(delta['paths']) - 5})" if len(delta['paths']) > 5 else ""))
+    recomputed = delta["recomputed"]
+    print(f"   🔁 Recalculés: {len(recomputed['controls'])} contrôle(s), "
+          f"{len(recomputed['sections'])} section(s), {len(recomputed['packages'])} package(s)"
+          f" en {delta['seconds'] * 1000:.0f} ms")
+    print(f"   🎯 Score global: {format_change(*delta['overall_score'])}"
+          f" | réaliste: {format_change(*delta['score_realiste'])}")
+    for package, (before, after) in sorted(delta["packages"].items()):
+        print(f"   📦 {package}: {format_change(before, after)}")
+    for control_id, (before, after) in sorted(delta["controls"].items()):
+        print(f"   {'✅' if after else '❌'} {control_id}: {before} → {after}")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Mode veille: réévalue la conformité à chaque modification")
+    parser.add_argument('--backend', choices=['bundle', 'server', 'subprocess', 'python'],
+                        default=os.getenv('OPA_BACKEND', 'python'),
+                        help="moteur d'évaluation (défaut: évaluateur intégré, sans processus opa)")
+    parser.add_argument('--policies', default='policies', help="répertoire des politiques .rego")
+    parser.add_argument('--controls', nargs='+', metavar='ID', type=control_selection,
+                        help="ne suivre que ces thèmes (A.8) ou contrôles (A.5.15)")
+    parser.add_argument('--debounce', type=float, default=0.2,
+                        help="secondes sans événement avant de recalculer (défaut: 0.2)")
+    parser.add_argument('--poll', action='store_true', help="scrutation périodique au lieu d'inotify")
+    parser.add_argument('--interval', type=float, default=0.5, help="période de scrutation, en secondes")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    set_metrics(Metrics("watch_compliance"))
+    start = time.perf_counter()
+    watch = ComplianceWatch(backend=resolve_backend(args.backend), policies_dir=args.policies,
+                            controls=args.controls)
+    watch.start()
+    watcher = open_watcher('.', WATCH_IGNORED_DIRS, polling=args.poll, interval=args.interval)
+    state = watch.state()
+    print(f"👀 Surveillance de {os.getcwd()} ({type(watcher).__name__}, {time.perf_counter() - start:.3f}s)")
+    print(f"🎯 Score global: {state['overall_score']}% | réaliste: {state['score_realiste']}%")
+    try:
+        while True:
+            paths = wait_for_changes(watcher, args.debounce)
+            print_delta(watch.apply(paths))
+    except KeyboardInterrupt:
+        print("👋 Arrêt de la surveillance")
+    finally:
+        watcher.close()
+        watch.stop()
+
+if __name__ == "__main__":
+    main()
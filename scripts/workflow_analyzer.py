@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+import hashlib
+import json
+import os
+import re
+
+import yaml
+
+from repo_snapshot import get_snapshot
+
+WORKFLOW_CACHE_PATH = 'evidence/.workflow_cache.json'
+CACHE_VERSION = 1
+WORKFLOWS_DIR = '.github/workflows'
+WORKFLOW_EXTENSIONS = ('.yml', '.yaml')
+
+# Les modèles en cache ne valent que pour ce code d'analyse (source du module)
+with open(__file__, 'rb') as _source:
+    PARSER_FINGERPRINT = hashlib.sha256(_source.read()).hexdigest()[:16]
+
+# libyaml si PyYAML a été compilé avec, sinon l'analyseur Python (plus lent)
+YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+# Référence d'action épinglée: SHA complet du commit (ou empreinte d'image docker)
+PINNED_REF = re.compile(r'[0-9a-f]{40}|sha256:[0-9a-f]{64}')
+
+# Outils de sécurité reconnus, par action (préfixe owner/repo) ou par commande
+CODE_SCANNING_ACTIONS = ('github/codeql-action', 'aquasecurity/trivy-action', 'snyk/actions',
+                         'returntocorp/semgrep-action', 'semgrep/semgrep-action', 'securego/gosec',
+                         'anchore/scan-action', 'ossf/scorecard-action', 'pycqa/bandit-action',
+                         'shiftleft/scan-action', 'checkmarx/kics-github-action', 'bridgecrewio/checkov-action')
+CODE_SCANNING_COMMANDS = ('codeql', 'semgrep', 'bandit', 'trivy', 'grype', 'gosec', 'checkov', 'tfsec',
+                          'snyk', 'zap-baseline', 'brakeman', 'njsscan')
+LICENSE_ACTIONS = ('fossas/fossa-action', 'fsfe/reuse-action', 'github/licensed', 'jonabc/setup-licensed',
+                   'mikaelvesavuori/license-compliance-action')
+LICENSE_COMMANDS = ('pip-licenses', 'license-checker', 'licensee', 'licensed', 'reuse lint', 'scancode',
+                    'cargo deny', 'go-licenses', 'liccheck')
+# Contrôles de sécurité exécutés en CI (analyse de code, dépendances, secrets, politiques)
+# Installer un outil (setup-opa, `opa version`) n'est pas un contrôle: pour OPA et
+# conftest, seules les commandes qui évaluent des politiques comptent
+SECURITY_GATE_ACTIONS = CODE_SCANNING_ACTIONS + ('actions/dependency-review-action', 'gitleaks/gitleaks-action',
+                                                 'trufflesecurity/trufflehog', 'instrumenta/conftest-action')
+# Le pipeline de conformité de ce dépôt (collecte puis `opa eval` des politiques) en est un;
+# SECURITY_GATE_COMMANDS (séparées par des virgules) en ajoute d'autres, ex: "make audit"
+COMPLIANCE_PIPELINE_COMMANDS = tuple(f"{python} scripts/{script}" for python in ('python', 'python3')
+                                     for script in ('run_pipeline.py', 'evaluate_with_opa.py'))
+EXTRA_SECURITY_GATE_COMMANDS = tuple(' '.join(command.split())
+                                     for command in os.getenv('SECURITY_GATE_COMMANDS', '').split(',')
+                                     if command.strip())
+SECURITY_GATE_COMMANDS = (CODE_SCANNING_COMMANDS
+                          + ('opa eval', 'opa test', 'conftest test', 'conftest verify', 'gitleaks', 'trufflehog',
+                             'pip-audit', 'safety', 'npm audit', 'osv-scanner')
+                          + COMPLIANCE_PIPELINE_COMMANDS + EXTRA_SECURITY_GATE_COMMANDS)
+
+# Installation d'outils dans une étape `run`: téléchargement ou gestionnaire de paquets
+DOWNLOAD_COMMAND = re.compile(r'\b(curl|wget)\b[^\n|;&]*?(https?://[^\s"\'|;&)]+)')
+PACKAGE_INSTALL = re.compile(r'\b(pip3?|apt-get|apt|npm|go|brew|gem|cargo)\s+install\b([^\n|;&]*)')
+CHECKSUM_VERIFICATION = re.compile(r'\b(?:sha256sum|sha512sum|shasum|gpg\s+--verify|cosign\s+verify|--require-hashes)\b')
+
+class WorkflowAnalyzer:
+    """Modèle normalisé des workflows GitHub Actions, relu seulement quand un fichier change
+
+    Chaque workflow est analysé une fois par contenu (empreinte SHA-256):
+    le modèle est mémorisé en mémoire et sur disque (cache invalidé si le
+    code d'analyse change). Toutes les
+    vérifications fondées sur les workflows interrogent ce modèle.
+    """
+
+    def __init__(self, cache_path=None):
+        self.cache_path = cache_path
+        # sha256 du contenu -> modèle
+        self.models = {}
+        self.snapshot = None
+        self.generation = None
+        self.workflows = []
+        self.stats = {"parsed": 0, "reused": 0}
+        if cache_path is not None:
+            self.load()
+
+    def load(self):
+        try:
+            with open(self.cache_path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") == CACHE_VERSION and data.get("parser") == PARSER_FINGERPRINT:
+            self.models = data.get("models", {})
+
+    def save(self):
+        """Conserve les modèles des workflows actuels (les anciennes versions sont oubliées)"""
+        if self.cache_path is None:
+            return
+        current = {workflow["sha256"] for workflow in self.workflows}
+        os.makedirs(os.path.dirname(self.cache_path) or '.', exist_ok=True)
+        tmp_path = f"{self.cache_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(json.dumps({"version": CACHE_VERSION, "parser": PARSER_FINGERPRINT,
+                                "models": {sha: model for sha, model in self.models.items() if sha in current}},
+                               separators=(',', ':')))
+        os.replace(tmp_path, self.cache_path)
+
+    def refresh(self, snapshot=None):
+        """Modèles à jour pour un instantané (une seule fois par état de l'instantané)"""
+        snapshot = snapshot or get_snapshot()
+        if snapshot is self.snapshot and snapshot.generation == self.generation:
+            return self
+        workflows = []
+        for name in sorted(snapshot.listdir(WORKFLOWS_DIR)):
+            path = f"{WORKFLOWS_DIR}/{name}"
+            if not name.endswith(WORKFLOW_EXTENSIONS) or not snapshot.is_file(path):
+                continue
+            content = snapshot.read_bytes(path) or b''
+            digest = hashlib.sha256(content).hexdigest()
+            model = self.models.get(digest)
+            if model is None:
+                model = parse_workflow(content)
+                self.models[digest] = model
+                self.stats["parsed"] += 1
+            else:
+                self.stats["reused"] += 1
+            workflows.append(dict(model, path=path, sha256=digest))
+        self.workflows = workflows
+        self.snapshot = snapshot
+        self.generation = snapshot.generation
+        return self
+
+    # ---------- Requêtes ----------
+
+    def valid_workflows(self):
+        return [workflow for workflow in self.workflows if not workflow.get("error") and workflow["jobs"]]
+
+    def actions(self):
+        return [dict(action, workflow=workflow["path"]) for workflow in self.valid_workflows()
+                for action in workflow["actions"]]
+
+    def uses_any(self, prefixes, commands, workflows=None):
+        """Un workflow utilise-t-il une de ces actions ou exécute-t-il une de ces commandes?"""
+        for workflow in self.valid_workflows() if workflows is None else workflows:
+            if any(action["action"].lower().startswith(prefixes) for action in workflow["actions"]):
+                return True
+            if any(command in workflow["commands"] for command in commands):
+                return True
+        return False
+
+    def pull_request_workflows(self):
+        return [workflow for workflow in self.valid_workflows()
+                if {"pull_request", "pull_request_target", "merge_group"} & set(workflow["triggers"])]
+
+    def grants_write_all(self):
+        return any(workflow["permissions"] == "write-all"
+                   or any(job["permissions"] == "write-all" for job in workflow["jobs"])
+                   for workflow in self.valid_workflows())
+
+    def summary(self):
+        """Section `workflows` des preuves (fonction du seul contenu des workflows: mise en cache par depends_on)"""
+        valid = self.valid_workflows()
+        actions = self.actions()
+        return {
+            "count": len(valid),
+            "errors": {workflow["path"]: workflow["error"] for workflow in self.workflows if workflow.get("error")},
+            "triggers": sorted({trigger for workflow in valid for trigger in workflow["triggers"]}),
+            "permissions_declared": sum(1 for workflow in valid if permissions_declared(workflow)),
+            "write_all": self.grants_write_all(),
+            "actions": len(actions),
+            "unpinned_actions": sorted({action["uses"] for action in actions if not action["pinned"]}),
+            "tool_installs": [dict(install, workflow=workflow["path"]) for workflow in valid
+                              for install in workflow["tool_installs"]],
+            "code_scanning": self.uses_any(CODE_SCANNING_ACTIONS, CODE_SCANNING_COMMANDS),
+            "license_scanning": self.uses_any(LICENSE_ACTIONS, LICENSE_COMMANDS),
+            "security_gates": self.uses_any(SECURITY_GATE_ACTIONS, SECURITY_GATE_COMMANDS)
+        }
+
+def security_gate_fingerprint():
+    """Commandes ajoutées par l'environnement (hors source du module: empreinte du cache des vérifications)"""
+    return list(EXTRA_SECURITY_GATE_COMMANDS)
+
+def parse_workflow(content):
+    """Modèle normalisé d'un fichier de workflow (ou {"error": ...} s'il est illisible)"""
+    try:
+        document = yaml.load(content, Loader=YAML_LOADER)
+    except yaml.YAMLError as e:
+        return {"error": str(e).split('\n', 1)[0], "jobs": []}
+    if not isinstance(document, dict):
+        return {"error": "le document n'est pas un dictionnaire", "jobs": []}
+    # YAML 1.1: la clé `on` est lue comme le booléen True
+    triggers = document.get("on", document.get(True))
+    jobs = []
+    actions = []
+    tool_installs = []
+    commands = set()
+    for job_id, job in (document.get("jobs") or {}).items():
+        if not isinstance(job, dict):
+            continue
+        steps = [step for step in job.get("steps") or [] if isinstance(step, dict)]
+        jobs.append({
+            "id": str(job_id),
+            "permissions": normalize_permissions(job.get("permissions")),
+            "needs": as_list(job.get("needs")),
+            "environment": environment_name(job.get("environment")),
+            "steps": len(steps)
+        })
+        if isinstance(job.get("uses"), str):
+            # Workflow réutilisable
+            actions.append(action_reference(job["uses"], str(job_id)))
+        for index, step in enumerate(steps):
+            if isinstance(step.get("uses"), str):
+                action = action_reference(step["uses"], str(job_id))
+                inputs = step.get("with") if isinstance(step.get("with"), dict) else {}
+                # Filtre de licences (dependency-review-action: allow-licenses / deny-licenses)
+                action["licenses"] = any(key in inputs for key in ('allow-licenses', 'deny-licenses'))
+                actions.append(action)
+            script = step.get("run")
+            if isinstance(script, str):
+                commands.update(command_names(script))
+                tool_installs.extend(find_tool_installs(script, str(job_id), step.get("name") or f"#{index + 1}"))
+    return {
+        "name": document.get("name"),
+        "triggers": trigger_names(triggers),
+        "permissions": normalize_permissions(document.get("permissions")),
+        "jobs": jobs,
+        "actions": actions,
+        "commands": sorted(commands),
+        "tool_installs": tool_installs
+    }
+
+def trigger_names(triggers):
+    if isinstance(triggers, str):
+        return [triggers]
+    if isinstance(triggers, (list, dict)):
+        return sorted(str(trigger) for trigger in triggers)
+    return []
+
+def normalize_permissions(permissions):
+    """None (non déclarées), "read-all"/"write-all", ou {portée: niveau}"""
+    if permissions is None:
+        return None
+    if isinstance(permissions, str):
+        return permissions
+    if isinstance(permissions, dict):
+        return {str(scope): str(level) for scope, level in sorted(permissions.items())}
+    return str(permissions)
+
+def permissions_declared(workflow):
+    """Permissions du jeton déclarées pour le workflow ou pour chacun de ses jobs"""
+    return workflow["permissions"] is not None or all(job["permissions"] is not None for job in workflow["jobs"])
+
+def action_reference(uses, job_id):
+    """`owner/repo[/chemin]@ref` -> action, référence, épinglage par SHA"""
+    if uses.startswith('./'):
+        return {"uses": uses, "action": uses, "ref": None, "pinned": True, "job": job_id}
+    if uses.startswith('docker://'):
+        image, _, digest = uses.partition('@')
+        return {"uses": uses, "action": image, "ref": digest or None,
+                "pinned": bool(PINNED_REF.fullmatch(digest)), "job": job_id}
+    action, _, ref = uses.partition('@')
+    return {"uses": uses, "action": action, "ref": ref or None, "pinned": bool(PINNED_REF.fullmatch(ref)),
+            "job": job_id}
+
+def command_names(script):
+    """Commandes lancées par un script `run` (premier mot de chaque commande, et `npm audit`/`reuse lint`)"""
+    names = set()
+    for command in re.split(r'[\n;|&]+', script):
+        words = command.strip().split()
+        while words and (words[0] in ('sudo', 'env', 'time', 'exec') or '=' in words[0]):
+            words = words[1:]
+        if words:
+            names.add(os.path.basename(words[0]))
+            if len(words) > 1:
+                names.add(f"{os.path.basename(words[0])} {words[1]}")
+    return names
+
+def find_tool_installs(script, job_id, step):
+    """Outils téléchargés (curl/wget) ou installés (pip, apt, npm...) par une étape"""
+    verified = bool(CHECKSUM_VERIFICATION.search(script))
+    installs = []
+    for method, url in DOWNLOAD_COMMAND.findall(script):
+        tool = url.rstrip('/').rsplit('/', 1)[-1].split('?', 1)[0]
+        # Binaire nommé d'après le dépôt GitHub de publication (…/opa/releases/download/…)
+        release = re.search(r'github\.com/[^/]+/([^/]+)/releases/', url)
+        installs.append({"job": job_id, "step": step, "method": method, "tool": release[1] if release else tool,
+                         "url": url, "verified": verified})
+    for manager, arguments in PACKAGE_INSTALL.findall(script):
+        installs.append({"job": job_id, "step": step, "method": manager, "tool": arguments.strip() or None,
+                         "url": None, "verified": verified or '--require-hashes' in arguments})
+    return installs
+
+def as_list(value):
+    if value is None:
+        return []
+    return [str(item) for item in value] if isinstance(value, list) else [str(value)]
+
+def environment_name(environment):
+    if isinstance(environment, dict):
+        return environment.get("name")
+    return environment
+
+# Analyseur actif pour la collecte en cours (None = analyseur en mémoire, sans cache)
+_active_analyzer = None
+
+def get_workflow_analyzer():
+    """Analyseur à jour pour l'instantané courant"""
+    global _active_analyzer
+    if _active_analyzer is None:
+        _active_analyzer = WorkflowAnalyzer()
+    return _active_analyzer.refresh()
+
+def set_workflow_analyzer(analyzer):
+    global _active_analyzer
+    _active_analyzer = analyzer
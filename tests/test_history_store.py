@@ -0,0 +1,81 @@
+"""Historique SQLite: bascules des contrôles, exécutions rétroactives et comparaisons"""
+import pytest
+
+from history_store import HistoryStore
+
+REPOSITORY = "acme/app"
+
+
+@pytest.fixture
+def store():
+    with HistoryStore(':memory:') as store:
+        yield store
+
+
+def record(store, timestamp, controls, scores=None, **fields):
+    return store.record_run(REPOSITORY, timestamp, controls, scores or {}, **fields)
+
+
+def control_state(store, control_id):
+    row = store.connection.execute(
+        "SELECT compliant, flips, runs, last_timestamp FROM control_state WHERE repository = ? AND control_id = ?",
+        (REPOSITORY, control_id)).fetchone()
+    return dict(row)
+
+
+def test_in_order_flips(store):
+    record(store, "2026-01-01T00:00:00", {"A.5.1": True, "A.8.8": False, "A.8.9": None})
+    record(store, "2026-01-02T00:00:00", {"A.5.1": False, "A.8.8": False})
+    record(store, "2026-01-03T00:00:00", {"A.5.1": True, "A.8.8": True})
+
+    assert control_state(store, "A.5.1") == {"compliant": 1, "flips": 2, "runs": 3,
+                                              "last_timestamp": "2026-01-03T00:00:00"}
+    assert control_state(store, "A.8.8")["flips"] == 1
+    # Valeur None: non évalué, rien n'est enregistré
+    assert store.control_trend(REPOSITORY, "A.8.9") == []
+    assert store.flapping_controls(REPOSITORY) == [{"control_id": "A.5.1", "flips": 2, "runs": 3},
+                                                   {"control_id": "A.8.8", "flips": 1, "runs": 3}]
+    assert store.flapping_controls(REPOSITORY, since="2026-01-03") == [{"control_id": "A.5.1", "flips": 1},
+                                                                       {"control_id": "A.8.8", "flips": 1}]
+
+
+def test_backfilled_run_does_not_flip_current_state(store):
+    record(store, "2026-02-01T00:00:00", {"A.5.1": True})
+    latest = record(store, "2026-02-02T00:00:00", {"A.5.1": True})
+    # Exécution rétroactive (commit plus ancien), ajoutée après coup
+    record(store, "2026-01-15T00:00:00", {"A.5.1": False})
+
+    assert control_state(store, "A.5.1") == {"compliant": 1, "flips": 0, "runs": 3,
+                                              "last_timestamp": "2026-02-02T00:00:00"}
+    assert store.flapping_controls(REPOSITORY) == []
+    assert [point["compliant"] for point in store.control_trend(REPOSITORY, "A.5.1")] == [False, True, True]
+    assert store.latest_run(REPOSITORY)["id"] == latest
+    # Dernière exécution comparée à la précédente dans le temps, pas dans l'ordre d'insertion
+    assert store.regressions(REPOSITORY)["regressed_controls"] == []
+
+
+def test_compare_runs(store):
+    baseline = record(store, "2026-03-01T00:00:00", {"A.5.1": True, "A.5.2": False, "A.8.8": True},
+                      {"access_control": 100, "github_security": 50, "awareness": 80},
+                      statuses={"access_control": "CONFORME"})
+    current = record(store, "2026-03-02T00:00:00", {"A.5.1": False, "A.5.2": True, "A.8.8": True, "A.8.9": True},
+                     {"access_control": 50, "github_security": 100, "awareness": 80, "secret_scanning": 100},
+                     statuses={"access_control": "NON CONFORME"})
+
+    comparison = store.compare_runs(baseline, current)
+    assert comparison["regressed_controls"] == ["A.5.1"]
+    assert comparison["fixed_controls"] == ["A.5.2"]
+    assert comparison["regressed_packages"] == [{"package": "access_control", "before": 100, "after": 50,
+                                                 "status_before": "CONFORME", "status_after": "NON CONFORME"}]
+    assert [package["package"] for package in comparison["improved_packages"]] == ["github_security"]
+
+    regressions = store.regressions(REPOSITORY)
+    assert (regressions["baseline"]["id"], regressions["current"]["id"]) == (baseline, current)
+    assert regressions["regressed_controls"] == ["A.5.1"]
+
+
+def test_regressions_need_a_baseline(store):
+    assert store.regressions(REPOSITORY) is None
+    record(store, "2026-04-01T00:00:00", {"A.5.1": True})
+    assert store.regressions(REPOSITORY) is None
+    assert store.summary(REPOSITORY)["runs"] == 1
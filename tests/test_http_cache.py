@@ -0,0 +1,70 @@
+"""Cache HTTP de l'API GitHub: taille totale tenue à jour, éviction LRU et réouverture"""
+import sqlite3
+
+from http_cache import HttpCache, build_response
+
+URL = "https://api.github.com/repos/acme/app"
+
+
+def response(body, url=URL):
+    return build_response(url, 200, {"ETag": f'"{len(body)}"'}, body)
+
+
+def table_size(path):
+    with sqlite3.connect(path) as connection:
+        return connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+
+def test_running_total_follows_inserts_and_replacements(tmp_path):
+    cache = HttpCache(str(tmp_path / "cache.db"), max_bytes=10_000)
+    cache.store("a", response(b"x" * 100))
+    cache.store("b", response(b"y" * 300))
+    cache.store("a", response(b"z" * 50))
+    summary = cache.summary()
+    assert (summary["entries"], summary["bytes"]) == (2, 350)
+    assert summary["bytes"] == table_size(cache.path)
+    cache.close()
+
+
+def test_least_recently_read_entries_are_evicted(tmp_path):
+    cache = HttpCache(str(tmp_path / "cache.db"), max_bytes=1000)
+    for key in ("old", "read", "new"):
+        cache.store(key, response(b"x" * 300, f"{URL}/{key}"))
+    cache.touch("read")
+    # 1200 octets > 1000: éviction jusqu'à 900 octets au plus, en commençant par "old"
+    cache.store("last", response(b"x" * 300, f"{URL}/last"))
+    assert cache.lookup("old") == (None, False)
+    assert cache.lookup("read")[0] is not None
+    summary = cache.summary()
+    assert summary["evicted"] == 1
+    assert summary["bytes"] == 900 == table_size(cache.path)
+    cache.close()
+
+
+def test_total_initialized_from_existing_cache_and_shared(tmp_path):
+    path = str(tmp_path / "cache.db")
+    first = HttpCache(path)
+    first.store("a", response(b"x" * 200))
+    # Base d'un cache antérieur aux compteurs: le total est recalculé une fois
+    first.connection.executescript("DROP TABLE cache_size; DROP TRIGGER responses_size_insert;"
+                                   "DROP TRIGGER responses_size_update; DROP TRIGGER responses_size_delete;")
+    first.connection.execute("INSERT INTO responses SELECT 'b', url, status, headers, body, etag, last_modified,"
+                             " fetched_at, accessed_at, size FROM responses WHERE key = 'a'")
+    first.close()
+    second = HttpCache(path)
+    third = HttpCache(path)
+    assert second.summary()["bytes"] == 400
+    third.store("c", response(b"y" * 100))
+    assert second.summary()["bytes"] == 500 == table_size(path)
+    second.close()
+    third.close()
+
+
+def test_close_then_lazy_reopen(tmp_path):
+    cache = HttpCache(str(tmp_path / "cache.db"))
+    cache.store("a", response(b"x" * 10))
+    cache.close()
+    cache.close()
+    stored, fresh = cache.lookup("a")
+    assert stored.content == b"x" * 10 and fresh
+    cache.close()
@@ -0,0 +1,25 @@
+"""Serveur OPA: ressources libérées quand opa s'arrête au démarrage"""
+import os
+import stat
+
+import pytest
+
+from opa_server import OpaServer, OpaServerError
+
+
+@pytest.fixture
+def failing_opa(tmp_path, monkeypatch):
+    """Binaire `opa` qui écrit une erreur et s'arrête aussitôt"""
+    opa = tmp_path / "opa"
+    opa.write_text("#!/bin/sh\necho 'error: policy.rego:1: rego_parse_error' >&2\nexit 1\n")
+    opa.chmod(opa.stat().st_mode | stat.S_IXUSR)
+    monkeypatch.setenv('PATH', f"{tmp_path}{os.pathsep}{os.environ['PATH']}")
+    return opa
+
+
+def test_startup_failure_releases_process_and_error_log(failing_opa, tmp_path):
+    server = OpaServer(["policy.rego"], socket_path=str(tmp_path / "opa.sock"), startup_timeout=5)
+    with pytest.raises(OpaServerError, match="rego_parse_error"):
+        server.start()
+    assert server.process is None
+    assert server.stderr is None
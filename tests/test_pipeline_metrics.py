@@ -0,0 +1,46 @@
+"""Fichier de métriques: format texte Prometheus accepté par le collecteur textfile de node_exporter"""
+import re
+
+from pipeline_metrics import Metrics
+
+SAMPLE_RE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)\{([^}]*)\} (\S+)$')
+
+
+def sample_metrics():
+    metrics = Metrics("test")
+    with metrics.stage("collect"):
+        pass
+    metrics.record_check("check_has_tests", 0.001, cached=False)
+    metrics.record_check("check_has_tests", 0.0, cached=True)
+    metrics.record_cache("checks", 3, 1)
+    metrics.add_bytes_read(1024)
+    return metrics
+
+
+def test_samples_belong_to_declared_families():
+    declared = {}
+    helped = set()
+    for line in sample_metrics().to_prometheus().splitlines():
+        if line.startswith('# HELP '):
+            helped.add(line.split(' ')[2])
+        elif line.startswith('# TYPE '):
+            _, _, name, metric_type = line.split(' ')
+            assert name not in declared
+            declared[name] = metric_type
+        else:
+            match = SAMPLE_RE.match(line)
+            assert match, line
+            assert match.group(1) in declared
+            float(match.group(3))
+    assert helped == set(declared)
+    assert all(name.endswith('_total') for name, metric_type in declared.items() if metric_type == 'counter')
+
+
+def test_no_openmetrics_terminator():
+    assert '# EOF' not in sample_metrics().to_prometheus()
+
+
+def test_textfile_written_atomically(tmp_path):
+    path = sample_metrics().write_prometheus(str(tmp_path))
+    assert path == str(tmp_path / "test.prom")
+    assert [entry.name for entry in tmp_path.iterdir()] == ["test.prom"]
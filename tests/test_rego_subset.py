@@ -0,0 +1,98 @@
+"""Évaluateur Rego intégré: résultats attendus des politiques et comparaison à `opa eval`"""
+import glob
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from rego_subset import RegoUnsupportedError, compile_policy, differential_check, load_policy
+
+POLICY_PATHS = sorted(glob.glob('policies/**/*.rego', recursive=True))
+
+# (politique, input, valeurs attendues des règles)
+GOLDEN_CASES = [
+    ('policies/organizational/access-control.rego', {},
+     {"security_policies_defined": False, "roles_responsibilities_defined": False, "access_control_score": 0}),
+    ('policies/organizational/access-control.rego',
+     {"policies": {"information_security_policy": True, "total_policies": 3}},
+     {"security_policies_defined": True, "roles_responsibilities_defined": True, "access_control_score": 100}),
+    ('policies/organizational/access-control.rego',
+     {"policies": {"information_security_policy": False, "total_policies": 2}},
+     {"security_policies_defined": False, "roles_responsibilities_defined": True, "access_control_score": 50}),
+    ('policies/people/awareness-training.rego', {"system": {"has_readme": True}},
+     {"security_awareness": True, "awareness_score": 100}),
+    ('policies/people/awareness-training.rego', {"system": {"has_readme": False}},
+     {"security_awareness": False, "awareness_score": 0}),
+    ('policies/people/awareness-training.rego', {},
+     {"security_awareness": False, "awareness_score": 0}),
+    ('policies/technological/secret-scanning.rego', {"secrets": {"files_scanned": 10, "findings_count": 0}},
+     {"secrets_scan_performed": True, "no_exposed_secrets": True, "secret_scanning_score": 100}),
+    ('policies/technological/secret-scanning.rego', {"secrets": {"files_scanned": 10, "findings_count": 2}},
+     {"secrets_scan_performed": True, "no_exposed_secrets": False, "secret_scanning_score": 50}),
+    ('policies/technological/secret-scanning.rego', {"secrets": {"files_scanned": 0, "findings_count": 0}},
+     {"secrets_scan_performed": False, "no_exposed_secrets": False, "secret_scanning_score": 0}),
+    # Sans index OSV, la troisième règle ne compte pas dans le score
+    ('policies/technological/github-security.rego',
+     {"github": {"security_features": {"code_scanning": False, "dependabot": True}}},
+     {"malware_protection_enabled": False, "vulnerability_management_enabled": True,
+      "dependencies_free_of_known_vulnerabilities": False, "github_security_score": 50}),
+    ('policies/technological/github-security.rego',
+     {"github": {"security_features": {"code_scanning": True, "dependabot": True}},
+      "vulnerabilities": {"database": {"available": False}, "pinned": 4, "findings_count": 0}},
+     {"dependencies_free_of_known_vulnerabilities": False, "github_security_score": 100}),
+    ('policies/technological/github-security.rego',
+     {"github": {"security_features": {"code_scanning": True, "dependabot": True}},
+      "vulnerabilities": {"database": {"available": True}, "pinned": 4, "findings_count": 0}},
+     {"dependencies_free_of_known_vulnerabilities": True, "github_security_score": 100}),
+    ('policies/technological/github-security.rego',
+     {"github": {"security_features": {"code_scanning": True, "dependabot": True}},
+      "vulnerabilities": {"database": {"available": True}, "pinned": 4, "findings_count": 1}},
+     {"dependencies_free_of_known_vulnerabilities": False, "github_security_score": pytest.approx(200 / 3)}),
+]
+
+
+def real_opa():
+    """Binaire opa disponible, hors substitut des benchmarks (qui évalue avec rego_subset)"""
+    if shutil.which('opa') is None:
+        return False
+    result = subprocess.run(['opa', 'version'], capture_output=True, text=True)
+    return result.returncode == 0 and 'standin' not in result.stdout
+
+
+def require_real_opa():
+    """Ignore la comparaison sans opa, sauf en CI (variable CI) où elle doit s'exécuter"""
+    if real_opa():
+        return
+    if os.getenv('CI'):
+        pytest.fail("binaire opa absent en CI: la comparaison à opa eval ne peut pas être ignorée")
+    pytest.skip("binaire opa absent")
+
+
+@pytest.mark.parametrize('policy_path', POLICY_PATHS)
+def test_policies_stay_in_subset(policy_path):
+    assert load_policy(policy_path).rule_names
+
+
+@pytest.mark.parametrize('policy_path, input_doc, expected', GOLDEN_CASES)
+def test_golden_results(policy_path, input_doc, expected):
+    document = load_policy(policy_path).evaluate(input_doc)
+    assert {name: document.get(name) for name in expected} == expected
+
+
+@pytest.mark.parametrize('source', [
+    'package p\nimport future.keywords\nallow { true }',
+    'package p\nallow { data.other.rule }',
+    'package p\ndeny[msg] { msg := "x" }',
+    'package p\nallow { some x; input.items[x] }',
+])
+def test_unsupported_constructs_are_rejected(source):
+    with pytest.raises(RegoUnsupportedError):
+        compile_policy(source)
+
+
+@pytest.mark.parametrize('policy_path', POLICY_PATHS)
+def test_matches_opa_eval(policy_path):
+    require_real_opa()
+    seeds = [input_doc for path, input_doc, _ in GOLDEN_CASES if path == policy_path] or [{}]
+    assert differential_check([policy_path], seeds) == []
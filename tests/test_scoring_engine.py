@@ -0,0 +1,83 @@
+"""Scores de flotte vectorisés: cohérence avec calculate_realistic_score et agrégats"""
+import json
+
+import numpy as np
+import pytest
+
+from collect_real_evidence import calculate_realistic_score
+from evaluate_with_opa import assess_compliance_status
+from scoring_engine import ScoreMatrix, load_weights
+
+RESULTS = [
+    {"repository": "api", "overall_score": 85.0,
+     "controles": {"A.5.1": True, "A.5.2": False, "A.6.3": True, "A.8.7": True, "A.8.8": None, "A.8.26": True}},
+    {"repository": "web", "overall_score": 62.5,
+     "controles": {"A.5.1": True, "A.5.2": True, "A.6.3": False, "A.8.7": False, "A.8.8": False, "A.8.26": True,
+                   "A.8.32": True}},
+    {"repository": "ops", "overall_score": 20.0,
+     "controles": {"A.5.1": False, "A.8.7": False, "A.8.8": True}},
+    {"repository": "broken", "status": "error", "error": "checkout introuvable"},
+]
+GROUPS = {"api": {"team": "platform", "org": "acme"}, "web": {"team": "platform", "org": "acme"},
+          "ops": {"team": "infra"}}
+
+
+@pytest.fixture
+def matrix():
+    return ScoreMatrix.from_results(RESULTS)
+
+
+def test_equal_weights_match_calculate_realistic_score(matrix):
+    assert matrix.repositories == ["api", "web", "ops"]
+    expected = [calculate_realistic_score(result["controles"]) for result in RESULTS[:3]]
+    assert matrix.realistic_scores().tolist() == expected
+
+
+def test_weights(matrix, tmp_path):
+    path = tmp_path / "weights.json"
+    path.write_text(json.dumps({"A.8.8": 4, "A.5.1": 0}))
+    weights = load_weights(str(path))
+    assert weights == {"A.8.8": 4.0, "A.5.1": 0.0}
+    # ops: A.8.7 (poids 1) non satisfait, A.8.8 (poids 4) satisfait, A.5.1 ignoré
+    assert matrix.realistic_scores(weights).tolist()[2] == 80.0
+    assert matrix.summary(weights)["weights"] == weights
+
+
+def test_theme_scores(matrix):
+    assert matrix.themes == ["A.5", "A.6", "A.7", "A.8"]
+    themes = matrix.theme_scores()
+    # Thème sans contrôle évalué: 0
+    assert themes.tolist() == [[50.0, 100.0, 0.0, 66.7], [100.0, 0.0, 0.0, 50.0], [0.0, 0.0, 0.0, 50.0]]
+    # Flotte: contrôles de tous les dépôts mis en commun
+    assert matrix.fleet_theme_scores() == {"A.5": 60.0, "A.6": 50.0, "A.7": 0.0, "A.8": 55.6}
+    assert matrix.fleet_score() == 56.2
+
+
+def test_rollup(matrix):
+    teams = matrix.rollup([GROUPS[repository]["team"] for repository in matrix.repositories])
+    assert teams["platform"]["repositories"] == 2
+    # 8 contrôles satisfaits sur 13 évalués (api + web)
+    assert teams["platform"]["score_realiste"] == 61.5
+    assert teams["platform"]["overall_score"] == 73.8
+    assert teams["platform"]["status"] == "PARTIELLEMENT CONFORME"
+    assert teams["infra"]["score_realiste"] == 33.3
+    assert teams["infra"]["themes"]["A.8"] == 50.0
+    summary = matrix.summary(groups=GROUPS)
+    assert summary["rollups"]["org"]["acme"]["repositories"] == 2
+    assert summary["rollups"]["org"]["(non affecté)"]["repositories"] == 1
+
+
+def test_percentiles(matrix):
+    assert matrix.percentiles(np.array([0.0, 50.0, 100.0])) == {"p10": 10.0, "p25": 25.0, "p50": 50.0,
+                                                                 "p75": 75.0, "p90": 90.0}
+    assert matrix.percentiles(np.array([])) == {}
+
+
+def test_statuses_match_assess_compliance_status(matrix):
+    scores = [100, 80, 79.9, 60, 59.9, 0]
+    expected = assess_compliance_status(dict(enumerate(scores)))
+    assert matrix.statuses(np.array(scores)).tolist() == [expected[index] for index in range(len(scores))]
+    summary = matrix.summary()
+    assert summary["compliance_status"] == {"api": "CONFORME", "web": "PARTIELLEMENT CONFORME",
+                                            "ops": "NON CONFORME"}
+    assert summary["fleet_overall_score"] == 55.8
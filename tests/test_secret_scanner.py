@@ -0,0 +1,79 @@
+"""Recherche de secrets: règles, filtre d'entropie et chevauchement des découvertes
+
+Les jetons d'essai sont assemblés à l'exécution: ce fichier lui-même ne doit
+rien déclencher quand le pipeline analyse le dépôt.
+"""
+import base64
+import hashlib
+
+import pytest
+
+from secret_scanner import ENTROPY_THRESHOLDS, scan_content, shannon_entropy
+
+# Valeurs aléatoires mais reproductibles: base64 (≈ 6 bits/caractère) et hexadécimal (4 bits au plus)
+RANDOM_B64 = base64.b64encode(hashlib.sha512(b'secret-scanner-tests').digest()).decode().rstrip('=')
+RANDOM_ALNUM = ''.join(char for char in RANDOM_B64 if char.isalnum())
+RANDOM_HEX = hashlib.sha256(b'secret-scanner-tests').hexdigest()
+
+
+def assignment(key, value):
+    return f'{key} = "{value}"\n'.encode()
+
+
+def rules(content):
+    return [rule for rule, _, _ in scan_content(content)]
+
+
+@pytest.mark.parametrize('rule, content', [
+    ("private_key", ('-----BEGIN ' + 'RSA PRIVATE KEY-----\n').encode()),
+    ("aws_access_key_id", f"key_id: {'AK' + 'IA' + RANDOM_ALNUM[:16].upper()}\n".encode()),
+    ("aws_secret_access_key", f"aws_secret_access_key={RANDOM_B64[:40]}\n".encode()),
+    ("github_token", f"url = https://{'gh' + 'p_' + RANDOM_ALNUM[:36]}@github.com\n".encode()),
+    ("github_fine_grained_token", f"{'github' + '_pat_' + (RANDOM_ALNUM * 2)[:82]}\n".encode()),
+    ("gitlab_token", f"{'gl' + 'pat-' + RANDOM_ALNUM[:20]}\n".encode()),
+    ("slack_token", f"{'xo' + 'xb-' + RANDOM_ALNUM[:24]}\n".encode()),
+    ("google_api_key", f"{'AI' + 'za' + RANDOM_ALNUM[:35]}\n".encode()),
+    ("stripe_live_key", f"{'sk' + '_live_' + RANDOM_ALNUM[:24]}\n".encode()),
+    ("generic_secret", assignment('db_' + 'password', RANDOM_ALNUM[:20])),
+    ("high_entropy_string", f"blob = '{RANDOM_B64[:48]}'\n".encode()),
+])
+def test_each_rule_detects_its_secret(rule, content):
+    assert rules(content) == [rule]
+
+
+def test_finding_line_and_redacted_preview():
+    token = 'gh' + 'p_' + RANDOM_ALNUM[:36]
+    findings = scan_content(f"# config\n\nclone {token}\n".encode())
+    assert findings == [("github_token", 3, f"{token[:4]}…(40)")]
+
+
+@pytest.mark.parametrize('content', [
+    assignment('api_' + 'key', 'aaaaaaaabbbbbbbb'),
+    assignment('pass' + 'word', 'your_password_here'),
+    assignment('to' + 'ken', '${{ secrets.TOKEN }}'),
+    f'checksum = "{RANDOM_HEX}"\n'.encode(),
+])
+def test_low_entropy_and_placeholders_are_ignored(content):
+    assert rules(content) == []
+
+
+def test_entropy_thresholds():
+    assert shannon_entropy(b'aaaa') == 0
+    assert shannon_entropy(RANDOM_HEX.encode()) < ENTROPY_THRESHOLDS["high_entropy_string"]
+    assert shannon_entropy(RANDOM_B64.encode()) > ENTROPY_THRESHOLDS["high_entropy_string"]
+
+
+def test_generic_assignment_of_known_token_reported_once_under_specific_rule():
+    assert rules(assignment('GITHUB_' + 'TOKEN', 'gh' + 'p_' + RANDOM_ALNUM[:36])) == ["github_token"]
+
+
+def test_rejected_generic_match_does_not_hide_nested_token():
+    # Valeur générique à faible entropie: écartée, mais le jeton Slack qu'elle contient est trouvé
+    token = 'xo' + 'xb-' + '1' * 10 + '-' + '1' * 10
+    assert rules(assignment('slack_' + 'credential', token)) == ["slack_token"]
+
+
+def test_allow_marker_and_binary_content():
+    token = 'gh' + 'p_' + RANDOM_ALNUM[:36]
+    assert scan_content(f"fixture = '{token}'  # no{'secret'}\n".encode()) == []
+    assert scan_content(b'\0\1' + token.encode()) is None
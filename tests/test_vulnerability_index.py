@@ -0,0 +1,128 @@
+"""Index OSV: ordre des versions PEP 440, intervalles touchés et fichiers de dépendances"""
+import json
+
+import pytest
+
+from check_cache import set_check_cache
+from collect_real_evidence import scan_dependency_vulnerabilities
+from repo_snapshot import RepoSnapshot, set_snapshot
+from vulnerability_index import (VulnerabilityIndex, parse_requirements, range_intervals, requirement_includes,
+                                 set_vulnerability_index, version_key)
+
+
+def advisory(advisory_id, name, events=None, versions=None, **fields):
+    affected = {"package": {"ecosystem": "PyPI", "name": name}}
+    if events is not None:
+        affected["ranges"] = [{"type": "ECOSYSTEM", "events": events}]
+    if versions is not None:
+        affected["versions"] = versions
+    return dict({"id": advisory_id, "affected": [affected]}, **fields)
+
+
+def index_of(*advisories):
+    index = VulnerabilityIndex(None)
+    for document in advisories:
+        index.add(document)
+    index.available = True
+    return index
+
+
+def test_pep440_ordering():
+    ordered = ['1.0.dev1', '1.0a1.dev1', '1.0a1', '1.0b2', '1.0rc1', '1.0', '1.0.post1.dev1', '1.0.post1',
+               '1.0.1', '1.1', '2.0', '1!0.1']
+    keys = [version_key(version) for version in ordered]
+    assert keys == sorted(keys)
+    assert len(set(keys)) == len(keys)
+
+
+@pytest.mark.parametrize('left, right', [('1.0', '1.0.0'), ('1.0alpha1', '1.0a1'), ('1.0-1', '1.0.post1'),
+                                         ('v2.1', '2.1'), ('1.0+local.1', '1.0'), ('1.0c1', '1.0rc1')])
+def test_equivalent_spellings(left, right):
+    assert version_key(left) == version_key(right)
+
+
+def test_unrecognized_version():
+    assert version_key('not-a-version') is None
+
+
+@pytest.mark.parametrize('events, expected', [
+    ([{"introduced": "0"}, {"fixed": "1.2"}], [[None, "1.2", None]]),
+    ([{"introduced": "1.0"}, {"last_affected": "1.4"}], [["1.0", None, "1.4"]]),
+    ([{"introduced": "2.0"}], [["2.0", None, None]]),
+    # Événements non triés: deux intervalles disjoints
+    ([{"fixed": "2.1"}, {"introduced": "2.0"}, {"fixed": "1.1"}, {"introduced": "1.0"}],
+     [["1.0", "1.1", None], ["2.0", "2.1", None]]),
+])
+def test_range_intervals(events, expected):
+    assert range_intervals(events) == expected
+
+
+def test_lookup_ranges_and_explicit_versions():
+    index = index_of(
+        advisory("GHSA-range", "Demo_Pkg", [{"introduced": "1.0"}, {"fixed": "1.2"},
+                                             {"introduced": "2.0"}, {"fixed": "2.0.3"}]),
+        advisory("GHSA-last", "demo-pkg", [{"introduced": "0"}, {"last_affected": "1.0.5"}]),
+        advisory("PYSEC-versions", "demo.pkg", versions=["3.0rc1"]),
+        advisory("GHSA-withdrawn", "demo-pkg", [{"introduced": "0"}], withdrawn="2024-01-01T00:00:00Z"),
+    )
+
+    def found(version):
+        return [(finding["advisory"], finding["fixed"]) for finding in index.lookup("demo_pkg", version)]
+
+    assert found("0.9") == [("GHSA-last", None)]
+    assert found("1.0") == [("GHSA-range", "1.2"), ("GHSA-last", None)]
+    assert found("1.1.9") == [("GHSA-range", "1.2")]
+    assert found("1.2") == []
+    assert found("2.0.2") == [("GHSA-range", "2.0.3")]
+    assert found("2.0.3") == []
+    assert found("3.0rc1") == [("PYSEC-versions", None)]
+    assert found("3.0") == []
+
+
+def test_same_advisory_in_two_files_is_indexed_once(tmp_path):
+    document = advisory("GHSA-dup", "demo", [{"introduced": "0"}, {"fixed": "1.0"}], summary="demo")
+    for directory in ("a", "b"):
+        (tmp_path / directory).mkdir()
+        (tmp_path / directory / "GHSA-dup.json").write_text(json.dumps(document))
+    index = VulnerabilityIndex(None)
+    index.build(str(tmp_path))
+    assert index.summary()["advisories"] == 1
+    assert index.packages["demo"]["ranges"] == [[0, None, "1.0", None]]
+    assert [finding["advisory"] for finding in index.lookup("demo", "0.5")] == ["GHSA-dup"]
+
+
+def test_parse_requirements():
+    content = ("-r requirements.txt\n"
+               "requests[socks]==2.31.0 ; python_version >= '3.8'  # commentaire\n"
+               "urllib3 == 2.0.7 \\\n    --hash=sha256:abc\n"
+               "pyyaml>=6\n"
+               "-e .\n")
+    assert parse_requirements(content) == [("requests", "2.31.0", "==2.31.0"), ("urllib3", "2.0.7", "==2.0.7"),
+                                           ("pyyaml", None, ">=6")]
+
+
+def test_requirement_includes():
+    content = ("-r ../base.txt\n-c=constraints.txt\n--requirement https://example.com/r.txt\n"
+               "-rlocal.in  # commentaire\n--constraint ../../outside.txt\n")
+    assert requirement_includes("requirements/dev.txt", content) == [
+        "base.txt", "requirements/constraints.txt", "requirements/local.in"]
+    assert requirement_includes("poetry.lock", "-r base.txt") == []
+
+
+def test_scan_follows_includes(tmp_path):
+    (tmp_path / "requirements.txt").write_text("requests==2.31.0\npyyaml\n")
+    (tmp_path / "requirements-dev.txt").write_text("-r requirements.txt\n-c constraints.txt\npytest==8.3.3\n")
+    (tmp_path / "constraints.txt").write_text("urllib3==2.0.7\n")
+    set_snapshot(RepoSnapshot.from_directory(str(tmp_path)))
+    set_check_cache(None)
+    set_vulnerability_index(index_of(advisory("GHSA-urllib3", "urllib3", [{"introduced": "0"}, {"fixed": "2.0.8"}])))
+    try:
+        scan = scan_dependency_vulnerabilities()
+    finally:
+        set_snapshot(None)
+        set_vulnerability_index(None)
+    assert scan["files"] == ["constraints.txt", "requirements-dev.txt", "requirements.txt"]
+    assert scan["pinned"] == 3
+    assert scan["unpinned"] == ["pyyaml"]
+    assert [(finding["package"], finding["file"], finding["fixed"]) for finding in scan["findings"]] == [
+        ("urllib3", "constraints.txt", "2.0.8")]